@@ -0,0 +1,49 @@
+"""
+Script for rewriting the stored structures of split courses in the configured structure storage mode
+"""
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+
+
+# To run from command line: ./manage.py cms compact_structures course-v1:org+course+run
+
+
+class Command(BaseCommand):
+    """Rewrite the stored structures of split courses"""
+    help = '''
+    Rewrite every stored version of the structure of split courses: as deltas against periodic
+    snapshots if the split modulestore has the delta_structures option set, otherwise whole.
+    Takes the course ids of the courses to rewrite, or:
+    --all: rewrite the structures of every split course
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_keys', nargs='*', help="IDs of the Courses to rewrite the structures of")
+        parser.add_argument('--all', action='store_true', help="Rewrite the structures of every split course")
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        store = modulestore()
+        split_store = store._get_modulestore_by_type(ModuleStoreEnum.Type.split)  # pylint: disable=protected-access
+        if split_store is None:
+            raise CommandError("There's no split modulestore.")
+
+        if options['all']:
+            course_keys = [course_summary.id for course_summary in split_store.get_course_summaries()]
+        elif options['course_keys']:
+            try:
+                course_keys = [CourseKey.from_string(course_key) for course_key in options['course_keys']]
+            except InvalidKeyError:
+                raise CommandError("Invalid course key.")
+        else:
+            raise CommandError("Either course ids or --all must be given.")
+
+        for course_key in course_keys:
+            if not split_store.has_course(course_key):
+                raise CommandError("Course {} not found in the split modulestore.".format(course_key))
+            count = split_store.compact_course_structures(course_key)
+            print "Rewrote {} structures of course '{}'.".format(count, course_key)
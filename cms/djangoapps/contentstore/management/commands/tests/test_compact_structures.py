@@ -0,0 +1,59 @@
+"""
+Tests for the compact_structures management command
+"""
+import mock
+from django.core.management import call_command, CommandError
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class TestCompactStructures(ModuleStoreTestCase):
+    """
+    Tests for the compact_structures management command
+    """
+    def setUp(self):
+        super(TestCompactStructures, self).setUp()
+        self.course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        self.chapter = ItemFactory.create(category='chapter', parent_location=self.course.location)
+        for index in range(3):
+            ItemFactory.create(
+                category='html', parent_location=self.chapter.location, display_name='html {}'.format(index)
+            )
+        # pylint: disable=protected-access
+        self.split_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.split)
+
+    def count_deltas(self):
+        """
+        Return the number of structures stored as deltas.
+        """
+        return self.split_store.db_connection.structures.find({'snapshot_version': {'$exists': True}}).count()
+
+    def test_no_args(self):
+        """
+        Test 'compact_structures' command with no arguments
+        """
+        with self.assertRaisesRegexp(CommandError, "Either course ids or --all must be given."):
+            call_command('compact_structures')
+
+    def test_course_key_not_found(self):
+        """
+        Test 'compact_structures' command with non-existing course key
+        """
+        with self.assertRaisesRegexp(CommandError, "not found in the split modulestore"):
+            call_command('compact_structures', 'course-v1:org+course+run')
+
+    def test_compact_and_expand(self):
+        """
+        Test that the structures are rewritten as deltas and back, and stay readable
+        """
+        self.assertEqual(self.count_deltas(), 0)
+        # store every change to this small course as a delta
+        with mock.patch.multiple(self.split_store.db_connection, delta_structures=True, MAX_STRUCTURE_DELTA_RATIO=1):
+            call_command('compact_structures', unicode(self.course.id))
+        self.assertGreater(self.count_deltas(), 0)
+        self.assertEqual(len(self.store.get_item(self.chapter.location).children), 3)
+
+        call_command('compact_structures', '--all')
+        self.assertEqual(self.count_deltas(), 0)
+        self.assertEqual(len(self.store.get_item(self.chapter.location).children), 3)
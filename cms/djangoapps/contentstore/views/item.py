@@ -61,6 +61,7 @@ from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.draft_and_published import DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.exceptions import InvalidLocationError, ItemNotFoundError
 from xmodule.modulestore.inheritance import own_metadata
+from xmodule.modulestore.split_mongo import DefinitionPrefetchPolicy
 from xmodule.services import ConfigurationService, SettingsService
 from xmodule.tabs import CourseTabList
 from xmodule.x_module import DEPRECATION_VSCOMPAT_EVENT, PREVIEW_VIEWS, STUDENT_VIEW, STUDIO_VIEW
@@ -303,8 +304,13 @@ def xblock_view_handler(request, usage_key_string, view_name):
 
     if 'application/json' in accept_header:
         store = modulestore()
-        xblock = store.get_item(usage_key)
         container_views = ['container_preview', 'reorderable_container_child_preview', 'container_child_preview']
+        if view_name in container_views and request.GET.get('enable_paging', 'false') != 'true':
+            # A container renders all of its descendants, so load their definitions in batches
+            # rather than one at a time as each of them is rendered.
+            xblock = store.get_item(usage_key, depth=None, prefetch_definitions=DefinitionPrefetchPolicy())
+        else:
+            xblock = store.get_item(usage_key)
 
         # wrap the generated fragment in the xmodule_editor div so that the javascript
         # can bind to it correctly
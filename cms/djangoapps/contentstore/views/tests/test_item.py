@@ -218,6 +218,30 @@ class GetItemTest(ItemTest):
         # Verify that the Studio element wrapper has been added
         self.assertIn('level-element', html)
 
+    def test_split_container_preview_prefetches_definitions(self):
+        with self.store.default_store(ModuleStoreEnum.Type.split):
+            course = CourseFactory.create()
+            chapter = ItemFactory.create(parent_location=course.location, category='chapter')
+            sequential = ItemFactory.create(parent_location=chapter.location, category='sequential')
+            vertical = ItemFactory.create(parent_location=sequential.location, category='vertical')
+            for __ in range(3):
+                ItemFactory.create(parent_location=vertical.location, category='html')
+
+        db_connection = self.store._get_modulestore_by_type(  # pylint: disable=protected-access
+            ModuleStoreEnum.Type.split
+        ).db_connection
+        with patch.object(db_connection, 'get_definition', wraps=db_connection.get_definition) as mock_get_definition:
+            with patch.object(
+                db_connection, 'get_definitions', wraps=db_connection.get_definitions
+            ) as mock_get_definitions:
+                html, __ = self._get_container_preview(vertical.location)
+
+        self.assertIn('level-element', html)
+        # The definitions of the unit and its components are loaded with one query,
+        # rather than with one query per component as it's rendered.
+        self.assertTrue(mock_get_definitions.called)
+        self.assertFalse(mock_get_definition.called)
+
     def test_get_container_nested_container_fragment(self):
         """
         Test the case of the container page containing a link to another container page.
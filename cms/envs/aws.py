@@ -335,6 +335,8 @@ else:
 
 USER_TASKS_ARTIFACT_STORAGE = COURSE_IMPORT_EXPORT_STORAGE
 
+COURSE_IMPORT_NUM_WORKERS = ENV_TOKENS.get('COURSE_IMPORT_NUM_WORKERS', COURSE_IMPORT_NUM_WORKERS)
+
 DATABASES = AUTH_TOKENS['DATABASES']
 
 # The normal database user does not have enough permissions to run migrations.
@@ -588,6 +588,9 @@ MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
 
 COURSE_IMPORT_EXPORT_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# The number of threads uploading the static files of a course import concurrently
+COURSE_IMPORT_NUM_WORKERS = 1
+
 ##### EMBARGO #####
 EMBARGO_SITE_REDIRECT_URL = None
 
@@ -1285,6 +1288,7 @@ PROCTORING_SETTINGS = {}
 
 DATABASE_ROUTERS = [
     'openedx.core.lib.django_courseware_routers.StudentModuleHistoryExtendedRouter',
+    'openedx.core.lib.django_courseware_routers.StudentModuleShardRouter',
 ]
 
 ############################ OAUTH2 Provider ###################################
@@ -183,6 +183,11 @@ CACHES = {
     },
 }
 
+# Don't keep course structures in memory between tests, so that the mongo calls
+# counted by tests don't depend on the tests run before them. The split and mixed
+# modulestore tests turn the memory cache on for the length of each test.
+COURSE_STRUCTURE_MEMORY_CACHE_SIZE = 0
+
 # hide ratelimit warnings while running tests
 filterwarnings('ignore', message='No request passed to the backend, unable to rate-limit')
 
@@ -29,7 +29,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.core.cache import cache
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
 from django.db.models import Count
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import Signal, receiver
@@ -149,12 +149,9 @@ def anonymous_id_for_user(user, course_id, save=True):
         hasher.update(unicode(course_id).encode('utf-8'))
     digest = hasher.hexdigest()
 
-    if not hasattr(user, '_anonymous_id'):
-        user._anonymous_id = {}  # pylint: disable=protected-access
-
-    user._anonymous_id[course_id] = digest  # pylint: disable=protected-access
-
     if save is False:
+        # Only saved ids are cached, so that a later call with save=True
+        # still saves the id
         return digest
 
     try:
@@ -168,6 +165,11 @@ def anonymous_id_for_user(user, course_id, save=True):
         # continue
         pass
 
+    if not hasattr(user, '_anonymous_id'):
+        user._anonymous_id = {}  # pylint: disable=protected-access
+
+    user._anonymous_id[course_id] = digest  # pylint: disable=protected-access
+
     return digest
 
 
@@ -1340,6 +1342,108 @@ class CourseEnrollment(models.Model):
                 return None
             raise
 
+    @classmethod
+    def bulk_enroll(cls, users, course_key, mode=None, batch_size=500):
+        """
+        Enroll many users in a course. This saves immediately.
+
+        This is the batched equivalent of calling `enroll()` without access
+        checks for each of the users: the missing enrollments are created
+        and the inactive ones are activated with a constant number of
+        queries, after which the `post_save` signals, events and enrollment
+        signals of every changed enrollment are sent, as `save()` would.
+
+        `users` is a collection of saved Django User objects.
+
+        `course_key` is the CourseKey of the course to enroll the users in.
+
+        `mode` is a string specifying what kind of enrollment this is. The
+               default is the default course mode.
+
+        `batch_size` is the maximum number of rows inserted per query.
+
+        Returns the list of CourseEnrollment objects that were created or
+        changed. Users already actively enrolled in the given mode are left
+        untouched and are not included.
+        """
+        assert isinstance(course_key, CourseKey)
+        if mode is None:
+            mode = _default_course_mode(unicode(course_key))
+
+        users_by_id = {user.id: user for user in users}
+        if not users_by_id:
+            return []
+
+        existing_enrollments = {
+            enrollment.user_id: enrollment
+            for enrollment in cls.objects.filter(course_id=course_key, user_id__in=users_by_id.keys())
+        }
+        new_enrollments = [
+            cls(user_id=user_id, course_id=course_key, mode=mode, is_active=True)
+            for user_id in users_by_id
+            if user_id not in existing_enrollments
+        ]
+        changed_enrollment_ids = [
+            enrollment.id for enrollment in existing_enrollments.itervalues()
+            if not enrollment.is_active or enrollment.mode != mode
+        ]
+        if not new_enrollments and not changed_enrollment_ids:
+            return []
+
+        with transaction.atomic():
+            cls.objects.bulk_create(new_enrollments, batch_size=batch_size)
+            if changed_enrollment_ids:
+                cls.objects.filter(id__in=changed_enrollment_ids).update(is_active=True, mode=mode)
+
+            # bulk_create does not set the primary keys of the new rows, so
+            # read the enrollments back before sending their signals.
+            changed_user_ids = [enrollment.user_id for enrollment in new_enrollments]
+            changed_user_ids.extend(
+                enrollment.user_id for enrollment in existing_enrollments.itervalues()
+                if enrollment.id in changed_enrollment_ids
+            )
+            enrollments = list(cls.objects.filter(course_id=course_key, user_id__in=changed_user_ids))
+
+            # Neither bulk_create nor update send the model signals, so send
+            # post_save as save() would have: the receivers record the history,
+            # assign the forum role, invalidate the mode cache, etc.
+            for enrollment in enrollments:
+                enrollment.user = users_by_id[enrollment.user_id]
+                existing_enrollment = existing_enrollments.get(enrollment.user_id)
+                # Set by the pre_save receiver of verified_track_content when saving
+                old_mode = existing_enrollment.mode if existing_enrollment else None
+                enrollment._old_mode = old_mode  # pylint: disable=protected-access
+                models.signals.post_save.send(
+                    sender=cls,
+                    instance=enrollment,
+                    created=existing_enrollment is None,
+                    update_fields=None,
+                    raw=False,
+                    using=enrollment._state.db,  # pylint: disable=protected-access
+                )
+
+        for enrollment in enrollments:
+            cls._update_enrollment_in_request_cache(
+                enrollment.user,
+                course_key,
+                CourseEnrollmentState(enrollment.mode, enrollment.is_active),
+            )
+        cache.delete_many([cls.enrollment_status_hash_cache_key(enrollment.user) for enrollment in enrollments])
+
+        for enrollment in enrollments:
+            enrollment.emit_event(EVENT_NAME_ENROLLMENT_ACTIVATED)
+            enrollment.send_signal(EnrollStatusChange.enroll)
+
+        dog_stats_api.increment(
+            "common.student.enrollment",
+            value=len(enrollments),
+            tags=[u"org:{}".format(course_key.org),
+                  u"offering:{}".format(course_key.offering),
+                  u"mode:{}".format(mode)]
+        )
+
+        return enrollments
+
     @classmethod
     def unenroll(cls, user, course_id, skip_refund=False):
         """
@@ -6,6 +6,7 @@ from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.db.models.functions import Lower
 
+from django_comment_common.models import FORUM_ROLE_STUDENT, Role
 from student.models import CourseEnrollment
 from student.tests.factories import CourseEnrollmentFactory, UserFactory
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
@@ -103,3 +104,35 @@ class CourseEnrollmentTests(SharedModuleStoreTestCase):
             CourseEnrollment.objects.users_enrolled_in(self.course.id, include_inactive=True)
         )
         self.assertListEqual([self.user, self.user_2], all_enrolled_users)
+
+    def test_bulk_enroll(self):
+        """CourseEnrollment.bulk_enroll should create missing enrollments and activate inactive ones."""
+        CourseEnrollmentFactory.create(user=self.user, course_id=self.course.id, mode='honor', is_active=False)
+        user_3 = UserFactory.create()
+        CourseEnrollmentFactory.create(user=user_3, course_id=self.course.id, mode='honor', is_active=True)
+        status_hash = CourseEnrollment.generate_enrollment_status_hash(self.user)
+        self.assert_enrollment_status_hash_cached(self.user, status_hash)
+
+        enrollments = CourseEnrollment.bulk_enroll([self.user, self.user_2, user_3], self.course.id, mode='honor')
+
+        self.assertItemsEqual([enrollment.user for enrollment in enrollments], [self.user, self.user_2])
+        for user in (self.user, self.user_2, user_3):
+            self.assertEqual(CourseEnrollment.enrollment_mode_for_user(user, self.course.id), ('honor', True))
+        self.assertIsNone(cache.get(CourseEnrollment.enrollment_status_hash_cache_key(self.user)))
+        self.assertEqual(CourseEnrollment.history.filter(user_id=self.user_2.id, history_type='+').count(), 1)
+
+        # Users that are already enrolled are left untouched
+        self.assertEqual(CourseEnrollment.bulk_enroll([self.user, self.user_2], self.course.id, mode='honor'), [])
+
+    def test_bulk_enroll_sends_post_save(self):
+        """CourseEnrollment.bulk_enroll should run the post_save receivers of each changed enrollment."""
+        CourseEnrollmentFactory.create(user=self.user, course_id=self.course.id, mode='honor', is_active=False)
+
+        CourseEnrollment.bulk_enroll([self.user, self.user_2], self.course.id, mode='honor')
+
+        # The forum role is assigned by the receiver in django_comment_common
+        student_role = Role.objects.get(course_id=self.course.id, name=FORUM_ROLE_STUDENT)
+        self.assertItemsEqual(student_role.users.all(), [self.user, self.user_2])
+        # The history is recorded by the receiver of simple_history
+        self.assertEqual(CourseEnrollment.history.filter(user_id=self.user.id, history_type='~').count(), 1)
+        self.assertEqual(CourseEnrollment.history.filter(user_id=self.user_2.id, history_type='+').count(), 1)
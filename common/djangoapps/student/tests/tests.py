@@ -1048,6 +1048,13 @@ class AnonymousLookupTable(ModuleStoreTestCase):
         self.assertEqual(self.user, real_user)
         self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, course2.id, save=False))
 
+    def test_save_after_unsaved_id(self):
+        """Test that an id first returned without being saved is saved by a later call."""
+        anonymous_id = anonymous_id_for_user(self.user, self.course.id, save=False)
+        self.assertIsNone(user_by_anonymous_id(anonymous_id))
+        self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, self.course.id))
+        self.assertEqual(self.user, user_by_anonymous_id(anonymous_id))
+
     def test_secret_key_changes(self):
         """Test that a new anonymous id is returned when the secret key changes."""
         CourseEnrollment.enroll(self.user, self.course.id)
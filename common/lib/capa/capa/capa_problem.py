@@ -13,9 +13,11 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+import hashlib
 import logging
 import os.path
 import re
+import threading
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
@@ -69,8 +71,54 @@ html_problem_semantics = [
     "openendedrubric",
 ]
 
+# Maximum number of parsed problem definitions kept per process
+PARSED_PROBLEM_CACHE_SIZE = 500
+
 log = logging.getLogger(__name__)
 
+
+class ParsedProblemCache(object):
+    """
+    A least recently used cache of the parsed XML trees of problems, keyed by
+    hash of their definitions.  The trees are shared between threads, so they
+    must be copied before being modified.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the item cached for `key` and marks it as the most recently used,
+        or None if there is none.
+        """
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self._items[key] = item
+            return item
+
+    def set(self, key, item):
+        """
+        Caches `item` for `key`, evicting the least recently used item if the cache is full.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = item
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Empties the cache.
+        """
+        with self._lock:
+            self._items.clear()
+
+
+PARSED_PROBLEMS = ParsedProblemCache(PARSED_PROBLEM_CACHE_SIZE)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -171,15 +219,8 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
         # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        self.make_xml_compatible(self.tree)
+        self.problem_text, self.tree = self._parse_problem_text(problem_text)
 
         # handle any <include file="foo"> tags
         self._process_includes()
@@ -214,6 +255,31 @@ class LoncapaProblem(object):
 
             self.extracted_tree = self._extract_html(self.tree)
 
+    def _parse_problem_text(self, problem_text):
+        """
+        Converts startouttext and endouttext to proper <text></text> in the
+        problem text, and parses it into an element tree made compatible (see
+        `make_xml_compatible`).  Returns the converted text and the tree.
+
+        This only depends on the definition of the problem, so it is only done
+        once per process for each definition, and a copy of the cached tree is
+        returned to each problem.  Everything which depends on the seed, or on
+        files which may change (includes), is still done for each problem.
+        """
+        definition = problem_text.encode('utf-8') if isinstance(problem_text, unicode) else problem_text
+        cache_key = hashlib.sha1(definition).hexdigest()
+        parsed = PARSED_PROBLEMS.get(cache_key)
+        if parsed is None:
+            problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+            problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+            tree = etree.XML(problem_text)
+            self.make_xml_compatible(tree)
+            parsed = (problem_text, tree)
+            PARSED_PROBLEMS.set(cache_key, parsed)
+
+        problem_text, tree = parsed
+        return problem_text, deepcopy(tree)
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
@@ -4,8 +4,10 @@ Test capa problem.
 import ddt
 import textwrap
 from lxml import etree
+from mock import patch
 import unittest
 
+from capa.capa_problem import LoncapaProblem, ParsedProblemCache
 from capa.tests.helpers import new_loncapa_problem
 
 
@@ -590,3 +592,56 @@ class CAPAMultiInputProblemTest(unittest.TestCase):
             description_element = multi_inputs_group.xpath('//p[@id="{}"]'.format(description_id))
             self.assertEqual(len(description_element), 1)
             self.assertEqual(description_element[0].text, descriptions[index])
+
+
+class ParsedProblemCacheTest(unittest.TestCase):
+    """
+    Tests for the cache of the parsed problem definitions.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <startouttext/>Which colour is the sky?<endouttext/>
+            <optionresponse>
+                <optioninput label="sky">
+                    <option correct="False">yellow</option>
+                    <option correct="True">blue</option>
+                </optioninput>
+            </optionresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ParsedProblemCacheTest, self).setUp()
+        patcher = patch('capa.capa_problem.PARSED_PROBLEMS', ParsedProblemCache(2))
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parsed_once(self):
+        with patch.object(
+            LoncapaProblem, 'make_xml_compatible', autospec=True, side_effect=LoncapaProblem.make_xml_compatible
+        ) as make_xml_compatible:
+            new_loncapa_problem(self.xml, problem_id='1', seed=1)
+            new_loncapa_problem(self.xml, problem_id='2', seed=2)
+        self.assertEqual(make_xml_compatible.call_count, 1)
+
+    def test_problems_get_their_own_tree(self):
+        problem = new_loncapa_problem(self.xml, problem_id='1')
+        other_problem = new_loncapa_problem(self.xml, problem_id='2')
+
+        self.assertIsNot(problem.tree, other_problem.tree)
+        self.assertEqual(problem.problem_text, other_problem.problem_text)
+        self.assertNotIn('startouttext', problem.problem_text)
+        # The ids are assigned to the copy of each problem.
+        self.assertEqual(problem.tree.xpath('//optioninput/@id'), ['1_2_1'])
+        self.assertEqual(other_problem.tree.xpath('//optioninput/@id'), ['2_2_1'])
+        # The compatibility translation was made before caching.
+        self.assertEqual(other_problem.tree.xpath('//optioninput/@options'), ["('yellow','blue')"])
+
+    def test_least_recently_used_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
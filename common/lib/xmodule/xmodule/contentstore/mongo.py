@@ -2,6 +2,7 @@
 MongoDB/GridFS-level code for the contentstore.
 """
 import os
+import posixpath
 import json
 import pymongo
 import gridfs
@@ -170,6 +171,47 @@ class MongoContentStore(ContentStore):
         with disk_fs.open(export_name, 'wb') as asset_file:
             asset_file.write(content.data)
 
+    def export_to_fs(self, location, export_fs):
+        """
+        Export the asset at location into the static directory of export_fs, copying it from
+        GridFS in chunks rather than loading it into memory.
+        """
+        content_id, __ = self.asset_db_key(location)
+        try:
+            with self.fs.get(content_id) as fp:
+                output_directory = posixpath.normpath(
+                    posixpath.join('static', os.path.dirname(getattr(fp, 'import_path', None) or ''))
+                )
+                # Escape invalid char from filename.
+                export_name = escape_invalid_characters(name=fp.displayname, invalid_char_list=['/', '\\'])
+
+                export_fs.makedir(output_directory, recursive=True, allow_recreate=True)
+                export_fs.setcontents(posixpath.join(output_directory, export_name), fp)
+        except NoFile:
+            raise NotFoundError(content_id)
+
+    def export_all_for_course_to_fs(self, course_key, export_fs):
+        """
+        Export all of this course's assets to the static directory of export_fs, and all of the
+        assets' attributes to its policies/assets.json file.
+
+        Args:
+            course_key (CourseKey): the :class:`CourseKey` identifying the course
+            export_fs: the filesystem of the exported course
+        """
+        policy = {}
+        assets, __ = self.get_all_content_for_course(course_key)
+
+        for asset in assets:
+            self.export_to_fs(asset['asset_key'], export_fs)
+            for attr, value in asset.iteritems():
+                if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
+                    policy.setdefault(asset['asset_key'].name, {})[attr] = value
+
+        export_fs.makedir('policies', allow_recreate=True)
+        with export_fs.open('policies/assets.json', 'w') as f:
+            json.dump(policy, f, sort_keys=True, indent=4)
+
     def export_all_for_course(self, course_key, output_directory, assets_policy_file):
         """
         Export all of this course's assets to the output_directory. Export all of the assets'
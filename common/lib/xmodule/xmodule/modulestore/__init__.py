@@ -9,7 +9,7 @@ import json
 import datetime
 
 from pytz import UTC
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from contextlib import contextmanager
 import threading
 from operator import itemgetter
@@ -26,6 +26,7 @@ from opaque_keys.edx.keys import CourseKey, UsageKey, AssetKey
 from opaque_keys.edx.locations import Location  # For import backwards compatibility
 from xblock.runtime import Mixologist
 from xblock.core import XBlock
+from xblock.fields import Scope
 
 log = logging.getLogger('edx.modulestore')
 
@@ -496,6 +497,25 @@ class BlockData(object):
         return not self == block_data
 
 
+class BlockRecord(namedtuple('BlockRecord', 'usage_key block_type parent children settings content')):
+    """
+    A plain record of a stored block, read without constructing its XBlock (see get_block_records).
+
+    usage_key: the UsageKey of the block
+    block_type: the XBlock type of the block
+    parent: the UsageKey of the parent of the block, or None (for the course and orphans)
+    children: the list of the UsageKeys of the children of the block
+    settings: a dict of the explicitly set Scope.settings field values of the block, as stored
+        (without their inherited or default values)
+    content: a dict of the explicitly set Scope.content field values of the block, as stored,
+        or None if they weren't requested
+
+    The field values may be shared with the caches of the modulestore, so they must be copied
+    before being changed.
+    """
+    __slots__ = ()
+
+
 new_contract('BlockData', BlockData)
 
 
@@ -1224,6 +1244,31 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
                 return course
         return None
 
+    def get_block_records(self, course_key, include_content=False, **kwargs):
+        """
+        Yields a BlockRecord for each block of the given course, streamed from the stored
+        documents of the course without constructing any XBlocks or runtimes. This is much
+        cheaper than get_course(depth=None) or get_items for reading the fields of every
+        block of many courses, but the records only have the explicitly set field values.
+
+        Args:
+            course_key (CourseKey): the course identifier
+            include_content (bool): whether to read the Scope.content fields of the blocks too
+                (which needs the definitions of the blocks to be fetched)
+
+        This default implementation reads the blocks with get_items, so it does construct their
+        XBlocks; the modulestores which can read their stored documents override it.
+        """
+        for block in self.get_items(course_key, **kwargs):
+            yield BlockRecord(
+                usage_key=block.location,
+                block_type=block.location.block_type,
+                parent=block.parent,
+                children=list(block.children) if block.has_children else [],
+                settings=block.get_explicitly_set_fields_by_scope(Scope.settings),
+                content=block.get_explicitly_set_fields_by_scope(Scope.content) if include_content else None,
+            )
+
     def has_course(self, course_id, ignore_case=False, **kwargs):
         """
         Returns the course_id of the course if it was found, else None
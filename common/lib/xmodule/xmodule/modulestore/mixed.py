@@ -13,7 +13,7 @@ from contracts import contract, new_contract
 
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey, AssetKey
-from opaque_keys.edx.locator import LibraryLocator
+from opaque_keys.edx.locator import CourseLocator, LibraryLocator
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xmodule.assetstore import AssetMetadata
 
@@ -21,6 +21,7 @@ from . import ModuleStoreWriteBase, ModuleStoreEnum, XMODULE_FIELDS_WITH_USAGE_K
 from .exceptions import ItemNotFoundError, DuplicateCourseError
 from .draft_and_published import ModuleStoreDraftAndPublished
 from .split_migrator import SplitMigrator
+from .mixed_routing import CourseRoutingCache, NOT_CACHED
 
 new_contract('CourseKey', CourseKey)
 new_contract('AssetKey', AssetKey)
@@ -143,11 +144,21 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
             user_service=None,
             create_modulestore_instance=None,
             signal_handler=None,
+            routing_cache_size=10000,
+            negative_routing_ttl=60,
+            fill_routing_cache=False,
             **kwargs
     ):
         """
         Initialize a MixedModuleStore. Here we look into our passed in kwargs which should be a
         collection of other modulestore configuration information
+
+        routing_cache_size: the maximum number of courses and libraries not in the mappings
+            whose store is cached (0 to not cache them)
+        negative_routing_ttl: the number of seconds for which courses and libraries which no
+            store has are routed to the default store without checking every store again
+        fill_routing_cache: whether to route every course in the course indexes of the
+            stores on the first request for a course which isn't cached
         """
         super(MixedModuleStore, self).__init__(contentstore, **kwargs)
 
@@ -155,6 +166,8 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
             raise ValueError('MixedModuleStore constructor must be passed a create_modulestore_instance function')
 
         self.modulestores = []
+        self.routing_cache = CourseRoutingCache(routing_cache_size, negative_routing_ttl)
+        self._fill_routing_cache_on_miss = fill_routing_cache
         self.mappings = {}
 
         for course_id, store_name in mappings.iteritems():
@@ -185,6 +198,22 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
                     self.mappings[course_key] = store
             self.modulestores.append(store)
 
+    @property
+    def mappings(self):
+        """
+        The dict mapping course and library keys to the store they're pinned to, either by
+        configuration or because they were created through this modulestore.
+        """
+        return self._mappings
+
+    @mappings.setter
+    def mappings(self, mappings):
+        """
+        Replace the mappings, forgetting the stores found for courses and libraries too.
+        """
+        self._mappings = mappings
+        self.routing_cache.clear()
+
     def _clean_locator_for_mapping(self, locator):
         """
         In order for mapping to work, the locator must be minimal--no version, no branch--
@@ -201,28 +230,70 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
     def _get_modulestore_for_courselike(self, locator=None):
         """
         For a given locator, look in the mapping table and see if it has been pinned
-        to a particular modulestore
+        to a particular modulestore, and otherwise in the routing cache for the store
+        which was found to have it
 
-        If locator is None, returns the first (ordered) store as the default
+        If locator is None, or no store has it, returns the first (ordered) store as the default
         """
         if locator is not None:
             locator = self._clean_locator_for_mapping(locator)
             mapping = self.mappings.get(locator, None)
             if mapping is not None:
                 return mapping
-            else:
-                if isinstance(locator, LibraryLocator):
-                    has_locator = lambda store: hasattr(store, 'has_library') and store.has_library(locator)
-                else:
-                    has_locator = lambda store: store.has_course(locator)
-                for store in self.modulestores:
-                    if has_locator(store):
-                        self.mappings[locator] = store
-                        return store
+            store = self.routing_cache.get(locator)
+            if store is NOT_CACHED:
+                store = self._find_modulestore_for_courselike(locator)
+            if store is not None:
+                return store
 
         # return the default store
         return self.default_modulestore
 
+    def _find_modulestore_for_courselike(self, locator):
+        """
+        Find the store which has the given cleaned locator and cache it, along with every
+        course in the course indexes if fill_routing_cache is set and they haven't been.
+
+        Returns None if no store has it.
+        """
+        if self._fill_routing_cache_on_miss:
+            self._fill_routing_cache_on_miss = False
+            self.fill_routing_cache()
+            store = self.routing_cache.get(locator)
+            if store is not NOT_CACHED:
+                return store
+
+        if isinstance(locator, LibraryLocator):
+            has_locator = lambda store: hasattr(store, 'has_library') and store.has_library(locator)
+        else:
+            has_locator = lambda store: store.has_course(locator)
+        for store in self.modulestores:
+            if has_locator(store):
+                self.routing_cache.set(locator, store)
+                return store
+        self.routing_cache.set(locator, None)
+        return None
+
+    def fill_routing_cache(self):
+        """
+        Cache the store of every course and library in the course indexes of the stores
+        which have them (split), until the routing cache is full, so that they don't each
+        need a round trip to every store when they're first requested.
+        """
+        for store in self.modulestores:
+            if not hasattr(store, 'find_matching_course_indexes'):
+                continue
+            for index in store.find_matching_course_indexes():
+                if self.routing_cache.is_full():
+                    return
+                if index['run'] == LibraryLocator.RUN:
+                    locator = LibraryLocator(index['org'], index['course'])
+                else:
+                    locator = CourseLocator(index['org'], index['course'], index['run'])
+                # a course in several stores is routed to the first of them, as by has_course
+                if locator not in self.mappings and locator not in self.routing_cache:
+                    self.routing_cache.set(locator, store)
+
     def _get_modulestore_by_type(self, modulestore_type):
         """
         This method should only really be used by tests and migration scripts when necessary.
@@ -290,6 +361,13 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         store = self._get_modulestore_for_courselike(course_key)
         return store.get_items(course_key, **kwargs)
 
+    def get_block_records(self, course_key, **kwargs):
+        """
+        See xmodule.modulestore.ModuleStoreReadBase.get_block_records
+        """
+        store = self._get_modulestore_for_courselike(course_key)
+        return store.get_block_records(course_key, **kwargs)
+
     @strip_key
     def get_course_summaries(self, **kwargs):
         """
@@ -422,7 +500,10 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         """
         assert isinstance(course_key, CourseKey)
         store = self._get_modulestore_for_courselike(course_key)
-        return store.delete_course(course_key, user_id)
+        try:
+            return store.delete_course(course_key, user_id)
+        finally:
+            self.routing_cache.invalidate(self._clean_locator_for_mapping(course_key))
 
     @contract(asset_metadata='AssetMetadata', user_id='int|long', import_only=bool)
     def save_asset_metadata(self, asset_metadata, user_id, import_only=False):
@@ -649,6 +730,7 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
 
         # add new course to the mapping
         self.mappings[course_key] = store
+        self.routing_cache.invalidate(course_key)
 
         return course
 
@@ -677,6 +759,7 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
 
         # add new library to the mapping
         self.mappings[lib_key] = store
+        self.routing_cache.invalidate(lib_key)
 
         return library
 
@@ -691,25 +774,28 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
             * copy the assets
             * migrate the courseware
         """
-
-        source_modulestore = self._get_modulestore_for_courselike(source_course_id)
-        # for a temporary period of time, we may want to hardcode dest_modulestore as split if there's a split
-        # to have only course re-runs go to split. This code, however, uses the config'd priority
-        dest_modulestore = self._get_modulestore_for_courselike(dest_course_id)
-        if source_modulestore == dest_modulestore:
-            return source_modulestore.clone_course(source_course_id, dest_course_id, user_id, fields, **kwargs)
-
-        if dest_modulestore.get_modulestore_type() == ModuleStoreEnum.Type.split:
-            split_migrator = SplitMigrator(dest_modulestore, source_modulestore)
-            split_migrator.migrate_mongo_course(source_course_id, user_id, dest_course_id.org,
-                                                dest_course_id.course, dest_course_id.run, fields, **kwargs)
-
-            # the super handles assets and any other necessities
-            super(MixedModuleStore, self).clone_course(source_course_id, dest_course_id, user_id, fields, **kwargs)
-        else:
-            raise NotImplementedError("No code for cloning from {} to {}".format(
-                source_modulestore, dest_modulestore
-            ))
+        try:
+            source_modulestore = self._get_modulestore_for_courselike(source_course_id)
+            # for a temporary period of time, we may want to hardcode dest_modulestore as split if there's a split
+            # to have only course re-runs go to split. This code, however, uses the config'd priority
+            dest_modulestore = self._get_modulestore_for_courselike(dest_course_id)
+            if source_modulestore == dest_modulestore:
+                return source_modulestore.clone_course(source_course_id, dest_course_id, user_id, fields, **kwargs)
+
+            if dest_modulestore.get_modulestore_type() == ModuleStoreEnum.Type.split:
+                split_migrator = SplitMigrator(dest_modulestore, source_modulestore)
+                split_migrator.migrate_mongo_course(source_course_id, user_id, dest_course_id.org,
+                                                    dest_course_id.course, dest_course_id.run, fields, **kwargs)
+
+                # the super handles assets and any other necessities
+                super(MixedModuleStore, self).clone_course(source_course_id, dest_course_id, user_id, fields, **kwargs)
+            else:
+                raise NotImplementedError("No code for cloning from {} to {}".format(
+                    source_modulestore, dest_modulestore
+                ))
+        finally:
+            # the destination course may have been cached as missing while it was being cloned
+            self.routing_cache.invalidate(self._clean_locator_for_mapping(dest_course_id))
 
     @strip_key
     @prepare_asides
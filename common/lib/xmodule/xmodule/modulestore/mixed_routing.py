@@ -0,0 +1,83 @@
+"""
+The cache of which backing store the MixedModuleStore routes each course and library to.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+# Returned by CourseRoutingCache.get for keys that aren't cached (as opposed to None,
+# which is cached for keys which no store has)
+NOT_CACHED = object()
+
+
+class CourseRoutingCache(object):
+    """
+    A thread-safe LRU cache of the store which has each course or library key, bounded
+    by its number of keys.
+
+    Keys which no store has are cached too, with None as their store, so that requests
+    for unknown courses don't query every store each time. As another process may
+    create the course in the meantime, those expire after `negative_ttl` seconds.
+    """
+    def __init__(self, max_size, negative_ttl=60):
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        # Maps each key to its store and the time its entry expires at (None for stores)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not NOT_CACHED
+
+    def get(self, key):
+        """
+        Return the store which has the given key, None if no store has it, or
+        NOT_CACHED if it isn't known.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return NOT_CACHED
+            store, expires = entry
+            if expires is not None and expires < time.time():
+                return NOT_CACHED
+            # Move the entry to the most recently used end
+            self._entries[key] = entry
+            return store
+
+    def set(self, key, store):
+        """
+        Cache the store which has the given key (None if no store has it).
+        """
+        if self.max_size <= 0:
+            return
+        expires = time.time() + self.negative_ttl if store is None else None
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (store, expires)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def is_full(self):
+        """
+        Return whether caching another key would evict one.
+        """
+        return len(self._entries) >= self.max_size
+
+    def invalidate(self, key):
+        """
+        Remove the given key from the cache, if it's there.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every key from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
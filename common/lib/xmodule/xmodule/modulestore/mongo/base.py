@@ -12,7 +12,6 @@ structure:
 }
 """
 
-import copy
 from datetime import datetime
 from importlib import import_module
 import logging
@@ -42,11 +41,14 @@ from xmodule.errortracker import null_error_tracker, exc_info_to_str
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.mako_module import MakoDescriptorSystem
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
-from xmodule.modulestore import ModuleStoreWriteBase, ModuleStoreEnum, BulkOperationsMixin, BulkOpsRecord
+from xmodule.modulestore import (
+    ModuleStoreWriteBase, ModuleStoreEnum, BulkOperationsMixin, BulkOpsRecord, BlockRecord
+)
 from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished, DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
 from xmodule.modulestore.inheritance import InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
+from xmodule.modulestore.mongo.inheritance_tree import InheritanceSource, INHERITANCE_SOURCE_VERSION, container_key
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.modulestore.xml import CourseLocationManager
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
@@ -578,6 +580,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 asset_collection = self.DEFAULT_ASSET_COLLECTION_NAME
             self.asset_collection = self.database[asset_collection]
 
+            # Collection which stores the sources of the courses' metadata inheritance trees.
+            self.inheritance_collection = self.database['{}.metadata_inheritance'.format(collection)]
+
         do_connection(**doc_store_config)
 
         if default_class is not None:
@@ -630,8 +635,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             connection.drop_database(self.collection.database.proxied_object)
         elif collections:
             self.collection.drop()
+            self.inheritance_collection.drop()
         else:
             self.collection.remove({})
+            self.inheritance_collection.remove({})
 
         if connections:
             connection.close()
@@ -684,19 +691,28 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
     def _compute_metadata_inheritance_tree(self, course_id):
         '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        Find all inheritable fields from all xblocks in the course which may define inheritable data,
+        persist them as the course's InheritanceSource and compute the tree from them
         '''
-        # get all collections in the course, this query should not return any leaf nodes
         course_id = self.fill_in_run(course_id)
+        source = self._query_metadata_inheritance_source(course_id)
+        self.inheritance_collection.save(source.to_mongo())
+        return source.compute_tree(
+            self.get_branch_setting(),
+            published_only=self.get_branch_setting() == ModuleStoreEnum.Branch.published_only,
+        )
+
+    def _query_metadata_inheritance_source(self, course_id):
+        '''
+        Query the inheritable metadata and the children of every revision of the containers in the course
+        '''
+        # get all collections in the course, this query should not return any leaf nodes
         query = SON([
             ('_id.tag', 'i4x'),
             ('_id.org', course_id.org),
             ('_id.course', course_id.course),
             ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
         ])
-        # if we're only dealing in the published branch, then only get published containers
-        if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
-            query['_id.revision'] = None
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
 
@@ -710,61 +726,27 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
-        results_by_url = {}
-        root = None
-
-        # now go through the results and order them by the location url
+        source = InheritanceSource(course_id)
         for result in resultset:
             # manually pick it apart b/c the db has tag and we want as_published revision regardless
             location = as_published(Location._from_deprecated_son(result['_id'], course_id.run))
+            source.set_container(
+                unicode(location),
+                result['_id'].get('revision'),
+                location.category,
+                result.get('metadata', {}),
+                result.get('definition', {}).get('children', []),
+            )
+        return source
 
-            location_url = unicode(location)
-            if location_url in results_by_url:
-                # found either draft or live to complement the other revision
-                # FIXME this is wrong. If the child was moved in draft from one parent to the other, it will
-                # show up under both in this logic: https://openedx.atlassian.net/browse/TNL-1075
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                # use set to get rid of duplicates. We don't care about order; so, it shouldn't matter.
-                results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
-            else:
-                results_by_url[location_url] = result
-            if location.category == 'course':
-                root = location_url
-
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
-
-        if root is not None:
-            _compute_inherited_metadata(root)
-
-        return metadata_to_inherit
+    def _get_metadata_inheritance_source(self, course_id):
+        '''
+        Get the persisted InheritanceSource of the course, or None if it hasn't been persisted
+        (in the current format)
+        '''
+        return InheritanceSource.from_mongo(
+            course_id, self.inheritance_collection.find_one({'_id': unicode(course_id)})
+        )
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
@@ -787,13 +769,21 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                     OK in localdev and testing environment. Not OK in production.'
                 )
 
+            if not tree:
+                # then compute it from the persisted inheritance source, if any, which
+                # spares querying every container of the course on a cold cache
+                source = self._get_metadata_inheritance_source(course_id)
+                if source is not None:
+                    tree = source.compute_tree(
+                        self.get_branch_setting(),
+                        published_only=self.get_branch_setting() == ModuleStoreEnum.Branch.published_only,
+                    )
+                    self._set_cached_metadata_inheritance_tree(course_id, tree)
+
         if not tree:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
-
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            self._set_cached_metadata_inheritance_tree(course_id, tree)
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
@@ -807,6 +797,13 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return tree
 
+    def _set_cached_metadata_inheritance_tree(self, course_id, tree):
+        '''
+        Write out the computed tree to the caching subsystem (e.g. memcached), if available
+        '''
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+
     def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
@@ -822,6 +819,94 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def update_cached_metadata_inheritance_tree(self, location, metadata, children, runtime=None):
+        """
+        Update the cached metadata inheritance tree of the course after the item at location was saved
+        with the given metadata and children, computing it from the course's persisted inheritance source.
+
+        If given a runtime, it replaces the cached_metadata in that runtime.
+        """
+        course_id = location.course_key.for_branch(None)
+        if self._is_in_bulk_operation(course_id):
+            # the tree is refreshed at the end of the bulk operation
+            return
+        if location.category not in BLOCK_TYPES_WITH_CHILDREN:
+            # only containers affect the tree
+            return
+
+        course_id = self.fill_in_run(course_id)
+        key, entry = InheritanceSource(course_id).set_container(
+            unicode(as_published(location)),
+            location.revision,
+            location.category,
+            {
+                field_name: value for field_name, value in metadata.iteritems()
+                if field_name in InheritanceMixin.fields
+            },
+            children,
+        )
+        self.inheritance_collection.update(
+            {'_id': unicode(course_id), 'version': INHERITANCE_SOURCE_VERSION},
+            {'$set': {'containers.{}'.format(key): entry}},
+        )
+
+        # compute the tree from the source as persisted after the update rather than patching the
+        # cached tree, which would drop the changes of any concurrent save of another container
+        source = self._get_metadata_inheritance_source(course_id)
+        if source is None:
+            # the update above was a no-op, as the source hasn't been persisted (in the current format)
+            self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+            return
+
+        tree = source.compute_tree(
+            self.get_branch_setting(),
+            published_only=self.get_branch_setting() == ModuleStoreEnum.Branch.published_only,
+        )
+        self._set_cached_metadata_inheritance_tree(course_id, tree)
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('metadata_inheritance', {})[unicode(course_id)] = tree
+        if runtime:
+            runtime.cached_metadata = tree
+
+    def _add_to_metadata_inheritance_source(self, course_key, items):
+        """
+        Add the given raw items, newly inserted in the collection, to the course's persisted inheritance source
+        """
+        course_id = self.fill_in_run(course_key.for_branch(None))
+        source = InheritanceSource(course_id)
+        to_set = {}
+        for item in items:
+            if item['_id']['category'] in BLOCK_TYPES_WITH_CHILDREN:
+                location = as_published(Location._from_deprecated_son(item['_id'], course_id.run))
+                key, entry = source.set_container(
+                    unicode(location),
+                    item['_id'].get('revision'),
+                    location.category,
+                    {
+                        field_name: value for field_name, value in item.get('metadata', {}).iteritems()
+                        if field_name in InheritanceMixin.fields
+                    },
+                    item.get('definition', {}).get('children', []),
+                )
+                to_set['containers.{}'.format(key)] = entry
+        if to_set:
+            self.inheritance_collection.update(
+                {'_id': unicode(course_id), 'version': INHERITANCE_SOURCE_VERSION}, {'$set': to_set}
+            )
+
+    def _remove_from_metadata_inheritance_source(self, course_key, item_sons):
+        """
+        Remove the deleted items with the given ids from the course's persisted inheritance source
+        """
+        course_id = self.fill_in_run(course_key.for_branch(None))
+        unset = {}
+        for son in item_sons:
+            if son['category'] in BLOCK_TYPES_WITH_CHILDREN:
+                location = as_published(Location._from_deprecated_son(son, course_id.run))
+                unset['containers.{}'.format(container_key(unicode(location), son.get('revision')))] = ''
+        if unset:
+            self.inheritance_collection.update({'_id': unicode(course_id)}, {'$unset': unset})
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -1272,6 +1357,65 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         )
         return modules
 
+    def get_block_records(
+            self, course_id, include_content=False, key_revisions=(MongoRevisionKey.published,), **kwargs
+    ):
+        """
+        See ModuleStoreReadBase.get_block_records
+
+        As the parents of the items aren't stored, the children of every item are read first, and
+        then the items are streamed by a second query.
+
+        Args:
+            key_revisions (tuple): the revisions of the items to read, in order of preference (only
+                one revision of each item is read)
+        """
+        query = self._course_key_to_son(course_id)
+        query['_id.revision'] = {'$in': list(key_revisions)}
+
+        def location_of(item):
+            """
+            Return the location of the given item, without its revision.
+            """
+            return as_published(Location._from_deprecated_son(item['_id'], course_id.run))
+
+        # Find the revision to read and the children of each item, and from them its parent
+        revisions = {}
+        children = {}
+        for item in self.collection.find(query, ['definition.children']):
+            location = location_of(item)
+            revision = item['_id']['revision']
+            if location in revisions and key_revisions.index(revisions[location]) < key_revisions.index(revision):
+                continue
+            revisions[location] = revision
+            children[location] = [
+                course_id.make_usage_key_from_deprecated_string(child)
+                for child in item.get('definition', {}).get('children', [])
+            ]
+        parents = {}
+        for location, child_locations in children.iteritems():
+            for child_location in child_locations:
+                parents.setdefault(child_location, location)
+
+        fields = ['metadata', 'definition.data'] if include_content else ['metadata']
+        for item in self.collection.find(query, fields):
+            location = location_of(item)
+            if item['_id']['revision'] != revisions.get(location):
+                continue
+            content = None
+            if include_content:
+                content = item.get('definition', {}).get('data', {})
+                if isinstance(content, basestring):
+                    content = {'data': content}
+            yield BlockRecord(
+                usage_key=location,
+                block_type=location.block_type,
+                parent=parents.get(location),
+                children=children[location],
+                settings=item.get('metadata', {}),
+                content=content,
+            )
+
     def create_course(self, org, course, run, user_id, fields=None, **kwargs):
         """
         Creates and returns the course.
@@ -1546,8 +1690,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # update the edit info of the instantiated xblock
             xblock._edit_info = payload['edit_info']
 
-            # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            # update the subtree of the metadata inheritance tree which is cached
+            self.update_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id, payload['metadata'], payload.get('definition.children', []), xblock.runtime
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -1609,6 +1755,15 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                         multi=False,
                         upsert=True,
                     )
+                    # and from its entry in the persisted inheritance source, if it has one
+                    key = container_key(unicode(as_published(parent_loc)), parent['_id'].get('revision'))
+                    self.inheritance_collection.update(
+                        {
+                            '_id': unicode(location.course_key.for_branch(None)),
+                            'containers.{}'.format(key): {'$exists': True},
+                        },
+                        {'$set': {'containers.{}.children'.format(key): []}},
+                    )
                 elif ancestor_loc.category == 'course':
                     # once we reach the top location of the tree and if the location is not an orphan then the
                     # parent is not an orphan either
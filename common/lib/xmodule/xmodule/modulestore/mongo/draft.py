@@ -165,6 +165,7 @@ class DraftModuleStore(MongoModuleStore):
         # delete all of the db records for the course
         course_query = self._course_key_to_son(course_key)
         self.collection.remove(course_query, multi=True)
+        self.inheritance_collection.remove({'_id': unicode(course_key.for_branch(None))})
         self.delete_all_asset_metadata(course_key, user_id)
 
         self._emit_course_deleted_signal(course_key)
@@ -325,6 +326,25 @@ class DraftModuleStore(MongoModuleStore):
         new_block.location = self.for_branch_setting(new_block.location)
         return wrap_draft(new_block)
 
+    def get_block_records(self, course_key, revision=None, **kwargs):
+        """
+        See ModuleStoreReadBase.get_block_records
+
+        Args:
+            revision:
+                ModuleStoreEnum.RevisionOption.published_only - reads only Published items
+                ModuleStoreEnum.RevisionOption.draft_only - reads only Draft items
+                None - uses the branch setting, as get_items does
+        """
+        if revision == ModuleStoreEnum.RevisionOption.draft_only:
+            key_revisions = (MongoRevisionKey.draft,)
+        elif revision == ModuleStoreEnum.RevisionOption.published_only \
+                or self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
+            key_revisions = (MongoRevisionKey.published,)
+        else:
+            key_revisions = (MongoRevisionKey.draft, MongoRevisionKey.published)
+        return super(DraftModuleStore, self).get_block_records(course_key, key_revisions=key_revisions, **kwargs)
+
     def get_items(self, course_key, revision=None, **kwargs):
         """
         Performance Note: This is generally a costly operation, but useful for wildcard searches.
@@ -439,6 +459,9 @@ class DraftModuleStore(MongoModuleStore):
                 # prevent re-creation of DRAFT versions, unless explicitly requested to ignore
                 if not ignore_if_draft:
                     raise DuplicateItemError(item['_id'], self, 'collection')
+            else:
+                # copy the id, as it's changed below to delete the published version
+                drafts.append(dict(item, _id=dict(item['_id'])))
 
             # delete the old PUBLISHED version if requested
             if delete_published:
@@ -448,7 +471,11 @@ class DraftModuleStore(MongoModuleStore):
             return next_tier
 
         # convert the subtree using the original item as the root
+        drafts = []
         self._breadth_first(convert_item, [location])
+        # add the draft containers to the persisted inheritance source, which unpublish
+        # would otherwise leave without any version of them
+        self._add_to_metadata_inheritance_source(location.course_key, drafts)
 
     def update_item(
             self,
@@ -638,6 +665,7 @@ class DraftModuleStore(MongoModuleStore):
             bulk_record = self._get_bulk_ops_record(root_usages[0].course_key)
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}}, safe=self.collection.safe)
+            self._remove_from_metadata_inheritance_source(root_usages[0].course_key, to_be_deleted)
 
     @memoize_in_request_cache('request_cache')
     def has_changes(self, xblock):
@@ -742,6 +770,7 @@ class DraftModuleStore(MongoModuleStore):
         if len(to_be_deleted) > 0:
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}})
+            self._remove_from_metadata_inheritance_source(course_key, to_be_deleted)
 
         self._flag_publish_event(course_key)
 
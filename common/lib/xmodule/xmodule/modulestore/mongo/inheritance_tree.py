@@ -0,0 +1,135 @@
+"""
+The persisted source of the metadata inheritance trees of the Mongo modulestore.
+
+Computing the inheritance tree of a course only needs the inheritable metadata
+and the children of each of its containers. Rather than querying every container
+of the course whenever the tree is invalidated, the modulestore keeps them in a
+single compact document per course, which is patched as containers are saved.
+The tree can then be computed without querying the items of the course.
+"""
+import copy
+import hashlib
+
+
+# Bump this whenever the format of the persisted documents changes, so that the
+# documents stored in an older format get rebuilt rather than read
+INHERITANCE_SOURCE_VERSION = 1
+
+
+def container_key(url, revision):
+    """
+    The key of the container with the given url and revision in a persisted
+    document (urls can't be used as Mongo keys as they may contain dots).
+    """
+    return hashlib.sha1(u'{}@{}'.format(url, revision).encode('utf-8')).hexdigest()
+
+
+class InheritanceSource(object):
+    """
+    The inheritable metadata and children of every container of a course, by
+    revision, from which the metadata inheritance tree of the course is computed.
+    """
+    def __init__(self, course_id, containers=None):
+        self.course_id = course_id
+        # Maps the container_key of each container to a dict of its url, revision,
+        # category, inheritable metadata and children
+        self.containers = containers if containers is not None else {}
+
+    @classmethod
+    def from_mongo(cls, course_id, document):
+        """
+        Return the InheritanceSource stored in the given document, or None if
+        there's no document or it was stored in an older format.
+        """
+        if document is None or document.get('version') != INHERITANCE_SOURCE_VERSION:
+            return None
+        return cls(course_id, document['containers'])
+
+    def to_mongo(self):
+        """
+        Return the document to persist this source as.
+        """
+        return {
+            '_id': unicode(self.course_id),
+            'version': INHERITANCE_SOURCE_VERSION,
+            'containers': self.containers,
+        }
+
+    def set_container(self, url, revision, category, metadata, children):
+        """
+        Add or replace a container of the course.
+
+        Returns the container_key and the entry of the container.
+        """
+        key = container_key(url, revision)
+        entry = {
+            'url': url,
+            'revision': revision,
+            'category': category,
+            'metadata': metadata,
+            'children': list(children),
+        }
+        self.containers[key] = entry
+        return key, entry
+
+    def _merge_revisions(self, published_only):
+        """
+        Merge the revisions of each container, as seen from a branch.
+
+        Returns a dict mapping the url of each container to a dict of its metadata
+        and children, and the url of the course (or None if it's missing).
+        """
+        results_by_url = {}
+        root = None
+        for entry in self.containers.itervalues():
+            if published_only and entry['revision'] is not None:
+                continue
+            url = entry['url']
+            result = results_by_url.get(url)
+            if result is None:
+                results_by_url[url] = {'metadata': entry['metadata'], 'children': entry['children']}
+            else:
+                # found either draft or live to complement the other revision. The children
+                # of both are kept, as in MongoModuleStore._compute_metadata_inheritance_tree,
+                # and the metadata of the draft is preferred.
+                result['children'] = list(set(result['children']) | set(entry['children']))
+                if entry['revision'] is not None:
+                    result['metadata'] = entry['metadata']
+            if entry['category'] == 'course':
+                root = url
+        return results_by_url, root
+
+    def compute_tree(self, branch, published_only=False):
+        """
+        Compute the metadata inheritance tree of the course: a dict mapping the url of
+        each item below the course to the metadata it inherits, along with its parent
+        in the given branch.
+        """
+        results_by_url, root = self._merge_revisions(published_only)
+        tree = {}
+        if root is not None:
+            _compute_inherited_metadata(results_by_url, tree, root, results_by_url[root]['metadata'], branch)
+        return tree
+
+
+def _compute_inherited_metadata(results_by_url, tree, url, metadata, branch):
+    """
+    Add the metadata inherited by the descendants of the container with the given url
+    and (inherited and own) metadata to the tree.
+    """
+    # go through all the children and recurse, but only if we have
+    # them in the result set. Remember results will not contain leaf nodes
+    for child in results_by_url[url]['children']:
+        if child in results_by_url:
+            child_metadata = copy.deepcopy(metadata)
+            child_metadata.update(results_by_url[child]['metadata'])
+            _compute_inherited_metadata(results_by_url, tree, child, child_metadata, branch)
+            tree[child] = child_metadata
+        else:
+            # this is likely a leaf node, so let's record what metadata we need to inherit
+            tree[child] = metadata.copy()
+        # WARNING: 'parent' is not part of inherited metadata, but we're piggybacking on
+        # this traversal to cache the child's parent, as a performance optimization.
+        # The 'parent' key will be popped out of the dictionary during
+        # CachingDescriptorSystem.load_item
+        tree[child].setdefault('parent', {})[branch] = url
@@ -265,11 +265,77 @@ class FindReportGen(ReportGenerator):
         return html
 
 
+class ReadPathsReportGen(object):
+    """
+    Class which generates report for modulestore read path performance test data.
+    """
+    def __init__(self, db_name):
+        conn = sqlite3.connect(db_name)
+        conn.row_factory = sqlite3.Row
+        sel_sql = (
+            'select id, run_id, block_desc, elapsed, queries, memory, timestamp FROM read_path_stats '
+            'ORDER BY run_id DESC'
+        )
+        cur = conn.cursor()
+        cur.execute(sel_sql)
+        self.all_rows = cur.fetchall()
+        self._read_stats_data()
+
+    def _read_stats_data(self):
+        """
+        Read in the latest measurements from the sqlite DB and save into a dict.
+        """
+        self.run_data = {}
+
+        self.all_modulestores = set()
+        for row in self.all_rows:
+            # Split apart the description into its parts.
+            desc_parts = row['block_desc'].split(':')
+            if desc_parts[0] != 'ReadPaths':
+                continue
+            modulestore, shape, test_phase = desc_parts[1:4]
+            self.all_modulestores.add(modulestore)
+
+            # Save the data in a multi-level dict - { phase1: { shape1: { modulestore1: stats, ...}, ...}, ...}.
+            phase_data = self.run_data.setdefault(test_phase, {})
+            shape_data = phase_data.setdefault(shape, {})
+            __ = shape_data.setdefault(modulestore, (row['elapsed'], row['queries'], row['memory']))
+
+    def generate_html(self):
+        """
+        Generate HTML.
+        """
+        html = HTMLDocument("Results")
+
+        for phase in sorted(self.run_data.keys()):
+            per_phase = self.run_data[phase]
+
+            # Make the table header columns and the table.
+            columns = ["Course Shape", ]
+            ms_keys = sorted(self.all_modulestores)
+            for k in ms_keys:
+                columns.append("Time Taken (ms) / Queries / Peak Memory Growth (KB) ({})".format(k))
+            phase_table = HTMLTable(columns)
+            for shape in sorted(per_phase.keys()):
+                per_shape = per_phase[shape]
+                row = [shape, ]
+                for modulestore in ms_keys:
+                    if modulestore in per_shape:
+                        row.append("{:.1f} / {} / {}".format(*per_shape[modulestore]))
+                    else:
+                        row.append("")
+                phase_table.add_row(row)
+            html.add_header(2, phase)
+            html.add_to_body(phase_table.table)
+
+        return html
+
+
 if click is not None:
     @click.command()
     @click.argument('outfile', type=click.File('w'), default='-', required=False)
     @click.option('--db_name', help='Name of sqlite database from which to read data.', default=DB_NAME)
-    @click.option('--data_type', help='Data type to process. One of: "imp_exp" or "find"', default="find")
+    @click.option('--data_type', help='Data type to process. One of: "imp_exp", "find" or "read"', default="find")
     def cli(outfile, db_name, data_type):
         """
         Generate an HTML report from the sqlite timing data.
@@ -280,6 +346,9 @@ if click is not None:
         elif data_type == 'find':
             f_gen = FindReportGen(db_name)
             html = f_gen.generate_html()
+        elif data_type == 'read':
+            r_gen = ReadPathsReportGen(db_name)
+            html = r_gen.generate_html()
         click.echo(html.tostring(), file=outfile)
 
 if __name__ == '__main__':
@@ -0,0 +1,72 @@
+"""
+Performance test for reading every block of a course as plain records rather than XBlocks.
+"""
+import unittest
+
+import ddt
+from nose.plugins.skip import SkipTest
+from xblock.fields import Scope
+
+from xmodule.modulestore.xml_importer import import_course_from_xml
+from xmodule.modulestore.tests.utils import (
+    MODULESTORE_SETUPS,
+    SHORT_NAME_MAP,
+)
+from xmodule.modulestore.perf_tests.test_asset_import_export import TEST_DATA_ROOT, TEST_COURSE
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class BlockRecordsTest(unittest.TestCase):
+    """
+    This class exists to compare reading the settings and content of every block of a course
+    through get_block_records with reading them from the XBlocks of get_course(depth=None).
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*MODULESTORE_SETUPS)
+    def test_generate_block_records_timings(self, source_ms):
+        """
+        Generate timings of reading every block of a course in different modulestores.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        desc = "BlockRecords:{}".format(SHORT_NAME_MAP[source_ms])
+
+        with source_ms.build() as (source_content, source_store):
+            source_course_key = source_store.make_course_key('a', 'course', 'course')
+            import_course_from_xml(
+                source_store,
+                'test_user',
+                TEST_DATA_ROOT,
+                source_dirs=TEST_COURSE,
+                static_content_store=source_content,
+                target_id=source_course_key,
+                create_if_not_present=True,
+                raise_on_failure=True,
+            )
+
+            with CodeBlockTimer("{}:xblocks".format(desc)):
+                blocks = [source_store.get_course(source_course_key, depth=None)]
+                for block in blocks:
+                    block.get_explicitly_set_fields_by_scope(Scope.settings)
+                    block.get_explicitly_set_fields_by_scope(Scope.content)
+                    if block.has_children:
+                        blocks.extend(block.get_children())
+
+            with CodeBlockTimer("{}:records".format(desc)):
+                for __ in source_store.get_block_records(source_course_key, include_content=True):
+                    pass
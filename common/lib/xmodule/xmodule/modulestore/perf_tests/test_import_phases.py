@@ -0,0 +1,80 @@
+"""
+Performance test for the phases of XML course import into the modulestore.
+"""
+import itertools
+import logging
+import unittest
+
+import ddt
+from nose.plugins.skip import SkipTest
+
+from xmodule.modulestore.xml_importer import CourseImportManager
+from xmodule.modulestore.tests.utils import (
+    MODULESTORE_SETUPS,
+    SHORT_NAME_MAP,
+)
+from xmodule.modulestore.perf_tests.test_asset_import_export import TEST_DATA_ROOT, TEST_COURSE
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+log = logging.getLogger(__name__)
+
+# Number of threads uploading the static files per test run.
+NUM_WORKERS_PER_TEST = (1, 4, 8)
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class ImportPhasesTest(unittest.TestCase):
+    """
+    This class exists to time each phase of XML import into different modulestore
+    classes with different numbers of workers.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*itertools.product(
+        MODULESTORE_SETUPS,
+        NUM_WORKERS_PER_TEST,
+    ))
+    @ddt.unpack
+    def test_generate_import_phase_timings(self, dest_ms, num_workers):
+        """
+        Generate timings of each import phase for different modulestores and numbers of workers.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        desc = "ImportPhases:{}:{}".format(
+            SHORT_NAME_MAP[dest_ms],
+            num_workers,
+        )
+
+        with dest_ms.build() as (dest_content, dest_store):
+            dest_course_key = dest_store.make_course_key('a', 'course', 'course')
+
+            with CodeBlockTimer(desc):
+                manager = CourseImportManager(
+                    dest_store,
+                    'test_user',
+                    TEST_DATA_ROOT,
+                    source_dirs=TEST_COURSE,
+                    static_content_store=dest_content,
+                    target_id=dest_course_key,
+                    create_if_not_present=True,
+                    raise_on_failure=True,
+                    num_workers=num_workers,
+                )
+                list(manager.run_imports())
+
+            for phase, seconds in manager.phase_timings.iteritems():
+                log.info("%s:%s %.3fs", desc, phase, seconds)
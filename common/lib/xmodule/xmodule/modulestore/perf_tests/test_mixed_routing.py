@@ -0,0 +1,86 @@
+"""
+Performance test for the routing of requests to the backing stores of the MixedModuleStore.
+"""
+import itertools
+import unittest
+
+import ddt
+from nose.plugins.skip import SkipTest
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.mixed_routing import CourseRoutingCache
+from xmodule.modulestore.tests.utils import MIXED_MODULESTORE_BOTH_SETUP, MongoContentstoreBuilder
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+# Number of requests routed per test run.
+NUM_REQUESTS = 1000
+
+# Maximum number of routed courses, where 0 disables the routing cache.
+ROUTING_CACHE_SIZES = (0, 10000)
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class MixedRoutingTest(unittest.TestCase):
+    """
+    This class exists to time the dispatch overhead of the MixedModuleStore on the hot
+    LMS paths (get_course, get_item and get_parent_location), with and without the
+    routing cache, for courses in each of its stores and for unknown courses.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*itertools.product(
+        (ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split, None),
+        ROUTING_CACHE_SIZES,
+    ))
+    @ddt.unpack
+    def test_generate_routing_timings(self, course_store_type, routing_cache_size):
+        """
+        Generate timings of the requests for a course in a store (or an unknown course,
+        when course_store_type is None) with different routing cache sizes.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        desc = "MixedRouting:{}:{}".format(course_store_type or 'unknown', routing_cache_size)
+
+        with MongoContentstoreBuilder().build() as contentstore:
+            with MIXED_MODULESTORE_BOTH_SETUP.build_with_contentstore(contentstore) as store:
+                store.routing_cache = CourseRoutingCache(routing_cache_size)
+                if course_store_type is None:
+                    course_key = store.make_course_key('a', 'unknown', 'course')
+                    usage_key = course_key.make_usage_key('html', 'html')
+                else:
+                    with store.default_store(course_store_type):
+                        course = store.create_course('a', course_store_type, 'course', ModuleStoreEnum.UserID.test)
+                        html = store.create_child(ModuleStoreEnum.UserID.test, course.location, 'html')
+                    course_key = course.id
+                    usage_key = html.location
+                # Forget the stores the courses were created in, as in a new LMS process
+                store.mappings = {}
+
+                with CodeBlockTimer("{}:route".format(desc)):
+                    for __ in xrange(NUM_REQUESTS):
+                        store._get_modulestore_for_courselike(course_key)  # pylint: disable=protected-access
+
+                if course_store_type is not None:
+                    with CodeBlockTimer("{}:get_course".format(desc)):
+                        for __ in xrange(NUM_REQUESTS):
+                            store.get_course(course_key)
+                    with CodeBlockTimer("{}:get_item".format(desc)):
+                        for __ in xrange(NUM_REQUESTS):
+                            store.get_item(usage_key)
+                    with CodeBlockTimer("{}:get_parent_location".format(desc)):
+                        for __ in xrange(NUM_REQUESTS):
+                            store.get_parent_location(usage_key)
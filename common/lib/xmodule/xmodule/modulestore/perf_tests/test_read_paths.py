@@ -0,0 +1,211 @@
+"""
+Performance tests for the hot read paths of the modulestores, on synthetic courses.
+
+Each measurement records the wall time, the number of Mongo queries and the growth of the
+peak memory of the process in the sqlite database read by generate_report.py (with
+--data_type read), so that regressions show up when comparing runs.
+
+The shapes of the synthetic courses can be configured with the READ_PATHS_COURSE_SHAPES
+environment variable, as a comma separated list of
+<chapters>x<sequentials>x<verticals>x<problems> shapes (e.g. "2x2x2x2,10x5x4x5").
+"""
+from contextlib import contextmanager
+import datetime
+import itertools
+import logging
+import os
+import resource
+import sqlite3
+import time
+import unittest
+
+import ddt
+from mock import patch
+import pymongo
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.perf_tests.generate_report import DB_NAME
+from xmodule.modulestore.split_mongo.mongo_connection import CourseStructureCache
+from xmodule.modulestore.tests.factories import StackTraceCounter
+from xmodule.modulestore.tests.utils import (
+    MIXED_MODULESTORE_SETUPS,
+    MIXED_MS_SETUPS_SHORT,
+)
+
+log = logging.getLogger(__name__)
+
+# The shapes of the synthetic courses: the number of chapters, of sequentials per chapter,
+# of verticals per sequential and of problems per vertical.
+COURSE_SHAPES = tuple(
+    tuple(int(amount) for amount in shape.split('x'))
+    for shape in os.environ.get('READ_PATHS_COURSE_SHAPES', '2x2x2x2,10x5x4x5').split(',')
+)
+
+# Number of times each read is repeated per measurement.
+NUM_READS = 10
+
+# The depths to get the courses at.
+COURSE_DEPTHS = (0, 1, 2, None)
+
+SHORT_NAME_MAP = dict(zip(MIXED_MODULESTORE_SETUPS, MIXED_MS_SETUPS_SHORT))
+
+
+def build_synthetic_course(store, shape, user_id=ModuleStoreEnum.UserID.test):
+    """
+    Create and publish a course of the given shape in the store.
+
+    Returns the course key, and the location of the first sequential and of the last problem.
+    """
+    num_chapters, num_sequentials, num_verticals, num_problems = shape
+    course_name = 'course_{}'.format('x'.join(str(amount) for amount in shape))
+    course = store.create_course('perf', course_name, 'run', user_id)
+    sequential = problem = None
+    with store.bulk_operations(course.id):
+        for chapter_index in xrange(num_chapters):
+            chapter = store.create_child(
+                user_id, course.location, 'chapter', fields={'display_name': 'Chapter {}'.format(chapter_index)}
+            )
+            for sequential_index in xrange(num_sequentials):
+                sequential = store.create_child(
+                    user_id, chapter.location, 'sequential',
+                    fields={'display_name': 'Sequential {}'.format(sequential_index), 'graded': True}
+                )
+                for vertical_index in xrange(num_verticals):
+                    vertical = store.create_child(
+                        user_id, sequential.location, 'vertical',
+                        fields={'display_name': 'Vertical {}'.format(vertical_index)}
+                    )
+                    for problem_index in xrange(num_problems):
+                        problem = store.create_child(
+                            user_id, vertical.location, 'problem',
+                            fields={'display_name': 'Problem {}'.format(problem_index), 'weight': 1.0}
+                        )
+        store.publish(course.location, user_id)
+    return course.id, sequential.location, problem.location
+
+
+class ReadPathStats(object):
+    """
+    Measures blocks of code, and records their measurements in a sqlite database.
+    """
+    def __init__(self, db_name=DB_NAME):
+        self.db_name = db_name
+        self.run_id = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        with sqlite3.connect(self.db_name) as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS read_path_stats ('
+                'id INTEGER PRIMARY KEY, run_id TEXT, block_desc TEXT, elapsed REAL, queries INTEGER, '
+                'memory INTEGER, timestamp TEXT)'
+            )
+
+    @contextmanager
+    def measure(self, desc):
+        """
+        Measure the wall time (in ms), the number of Mongo queries and the growth of the
+        peak memory of the process (in KB, as reported by getrusage) of the block.
+        """
+        counters = {
+            method: StackTraceCounter.capture_call(
+                getattr(pymongo.message, method), stack_depth=3, include_arguments=False
+            )
+            for method in ('query', 'get_more')
+        }
+        start_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start_time = time.time()
+        with patch.multiple(pymongo.message, **counters):
+            yield
+        elapsed = (time.time() - start_time) * 1000
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_memory
+        queries = sum(counter.stack_counter.total_calls for counter in counters.values())
+
+        log.info("%s: %.1fms, %d queries, %dKB", desc, elapsed, queries, memory)
+        with sqlite3.connect(self.db_name) as conn:
+            conn.execute(
+                'INSERT INTO read_path_stats (run_id, block_desc, elapsed, queries, memory, timestamp) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self.run_id, desc, elapsed, queries, memory, datetime.datetime.utcnow().isoformat())
+            )
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class ReadPathsTest(unittest.TestCase):
+    """
+    This class exists to measure get_course at several depths, get_item, get_items by
+    category, get_parent_location and the split structure cache, for synthetic courses
+    of different sizes in split and old Mongo.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(ReadPathsTest, self).setUp()
+        self.stats = ReadPathStats()
+
+    def measure_reads(self, desc, read):
+        """
+        Measure NUM_READS calls of read.
+        """
+        with self.stats.measure(desc):
+            for __ in xrange(NUM_READS):
+                read()
+
+    @ddt.data(*itertools.product(
+        MIXED_MODULESTORE_SETUPS,
+        COURSE_SHAPES,
+    ))
+    @ddt.unpack
+    def test_generate_read_path_stats(self, store_builder, shape):
+        """
+        Generate the measurements of the read paths of a store for a course of the given shape.
+        """
+        desc = "ReadPaths:{}:{}".format(SHORT_NAME_MAP[store_builder], 'x'.join(str(amount) for amount in shape))
+
+        with store_builder.build() as (__, store):
+            course_key, sequential_location, problem_location = build_synthetic_course(store, shape)
+
+            with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+                for depth in COURSE_DEPTHS:
+                    self.measure_reads(
+                        "{}:get_course_depth_{}".format(desc, 'all' if depth is None else depth),
+                        lambda: store.get_course(course_key, depth=depth),  # pylint: disable=cell-var-from-loop
+                    )
+                self.measure_reads("{}:get_item".format(desc), lambda: store.get_item(problem_location))
+                self.measure_reads(
+                    "{}:get_item_sequential_depth_all".format(desc),
+                    lambda: store.get_item(sequential_location, depth=None),
+                )
+                self.measure_reads(
+                    "{}:get_items_by_category".format(desc),
+                    lambda: store.get_items(course_key, qualifiers={'category': 'problem'}),
+                )
+                self.measure_reads(
+                    "{}:get_parent_location".format(desc), lambda: store.get_parent_location(problem_location)
+                )
+
+            split_store = store._get_modulestore_by_type(ModuleStoreEnum.Type.split)  # pylint: disable=protected-access
+            if split_store is not None:
+                self.measure_structure_cache(desc, split_store, course_key)
+
+    def measure_structure_cache(self, desc, split_store, course_key):
+        """
+        Measure reading the published structure of the course from split, when it isn't
+        cached and when it is (the cache is only enabled when the django
+        'course_structure_cache' is configured).
+        """
+        version_guid = split_store.get_course_index(course_key)['versions'][ModuleStoreEnum.BranchName.published]
+        cache = CourseStructureCache()
+        with self.stats.measure("{}:structure_cache_miss".format(desc)):
+            for __ in xrange(NUM_READS):
+                if cache.cache is not None:
+                    cache.cache.delete(version_guid)
+                    cache.memory_cache.clear()
+                split_store.db_connection.get_structure(version_guid, course_key)
+        self.measure_reads(
+            "{}:structure_cache_hit".format(desc),
+            lambda: split_store.db_connection.get_structure(version_guid, course_key),
+        )
@@ -0,0 +1,82 @@
+"""
+Performance test for the storage of split modulestore structures, whole or as deltas.
+"""
+import itertools
+import logging
+import unittest
+
+import ddt
+from nose.plugins.skip import SkipTest
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.utils import VersioningModulestoreBuilder
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+log = logging.getLogger(__name__)
+
+# Number of html blocks in the course per test run.
+NUM_BLOCKS = (100, 1000)
+
+# Number of edits (each storing a new version of the structure) per test run.
+NUM_EDITS = 100
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class StructureStorageTest(unittest.TestCase):
+    """
+    This class exists to compare the write volume and the read latency of the structures
+    of an edited course, when they're stored whole and as deltas.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*itertools.product(
+        (False, True),
+        NUM_BLOCKS,
+    ))
+    @ddt.unpack
+    def test_generate_structure_storage_timings(self, delta_structures, num_blocks):
+        """
+        Generate the size of the stored structures, and timings of the edits and of
+        reading every version of the structure back.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        desc = "StructureStorage:{}:{}".format('delta' if delta_structures else 'full', num_blocks)
+        user_id = ModuleStoreEnum.UserID.test
+
+        with VersioningModulestoreBuilder().build(delta_structures=delta_structures) as (__, store):
+            course = store.create_course('a', 'course', 'course', user_id)
+            with store.bulk_operations(course.id):
+                blocks = [
+                    store.create_child(user_id, course.location, 'html', block_id='html{}'.format(index))
+                    for index in xrange(num_blocks)
+                ]
+
+            with CodeBlockTimer("{}:edit".format(desc)):
+                for index in xrange(NUM_EDITS):
+                    block = store.get_item(blocks[index % num_blocks].location)
+                    block.display_name = 'edit {}'.format(index)
+                    store.update_item(block, user_id)
+
+            db_connection = store.db_connection
+            stats = db_connection.database.command('collstats', db_connection.structures.name)
+            log.info("%s:structures %d", desc, stats['count'])
+            log.info("%s:size %d bytes", desc, stats['size'])
+
+            version_guids = [doc['_id'] for doc in db_connection.structures.find({}, {'_id': 1})]
+            with CodeBlockTimer("{}:read".format(desc)):
+                for version_guid in version_guids:
+                    db_connection.get_structure(version_guid, course.id)
@@ -21,3 +21,27 @@ class BlockKey(namedtuple('BlockKey', 'type id')):
 
 
 CourseEnvelope = namedtuple('CourseEnvelope', 'course_key structure')
+
+
+class DefinitionPrefetchPolicy(namedtuple('DefinitionPrefetchPolicy', 'depth block_types batch_size')):
+    """
+    Which definitions to load along with a subtree of blocks, in one query per batch,
+    rather than one at a time the first time a content scoped field of each block is read.
+
+    depth: how far below the requested blocks to prefetch (0 => the requested blocks only,
+        None => all of their descendants)
+    block_types: the block types whose definitions to prefetch, or None for every type
+    batch_size: the maximum number of definitions to fetch per query
+    """
+    __slots__ = ()
+
+    def __new__(cls, depth=None, block_types=None, batch_size=1000):
+        if block_types is not None:
+            block_types = frozenset(block_types)
+        return super(DefinitionPrefetchPolicy, cls).__new__(cls, depth, block_types, batch_size)
+
+    def includes(self, block_key):
+        """
+        Whether the definition of the block with the given BlockKey should be prefetched.
+        """
+        return self.block_types is None or block_key.type in self.block_types
@@ -1,6 +1,7 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import copy
 import datetime
 import cPickle as pickle
 import math
@@ -8,6 +9,8 @@ import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
@@ -15,6 +18,7 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -44,6 +48,30 @@ def get_cache(alias):
     return caches[alias]
 
 
+# The default maximum total size of the pickled structures held in each
+# process' StructureMemoryCache. Note that the unpickled structures use
+# several times as much memory.
+DEFAULT_STRUCTURE_MEMORY_CACHE_SIZE = 16 * 1024 * 1024
+
+_STRUCTURE_MEMORY_CACHE = None
+
+
+def get_memory_cache():
+    """
+    Return the StructureMemoryCache of this process, sized by the
+    COURSE_STRUCTURE_MEMORY_CACHE_SIZE setting when it is available.
+
+    Note: The primary purpose of this is to mock the cache in test_split_modulestore.py
+    """
+    global _STRUCTURE_MEMORY_CACHE  # pylint: disable=global-statement
+    if _STRUCTURE_MEMORY_CACHE is None:
+        max_size = DEFAULT_STRUCTURE_MEMORY_CACHE_SIZE
+        if DJANGO_AVAILABLE:
+            max_size = getattr(settings, 'COURSE_STRUCTURE_MEMORY_CACHE_SIZE', max_size)
+        _STRUCTURE_MEMORY_CACHE = StructureMemoryCache(max_size)
+    return _STRUCTURE_MEMORY_CACHE
+
+
 def round_power_2(value):
     """
     Return value rounded up to the nearest power of 2.
@@ -162,6 +190,10 @@ class QueryTimer(object):
 
 TIMER = QueryTimer(__name__, 0.01)
 
+# The fields of the structure documents stored by structure_delta_to_mongo which
+# record which structure they're stored against
+DELTA_FIELDS = ('snapshot_version', 'delta_depth')
+
 
 def structure_from_mongo(structure, course_context=None):
     """
@@ -225,28 +257,167 @@ def structure_to_mongo(structure, course_context=None):
         return new_structure
 
 
+def structure_delta_to_mongo(structure, snapshot, max_ratio, course_context=None):
+    """
+    Converts a structure to the mongo document storing only its differences from
+    a snapshot (a previous version of it): the blocks which were added or changed
+    since the snapshot (as 'delta_blocks', in the format of structure_to_mongo) and
+    the keys of the blocks which were removed (as 'delta_removed_blocks').
+
+    Returns None if more than max_ratio of the blocks of the structure differ, as
+    the structure is then better stored whole.
+    """
+    with TIMER.timer('structure_delta_to_mongo', course_context) as tagger:
+        changed_blocks = {}
+        for block_key, block in structure['blocks'].iteritems():
+            snapshot_block = snapshot['blocks'].get(block_key)
+            if snapshot_block is None or snapshot_block.to_storable() != block.to_storable():
+                changed_blocks[block_key] = block
+        removed_block_keys = [block_key for block_key in snapshot['blocks'] if block_key not in structure['blocks']]
+        tagger.measure('blocks', len(structure['blocks']))
+        tagger.measure('changed_blocks', len(changed_blocks))
+        tagger.measure('removed_blocks', len(removed_block_keys))
+
+        if len(changed_blocks) + len(removed_block_keys) > max_ratio * len(structure['blocks']):
+            return None
+
+        delta = structure_to_mongo(dict(structure, blocks=changed_blocks), course_context)
+        delta['delta_blocks'] = delta.pop('blocks')
+        delta['delta_removed_blocks'] = removed_block_keys
+        return delta
+
+
+def structure_from_delta(delta, snapshot, course_context=None):
+    """
+    Converts a document stored by structure_delta_to_mongo back into the structure,
+    given the (converted) snapshot it was stored against.
+    """
+    with TIMER.timer('structure_from_delta', course_context) as tagger:
+        removed_block_keys = delta.pop('delta_removed_blocks')
+        delta['blocks'] = delta.pop('delta_blocks')
+        for field in DELTA_FIELDS:
+            delta.pop(field, None)
+        structure = structure_from_mongo(delta, course_context)
+        tagger.measure('changed_blocks', len(structure['blocks']))
+
+        # The snapshot may be cached (and shared), so its blocks can't be reused
+        blocks = copy.deepcopy(snapshot['blocks'])
+        for block_key in removed_block_keys:
+            blocks.pop(BlockKey(*block_key), None)
+        blocks.update(structure['blocks'])
+        structure['blocks'] = blocks
+        tagger.measure('blocks', len(blocks))
+        return structure
+
+
+class StructureMemoryCache(object):
+    """
+    A process-local, thread-safe LRU cache of pickled course structures,
+    bounded by their total size.
+
+    Structures are immutable and keyed by their version guid, so they are
+    kept between requests without ever being invalidated. They are kept
+    pickled, so that every reader unpickles its own copy, which it is free
+    to change.
+    """
+    def __init__(self, max_size):
+        """
+        Arguments:
+            max_size: The maximum total size of the pickled structures, in
+                bytes. A size of 0 disables the cache.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self._structures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the pickled structure with the given key, or None if it isn't cached.
+        """
+        with self._lock:
+            entry = self._structures.pop(key, None)
+            if entry is None:
+                return None
+            # Move the structure to the most recently used end
+            self._structures[key] = entry
+            return entry[0]
+
+    def set(self, key, structure, size):
+        """
+        Cache a structure, evicting the least recently used structures
+        until the cache fits within its maximum size.
+
+        Arguments:
+            key: The version guid of the structure.
+            structure: The pickled structure to cache.
+            size: The size of the pickled structure, in bytes.
+
+        Returns the number of structures that were evicted.
+        """
+        if size > self.max_size:
+            return 0
+
+        evictions = 0
+        with self._lock:
+            previous_entry = self._structures.pop(key, None)
+            if previous_entry is not None:
+                self.size -= previous_entry[1]
+            self._structures[key] = (structure, size)
+            self.size += size
+            while self.size > self.max_size:
+                __, (__, evicted_size) = self._structures.popitem(last=False)
+                self.size -= evicted_size
+                evictions += 1
+        return evictions
+
+    def clear(self):
+        """
+        Remove every structure from the cache.
+        """
+        with self._lock:
+            self._structures.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._structures)
+
+
 class CourseStructureCache(object):
     """
-    Wrapper around django cache object to cache course structure objects.
-    The course structures are pickled and compressed when cached.
+    Two-level cache of course structure objects: a process-local
+    StructureMemoryCache in front of a django cache object. The course
+    structures are pickled when cached in memory, and pickled and compressed
+    when cached in django.
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
     """
     def __init__(self):
         self.cache = None
+        self.memory_cache = None
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
+                self.memory_cache = get_memory_cache()
             except InvalidCacheBackendError:
                 pass
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """
+        Pull the pickled struct data from the memory cache, or the compressed,
+        pickled struct data from cache (adding it to the memory cache), and
+        deserialize it.
+        """
         if self.cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
+            pickled_data = self.memory_cache.get(key)
+            tagger.tag(from_memory_cache=str(pickled_data is not None).lower())
+            if pickled_data is not None:
+                return pickle.loads(pickled_data)
+
             compressed_pickled_data = self.cache.get(key)
             tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
 
@@ -260,6 +431,7 @@ class CourseStructureCache(object):
             pickled_data = zlib.decompress(compressed_pickled_data)
             tagger.measure('uncompressed_size', len(pickled_data))
 
+            self._set_in_memory_cache(key, pickled_data, tagger)
             return pickle.loads(pickled_data)
 
     def set(self, key, structure, course_context=None):
@@ -278,18 +450,43 @@ class CourseStructureCache(object):
             # Stuctures are immutable, so we set a timeout of "never"
             self.cache.set(key, compressed_pickled_data, None)
 
+            self._set_in_memory_cache(key, pickled_data, tagger)
+
+    def _set_in_memory_cache(self, key, pickled_data, tagger):
+        """
+        Add a pickled structure to the memory cache, recording the number of
+        evicted structures and the size of the cache with the tagger.
+        """
+        evictions = self.memory_cache.set(key, pickled_data, len(pickled_data))
+        tagger.measure('memory_cache_evictions', evictions)
+        tagger.measure('memory_cache_size', self.memory_cache.size)
+
 
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
+    # The maximum number of consecutive versions of a structure stored as deltas
+    # against the same snapshot, when delta_structures is set
+    STRUCTURE_SNAPSHOT_INTERVAL = 20
+
+    # The maximum fraction of the blocks of a structure which may differ from its
+    # snapshot for it to be stored as a delta, when delta_structures is set
+    MAX_STRUCTURE_DELTA_RATIO = 0.25
+
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, delta_structures=False, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        If delta_structures is set, new structures are stored as their differences from a
+        previous version (a snapshot), rather than whole. Both kinds of documents are
+        always read.
         """
+        self.delta_structures = delta_structures
+
         # Set a write concern of 1, which makes writes complete successfully to the primary
         # only before returning. Also makes pymongo report write errors.
         kwargs['w'] = 1
@@ -336,8 +533,11 @@ class MongoConnection(object):
                             unicode(key)
                         )
                         return None
-                    tagger_find_one.measure("blocks", len(doc['blocks']))
-                    structure = structure_from_mongo(doc, course_context)
+                    tagger_find_one.measure("blocks", len(doc.get('blocks', doc.get('delta_blocks'))))
+                    tagger_find_one.tag(delta=str('snapshot_version' in doc).lower())
+                    structure = self._structure_from_storage(doc, course_context)
+                    if structure is None:
+                        return None
                     tagger_find_one.sample_rate = 1
 
                 cache.set(key, structure, course_context)
@@ -354,10 +554,7 @@ class MongoConnection(object):
         """
         with TIMER.timer("find_structures_by_id", course_context) as tagger:
             tagger.measure("requested_ids", len(ids))
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({'_id': {'$in': ids}})
-            ]
+            docs = self._structures_from_storage(self.structures.find({'_id': {'$in': ids}}), course_context)
             tagger.measure("structures", len(docs))
             return docs
 
@@ -371,13 +568,28 @@ class MongoConnection(object):
         """
         with TIMER.timer("find_course_blocks_by_id", course_context) as tagger:
             tagger.measure("requested_ids", len(ids))
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find(
+            docs = []
+            for structure in self.structures.find(
                     {'_id': {'$in': ids}},
-                    {'blocks': {'$elemMatch': {'block_type': 'course'}}, 'root': 1}
-                )
-            ]
+                    {'blocks': {'$elemMatch': {'block_type': 'course'}}, 'root': 1, 'snapshot_version': 1}
+            ):
+                if 'snapshot_version' in structure:
+                    # the course block of a delta may only be in its snapshot
+                    full_structure = self.get_structure(structure['_id'], course_context)
+                    if full_structure is None:
+                        continue
+                    structure = {
+                        '_id': full_structure['_id'],
+                        'root': full_structure['root'],
+                        'blocks': {
+                            block_key: block
+                            for block_key, block in full_structure['blocks'].iteritems()
+                            if block_key.type == 'course'
+                        },
+                    }
+                else:
+                    structure = structure_from_mongo(structure, course_context)
+                docs.append(structure)
             tagger.measure("structures", len(docs))
             return docs
 
@@ -391,10 +603,9 @@ class MongoConnection(object):
         """
         with TIMER.timer("find_structures_derived_from", course_context) as tagger:
             tagger.measure("base_ids", len(ids))
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({'previous_version': {'$in': ids}})
-            ]
+            docs = self._structures_from_storage(
+                self.structures.find({'previous_version': {'$in': ids}}), course_context
+            )
             tagger.measure("structures", len(docs))
             return docs
 
@@ -408,21 +619,35 @@ class MongoConnection(object):
             block_key (BlockKey): The id of the block in question
         """
         with TIMER.timer("find_ancestor_structures", course_context) as tagger:
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({
-                    'original_version': original_version,
-                    'blocks': {
-                        '$elemMatch': {
-                            'block_id': block_key.id,
-                            'block_type': block_key.type,
-                            'edit_info.update_version': {
-                                '$exists': True,
+            docs = []
+            for structure in self.structures.find({
+                'original_version': original_version,
+                '$or': [
+                    {
+                        'blocks': {
+                            '$elemMatch': {
+                                'block_id': block_key.id,
+                                'block_type': block_key.type,
+                                'edit_info.update_version': {
+                                    '$exists': True,
+                                },
                             },
                         },
                     },
-                })
-            ]
+                    # the block may only be in the snapshot of a delta, so deltas are filtered once rebuilt
+                    {'snapshot_version': {'$exists': True}},
+                ],
+            }):
+                is_delta = 'snapshot_version' in structure
+                structure = self._structure_from_storage(structure, course_context)
+                if structure is None:
+                    continue
+                if is_delta and (
+                        block_key not in structure['blocks'] or
+                        structure['blocks'][block_key].edit_info.update_version is None
+                ):
+                    continue
+                docs.append(structure)
             tagger.measure("structures", len(docs))
             return docs
 
@@ -432,7 +657,83 @@ class MongoConnection(object):
         """
         with TIMER.timer("insert_structure", course_context) as tagger:
             tagger.measure("blocks", len(structure["blocks"]))
-            self.structures.insert(structure_to_mongo(structure, course_context))
+            doc = self._structure_to_storage(structure, course_context)
+            tagger.tag(delta=str('snapshot_version' in doc).lower())
+            self.structures.insert(doc)
+
+    def compact_structures(self, original_version, course_context=None):
+        """
+        Rewrite every stored version of the structure with the given original version
+        in the current storage mode: as deltas against periodic snapshots if
+        delta_structures is set, otherwise whole.
+
+        Returns the number of rewritten structures.
+        """
+        with TIMER.timer("compact_structures", course_context) as tagger:
+            # Rewrite the oldest versions first, so that the newer versions are stored against
+            # the rewritten ones. Deltas are rebuilt from their snapshots whatever they're stored
+            # as, so each structure stays readable while the others are rewritten.
+            structure_ids = [
+                doc['_id'] for doc in self.structures.find(
+                    {'original_version': original_version}, {'_id': 1}
+                ).sort('edited_on', pymongo.ASCENDING)
+            ]
+            for structure_id in structure_ids:
+                structure = self.get_structure(structure_id, course_context)
+                if structure is not None:
+                    self.structures.update({'_id': structure_id}, self._structure_to_storage(structure, course_context))
+            tagger.measure("structures", len(structure_ids))
+            return len(structure_ids)
+
+    def _structure_to_storage(self, structure, course_context=None):
+        """
+        Return the document to store the given structure as. If delta_structures is set,
+        that's its delta against the latest snapshot of its previous version, unless it's
+        been STRUCTURE_SNAPSHOT_INTERVAL versions since that snapshot, or the structure
+        changed too much since then. Otherwise, it's the whole structure (a snapshot).
+        """
+        if self.delta_structures and structure.get('previous_version') is not None:
+            previous = self.structures.find_one(
+                {'_id': structure['previous_version']}, {field: 1 for field in DELTA_FIELDS}
+            )
+            if previous is not None:
+                snapshot_version = previous.get('snapshot_version', previous['_id'])
+                delta_depth = previous.get('delta_depth', 0) + 1
+                if delta_depth <= self.STRUCTURE_SNAPSHOT_INTERVAL:
+                    snapshot = self.get_structure(snapshot_version, course_context)
+                    if snapshot is not None:
+                        delta = structure_delta_to_mongo(
+                            structure, snapshot, self.MAX_STRUCTURE_DELTA_RATIO, course_context
+                        )
+                        if delta is not None:
+                            delta['snapshot_version'] = snapshot_version
+                            delta['delta_depth'] = delta_depth
+                            return delta
+        return structure_to_mongo(structure, course_context)
+
+    def _structure_from_storage(self, doc, course_context=None):
+        """
+        Convert a stored structure document (whole or a delta) into the structure.
+
+        Returns None if the snapshot of a delta is missing.
+        """
+        if 'snapshot_version' not in doc:
+            return structure_from_mongo(doc, course_context)
+
+        snapshot = self.get_structure(doc['snapshot_version'], course_context)
+        if snapshot is None:
+            log.warning(
+                "snapshot %s of structure %s was missing", unicode(doc['snapshot_version']), unicode(doc['_id'])
+            )
+            return None
+        return structure_from_delta(doc, snapshot, course_context)
+
+    def _structures_from_storage(self, docs, course_context=None):
+        """
+        Convert stored structure documents into structures, skipping any missing their snapshot.
+        """
+        structures = (self._structure_from_storage(doc, course_context) for doc in docs)
+        return [structure for structure in structures if structure is not None]
 
     def get_course_index(self, key, ignore_case=False):
         """
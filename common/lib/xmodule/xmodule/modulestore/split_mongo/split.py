@@ -78,14 +78,15 @@ from xmodule.modulestore.exceptions import InsufficientSpecificationError, Versi
     DuplicateCourseError, MultipleCourseBlocksFound
 from xmodule.modulestore import (
     inheritance, ModuleStoreWriteBase, ModuleStoreEnum,
-    BulkOpsRecord, BulkOperationsMixin, SortedAssetList, BlockData
+    BulkOpsRecord, BulkOperationsMixin, SortedAssetList, BlockData, BlockRecord
 )
 
 from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.partitions.partitions_service import PartitionService
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError, TIMER
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
+from xmodule.modulestore.split_mongo.structure_index import StructureIndex, StructureIndexCache
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
@@ -655,18 +656,27 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
     # version) but those functions will have an optional arg for setting these.
     SEARCH_TARGET_DICT = ['wiki_slug']
 
+    # The maximum total number of blocks of the structures whose indexes are
+    # kept in memory by each modulestore
+    STRUCTURE_INDEX_CACHE_SIZE = 100000
+
+    # The maximum number of definitions fetched per query by get_block_records
+    BLOCK_RECORDS_BATCH_SIZE = 1000
+
     def __init__(self, contentstore, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, delta_structures=False, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param delta_structures: whether to store new structures as deltas against periodic snapshots of
+            their previous versions, rather than whole (see MongoConnection)
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(delta_structures=delta_structures, **doc_store_config)
 
         if default_class is not None:
             module_path, __, class_name = default_class.rpartition('.')
@@ -691,6 +701,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             self.services["request_cache"] = self.request_cache
 
         self.signal_handler = signal_handler
+        self._structure_indexes = StructureIndexCache(self.STRUCTURE_INDEX_CACHE_SIZE)
 
     def close_connections(self):
         """
@@ -721,7 +732,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         self.db_connection._drop_database(database, collections, connections)  # pylint: disable=protected-access
 
-    def cache_items(self, system, base_block_ids, course_key, depth=0, lazy=True):
+    def cache_items(self, system, base_block_ids, course_key, depth=0, lazy=True, prefetch_definitions=None):
         """
         Handles caching of items once inheritance and any other one time
         per course per fetch operations are done.
@@ -732,6 +743,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             course_key: the destination course providing the context
             depth: how deep below these to prefetch
             lazy: whether to load definitions now or later
+            prefetch_definitions: a DefinitionPrefetchPolicy of the definitions to load now
+                when lazy
         """
         with self.bulk_operations(course_key, emit_signals=False):
             new_module_data = {}
@@ -747,36 +760,93 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # until they're actually needed.
             if not lazy:
                 # Non-lazy loading: Load all descendants by id.
-                descendent_definitions = self.get_definitions(
-                    course_key,
-                    [
-                        block.definition
-                        for block in new_module_data.itervalues()
-                    ]
-                )
-                # Turn definitions into a map.
-                definitions = {definition['_id']: definition
-                               for definition in descendent_definitions}
-
-                for block in new_module_data.itervalues():
-                    if block.definition in definitions:
-                        definition = definitions[block.definition]
-                        # convert_fields gets done later in the runtime's xblock_from_json
-                        block.fields.update(definition.get('fields'))
-                        block.definition_loaded = True
+                new_module_data.update(self._load_definitions(course_key, new_module_data))
 
             system.module_data.update(new_module_data)
+            if lazy and prefetch_definitions is not None:
+                self.prefetch_definitions(system, base_block_ids, course_key, prefetch_definitions)
             return system.module_data
 
+    def prefetch_definitions(self, system, base_block_ids, course_key, policy):
+        """
+        Load the definitions of the blocks selected by the policy into the system's module data,
+        in one query per batch, so that the definitions of lazily loaded blocks don't have to be
+        fetched one at a time. The definitions are also added to the bulk operation's cache.
+
+        Arguments:
+            system: a CachingDescriptorSystem
+            base_block_ids: list of BlockIds to prefetch the definitions below
+            course_key: the destination course providing the context
+            policy: a DefinitionPrefetchPolicy
+        """
+        with TIMER.timer("prefetch_definitions", course_key) as tagger:
+            with self.bulk_operations(course_key, emit_signals=False):
+                blocks = {}
+                for block_id in base_block_ids:
+                    blocks = self.descendants(
+                        system.course_entry.structure['blocks'],
+                        block_id,
+                        policy.depth,
+                        blocks
+                    )
+                # Skip the blocks whose definitions have already been loaded by this system
+                block_items = [
+                    (block_key, block) for block_key, block in blocks.iteritems()
+                    if policy.includes(block_key) and block.definition is not None and
+                    not system.module_data.get(block_key, block).definition_loaded
+                ]
+                tagger.measure('blocks', len(block_items))
+
+                batches = 0
+                for start in xrange(0, len(block_items), policy.batch_size):
+                    batch = dict(block_items[start:start + policy.batch_size])
+                    system.module_data.update(self._load_definitions(course_key, batch))
+                    batches += 1
+                tagger.measure('batches', batches)
+
+    def _load_definitions(self, course_key, blocks):
+        """
+        Fetch the definitions of the given blocks in a single query.
+
+        Arguments:
+            course_key: the course the definitions are loaded for (to respect bulk operations)
+            blocks: a dict mapping BlockKeys to BlockData
+
+        Returns:
+            a dict mapping the BlockKeys whose definition was found to a copy of their
+            BlockData with the definition's fields loaded
+        """
+        definitions = {
+            definition['_id']: definition
+            for definition in self.get_definitions(course_key, [block.definition for block in blocks.itervalues()])
+        }
+
+        loaded_blocks = {}
+        for block_key, block in blocks.iteritems():
+            if block.definition in definitions:
+                definition = definitions[block.definition]
+                # Copy the block, as the structure it belongs to may be
+                # shared with other requests (see CourseStructureCache)
+                block = copy.copy(block)
+                # convert_fields gets done later in the runtime's xblock_from_json
+                block.fields = dict(block.fields)
+                block.fields.update(definition.get('fields'))
+                block.definition_loaded = True
+                loaded_blocks[block_key] = block
+        return loaded_blocks
+
     @contract(course_entry=CourseEnvelope, block_keys="list(BlockKey)", depth="int | None")
     def _load_items(self, course_entry, block_keys, depth=0, **kwargs):
         """
         Load & cache the given blocks from the course. May return the blocks in any order.
 
         Load the definitions into each block if lazy is in kwargs and is False;
-        otherwise, do not load the definitions - they'll be loaded later when needed.
+        otherwise, do not load the definitions - they'll be loaded later when needed,
+        except for those selected by the DefinitionPrefetchPolicy in the prefetch_definitions
+        kwarg, which are loaded in batches.
         """
         lazy = kwargs.pop('lazy', True)
+        prefetch_definitions = kwargs.pop('prefetch_definitions', None)
         should_cache_items = not lazy
 
         runtime = self._get_cache(course_entry.structure['_id'])
@@ -786,7 +856,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             should_cache_items = True
 
         if should_cache_items:
-            self.cache_items(runtime, block_keys, course_entry.course_key, depth, lazy)
+            self.cache_items(runtime, block_keys, course_entry.course_key, depth, lazy, prefetch_definitions)
+        elif lazy and prefetch_definitions is not None:
+            self.prefetch_definitions(runtime, block_keys, course_entry.course_key, prefetch_definitions)
 
         return [runtime.load_item(block_key, course_entry, **kwargs) for block_key in block_keys]
 
@@ -1226,20 +1298,32 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
 
-        # No need of these caches unless include_orphans is set to False
-        path_cache = None
-        parents_cache = None
+        structure_index = self._get_structure_index(course)
 
-        if not include_orphans:
-            path_cache = {}
-            parents_cache = self.build_block_key_to_parents_mapping(course.structure)
+        # Only consider the blocks of the requested types when they're given
+        # as plain strings, otherwise check every block
+        block_types = qualifiers.get('block_type')
+        if isinstance(block_types, six.string_types):
+            block_types = [block_types]
+        elif isinstance(block_types, dict) and block_types.keys() == ['$in']:
+            block_types = block_types['$in']
+        else:
+            block_types = None
+        if block_types is not None and all(isinstance(block_type, six.string_types) for block_type in block_types):
+            block_ids = [
+                block_id
+                for block_type in set(block_types)
+                for block_id in structure_index.get_block_keys_of_type(block_type)
+            ]
+        else:
+            block_ids = course.structure['blocks'].iterkeys()
 
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
+        for block_id in block_ids:
+            if _block_matches_all(course.structure['blocks'][block_id]):
                 if not include_orphans:
                     if (  # pylint: disable=bad-continuation
                         block_id.type in DETACHED_XBLOCK_TYPES or
-                        self.has_path_to_root(block_id, course, path_cache, parents_cache)
+                        block_id in structure_index.reachable
                     ):
                         items.append(block_id)
                 else:
@@ -1250,6 +1334,57 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         else:
             return []
 
+    def get_block_records(self, course_locator, include_content=False, **kwargs):
+        """
+        See ModuleStoreReadBase.get_block_records
+
+        The records are built from the structure of the course, and, if include_content is
+        set, from its definitions, fetched BLOCK_RECORDS_BATCH_SIZE at a time.
+        """
+        if not isinstance(course_locator, CourseKey) or course_locator.deprecated:
+            # The supplied courselike key is of the wrong type, so it can't possibly be stored in this modulestore.
+            return
+
+        course = self._lookup_course(course_locator)
+        course_key = course.course_key
+        blocks = course.structure['blocks']
+        structure_index = self._get_structure_index(course)
+
+        def make_usage_key(block_key):
+            """
+            Return the UsageKey of the block with the given BlockKey.
+            """
+            return course_key.make_usage_key(block_key.type, block_key.id)
+
+        block_keys = list(blocks)
+        for batch_start in xrange(0, len(block_keys), self.BLOCK_RECORDS_BATCH_SIZE):
+            batch = block_keys[batch_start:batch_start + self.BLOCK_RECORDS_BATCH_SIZE]
+            definitions = {}
+            if include_content:
+                definition_ids = [blocks[block_key].definition for block_key in batch]
+                definitions = {
+                    definition['_id']: definition
+                    for definition in self.get_definitions(
+                        course_key, [definition_id for definition_id in definition_ids if definition_id is not None]
+                    )
+                }
+
+            for block_key in batch:
+                block = blocks[block_key]
+                parents = structure_index.get_parents(block_key)
+                content = None
+                if include_content:
+                    definition = definitions.get(block.definition)
+                    content = dict(definition['fields']) if definition is not None else {}
+                yield BlockRecord(
+                    usage_key=make_usage_key(block_key),
+                    block_type=block_key.type,
+                    parent=make_usage_key(parents[0]) if parents else None,
+                    children=[make_usage_key(child) for child in block.fields.get('children', [])],
+                    settings={name: value for name, value in block.fields.iteritems() if name != 'children'},
+                    content=content,
+                )
+
     def build_block_key_to_parents_mapping(self, structure):
         """
         Given a structure, builds block_key to parents mapping for all block keys in structure
@@ -1266,6 +1401,20 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         return children_to_parents
 
+    def _get_structure_index(self, course):
+        """
+        Return the StructureIndex of the structure of the given CourseEnvelope.
+
+        The indexes of stored structures are memoized by version guid, but the
+        structures created by an active bulk operation may still be edited, so
+        they are indexed afresh.
+        """
+        structure = course.structure
+        bulk_write_record = self._get_bulk_ops_record(course.course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return StructureIndex(structure)
+        return self._structure_indexes.get(structure)
+
     def has_path_to_root(self, block_key, course, path_cache=None, parents_cache=None):
         """
         Check recursively if an xblock has a path to the course root
@@ -1279,6 +1428,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         :return Bool: whether or not component has path to the root
         """
+        if path_cache is None and parents_cache is None:
+            return block_key in self._get_structure_index(course).reachable
 
         if path_cache and block_key in path_cache:
             return path_cache[block_key]
@@ -1318,14 +1469,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             raise ItemNotFoundError(locator)
 
         course = self._lookup_course(locator.course_key)
-        all_parent_ids = self._get_parents_from_structure(BlockKey.from_usage_key(locator), course.structure)
+        structure_index = self._get_structure_index(course)
+        all_parent_ids = structure_index.get_parents(BlockKey.from_usage_key(locator))
 
         # Check and verify the found parent_ids are not orphans; Remove parent which has no valid path
         # to the course root
         parent_ids = [
             valid_parent
             for valid_parent in all_parent_ids
-            if self.has_path_to_root(valid_parent, course)
+            if valid_parent in structure_index.reachable
         ]
 
         if len(parent_ids) == 0:
@@ -1349,16 +1501,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         detached_categories = [name for name, __ in XBlock.load_tagged_classes("detached")]
         course = self._lookup_course(course_key)
-        items = set(course.structure['blocks'].keys())
-        items.remove(course.structure['root'])
-        blocks = course.structure['blocks']
-        for block_id, block_data in blocks.iteritems():
-            items.difference_update(BlockKey(*child) for child in block_data.fields.get('children', []))
-            if block_data.block_type in detached_categories:
-                items.discard(block_id)
+        parents = self._get_structure_index(course).parents
+        root = course.structure['root']
         return [
             course_key.make_usage_key(block_type=block_id.type, block_id=block_id.id)
-            for block_id in items
+            for block_id, block_data in course.structure['blocks'].iteritems()
+            if block_id != root and block_id not in parents and block_data.block_type not in detached_categories
         ]
 
     def get_course_index_info(self, course_key):
@@ -1408,6 +1556,32 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             'edited_on': course['edited_on']
         }
 
+    def compact_course_structures(self, course_key):
+        """
+        Rewrite every stored version of the structure of the given course in
+        the structure storage mode of this modulestore: as deltas against periodic snapshots
+        if delta_structures is set, otherwise whole.
+
+        Returns the number of rewritten structures.
+        """
+        if not isinstance(course_key, CourseLocator) or course_key.deprecated:
+            # The supplied CourseKey is of the wrong type, so it can't possibly be stored in this modulestore.
+            raise ItemNotFoundError(course_key)
+
+        index = self.get_course_index(course_key)
+        if index is None:
+            raise ItemNotFoundError(course_key)
+
+        original_versions = set()
+        for version_guid in index['versions'].itervalues():
+            structure = self.db_connection.get_structure(version_guid, course_key)
+            if structure is not None:
+                original_versions.add(structure['original_version'])
+        return sum(
+            self.db_connection.compact_structures(original_version, course_key)
+            for original_version in original_versions
+        )
+
     def get_definition_history_info(self, definition_locator, course_context=None):
         """
         Because xblocks doesn't give a means to separate the definition's meta information from
@@ -287,6 +287,13 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
         course_locator = self._map_revision_to_branch(course_locator, revision=revision)
         return super(DraftVersioningModuleStore, self).get_items(course_locator, **kwargs)
 
+    def get_block_records(self, course_locator, revision=None, **kwargs):
+        """
+        See ModuleStoreReadBase.get_block_records, for the branch of the given revision.
+        """
+        course_locator = self._map_revision_to_branch(course_locator, revision=revision)
+        return super(DraftVersioningModuleStore, self).get_block_records(course_locator, **kwargs)
+
     def get_parent_location(self, location, revision=None, **kwargs):
         '''
         Returns the given location's parent location in this course.
@@ -0,0 +1,136 @@
+"""
+Secondary indexes of split modulestore course structures.
+
+Structures that have been stored are immutable, so their indexes can be
+memoized by version guid and shared for as long as the version is in use.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+
+
+class StructureIndex(object):
+    """
+    Lazily built secondary indexes of a course structure, which turn the
+    scans of its blocks done by `get_items`, `get_parent_location` and
+    orphan filtering into lookups.
+    """
+    # The block types which are the roots of a structure's tree
+    ROOT_BLOCK_TYPES = ('course', 'library')
+
+    def __init__(self, structure):
+        self.structure = structure
+        self._block_keys_by_type = None
+        self._parents = None
+        self._reachable = None
+
+    @property
+    def block_keys_by_type(self):
+        """
+        A dict mapping each block type to the list of the BlockKeys of
+        that type.
+        """
+        if self._block_keys_by_type is None:
+            block_keys_by_type = defaultdict(list)
+            for block_key in self.structure['blocks']:
+                block_keys_by_type[block_key.type].append(block_key)
+            self._block_keys_by_type = dict(block_keys_by_type)
+        return self._block_keys_by_type
+
+    @property
+    def parents(self):
+        """
+        A dict mapping each child BlockKey to the tuple of the BlockKeys
+        of its parents, in the order of the structure's blocks.
+        """
+        if self._parents is None:
+            parents = defaultdict(list)
+            for parent_key, block_data in self.structure['blocks'].iteritems():
+                for child_key in block_data.fields.get('children', []):
+                    parents[child_key].append(parent_key)
+            self._parents = {child_key: tuple(parent_keys) for child_key, parent_keys in parents.iteritems()}
+        return self._parents
+
+    @property
+    def reachable(self):
+        """
+        The frozenset of the BlockKeys which have a path to the root of
+        the structure, i.e. which aren't orphans.
+        """
+        if self._reachable is None:
+            blocks = self.structure['blocks']
+            stack = [
+                block_key for block_key in blocks
+                if block_key.type in self.ROOT_BLOCK_TYPES and block_key not in self.parents
+            ]
+            reachable = set(stack)
+            while stack:
+                block_data = blocks.get(stack.pop())
+                if block_data is None:
+                    continue
+                for child_key in block_data.fields.get('children', []):
+                    if child_key not in reachable:
+                        reachable.add(child_key)
+                        stack.append(child_key)
+            self._reachable = frozenset(reachable)
+        return self._reachable
+
+    def get_block_keys_of_type(self, block_type):
+        """
+        Return the list of the BlockKeys of the given type.
+        """
+        return self.block_keys_by_type.get(block_type, [])
+
+    def get_parents(self, block_key):
+        """
+        Return the tuple of the BlockKeys of the parents of the given block.
+        """
+        return self.parents.get(block_key, ())
+
+
+class StructureIndexCache(object):
+    """
+    A thread-safe LRU cache of the StructureIndexes of stored structures,
+    keyed by their version guid and bounded by their total number of blocks.
+    """
+    def __init__(self, max_blocks):
+        self.max_blocks = max_blocks
+        self.blocks = 0
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, structure):
+        """
+        Return the StructureIndex of the given stored structure, creating it
+        if it isn't cached.
+        """
+        version_guid = structure['_id']
+        with self._lock:
+            index = self._indexes.pop(version_guid, None)
+            if index is not None:
+                # Move the index to the most recently used end
+                self._indexes[version_guid] = index
+                return index
+
+        index = StructureIndex(structure)
+        number_of_blocks = len(structure['blocks'])
+        if number_of_blocks > self.max_blocks:
+            return index
+
+        with self._lock:
+            previous_index = self._indexes.pop(version_guid, None)
+            if previous_index is not None:
+                self.blocks -= len(previous_index.structure['blocks'])
+            self._indexes[version_guid] = index
+            self.blocks += number_of_blocks
+            while self.blocks > self.max_blocks:
+                __, evicted_index = self._indexes.popitem(last=False)
+                self.blocks -= len(evicted_index.structure['blocks'])
+        return index
+
+    def clear(self):
+        """
+        Remove every index from the cache.
+        """
+        with self._lock:
+            self._indexes.clear()
+            self.blocks = 0
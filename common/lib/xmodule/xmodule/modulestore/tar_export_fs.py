@@ -0,0 +1,125 @@
+"""
+A write-only filesystem which streams the files written to it into a tar archive,
+so that courses can be exported to a tarball without being written to disk first.
+"""
+import io
+import posixpath
+import tarfile
+import time
+from StringIO import StringIO
+
+
+class TarExportFS(object):
+    """
+    Implements the subset of the pyfs API used by course export (`makedir`, `makeopendir`,
+    `open` and `setcontents`) by adding each file to a tar archive as soon as it's written.
+
+    Files opened with `open` are held in memory until they're closed. Files written with
+    `setcontents` from a file-like object with a known `length` (e.g. a GridFS file) are
+    copied into the archive in chunks, without being held in memory.
+    """
+    def __init__(self, tar_file, root=u'', directories=None):
+        """
+        `tar_file`: the TarFile open for writing to add the files to
+        `root`: the directory of the archive that this filesystem is rooted at
+        `directories`: the set of directories already added to the archive, which is shared
+            by the filesystems opened on its sub directories
+        """
+        self.tar_file = tar_file
+        self.root = root
+        self._directories = directories if directories is not None else set()
+
+    def _archive_path(self, path):
+        """
+        Return the path of the given path of this filesystem in the archive.
+        """
+        archive_path = posixpath.normpath(posixpath.join(self.root, path)).lstrip('/')
+        return u'' if archive_path == '.' else archive_path
+
+    def _add_directory(self, archive_path):
+        """
+        Add the directory with the given path, and its parents, to the archive.
+        """
+        if not archive_path or archive_path in self._directories:
+            return
+        self._add_directory(posixpath.dirname(archive_path))
+        tar_info = tarfile.TarInfo(archive_path.encode('utf-8'))
+        tar_info.type = tarfile.DIRTYPE
+        tar_info.mode = 0755
+        tar_info.mtime = time.time()
+        self.tar_file.addfile(tar_info)
+        self._directories.add(archive_path)
+
+    def _add_file(self, archive_path, fileobj, size):
+        """
+        Add a file with the given path to the archive, copying size bytes from fileobj.
+        """
+        self._add_directory(posixpath.dirname(archive_path))
+        tar_info = tarfile.TarInfo(archive_path.encode('utf-8'))
+        tar_info.size = size
+        tar_info.mode = 0644
+        tar_info.mtime = time.time()
+        self.tar_file.addfile(tar_info, fileobj)
+
+    def makedir(self, path, recursive=False, allow_recreate=False):  # pylint: disable=unused-argument
+        """
+        Add a directory to the archive (along with its parents).
+        """
+        self._add_directory(self._archive_path(path))
+
+    def makeopendir(self, path, recursive=False):
+        """
+        Add a directory to the archive and return the filesystem rooted at it.
+        """
+        self.makedir(path, recursive=recursive, allow_recreate=True)
+        return TarExportFS(self.tar_file, self._archive_path(path), self._directories)
+
+    def open(self, path, mode='r', **kwargs):  # pylint: disable=unused-argument
+        """
+        Open a file for writing, which is added to the archive when it's closed.
+        """
+        if 'w' not in mode and 'a' not in mode:
+            raise ValueError(u"Can't open {} with mode {}: TarExportFS is write-only".format(path, mode))
+        return TarMemberFile(self, self._archive_path(path))
+
+    def setcontents(self, path, data, chunk_size=64 * 1024):
+        """
+        Add a file with the given contents (a string or a file-like object) to the archive.
+        """
+        length = getattr(data, 'length', None)
+        if hasattr(data, 'read') and length is not None:
+            self._add_file(self._archive_path(path), data, length)
+            return
+
+        with self.open(path, 'wb') as member_file:
+            if hasattr(data, 'read'):
+                chunk = data.read(chunk_size)
+                while chunk:
+                    member_file.write(chunk)
+                    chunk = data.read(chunk_size)
+            else:
+                member_file.write(data)
+
+
+class TarMemberFile(StringIO):
+    """
+    A file of a TarExportFS, which is added to its archive when it's closed.
+    """
+    def __init__(self, tar_fs, archive_path):
+        StringIO.__init__(self)
+        self.tar_fs = tar_fs
+        self.archive_path = archive_path
+
+    def close(self):
+        if not self.closed:
+            data = self.getvalue()
+            if isinstance(data, unicode):
+                data = data.encode('utf-8')
+            self.tar_fs._add_file(self.archive_path, io.BytesIO(data), len(data))  # pylint: disable=protected-access
+        StringIO.close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
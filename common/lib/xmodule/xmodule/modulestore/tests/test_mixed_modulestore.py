@@ -47,7 +47,11 @@ from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.draft_and_published import UnsupportedRevisionError, DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError, NoPathToItem
 from xmodule.modulestore.mixed import MixedModuleStore
+from xmodule.modulestore.mongo.inheritance_tree import container_key
 from xmodule.modulestore.search import path_to_location, navigation_index
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    DEFAULT_STRUCTURE_MEMORY_CACHE_SIZE, StructureMemoryCache
+)
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
 from xmodule.modulestore.tests.factories import check_mongo_calls, check_exact_number_of_calls, \
     mongo_uses_error_check
@@ -337,7 +341,39 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         course_key = self.course_locations[self.MONGO_COURSEID].course_key
         with check_exact_number_of_calls(self.store.default_modulestore, 'has_course', 1):
             self.assertEqual(self.store.default_modulestore, self.store._get_modulestore_for_courselike(course_key))  # pylint: disable=protected-access
-            self.assertIn(course_key, self.store.mappings)
+            self.assertIn(course_key, self.store.routing_cache)
+            self.assertEqual(self.store.default_modulestore, self.store._get_modulestore_for_courselike(course_key))  # pylint: disable=protected-access
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_get_modulestore_cache_missing_course(self, default_ms):
+        """
+        Make sure we cache courses which no store has until they're created
+        """
+        self.initdb(default_ms)
+        with self.store.default_store(default_ms):
+            course_key = self.store.make_course_key('org_x', 'course_y', 'run_z')
+            with check_exact_number_of_calls(self.store.default_modulestore, 'has_course', 1):
+                self.assertEqual(self.store.default_modulestore, self.store._get_modulestore_for_courselike(course_key))  # pylint: disable=protected-access
+                self.assertEqual(self.store.default_modulestore, self.store._get_modulestore_for_courselike(course_key))  # pylint: disable=protected-access
+            self.assertIsNone(self.store.routing_cache.get(course_key))
+
+            self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
+            self.assertNotIn(course_key, self.store.routing_cache)
+            self.assertTrue(self.store.has_course(course_key))
+
+            self.store.delete_course(course_key, self.user_id)
+            self.assertNotIn(course_key, self.store.routing_cache)
+
+    def test_fill_routing_cache(self):
+        """
+        Make sure the routing cache is filled from the split course index
+        """
+        self.initdb(ModuleStoreEnum.Type.split)
+        self.store.mappings = {}
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        self.store.fill_routing_cache()
+        self.assertEqual(self.store.routing_cache.get(course_key), self.store.default_modulestore)
+        with check_exact_number_of_calls(self.store.default_modulestore, 'has_course', 0):
             self.assertEqual(self.store.default_modulestore, self.store._get_modulestore_for_courselike(course_key))  # pylint: disable=protected-access
 
     @ddt.data(*itertools.product(
@@ -436,6 +472,35 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                 revision=ModuleStoreEnum.RevisionOption.draft_preferred
             )
 
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_get_block_records(self, default_ms):
+        self.initdb(default_ms)
+        self._create_block_hierarchy()
+
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        records = {
+            record.usage_key.block_id: record
+            for record in self.store.get_block_records(course_key, include_content=True)
+        }
+        self.assertEqual(len(records), len(self.store.get_items(course_key)))
+
+        problem = records[self.problem_x1a_1.block_id]
+        self.assertEqual(problem.block_type, 'problem')
+        self.assertEqual(problem.parent.block_id, self.vertical_x1a.block_id)
+        self.assertEqual(problem.settings['display_name'], 'Problem_x1a_1')
+        self.assertIsInstance(problem.content, dict)
+
+        vertical = records[self.vertical_x1a.block_id]
+        self.assertEqual(
+            [child.block_id for child in vertical.children],
+            [self.problem_x1a_1.block_id, self.problem_x1a_2.block_id, self.problem_x1a_3.block_id,
+             self.html_x1a_1.block_id]
+        )
+        self.assertIsNone(records[self.course.location.block_id].parent)
+
+        record = next(self.store.get_block_records(course_key))
+        self.assertIsNone(record.content)
+
     @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
     def test_course_version_on_block(self, default_ms):
         self.initdb(default_ms)
@@ -521,11 +586,11 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         self.assertEqual(orphan in [item.location for item in items_in_tree], orphan_in_items)
         self.assertEqual(len(items_in_tree), expected_items_in_tree)
 
-    # draft: get draft, get ancestors up to course (2-6), compute inheritance
+    # draft: get draft, get ancestors up to course (2-6); saving a leaf doesn't touch the inheritance tree
     #    sends: update problem and then each ancestor up to course (edit info)
     # split: active_versions, definitions (calculator field), structures
     #  2 sends to update index & structure (note, it would also be definition if a content field changed)
-    @ddt.data((ModuleStoreEnum.Type.mongo, 7, 5), (ModuleStoreEnum.Type.split, 3, 2))
+    @ddt.data((ModuleStoreEnum.Type.mongo, 6, 5), (ModuleStoreEnum.Type.split, 3, 2))
     @ddt.unpack
     def test_update_item(self, default_ms, max_find, max_send):
         """
@@ -913,13 +978,14 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
     # Draft
     #   Find: find parents (definition.children query), get parent, get course (fill in run?),
-    #         find parents of the parent (course), get inheritance items,
-    #         get item (to delete subtree), get inheritance again.
-    #   Sends: delete item, update parent
+    #         find parents of the parent (course), get inheritance source,
+    #         get item (to delete subtree), get inheritance items.
+    #   Sends: delete item, update parent, update the parent in the inheritance source,
+    #          remove the item from the inheritance source, save the refreshed inheritance source
     # Split
     #   Find: active_versions, 2 structures (published & draft), definition (unnecessary)
     #   Sends: updated draft and published structures and active_versions
-    @ddt.data((ModuleStoreEnum.Type.mongo, 7, 2), (ModuleStoreEnum.Type.split, 3, 3))
+    @ddt.data((ModuleStoreEnum.Type.mongo, 7, 5), (ModuleStoreEnum.Type.split, 3, 3))
     @ddt.unpack
     def test_delete_item(self, default_ms, max_find, max_send):
         """
@@ -942,12 +1008,13 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
     # Draft:
     #    queries: find parent (definition.children), count versions of item, get parent, count grandparents,
-    #             inheritance items, draft item, draft child, inheritance
-    #    sends: delete draft vertical and update parent
+    #             inheritance source, draft item, draft child, inheritance items
+    #    sends: delete draft vertical and update parent, update the parent in the inheritance source,
+    #           remove the vertical from the inheritance source, save the refreshed inheritance source
     # Split:
     #    queries: active_versions, draft and published structures, definition (unnecessary)
     #    sends: update published (why?), draft, and active_versions
-    @ddt.data((ModuleStoreEnum.Type.mongo, 9, 2), (ModuleStoreEnum.Type.split, 4, 3))
+    @ddt.data((ModuleStoreEnum.Type.mongo, 9, 5), (ModuleStoreEnum.Type.split, 4, 3))
     @ddt.unpack
     def test_delete_private_vertical(self, default_ms, max_find, max_send):
         """
@@ -996,11 +1063,11 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
     # Draft:
     #   find: find parent (definition.children) 2x, find draft item, get inheritance items
-    #   send: one delete query for specific item
+    #   send: one delete query for specific item, save the refreshed inheritance source
     # Split:
     #   find: active_version & structure (cached)
     #   send: update structure and active_versions
-    @ddt.data((ModuleStoreEnum.Type.mongo, 4, 1), (ModuleStoreEnum.Type.split, 2, 2))
+    @ddt.data((ModuleStoreEnum.Type.mongo, 4, 2), (ModuleStoreEnum.Type.split, 2, 2))
     @ddt.unpack
     def test_delete_draft_vertical(self, default_ms, max_find, max_send):
         """
@@ -1862,21 +1929,38 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         self.assertEqual(set(found_orphans), set(orphan_locations))
         self.assertEqual(len(set(found_orphans)), 2)
 
-        # add orphan vertical and sequential as another parents of problem "problem_x1a_1"
-        mongo_store.collection.update(
-            orphan_sequential.to_deprecated_son('_id.'),
-            {'$push': {'definition.children': unicode(self.problem_x1a_1)}}
-        )
-        mongo_store.collection.update(
-            orphan_vertical.to_deprecated_son('_id.'),
-            {'$push': {'definition.children': unicode(self.problem_x1a_1)}}
-        )
+        # add orphan vertical and sequential as another parents of problem "problem_x1a_1", in the
+        # persisted inheritance source too, as saving them through the store would
+        for location in orphan_locations:
+            mongo_store.collection.update(
+                location.to_deprecated_son('_id.'),
+                {'$push': {'definition.children': unicode(self.problem_x1a_1)}}
+            )
+            key = container_key(unicode(location), None)
+            mongo_store.inheritance_collection.update(
+                {'_id': unicode(course_id)},
+                {'$push': {'containers.{}.children'.format(key): unicode(self.problem_x1a_1)}}
+            )
         # test that "get_parent_location" method of published branch still returns the correct non-orphan parent for
         # problem "problem_x1a_1" since the two other parents are orphans
         with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_id):
             parent = mongo_store.get_parent_location(self.problem_x1a_1)
             self.assertEqual(parent, self.vertical_x1a)
 
+        # the children removed from the orphan parents are removed from the persisted inheritance source too
+        # pylint: disable=protected-access
+        source = mongo_store._get_metadata_inheritance_source(course_id)
+        queried_source = mongo_store._query_metadata_inheritance_source(course_id)
+        for location in orphan_locations:
+            key = container_key(unicode(location), None)
+            self.assertEqual(source.containers[key]['children'], [])
+            self.assertEqual(source.containers[key]['children'], queried_source.containers[key]['children'])
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_id):
+            self.assertEqual(
+                source.compute_tree(mongo_store.get_branch_setting(), published_only=True),
+                mongo_store._compute_metadata_inheritance_tree(course_id),
+            )
+
         # now add valid published vertical as another parent of problem
         mongo_store.collection.update(
             self.sequential_x1.to_deprecated_son('_id.'),
@@ -1954,11 +2038,13 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
     #      1. delete all of the published nodes in subtree
     #      2. insert vertical as published (deleted in step 1) w/ the deleted problems as children
     #      3-6. insert the 3 problems and 1 html as published
+    #      7. remove the published vertical from the inheritance source
+    #      8. add the draft vertical to the inheritance source
     # Split: active_versions, 2 structures (pre & post published?)
     # Sends:
     #    - insert structure
     #    - write index entry
-    @ddt.data((ModuleStoreEnum.Type.mongo, 2, 6), (ModuleStoreEnum.Type.split, 3, 2))
+    @ddt.data((ModuleStoreEnum.Type.mongo, 2, 8), (ModuleStoreEnum.Type.split, 3, 2))
     @ddt.unpack
     def test_unpublish(self, default_ms, max_find, max_send):
         """
@@ -1994,6 +2080,65 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         )
         self.assertIsNotNone(draft_xblock)
 
+    def test_unpublish_keeps_inheritance_source(self):
+        """
+        Test that the inheritance tree computed from the persisted inheritance source of an old mongo
+        course still contains an unpublished unit and the metadata it passes down to its children
+        """
+        self.initdb(ModuleStoreEnum.Type.mongo)
+        self._create_block_hierarchy()
+        vertical = self.store.get_item(self.vertical_x1a)
+        vertical.visible_to_staff_only = True
+        self.store.update_item(vertical, self.user_id)
+        self.store.publish(self.course.location, self.user_id)
+
+        self.store.unpublish(self.vertical_x1a, self.user_id)
+
+        # pylint: disable=protected-access
+        mongo_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, self.course.id):
+            source = mongo_store._get_metadata_inheritance_source(self.course.id)
+            tree = source.compute_tree(mongo_store.get_branch_setting())
+            self.assertEqual(tree, mongo_store._compute_metadata_inheritance_tree(self.course.id))
+        self.assertEqual(tree[unicode(self.vertical_x1a)]['parent'], {
+            ModuleStoreEnum.Branch.draft_preferred: unicode(self.sequential_x1),
+        })
+        self.assertTrue(tree[unicode(self.problem_x1a_1)]['visible_to_staff_only'])
+
+    def test_concurrent_saves_keep_inheritance_tree(self):
+        """
+        Test that saving a container of an old mongo course keeps the changes which another process saved
+        to the persisted inheritance source of the course after the inheritance tree was cached
+        """
+        self.initdb(ModuleStoreEnum.Type.mongo)
+        self._create_block_hierarchy()
+
+        # pylint: disable=protected-access
+        mongo_store = self.store._get_modulestore_by_type(ModuleStoreEnum.Type.mongo)
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, self.course.id):
+            mongo_store._get_cached_metadata_inheritance_tree(self.course.id)
+
+            # another process saves a vertical of the other chapter, which only updates the persisted
+            # source and its own cached tree
+            source = mongo_store._get_metadata_inheritance_source(self.course.id)
+            key, entry = next(
+                (key, entry) for key, entry in source.containers.iteritems()
+                if entry['url'] == unicode(self.vertical_y1a)
+            )
+            entry['metadata']['visible_to_staff_only'] = True
+            mongo_store.inheritance_collection.update(
+                {'_id': unicode(self.course.id)}, {'$set': {'containers.{}'.format(key): entry}}
+            )
+
+            sequential = self.store.get_item(self.sequential_x1)
+            sequential.graded = True
+            self.store.update_item(sequential, self.user_id)
+
+            tree = mongo_store._get_cached_metadata_inheritance_tree(self.course.id)
+            self.assertEqual(tree, mongo_store._compute_metadata_inheritance_tree(self.course.id))
+        self.assertTrue(tree[unicode(self.problem_y1a_1)]['visible_to_staff_only'])
+        self.assertTrue(tree[unicode(self.problem_x1a_1)]['graded'])
+
     # Draft: specific query for revision None
     # Split: active_versions, structure
     @ddt.data((ModuleStoreEnum.Type.mongo, 1, 0), (ModuleStoreEnum.Type.split, 2, 0))
@@ -3781,3 +3926,55 @@ class TestAsidesWithMixedModuleStore(CommonMixedModuleStoreSetup):
         item = self.store.get_item(item_location)
         self.assertFalse(self.store.has_published_version(item))
         _check_asides(item)
+
+
+@attr('mongo')
+class TestMixedModuleStoreWithStructureMemoryCache(CommonMixedModuleStoreSetup):
+    """
+    Tests that split courses read through the MixedModuleStore stay correct
+    while their structures are kept in memory, as they are outside of tests.
+    """
+    def setUp(self):
+        """
+        Keep course structures in memory for the length of the test
+        """
+        super(TestMixedModuleStoreWithStructureMemoryCache, self).setUp()
+        patcher = patch(
+            'xmodule.modulestore.split_mongo.mongo_connection.get_memory_cache',
+            return_value=StructureMemoryCache(DEFAULT_STRUCTURE_MEMORY_CACHE_SIZE),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.initdb(ModuleStoreEnum.Type.split)
+
+    def test_edit_publish_and_revert(self):
+        test_course = self.store.create_course('testx', 'GreekHero', 'test_run', self.user_id)
+        vertical = self.store.create_item(self.user_id, test_course.id, 'vertical', block_id='test_vertical')
+        self.store.publish(vertical.location, self.user_id)
+
+        vertical = self.store.get_item(vertical.location)
+        vertical.display_name = 'Changed Display Name'
+        self.store.update_item(vertical, self.user_id)
+
+        # the draft and published versions are read from separate structures
+        self.assertEqual(self.store.get_item(vertical.location).display_name, 'Changed Display Name')
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, test_course.id):
+            self.assertNotEqual(self.store.get_item(vertical.location).display_name, 'Changed Display Name')
+        self.assertTrue(self.store.has_changes(self.store.get_item(vertical.location)))
+
+        self.store.revert_to_published(vertical.location, self.user_id)
+        vertical = self.store.get_item(vertical.location)
+        self.assertNotEqual(vertical.display_name, 'Changed Display Name')
+        self.assertFalse(self.store.has_changes(vertical))
+
+    def test_subtree_edited_on(self):
+        test_course = self.store.create_course('testx', 'GreekHero', 'test_run', self.user_id)
+        course = self.store.get_course(test_course.id)
+        original_subtree_edited_on = course.subtree_edited_on
+
+        # computing subtree_edited_on when the course was read must not keep
+        # the stale value for the next read of the course
+        chapter = self.store.create_child(self.user_id, course.location, 'chapter', 'test_chapter')
+        course = self.store.get_course(test_course.id)
+        self.assertGreater(course.subtree_edited_on, original_subtree_edited_on)
+        self.assertGreaterEqual(course.subtree_edited_on, self.store.get_item(chapter.location).edited_on)
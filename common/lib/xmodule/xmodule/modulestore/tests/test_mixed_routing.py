@@ -0,0 +1,45 @@
+""" Test the behavior of mixed_routing """
+import unittest
+
+from mock import patch
+
+from xmodule.modulestore.mixed_routing import CourseRoutingCache, NOT_CACHED
+
+
+class TestCourseRoutingCache(unittest.TestCase):
+    """ Test the cache of the stores of courses """
+    def test_get(self):
+        cache = CourseRoutingCache(10)
+        self.assertIs(cache.get('course'), NOT_CACHED)
+        cache.set('course', 'store')
+        cache.set('missing', None)
+        self.assertEqual(cache.get('course'), 'store')
+        self.assertIsNone(cache.get('missing'))
+        self.assertIn('missing', cache)
+
+        cache.invalidate('course')
+        self.assertNotIn('course', cache)
+
+    def test_least_recently_used_eviction(self):
+        cache = CourseRoutingCache(2)
+        cache.set('course', 'store')
+        cache.set('other_course', 'store')
+        cache.get('course')
+        cache.set('new_course', 'store')
+        self.assertEqual(len(cache), 2)
+        self.assertIn('course', cache)
+        self.assertNotIn('other_course', cache)
+
+    def test_disabled(self):
+        cache = CourseRoutingCache(0)
+        cache.set('course', 'store')
+        self.assertNotIn('course', cache)
+
+    def test_missing_courses_expire(self):
+        cache = CourseRoutingCache(10, negative_ttl=60)
+        with patch('xmodule.modulestore.mixed_routing.time.time', return_value=1000):
+            cache.set('course', 'store')
+            cache.set('missing', None)
+        with patch('xmodule.modulestore.mixed_routing.time.time', return_value=1061):
+            self.assertEqual(cache.get('course'), 'store')
+            self.assertIs(cache.get('missing'), NOT_CACHED)
@@ -7,7 +7,10 @@ from tempfile import mkdtemp
 from shutil import rmtree
 from unittest import TestCase, skip
 import ddt
+from mock import patch
 
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.split_mongo import DefinitionPrefetchPolicy
 from xmodule.modulestore.xml_importer import import_course_from_xml
 from xmodule.modulestore.xml_exporter import export_course_to_xml
 from xmodule.modulestore.tests.factories import check_mongo_calls
@@ -172,6 +175,25 @@ class CountMongoCallsCourseTraversal(TestCase):
                     start_block = modulestore.get_course(course_key, depth=depth, lazy=lazy)
                     self._traverse_blocks_in_course(start_block, access_all_block_fields)
 
+    @ddt.data(
+        # Old Mongo ignores the prefetch policy.
+        (MIXED_OLD_MONGO_MODULESTORE_BUILDER, 175),
+        # As many calls as with lazy=False: all the definitions are loaded with one query.
+        (MIXED_SPLIT_MODULESTORE_BUILDER, 4),
+    )
+    @ddt.unpack
+    def test_prefetch_definitions(self, store_builder, num_mongo_calls):
+        request_cache = MemoryCache()
+        with store_builder.build(request_cache=request_cache) as (content_store, modulestore):
+            course_key = self._import_course(content_store, modulestore)
+
+            with check_mongo_calls(num_mongo_calls):
+                with modulestore.bulk_operations(course_key):
+                    start_block = modulestore.get_course(
+                        course_key, depth=None, prefetch_definitions=DefinitionPrefetchPolicy()
+                    )
+                    self._traverse_blocks_in_course(start_block, access_all_block_fields=True)
+
     @ddt.data(
         (MIXED_OLD_MONGO_MODULESTORE_BUILDER, 176),
         (MIXED_SPLIT_MODULESTORE_BUILDER, 5),
@@ -190,3 +212,43 @@ class CountMongoCallsCourseTraversal(TestCase):
                     # and then subsequently retrieved with the lazy and depth=None values
                     course = modulestore.get_item(course.location, depth=None, lazy=False)
                     self._traverse_blocks_in_course(course, access_all_block_fields=True)
+
+
+class CountDefinitionLoadsOnExport(TestCase):
+    """
+    Tests that exporting a Split course loads the definitions of its blocks in batches.
+    """
+
+    def setUp(self):
+        super(CountDefinitionLoadsOnExport, self).setUp()
+        self.export_dir = mkdtemp()
+        self.addCleanup(rmtree, self.export_dir, ignore_errors=True)
+
+    def test_export_prefetches_definitions(self):
+        with MIXED_SPLIT_MODULESTORE_BUILDER.build() as (content_store, modulestore):
+            course_key = modulestore.make_course_key('a', 'course', 'course')
+            import_course_from_xml(
+                modulestore,
+                'test_user',
+                TEST_DATA_DIR,
+                source_dirs=['manual-testing-complete'],
+                static_content_store=content_store,
+                target_id=course_key,
+                create_if_not_present=True,
+                raise_on_failure=True,
+            )
+
+            db_connection = modulestore._get_modulestore_by_type(  # pylint: disable=protected-access
+                ModuleStoreEnum.Type.split
+            ).db_connection
+            with patch.object(
+                db_connection, 'get_definition', wraps=db_connection.get_definition
+            ) as mock_get_definition:
+                with patch.object(
+                    db_connection, 'get_definitions', wraps=db_connection.get_definitions
+                ) as mock_get_definitions:
+                    export_course_to_xml(modulestore, content_store, course_key, self.export_dir, 'exported_course')
+
+            # The course has fewer blocks than a batch, so all the definitions are loaded with one query.
+            self.assertEqual(mock_get_definitions.call_count, 1)
+            self.assertFalse(mock_get_definition.called)
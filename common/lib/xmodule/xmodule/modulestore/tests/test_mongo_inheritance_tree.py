@@ -0,0 +1,44 @@
+""" Test the behavior of mongo/inheritance_tree """
+import unittest
+
+from xmodule.modulestore.mongo.inheritance_tree import InheritanceSource, INHERITANCE_SOURCE_VERSION
+
+COURSE = 'i4x://org/course/course/run'
+CHAPTER = 'i4x://org/course/chapter/chapter'
+SEQUENTIAL = 'i4x://org/course/sequential/sequential'
+OTHER_SEQUENTIAL = 'i4x://org/course/sequential/other'
+PROBLEM = 'i4x://org/course/problem/problem'
+BRANCH = 'draft-preferred'
+
+
+class TestInheritanceSource(unittest.TestCase):
+    """ Test the computation of metadata inheritance trees from their source """
+    def setUp(self):
+        super(TestInheritanceSource, self).setUp()
+        self.source = InheritanceSource('org/course/run')
+        self.source.set_container(COURSE, None, 'course', {'graded': False, 'due': 'course'}, [CHAPTER])
+        self.source.set_container(CHAPTER, None, 'chapter', {'due': 'chapter'}, [SEQUENTIAL, OTHER_SEQUENTIAL])
+        self.source.set_container(SEQUENTIAL, None, 'sequential', {'graded': True}, [PROBLEM])
+        self.source.set_container(OTHER_SEQUENTIAL, None, 'sequential', {}, [])
+
+    def test_compute_tree(self):
+        tree = self.source.compute_tree(BRANCH)
+        self.assertEqual(tree[CHAPTER], {'graded': False, 'due': 'chapter', 'parent': {BRANCH: COURSE}})
+        self.assertEqual(tree[SEQUENTIAL], {'graded': True, 'due': 'chapter', 'parent': {BRANCH: CHAPTER}})
+        self.assertEqual(tree[PROBLEM], {'graded': True, 'due': 'chapter', 'parent': {BRANCH: SEQUENTIAL}})
+        self.assertNotIn(COURSE, tree)
+
+    def test_revisions(self):
+        self.source.set_container(SEQUENTIAL, 'draft', 'sequential', {'graded': False}, [])
+        self.assertFalse(self.source.compute_tree(BRANCH)[SEQUENTIAL]['graded'])
+        self.assertIn(PROBLEM, self.source.compute_tree(BRANCH))
+        self.assertTrue(self.source.compute_tree(BRANCH, published_only=True)[SEQUENTIAL]['graded'])
+
+    def test_mongo_round_trip(self):
+        document = self.source.to_mongo()
+        source = InheritanceSource.from_mongo('org/course/run', document)
+        self.assertEqual(source.compute_tree(BRANCH), self.source.compute_tree(BRANCH))
+
+        document['version'] = INHERITANCE_SOURCE_VERSION - 1
+        self.assertIsNone(InheritanceSource.from_mongo('org/course/run', document))
+        self.assertIsNone(InheritanceSource.from_mongo('org/course/run', None))
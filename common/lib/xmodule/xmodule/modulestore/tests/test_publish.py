@@ -109,22 +109,24 @@ class TestPublish(SplitWMongoCourseBootstrapper):
         # Finds:
         #   1 get draft vert,
         #   2 compute parent
-        #   3-14 for each child: (3 children x 4 queries each)
+        #   3-11 for each child: (3 children x 3 queries each)
         #      get draft, compute parent, and then published child
-        #      compute inheritance
-        #   15 get published vert
-        #   16-18 get ancestor chain
-        #   19 compute inheritance
-        #   20-22 get draft and published vert, compute parent
+        #      (saving the children, which are leaves, doesn't touch the inheritance tree)
+        #   12 get published vert
+        #   13-15 get ancestor chain
+        #   16 get inheritance source
+        #   17-19 get draft and published vert, compute parent
         # Sends:
         #   delete the subtree of drafts (1 call),
         #   update the published version of each node in subtree (4 calls),
         #   update the ancestors up to course (2 calls)
+        #   update the published vert in the inheritance source (1 call)
+        #   remove the draft vert from the inheritance source (1 call)
         if mongo_uses_error_check(self.draft_mongo):
-            max_find = 23
+            max_find = 20
         else:
-            max_find = 22
-        with check_mongo_calls(max_find, 7):
+            max_find = 19
+        with check_mongo_calls(max_find, 9):
             self.draft_mongo.publish(item.location, self.user_id)
 
         # verify status
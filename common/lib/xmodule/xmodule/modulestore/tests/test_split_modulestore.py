@@ -31,7 +31,10 @@ from xmodule.x_module import XModuleMixin
 from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
-from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo import BlockKey, DefinitionPrefetchPolicy
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    DEFAULT_STRUCTURE_MEMORY_CACHE_SIZE, StructureMemoryCache
+)
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -548,6 +551,15 @@ class SplitModuleTest(unittest.TestCase):
         super(SplitModuleTest, self).setUp()
         self.user_id = random.getrandbits(32)
 
+        # keep course structures in memory, as they are outside of tests, but
+        # only for the length of the test
+        patcher = patch(
+            'xmodule.modulestore.split_mongo.mongo_connection.get_memory_cache',
+            return_value=StructureMemoryCache(DEFAULT_STRUCTURE_MEMORY_CACHE_SIZE),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def tearDown(self):
         """
         Clear persistence between each test.
@@ -987,18 +999,73 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
-    def test_dummy_cache(self):
+    @patch(
+        'xmodule.modulestore.split_mongo.mongo_connection.get_memory_cache',
+        return_value=StructureMemoryCache(0),
+    )
+    def test_dummy_cache(self, _mock_get_memory_cache):
         with check_mongo_calls(1):
             not_cached_structure = self._get_structure(self.new_course)
 
-        # Since the test is using the dummy cache, it's not actually caching
-        # anything
+        # Since the test is using the dummy cache, and no memory cache, it's
+        # not actually caching anything
         with check_mongo_calls(1):
             cached_structure = self._get_structure(self.new_course)
 
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_memory_cache')
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_memory_cache(self, mock_get_cache, mock_get_memory_cache):
+        mock_get_cache.return_value = self.cache
+        mock_get_memory_cache.return_value = StructureMemoryCache(DEFAULT_STRUCTURE_MEMORY_CACHE_SIZE)
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # the structure is kept in memory, so it doesn't have to be
+        # pulled from the django cache again
+        self.cache.clear()
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+
+        # each read gets its own copy of the structure
+        self.assertEqual(cached_structure, not_cached_structure)
+        self.assertIsNot(cached_structure, not_cached_structure)
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_memory_cache_copies(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+        structure = self._get_structure(self.new_course)
+        block_count = len(structure['blocks'])
+
+        # changing the structure that was read doesn't change the cached one
+        for block_data in structure['blocks'].values():
+            block_data.edit_info._subtree_edited_on = datetime.datetime.now()  # pylint: disable=protected-access
+        structure['blocks'].clear()
+        self.cache.clear()
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+
+        self.assertEqual(len(cached_structure['blocks']), block_count)
+        for block_data in cached_structure['blocks'].values():
+            self.assertIsNone(block_data.edit_info._subtree_edited_on)  # pylint: disable=protected-access
+
+    def test_subtree_edited_on_with_memory_cache(self):
+        # reading the course computes (and stores) subtree_edited_on in the
+        # blocks of the structure it loaded, which must not leak into the
+        # structure kept in memory and so into later edits
+        store = modulestore()
+        course = store.get_course(self.new_course.id)
+        original_subtree_edited_on = course.subtree_edited_on
+        chapter = store.create_child(self.user, course.location, 'chapter', 'chapter1')
+
+        course = store.get_course(self.new_course.id)
+        self.assertEqual(course.children, [chapter.location.version_agnostic()])
+        self.assertGreater(course.subtree_edited_on, original_subtree_edited_on)
+        self.assertGreaterEqual(course.subtree_edited_on, store.get_item(chapter.location).edited_on)
+
     def _get_structure(self, course):
         """
         Helper function to get a structure from a course.
@@ -1008,6 +1075,41 @@ class TestCourseStructureCache(SplitModuleTest):
         )
 
 
+class TestStructureMemoryCache(unittest.TestCase):
+    """Tests for the StructureMemoryCache"""
+
+    def test_least_recently_used_eviction(self):
+        cache = StructureMemoryCache(10)
+        self.assertEqual(cache.set('a', 'pickled a', 4), 0)
+        self.assertEqual(cache.set('b', 'pickled b', 4), 0)
+
+        # reading 'a' makes 'b' the least recently used structure
+        self.assertEqual(cache.get('a'), 'pickled a')
+        self.assertEqual(cache.set('c', 'pickled c', 4), 1)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'pickled a')
+        self.assertEqual(cache.get('c'), 'pickled c')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.size, 8)
+
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+    def test_structure_larger_than_cache(self):
+        cache = StructureMemoryCache(10)
+        cache.set('a', 'pickled a', 4)
+        self.assertEqual(cache.set('b', 'pickled b', 11), 0)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'pickled a')
+
+    def test_disabled(self):
+        cache = StructureMemoryCache(0)
+        cache.set('a', 'pickled a', 1)
+        self.assertIsNone(cache.get('a'))
+
+
 class SplitModuleItemTests(SplitModuleTest):
     '''
     Item read tests including inheritance
@@ -1191,6 +1293,33 @@ class SplitModuleItemTests(SplitModuleTest):
         self.assertFalse(modulestore()._block_matches({'a': 1, 'b': 2}, {'a': 1, 'c': 1}))
         self.assertTrue(modulestore()._block_matches({'a': 1, 'b': 2}, {'a': lambda i: 0 < i < 2}))
 
+    def test_prefetch_definitions(self):
+        """
+        Test that the definitions selected by a DefinitionPrefetchPolicy are loaded in batches
+        along with the blocks, and the others are left to be loaded lazily.
+        """
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        policy = DefinitionPrefetchPolicy(block_types=['chapter'], batch_size=3)
+        with patch.object(
+            modulestore().db_connection, 'get_definitions', wraps=modulestore().db_connection.get_definitions
+        ) as mock_get_definitions:
+            course = modulestore().get_course(locator, depth=None, prefetch_definitions=policy)
+            # 4 chapters in batches of 3
+            self.assertEqual(mock_get_definitions.call_count, 2)
+
+        module_data = course.runtime.module_data
+        self.assertItemsEqual(
+            [block_key.id for block_key, block in module_data.iteritems() if block.definition_loaded],
+            ['chapter1', 'chap', 'chapter2', 'chapter3'],
+        )
+
+        # The definitions already loaded by the runtime aren't fetched again
+        with patch.object(modulestore().db_connection, 'get_definitions') as mock_get_definitions:
+            modulestore().prefetch_definitions(
+                course.runtime, [BlockKey.from_usage_key(course.location)], course.id, policy
+            )
+            self.assertFalse(mock_get_definitions.called)
+
     def test_get_items(self):
         '''
         get_items(locator, qualifiers, [branch])
@@ -1,10 +1,38 @@
 """ Test the behavior of split_mongo/MongoConnection """
+import copy
 import unittest
 from mock import patch
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    MongoConnection, structure_delta_to_mongo, structure_from_delta
+)
 from xmodule.exceptions import HeartbeatFailure
 
 
+COURSE = BlockKey('course', 'course')
+CHAPTER = BlockKey('chapter', 'chapter')
+OTHER_CHAPTER = BlockKey('chapter', 'other')
+NEW_CHAPTER = BlockKey('chapter', 'new')
+
+
+def make_structure(version_guid, fields_map):
+    """
+    Return a structure with the given version guid, whose blocks are
+    described by a dict mapping each BlockKey to its fields.
+    """
+    return {
+        '_id': version_guid,
+        'root': COURSE,
+        'original_version': 'snapshot',
+        'previous_version': None,
+        'blocks': {
+            block_key: BlockData(block_type=block_key.type, fields=fields)
+            for block_key, fields in fields_map.iteritems()
+        },
+    }
+
+
 class TestHeartbeatFailureException(unittest.TestCase):
     """ Test that a heartbeat failure is thrown at the appropriate times """
     @patch('pymongo.MongoClient')
@@ -17,3 +45,41 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestStructureDeltas(unittest.TestCase):
+    """ Test the storage of structures as deltas against snapshots """
+    def setUp(self):
+        super(TestStructureDeltas, self).setUp()
+        self.snapshot = make_structure('snapshot', {
+            COURSE: {'children': [CHAPTER, OTHER_CHAPTER]},
+            CHAPTER: {'display_name': 'Chapter'},
+            OTHER_CHAPTER: {'display_name': 'Other Chapter'},
+        })
+
+    def test_round_trip(self):
+        structure = make_structure('structure', {
+            COURSE: {'children': [CHAPTER, NEW_CHAPTER]},
+            CHAPTER: {'display_name': 'Chapter'},
+            NEW_CHAPTER: {'display_name': 'New Chapter'},
+        })
+        delta = structure_delta_to_mongo(copy.deepcopy(structure), self.snapshot, 1)
+        self.assertItemsEqual([block['block_id'] for block in delta['delta_blocks']], ['course', 'new'])
+        self.assertEqual(delta['delta_removed_blocks'], [OTHER_CHAPTER])
+        self.assertNotIn('blocks', delta)
+
+        rebuilt = structure_from_delta(delta, self.snapshot)
+        self.assertEqual(rebuilt['_id'], 'structure')
+        self.assertEqual(
+            {block_key: block.to_storable() for block_key, block in rebuilt['blocks'].iteritems()},
+            {block_key: block.to_storable() for block_key, block in structure['blocks'].iteritems()},
+        )
+        # the snapshot is left alone
+        self.assertIn(OTHER_CHAPTER, self.snapshot['blocks'])
+
+    def test_too_many_changes(self):
+        structure = make_structure('structure', {
+            COURSE: {'children': [CHAPTER]},
+            CHAPTER: {'display_name': 'Changed'},
+        })
+        self.assertIsNone(structure_delta_to_mongo(structure, self.snapshot, 0.5))
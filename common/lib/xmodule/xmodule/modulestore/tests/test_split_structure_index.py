@@ -0,0 +1,81 @@
+""" Test the behavior of split_mongo/structure_index """
+import unittest
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.structure_index import StructureIndex, StructureIndexCache
+
+
+def make_structure(version_guid, children_map):
+    """
+    Return a structure with the given version guid, whose blocks are
+    described by a dict mapping each BlockKey to the list of its children.
+    """
+    return {
+        '_id': version_guid,
+        'root': BlockKey('course', 'course'),
+        'blocks': {
+            block_key: BlockData(block_type=block_key.type, fields={'children': children})
+            for block_key, children in children_map.iteritems()
+        },
+    }
+
+
+COURSE = BlockKey('course', 'course')
+CHAPTER = BlockKey('chapter', 'chapter')
+SEQUENTIAL = BlockKey('sequential', 'sequential')
+ORPHAN_CHAPTER = BlockKey('chapter', 'orphan')
+ORPHAN_SEQUENTIAL = BlockKey('sequential', 'orphan')
+
+CHILDREN_MAP = {
+    COURSE: [CHAPTER],
+    CHAPTER: [SEQUENTIAL],
+    SEQUENTIAL: [],
+    ORPHAN_CHAPTER: [SEQUENTIAL, ORPHAN_SEQUENTIAL],
+    ORPHAN_SEQUENTIAL: [],
+}
+
+
+class TestStructureIndex(unittest.TestCase):
+    """ Test the indexes of a structure """
+    def setUp(self):
+        super(TestStructureIndex, self).setUp()
+        self.index = StructureIndex(make_structure('version', CHILDREN_MAP))
+
+    def test_block_keys_by_type(self):
+        self.assertItemsEqual(self.index.get_block_keys_of_type('chapter'), [CHAPTER, ORPHAN_CHAPTER])
+        self.assertItemsEqual(self.index.get_block_keys_of_type('course'), [COURSE])
+        self.assertEqual(self.index.get_block_keys_of_type('html'), [])
+
+    def test_parents(self):
+        self.assertItemsEqual(self.index.get_parents(SEQUENTIAL), [CHAPTER, ORPHAN_CHAPTER])
+        self.assertEqual(self.index.get_parents(ORPHAN_SEQUENTIAL), (ORPHAN_CHAPTER,))
+        self.assertEqual(self.index.get_parents(COURSE), ())
+        self.assertNotIn(ORPHAN_CHAPTER, self.index.parents)
+
+    def test_reachable(self):
+        self.assertEqual(self.index.reachable, frozenset([COURSE, CHAPTER, SEQUENTIAL]))
+
+
+class TestStructureIndexCache(unittest.TestCase):
+    """ Test the memoization of the indexes of structures """
+    def test_memoized_by_version(self):
+        cache = StructureIndexCache(10)
+        index = cache.get(make_structure('version', CHILDREN_MAP))
+        self.assertIs(cache.get(make_structure('version', CHILDREN_MAP)), index)
+        self.assertIsNot(cache.get(make_structure('other_version', CHILDREN_MAP)), index)
+        self.assertEqual(cache.blocks, 10)
+
+    def test_least_recently_used_eviction(self):
+        cache = StructureIndexCache(10)
+        index = cache.get(make_structure('version', CHILDREN_MAP))
+        cache.get(make_structure('other_version', CHILDREN_MAP))
+        cache.get(make_structure('new_version', CHILDREN_MAP))
+        self.assertEqual(cache.blocks, 10)
+        self.assertIsNot(cache.get(make_structure('version', CHILDREN_MAP)), index)
+
+    def test_structure_larger_than_cache(self):
+        cache = StructureIndexCache(4)
+        index = cache.get(make_structure('version', CHILDREN_MAP))
+        self.assertIsNot(cache.get(make_structure('version', CHILDREN_MAP)), index)
+        self.assertEqual(cache.blocks, 0)
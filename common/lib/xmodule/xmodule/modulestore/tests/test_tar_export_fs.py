@@ -0,0 +1,57 @@
+""" Test the behavior of the TarExportFS """
+import io
+import tarfile
+import unittest
+
+from xmodule.modulestore.tar_export_fs import TarExportFS
+
+
+class GridFSFile(io.BytesIO):
+    """ A file-like object with a known length, like a GridFS file """
+    def __init__(self, data):
+        super(GridFSFile, self).__init__(data)
+        self.length = len(data)
+
+
+class TestTarExportFS(unittest.TestCase):
+    """ Test writing files into a tar archive through the pyfs API """
+    def setUp(self):
+        super(TestTarExportFS, self).setUp()
+        self.archive = io.BytesIO()
+
+    def read_archive(self):
+        """ Return a dict mapping the name of each member of the archive to its contents (None for directories) """
+        self.archive.seek(0)
+        with tarfile.open(fileobj=self.archive, mode='r:gz') as tar_file:
+            return {
+                member.name: tar_file.extractfile(member).read() if member.isfile() else None
+                for member in tar_file.getmembers()
+            }
+
+    def test_write_files(self):
+        with tarfile.open(fileobj=self.archive, mode='w|gz') as tar_file:
+            export_fs = TarExportFS(tar_file).makeopendir('course')
+            with export_fs.open('course.xml', 'w') as course_xml:
+                course_xml.write('<course/>')
+            export_fs.makedir('static/images', recursive=True, allow_recreate=True)
+            export_fs.setcontents('static/images/image.jpg', GridFSFile('image'))
+            export_fs.setcontents('static/notes.txt', 'notes')
+            policies_fs = export_fs.makeopendir('policies')
+            with policies_fs.open('assets.json', 'w') as assets_json:
+                assets_json.write(u'{}')
+
+        self.assertEqual(self.read_archive(), {
+            'course': None,
+            'course/course.xml': '<course/>',
+            'course/static': None,
+            'course/static/images': None,
+            'course/static/images/image.jpg': 'image',
+            'course/static/notes.txt': 'notes',
+            'course/policies': None,
+            'course/policies/assets.json': '{}',
+        })
+
+    def test_write_only(self):
+        with tarfile.open(fileobj=self.archive, mode='w|gz') as tar_file:
+            with self.assertRaises(ValueError):
+                TarExportFS(tar_file).open('course.xml')
@@ -64,6 +64,31 @@ class TestXMLModuleStore(unittest.TestCase):
         self.assertIn("GREEN", about_module.data)
         self.assertNotIn("RED", about_module.data)
 
+    def test_get_block_records(self):
+        store = XMLModuleStore(DATA_DIR, source_dirs=['toy'], xblock_mixins=(XModuleMixin,))
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        records = {
+            record.usage_key: record
+            for record in store.get_block_records(course_key, include_content=True)
+        }
+        self.assertEqual(len(records), len(store.get_items(course_key)))
+
+        video = records[course_key.make_usage_key('video', 'Welcome')]
+        self.assertEqual(video.block_type, 'video')
+        self.assertEqual(video.parent, course_key.make_usage_key('chapter', 'Overview'))
+        self.assertEqual(video.settings['display_name'], 'Welcome')
+        self.assertEqual(video.children, [])
+
+        videosequence = records[course_key.make_usage_key('videosequence', 'Toy_Videos')]
+        self.assertIn(course_key.make_usage_key('html', 'toyhtml'), videosequence.children)
+        self.assertIn('data', records[course_key.make_usage_key('html', 'toyhtml')].content)
+
+        course = next(
+            record for record in store.get_block_records(course_key) if record.block_type == 'course'
+        )
+        self.assertIsNone(course.parent)
+        self.assertIsNone(course.content)
+
     def test_get_courses_for_wiki(self):
         """
         Test the get_courses_for_wiki method
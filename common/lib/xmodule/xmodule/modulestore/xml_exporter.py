@@ -3,6 +3,7 @@ Methods for exporting course data to XML
 """
 
 import logging
+import tarfile
 from abc import abstractmethod
 import lxml.etree
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -13,9 +14,10 @@ from xmodule.modulestore import EdxJSONEncoder, ModuleStoreEnum
 from xmodule.modulestore.inheritance import own_metadata
 from xmodule.modulestore.store_utilities import draft_node_constructor, get_draft_subtree_roots
 from xmodule.modulestore import LIBRARY_ROOT
+from xmodule.modulestore.split_mongo import DefinitionPrefetchPolicy
+from xmodule.modulestore.tar_export_fs import TarExportFS
 from fs.osfs import OSFS
 from json import dumps
-import os
 
 from xmodule.modulestore.draft_and_published import DIRECT_ONLY_CATEGORIES
 from opaque_keys.edx.locator import CourseLocator, LibraryLocator
@@ -104,7 +106,7 @@ class ExportManager(object):
     """
     Manages XML exporting for courselike objects.
     """
-    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir):
+    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir, root_fs=None):
         """
         Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
 
@@ -113,12 +115,14 @@ class ExportManager(object):
         `courselike_key`: The Locator of the Descriptor to export
         `root_dir`: The directory to write the exported xml to
         `target_dir`: The name of the directory inside `root_dir` to write the content to
+        `root_fs`: The filesystem to write the exported xml to instead of `root_dir` (e.g. a TarExportFS)
         """
         self.modulestore = modulestore
         self.contentstore = contentstore
         self.courselike_key = courselike_key
         self.root_dir = root_dir
         self.target_dir = target_dir
+        self.root_fs = root_fs
 
     @abstractmethod
     def get_key(self):
@@ -154,7 +158,7 @@ class ExportManager(object):
         """
         with self.modulestore.bulk_operations(self.courselike_key):
 
-            fsm = OSFS(self.root_dir)
+            fsm = self.root_fs if self.root_fs is not None else OSFS(self.root_dir)
             root = lxml.etree.Element('unknown')
 
             # export only the published content
@@ -171,7 +175,7 @@ class ExportManager(object):
             self.process_root(root, export_fs)
 
             # Process extra items-- drafts, assets, etc
-            root_courselike_dir = self.root_dir + '/' + self.target_dir
+            root_courselike_dir = self.root_dir + '/' + self.target_dir if self.root_fs is None else None
             self.process_extra(root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs)
 
             # Any last pass adjustments
@@ -189,11 +193,13 @@ class CourseExportManager(ExportManager):
 
     def get_courselike(self):
         # depth = None: Traverses down the entire course structure.
-        # lazy = False: Loads and caches all block definitions during traversal for fast access later
-        #               -and- to eliminate many round-trips to read individual definitions.
+        # prefetch_definitions: Loads all block definitions during traversal, in batches, for fast access
+        #               later -and- to eliminate many round-trips to read individual definitions.
         # Why these parameters? Because a course export needs to access all the course block information
         # eventually. Accessing it all now at the beginning increases performance of the export.
-        return self.modulestore.get_course(self.courselike_key, depth=None, lazy=False)
+        return self.modulestore.get_course(
+            self.courselike_key, depth=None, prefetch_definitions=DefinitionPrefetchPolicy()
+        )
 
     def process_root(self, root, export_fs):
         with export_fs.open('course.xml', 'w') as course_xml:
@@ -201,26 +207,20 @@ class CourseExportManager(ExportManager):
 
     def process_extra(self, root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs):
         # Export the modulestore's asset metadata.
-        asset_dir = root_courselike_dir + '/' + AssetMetadata.EXPORTED_ASSET_DIR + '/'
-        if not os.path.isdir(asset_dir):
-            os.makedirs(asset_dir)
+        asset_dir = export_fs.makeopendir(AssetMetadata.EXPORTED_ASSET_DIR)
         asset_root = lxml.etree.Element(AssetMetadata.ALL_ASSETS_XML_TAG)
         course_assets = self.modulestore.get_all_asset_metadata(self.courselike_key, None)
         for asset_md in course_assets:
             # All asset types are exported using the "asset" tag - but their asset type is specified in each asset key.
             asset = lxml.etree.SubElement(asset_root, AssetMetadata.ASSET_XML_TAG)
             asset_md.to_xml(asset)
-        with OSFS(asset_dir).open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
+        with asset_dir.open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
             lxml.etree.ElementTree(asset_root).write(asset_xml_file)
 
         # export the static assets
         policies_dir = export_fs.makeopendir('policies')
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                root_courselike_dir + '/static/',
-                root_courselike_dir + '/policies/assets.json',
-            )
+            self.contentstore.export_all_for_course_to_fs(self.courselike_key, export_fs)
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
@@ -235,11 +235,8 @@ class CourseExportManager(ExportManager):
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_courselike_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open('course_image.jpg', 'wb') as course_image_file:
-                        course_image_file.write(course_image.data)
+                    export_fs.makedir('static/images', recursive=True, allow_recreate=True)
+                    export_fs.setcontents('static/images/course_image.jpg', course_image.data)
 
         # export the static tabs
         export_extra_content(
@@ -300,7 +297,9 @@ class LibraryExportManager(ExportManager):
         """
         Get the library from the modulestore.
         """
-        return self.modulestore.get_library(self.courselike_key, depth=None, lazy=False)
+        return self.modulestore.get_library(
+            self.courselike_key, depth=None, prefetch_definitions=DefinitionPrefetchPolicy()
+        )
 
     def process_root(self, root, export_fs):
         """
@@ -318,11 +317,7 @@ class LibraryExportManager(ExportManager):
         export_fs.makeopendir('policies')
 
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                self.root_dir + '/' + self.target_dir + '/static/',
-                self.root_dir + '/' + self.target_dir + '/policies/assets.json',
-            )
+            self.contentstore.export_all_for_course_to_fs(self.courselike_key, export_fs)
 
     def post_process(self, root, export_fs):
         """
@@ -351,6 +346,30 @@ def export_library_to_xml(modulestore, contentstore, library_key, root_dir, libr
     LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
 
 
+def export_course_to_tarball(modulestore, contentstore, course_key, fileobj, course_dir):
+    """
+    Export a course as a gzipped tar archive of `course_dir`, streamed into the writable `fileobj`
+    (which needn't be seekable) as it's exported, rather than written to disk first.
+    See ExportManager for details.
+    """
+    with tarfile.open(fileobj=fileobj, mode='w|gz') as tar_file:
+        CourseExportManager(
+            modulestore, contentstore, course_key, None, course_dir, root_fs=TarExportFS(tar_file)
+        ).export()
+
+
+def export_library_to_tarball(modulestore, contentstore, library_key, fileobj, library_dir):
+    """
+    Export a library as a gzipped tar archive of `library_dir`, streamed into the writable `fileobj`
+    (which needn't be seekable) as it's exported, rather than written to disk first.
+    See ExportManager for details.
+    """
+    with tarfile.open(fileobj=fileobj, mode='w|gz') as tar_file:
+        LibraryExportManager(
+            modulestore, contentstore, library_key, None, library_dir, root_fs=TarExportFS(tar_file)
+        ).export()
+
+
 def adapt_references(subtree, destination_course_key, export_fs):
     """
     Map every reference in the subtree into destination_course_key and set it back into the xblock fields
@@ -39,3 +39,16 @@ class IgnoredFilesTestCase(unittest.TestCase):
         self.assertNotIn(".DS_Store", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
         self.assertIn("BLUE", name_val[".example.txt"])
+
+    def test_concurrent_static_import(self):
+        """
+        Test that uploading the static files concurrently imports the same files
+        """
+        course_dir = DATA_DIR / "dot-underscore"
+        course_id = SlashSeparatedCourseKey("edX", "dot-underscore", "2014_Fall")
+        content_store = Mock()
+        content_store.generate_thumbnail.return_value = ("content", "location")
+        remap_dict = import_static_content(course_dir, content_store, course_id)
+        self.assertEqual(import_static_content(course_dir, content_store, course_id, num_workers=4), remap_dict)
+        saved_static_content = [call[0][0] for call in content_store.save.call_args_list]
+        self.assertEqual(len(saved_static_content), 2 * len(remap_dict))
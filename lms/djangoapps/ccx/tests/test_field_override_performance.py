@@ -3,18 +3,25 @@
 Performance tests for field overrides.
 """
 import itertools
-from datetime import datetime
+import logging
+import os
+import time
+import unittest
+from datetime import datetime, timedelta
 
 import ddt
 import mock
 from ccx_keys.locator import CCXLocator
 from courseware.field_overrides import OverrideFieldData
+from courseware.model_data import FieldDataCache
+from courseware.module_render import toc_for_course
 from courseware.testutils import FieldOverrideTestMixin
 from courseware.views.views import progress
 from django.conf import settings
 from django.core.cache import caches
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
+from lms.djangoapps.ccx.overrides import override_field_for_ccx
 from lms.djangoapps.ccx.tests.factories import CcxFactory
 from nose.plugins.attrib import attr
 from nose.plugins.skip import SkipTest
@@ -34,6 +41,8 @@ from xmodule.modulestore.tests.django_utils import (
 from xmodule.modulestore.tests.factories import CourseFactory, check_mongo_calls, check_sum_of_calls
 from xmodule.modulestore.tests.utils import ProceduralCourseTestMixin
 
+log = logging.getLogger(__name__)
+
 QUERY_COUNT_TABLE_BLACKLIST = WAFFLE_TABLES
 
 
@@ -276,3 +285,74 @@ class TestFieldOverrideSplitPerformance(FieldOverridePerformanceTestCase):
         ('ccx', 2, False, False): (23, 3),
         ('ccx', 3, False, False): (23, 3),
     }
+
+
+@attr(shard=3)
+@unittest.skipUnless(
+    os.environ.get('FIELD_OVERRIDE_BENCHMARK'),
+    "Set FIELD_OVERRIDE_BENCHMARK to time the course outline with and without CCX overrides."
+)
+class FieldOverrideOutlineBenchmark(FieldOverrideTestMixin, ProceduralCourseTestMixin, ModuleStoreTestCase):
+    """
+    Times the rendering of the course outline of a course, without field
+    overrides and viewed as a CCX overriding the due date of every sequential.
+    """
+    MODULESTORE = TEST_DATA_SPLIT_MODULESTORE
+
+    # Number of children per block of the course.
+    COURSE_WIDTH = 4
+
+    # Number of times the outline is rendered per measurement, each time as a new request.
+    NUM_RENDERS = 20
+
+    def setUp(self):
+        super(FieldOverrideOutlineBenchmark, self).setUp()
+        self.course = CourseFactory.create(enable_ccx=True)
+        self.populate_course(self.COURSE_WIDTH)
+
+        self.ccx = CcxFactory.create(course_id=self.course.id)
+        due = datetime.now(UTC) + timedelta(days=7)
+        for location in self.populated_usage_keys['sequential']:
+            override_field_for_ccx(self.ccx, self.store.get_item(location), 'due', due)
+
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('foo')
+        self.request.user = self.student
+
+    def time_outline(self, course_key):
+        """
+        Returns the average time, in milliseconds, of rendering the outline of the course.
+        """
+        CourseEnrollment.enroll(self.student, course_key)
+        OverrideFieldData.provider_classes = None
+        elapsed = 0
+        with self.settings(MODULESTORE_BRANCH='published-only'):
+            for __ in xrange(self.NUM_RENDERS):
+                # Each render starts from a new request.
+                RequestCache.clear_request_cache()
+                start = time.time()
+                course = self.store.get_course(course_key, depth=2)
+                field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                    course_key, self.student, course, depth=2
+                )
+                toc_for_course(self.student, self.request, course, None, None, field_data_cache)
+                elapsed += time.time() - start
+        return elapsed * 1000 / self.NUM_RENDERS
+
+    def test_outline_render_time(self):
+        with self.settings(
+            XBLOCK_FIELD_DATA_WRAPPERS=[],
+            MODULESTORE_FIELD_OVERRIDE_PROVIDERS=[],
+        ):
+            without_overrides = self.time_outline(self.course.id)
+
+        with self.settings(
+            XBLOCK_FIELD_DATA_WRAPPERS=['lms.djangoapps.courseware.field_overrides:OverrideModulestoreFieldData.wrap'],
+            MODULESTORE_FIELD_OVERRIDE_PROVIDERS=['ccx.overrides.CustomCoursesForEdxOverrideProvider'],
+        ):
+            with_ccx_overrides = self.time_outline(CCXLocator.from_course_locator(self.course.id, self.ccx.id))
+
+        log.info(
+            "Course outline (width %d): %.1fms without overrides, %.1fms with CCX overrides",
+            self.COURSE_WIDTH, without_overrides, with_ccx_overrides,
+        )
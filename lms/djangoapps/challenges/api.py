@@ -0,0 +1,199 @@
+"""
+An API for aggregating the challenge submissions of the students in a
+program, which can be used by exports and views alike.
+
+    `get_challenge_index` loads every challenge along with the names of
+        its tags in a single query, and indexes them by module level
+
+    `iter_student_challenge_counts` streams the challenge submissions of
+        the students in a program and yields the counts of each student
+
+    `get_student_challenge_histories` returns the challenge history of
+        every student enrolled in a program
+
+A student's challenge history is a dict with the `passed`, `attempted`,
+`unattempted` and `num_attempts` counts of each module level (e.g.
+`hf101_required`), along with the `achieved` and `total` counts of each
+skill under the `student_skills` key.
+"""
+from array import array
+
+from challenges.models import Challenge, ChallengeSubmission
+
+
+class ChallengeIndex(object):
+    """
+    An index of every challenge, used to aggregate the submissions.
+
+    Module levels and skills are numbered in the order in which they are
+    first seen, so the counts of a student can be kept in flat arrays.
+
+    `module_levels` is the list of the names of the module levels
+    `skills` is the list of the names of the skills (i.e. tags)
+    `challenges` maps the id of each challenge to a tuple of the number
+        of its module level and the numbers of its skills
+    `module_level_totals` is the number of challenges in each module level
+    `skill_totals` is the number of challenges tagged with each skill
+    """
+    def __init__(self, module_levels, skills, challenges):
+        self.module_levels = module_levels
+        self.skills = skills
+        self.challenges = challenges
+
+        self.module_level_totals = [0] * len(module_levels)
+        self.skill_totals = [0] * len(skills)
+        for module_level, challenge_skills in challenges.itervalues():
+            self.module_level_totals[module_level] += 1
+            for skill in challenge_skills:
+                self.skill_totals[skill] += 1
+
+    def history(self, counts=None):
+        """
+        Get the challenge history of a student from their counts.
+
+        `counts` is the StudentChallengeCounts of the student, or None if
+            the student hasn't submitted any challenges
+        """
+        if counts is None:
+            counts = StudentChallengeCounts(self)
+
+        history = {}
+        for module_level, name in enumerate(self.module_levels):
+            passed = counts.passed[module_level]
+            attempted = counts.attempted[module_level]
+            history[name] = {
+                'passed': passed,
+                'attempted': attempted,
+                'unattempted': self.module_level_totals[module_level] - passed - attempted,
+                'num_attempts': counts.num_attempts[module_level],
+            }
+        history['student_skills'] = {
+            name: {
+                'achieved': counts.achieved[skill],
+                'total': self.skill_totals[skill],
+            }
+            for skill, name in enumerate(self.skills)
+        }
+        return history
+
+
+class StudentChallengeCounts(object):
+    """
+    The counts of the challenge submissions of a student, stored in
+    arrays indexed by the numbers of the module levels and skills of a
+    ChallengeIndex.
+    """
+    __slots__ = ('passed', 'attempted', 'num_attempts', 'achieved')
+
+    def __init__(self, challenge_index):
+        number_of_module_levels = len(challenge_index.module_levels)
+        self.passed = array('l', [0]) * number_of_module_levels
+        self.attempted = array('l', [0]) * number_of_module_levels
+        self.num_attempts = array('l', [0]) * number_of_module_levels
+        self.achieved = array('l', [0]) * len(challenge_index.skills)
+
+    def add_submission(self, module_level, skills, passed, attempts):
+        """
+        Count a challenge submission of the student.
+        """
+        if passed:
+            self.passed[module_level] += 1
+            for skill in skills:
+                self.achieved[skill] += 1
+        else:
+            self.attempted[module_level] += 1
+        self.num_attempts[module_level] += attempts
+
+
+def get_challenge_index():
+    """
+    Collect all of the challenges in the LMS along with their tags, in a
+    single query.
+
+    Returns a ChallengeIndex
+    """
+    module_levels = {}
+    skills = {}
+    challenges = {}
+
+    challenge_rows = Challenge.objects.order_by('pk', 'tags__sort_key').values_list(
+        'pk', 'block_locator', 'level', 'tags__name')
+    for challenge_id, block_locator, level, tag_name in challenge_rows:
+        if challenge_id not in challenges:
+            module = block_locator.split('+')[1].lower()
+            module_level = "_".join((module, level)).lower()
+            challenges[challenge_id] = (
+                module_levels.setdefault(module_level, len(module_levels)), [])
+        if tag_name is not None:
+            challenges[challenge_id][1].append(skills.setdefault(tag_name, len(skills)))
+
+    return ChallengeIndex(
+        sorted(module_levels, key=module_levels.get),
+        sorted(skills, key=skills.get),
+        {
+            challenge_id: (module_level, tuple(challenge_skills))
+            for challenge_id, (module_level, challenge_skills) in challenges.iteritems()
+        },
+    )
+
+
+def iter_student_challenge_counts(program, challenge_index, student_ids=None):
+    """
+    Stream the challenge submissions of the students enrolled in a
+    program in a single query, ordered by student.
+
+    `program` is the Program of the students
+    `challenge_index` is the ChallengeIndex of the challenges
+    `student_ids` optionally limits the submissions to the given students
+
+    Yields a tuple of the id and the StudentChallengeCounts of each
+        student that submitted a challenge, in order of their id
+    """
+    submissions = ChallengeSubmission.objects.filter(student__program=program)
+    if student_ids is not None:
+        submissions = submissions.filter(student_id__in=student_ids)
+    submissions = submissions.order_by('student_id').values_list(
+        'student_id', 'challenge_id', 'passed', 'attempts')
+
+    student_id, counts = None, None
+    for submission_student_id, challenge_id, passed, attempts in submissions.iterator():
+        if challenge_id not in challenge_index.challenges:
+            # The challenge was added after the index was collected
+            continue
+        if submission_student_id != student_id:
+            if counts is not None:
+                yield student_id, counts
+            student_id, counts = submission_student_id, StudentChallengeCounts(challenge_index)
+        module_level, skills = challenge_index.challenges[challenge_id]
+        counts.add_submission(module_level, skills, passed, attempts)
+
+    if counts is not None:
+        yield student_id, counts
+
+
+def get_student_challenge_histories(program, student_ids=None):
+    """
+    Calculate the challenge history of every student enrolled in a
+    program, including the ones that haven't submitted any challenges.
+
+    `program` is the Program of the students
+    `student_ids` optionally limits the histories to the given students
+
+    Returns a dict mapping the id of each student to their challenge
+        history
+    """
+    challenge_index = get_challenge_index()
+
+    students = program.enrolled_students.all()
+    if student_ids is not None:
+        students = students.filter(id__in=student_ids)
+    student_counts = {
+        student_id: None for student_id in students.values_list('id', flat=True)
+    }
+    for student_id, counts in iter_student_challenge_counts(program, challenge_index, student_ids):
+        student_counts[student_id] = counts
+
+    return {
+        student_id: challenge_index.history(counts)
+        for student_id, counts in student_counts.iteritems()
+    }
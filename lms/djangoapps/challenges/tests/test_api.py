@@ -0,0 +1,96 @@
+"""
+Tests for the challenges API.
+"""
+from django.test import TestCase
+from django.utils import timezone
+
+from challenges.api import get_challenge_index, get_student_challenge_histories
+from challenges.models import Challenge, ChallengeSubmission, Tag
+from ci_program.models import Program
+from student.tests.factories import UserFactory
+
+
+class GetStudentChallengeHistoriesTest(TestCase):
+    """
+    Tests for `get_student_challenge_histories`.
+    """
+
+    def setUp(self):
+        super(GetStudentChallengeHistoriesTest, self).setUp()
+        self.program = Program.objects.create(name='Test Program', program_code='TP')
+        self.student = UserFactory.create()
+        self.other_student = UserFactory.create()
+        self.program.enrolled_students.add(self.student, self.other_student)
+
+        loops = Tag.objects.create(name='loops', sort_key=1)
+        functions = Tag.objects.create(name='functions', sort_key=2)
+        self.loops_challenge = self._create_challenge('HF101', 'Required', loops, functions)
+        self.functions_challenge = self._create_challenge('HF101', 'Required', functions)
+        self.bonus_challenge = self._create_challenge('HF101', 'Bonus')
+
+    def _create_challenge(self, module, level, *tags):
+        """
+        Create a challenge in the given module with the given tags.
+        """
+        challenge = Challenge.objects.create(
+            name='challenge_{}'.format(Challenge.objects.count()),
+            block_locator='block-v1:CI+{}+2017_T1+type@problem+block@{}'.format(module, Challenge.objects.count()),
+            level=level,
+        )
+        challenge.tags.add(*tags)
+        return challenge
+
+    def _submit(self, student, challenge, passed, attempts=1):
+        """
+        Create a challenge submission of the student.
+        """
+        ChallengeSubmission.objects.create(
+            student=student,
+            challenge=challenge,
+            time_challenge_started=timezone.now(),
+            time_challenge_submitted=timezone.now(),
+            passed=passed,
+            attempts=attempts,
+        )
+
+    def test_challenge_index(self):
+        challenge_index = get_challenge_index()
+        self.assertEqual(challenge_index.module_levels, ['hf101_required', 'hf101_bonus'])
+        self.assertEqual(challenge_index.skills, ['loops', 'functions'])
+        self.assertEqual(challenge_index.module_level_totals, [2, 1])
+        self.assertEqual(challenge_index.skill_totals, [1, 2])
+
+    def test_histories(self):
+        self._submit(self.student, self.loops_challenge, passed=True, attempts=2)
+        self._submit(self.student, self.functions_challenge, passed=False, attempts=3)
+
+        with self.assertNumQueries(3):
+            histories = get_student_challenge_histories(self.program)
+
+        self.assertEqual(histories[self.student.id], {
+            'hf101_required': {'passed': 1, 'attempted': 1, 'unattempted': 0, 'num_attempts': 5},
+            'hf101_bonus': {'passed': 0, 'attempted': 0, 'unattempted': 1, 'num_attempts': 0},
+            'student_skills': {
+                'loops': {'achieved': 1, 'total': 1},
+                'functions': {'achieved': 1, 'total': 2},
+            },
+        })
+        # students without submissions have a history too
+        self.assertEqual(histories[self.other_student.id], {
+            'hf101_required': {'passed': 0, 'attempted': 0, 'unattempted': 2, 'num_attempts': 0},
+            'hf101_bonus': {'passed': 0, 'attempted': 0, 'unattempted': 1, 'num_attempts': 0},
+            'student_skills': {
+                'loops': {'achieved': 0, 'total': 1},
+                'functions': {'achieved': 0, 'total': 2},
+            },
+        })
+
+    def test_histories_of_program_students_only(self):
+        outside_student = UserFactory.create()
+        self._submit(outside_student, self.bonus_challenge, passed=True)
+        self._submit(self.other_student, self.bonus_challenge, passed=True)
+
+        histories = get_student_challenge_histories(self.program, student_ids=[self.other_student.id])
+
+        self.assertEqual(histories.keys(), [self.other_student.id])
+        self.assertEqual(histories[self.other_student.id]['hf101_bonus']['passed'], 1)
@@ -13,6 +13,10 @@ need to import the Program model elsewhere.
         Returns a True or False status to notify if the enrollment was
         successful
 
+    `bulk_enroll_students_in_program` will enroll the students with the
+        provided `emails` into the program with the provided `code`.
+        Returns a dict of the enrollment status of each email
+
     `get_enrolled_students` returns the number of students enrolled in a given
         program
 
@@ -78,6 +82,25 @@ def enroll_student_in_program(code, email):
     return enrollment_status
 
 
+def bulk_enroll_students_in_program(code, emails, exclude_courses=[]):
+    """
+    Enroll many students in a program at once.
+
+    `code` is the code of the program that we want to enroll the
+        students in
+    `emails` is a collection of the emails of the users that we wish
+        to enroll
+    `exclude_courses` is a collection of course ids (formatted as a
+        string) that the students shouldn't be enrolled in
+    Note that the students must already be registered to the platform
+
+    Returns a dict mapping each email to the status of its enrollment
+    """
+    program = get_program_by_program_code(code)
+    return program.bulk_enroll_students_in_program(
+        emails, exclude_courses=exclude_courses)
+
+
 def get_enrolled_students(code):
     """
     Gets a list of the enrolled students enrolled in a given program
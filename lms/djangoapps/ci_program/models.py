@@ -1,6 +1,9 @@
 from logging import getLogger
 from uuid import uuid4
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django_extensions.db.models import TimeStampedModel
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.models import User
@@ -8,15 +11,34 @@ from django.core.mail import send_mail
 from opaque_keys.edx.locator import CourseLocator
 from openedx.core.djangoapps.xmodule_django.models import CourseKeyField
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
-from student.models import CourseEnrollmentAllowed
+from student.models import CourseEnrollment, CourseEnrollmentAllowed
 from lms.djangoapps.instructor.enrollment import enroll_email, unenroll_email
 from lms.djangoapps.student_enrollment.utils import create_email_connection
 from lms.djangoapps.student_enrollment.utils import construct_email
-from lms.djangoapps.courseware.courses import get_course
-from openedx.core.lib.courses import course_image_url
 
 log = getLogger(__name__)
 
+# Increment whenever the format of the cached program structure changes.
+PROGRAM_STRUCTURE_VERSION = 2
+
+# The cached structure is invalidated whenever the program's modules
+# change, so this is only a safety net.
+PROGRAM_STRUCTURE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def course_code_to_locator(course_code_key):
+    """
+    Get the CourseLocator for the key of a course code, e.g.
+
+    CodeInstitute+HF101+2017_T1
+    """
+    course_identifiers = course_code_key.split('+')
+    return CourseLocator(
+        course_identifiers[0],
+        course_identifiers[1],
+        course_identifiers[2]
+    )
+
 
 class Program(TimeStampedModel):
     """
@@ -147,28 +169,21 @@ class Program(TimeStampedModel):
         # Gather the information of each of the modules in the program
         # Get the latest 5DCC for this specific student
         if self.program_code == "5DCC":
-            student = User.objects.get(email=user.email)
-            users_five_day_module = student.courseenrollment_set.filter(
-                course_id__icontains="dcc").order_by('created').last()
-            course_id = users_five_day_module.course_id
-            course_overview = CourseOverview.objects.get(id=course_id)
-            course_descriptor = get_course(course_id)
-            
+            course_id = CourseEnrollment.objects.filter(
+                user_id=user.id, course_id__icontains="dcc").order_by(
+                'created').values_list('course_id', flat=True).last()
+            course_overviews = [CourseOverview.objects.get(id=course_id)]
+        else:
+            course_overviews = self.get_courses()
+
+        # The course image of each module is read from its overview
+        # rather than from the course in the modulestore
+        for course_overview in course_overviews:
             courses.append({
-                    "course_key": course_id,
-                    "course": course_overview,
-                    "course_image": course_image_url(course_descriptor)
-                })
-        else:    
-            for course_overview in self.get_courses():
-                course_id = course_overview.id
-                course_descriptor = get_course(course_id)
-                
-                courses.append({
-                    "course_key": course_id,
-                    "course": course_overview,
-                    "course_image": course_image_url(course_descriptor)
-                })
+                "course_key": course_overview.id,
+                "course": course_overview,
+                "course_image": course_overview.course_image_url
+            })
         
         # Create a dict out the information gathered
         program_descriptor = {
@@ -191,17 +206,7 @@ class Program(TimeStampedModel):
         
         CodeInstitute+HF101+2017_T1
         """
-        list_of_locators = []
-        
-        for course_code in self.course_codes.all():
-            course_identifiers = course_code.key.split('+')
-            list_of_locators.append(CourseLocator(
-                course_identifiers[0],
-                course_identifiers[1],
-                course_identifiers[2]
-            ))
-        
-        return list_of_locators
+        return self.get_program_structure()['locators']
     
     def get_courses(self):
         """
@@ -212,21 +217,74 @@ class Program(TimeStampedModel):
 
         Returns the list of children courses
         """
-        
-        list_of_courses = []
-        
-        for course_code in self.course_codes.all().order_by('programcoursecode'):
-            course_identifiers = course_code.key.split('+')
-            locator = CourseLocator(
-                course_identifiers[0],
-                course_identifiers[1],
-                course_identifiers[2]
-            )
-            list_of_courses.append(CourseOverview.objects.get(id=locator))
-
-        return list_of_courses
+        return self.get_program_structure()['course_overviews']
+
+    def get_program_structure(self):
+        """
+        Get the structure of the program, which is cached until one of
+        its course codes or course overviews changes.
+
+        Returns a dict of the `locators` and the `course_overviews` of
+        the modules of the program, in the order of their positions
+        """
+        # Only the keys and the field values of the course overviews are
+        # cached, from which new CourseOverview instances are made
+        course_overview_fields = CourseOverview._meta.concrete_fields
+        cache_key = self.program_structure_cache_key(self.id)
+        cached_structure = cache.get(cache_key)
+        if cached_structure is None:
+            locators = [
+                course_code_to_locator(course_code_key)
+                for course_code_key in ProgramCourseCode.objects.filter(
+                    program_id=self.id).values_list('course_code__key', flat=True)
+            ]
+            course_overviews = CourseOverview.objects.in_bulk(locators)
+            for locator in locators:
+                if locator not in course_overviews:
+                    raise CourseOverview.DoesNotExist(
+                        "No course overview for %s in %s" % (locator, self.name))
+
+            cached_structure = {
+                "locators": [unicode(locator) for locator in locators],
+                "course_overviews": [
+                    [
+                        field.get_prep_value(getattr(course_overviews[locator], field.attname))
+                        for field in course_overview_fields
+                    ]
+                    for locator in locators
+                ],
+            }
+            cache.set(cache_key, cached_structure, PROGRAM_STRUCTURE_CACHE_TIMEOUT)
+
+        return {
+            "locators": [CourseLocator.from_string(locator) for locator in cached_structure["locators"]],
+            "course_overviews": [
+                CourseOverview.from_db(
+                    CourseOverview.objects.db,
+                    [field.attname for field in course_overview_fields],
+                    field_values,
+                )
+                for field_values in cached_structure["course_overviews"]
+            ],
+        }
+
+    @staticmethod
+    def program_structure_cache_key(program_id):
+        """
+        Get the key of the cached structure of a program, which changes
+        with the format of the cached structure and of course overviews
+        """
+        return u"ci_program.v{}.course_overview_v{}.structure.{}".format(
+            PROGRAM_STRUCTURE_VERSION, CourseOverview.VERSION, program_id)
+
+    @classmethod
+    def clear_program_structures(cls, program_ids):
+        """
+        Remove the cached structures of the given programs
+        """
+        cache.delete_many([cls.program_structure_cache_key(program_id) for program_id in program_ids])
     
-    def send_email(self, student, enrollment_type, password):
+    def send_email(self, student, enrollment_type, password, connection=None):
         """
         Send the enrollment email to the student.
 
@@ -237,6 +295,8 @@ class Program(TimeStampedModel):
             this will be externally, or the student may already be
             aware of their password, in which case the value will be
             None
+        `connection` is the email connection used to send the email. A
+            new connection is created when it isn't provided
 
         Returns True if the email was successfully sent, otherwise
             return False
@@ -268,8 +328,8 @@ class Program(TimeStampedModel):
                                        program_name=self.name,
                                        module_url=module_url)
         
-        # Create a new email connection
-        email_connection = create_email_connection()
+        # Create a new email connection unless one is provided
+        email_connection = connection or create_email_connection()
 
         # Send the email. `send_mail` will return the amount of emails
         # that were sent successfully. We'll use this number to determine
@@ -340,6 +400,65 @@ class Program(TimeStampedModel):
         log.info(log_message)
         return student_successfully_enrolled
     
+    def bulk_enroll_students_in_program(self, student_emails, exclude_courses=[]):
+        """
+        Enroll many students in a program at once.
+
+        This is the batched equivalent of `enroll_student_in_program`: the
+        students are looked up in a single query, and for each course the
+        missing `CourseEnrollmentAllowed` and `CourseEnrollment` records
+        are created in bulk. The emails are not sent here, see
+        `student_enrollment.tasks.send_enrollment_emails`.
+
+        `student_emails` is a collection of the emails of the students to
+            be enrolled. Note that the students must already be registered
+            to the platform
+
+        `exclude_courses` is a collection of course codes (formatted as a string)
+        which can be used to exclude specific courses from the auto-enrollment
+        process
+
+        Returns a dict mapping each email to True if the student was
+            successfully enrolled in the program, otherwise False
+        """
+        student_emails = set(student_emails)
+        students = list(User.objects.filter(email__in=student_emails))
+        if not students:
+            log.info("None of the %d students could be enrolled in %s",
+                     len(student_emails), self.name)
+            return {email: False for email in student_emails}
+
+        for course in self.get_courses():
+            if str(course.id) in exclude_courses:
+                continue
+
+            # Allow every student to enroll, including ones that haven't
+            # been registered yet
+            course_enrollments_allowed = CourseEnrollmentAllowed.objects.filter(
+                course_id=course.id, email__in=student_emails)
+            emails_allowed = set(
+                course_enrollments_allowed.values_list('email', flat=True))
+            course_enrollments_allowed.filter(
+                auto_enroll=False).update(auto_enroll=True)
+            CourseEnrollmentAllowed.objects.bulk_create([
+                CourseEnrollmentAllowed(
+                    course_id=course.id, email=email, auto_enroll=True)
+                for email in student_emails - emails_allowed
+            ])
+
+            CourseEnrollment.bulk_enroll(students, course.id, mode='honor')
+
+        self.enrolled_students.add(*students)
+
+        enrolled_emails = set(self.enrolled_students.filter(
+            email__in=student_emails).values_list('email', flat=True))
+        for email in student_emails - enrolled_emails:
+            log.info("Failed to enroll %s in %s", email, self.name)
+        log.info("%d students were enrolled in %s",
+                 len(enrolled_emails), self.name)
+
+        return {email: email in enrolled_emails for email in student_emails}
+
     def unenroll_student_from_program(self, student):
         """
         Unenroll a student from a program.
@@ -434,3 +553,33 @@ class ProgramCourseCode(TimeStampedModel):
 
     def __unicode__(self):
         return unicode(self.course_code)
+
+
+@receiver([post_save, post_delete], sender=ProgramCourseCode)
+def clear_program_structure_of_program_course_code(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remove the cached structure of a program when its modules change
+    """
+    Program.clear_program_structures([instance.program_id])
+
+
+@receiver(post_save, sender=CourseCode)
+def clear_program_structures_of_course_code(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remove the cached structures of the programs of a course code when
+    its key changes
+    """
+    Program.clear_program_structures(
+        ProgramCourseCode.objects.filter(course_code=instance).values_list('program_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=CourseOverview)
+def clear_program_structures_of_course_overview(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remove the cached structures of the programs containing a course
+    when its overview changes
+    """
+    course_code_key = u'+'.join([instance.id.org, instance.id.course, instance.id.run])
+    Program.clear_program_structures(
+        ProgramCourseCode.objects.filter(
+            course_code__key=course_code_key).values_list('program_id', flat=True))
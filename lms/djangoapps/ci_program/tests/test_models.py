@@ -0,0 +1,100 @@
+"""
+Tests for the ci_program models.
+"""
+from django.core.cache import cache
+from mock import patch
+
+from ci_program.models import CourseCode, Program, ProgramCourseCode
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
+
+
+class ProgramStructureTest(SharedModuleStoreTestCase):
+    """
+    Tests for the cached structure of a program.
+    """
+    ENABLED_CACHES = ['default']
+
+    @classmethod
+    def setUpClass(cls):
+        super(ProgramStructureTest, cls).setUpClass()
+        cls.courses = [
+            CourseFactory.create(org='CI', course='HF101', run='2017_T1'),
+            CourseFactory.create(org='CI', course='PF101', run='2017_T1'),
+        ]
+
+    def setUp(self):
+        super(ProgramStructureTest, self).setUp()
+        self.course_overviews = [CourseOverview.get_from_id(course.id) for course in self.courses]
+        self.program = Program.objects.create(name='Test Program', program_code='TP')
+        self.program_course_codes = [
+            ProgramCourseCode.objects.create(
+                program=self.program,
+                course_code=CourseCode.objects.create(key='CI+{}+2017_T1'.format(code), display_name=code),
+                position=position,
+            )
+            for position, code in enumerate(['HF101', 'PF101'])
+        ]
+
+    def _assert_courses(self, courses, num_queries):
+        """
+        Assert that the courses of the program are read with the given
+        number of queries and that they are the expected courses.
+        """
+        with self.assertNumQueries(num_queries):
+            course_overviews = self.program.get_courses()
+        self.assertEqual(
+            [course_overview.id for course_overview in course_overviews],
+            [course.id for course in courses],
+        )
+        return course_overviews
+
+    def test_cache_miss_and_hit(self):
+        course_overviews = self._assert_courses(self.courses, 2)
+        cached_course_overviews = self._assert_courses(self.courses, 0)
+
+        self.assertEqual(
+            [course_overview.display_name for course_overview in cached_course_overviews],
+            [course_overview.display_name for course_overview in course_overviews],
+        )
+        self.assertIsNot(cached_course_overviews[0], course_overviews[0])
+        self.assertFalse(cached_course_overviews[0]._state.adding)  # pylint: disable=protected-access
+        with self.assertNumQueries(0):
+            self.assertEqual(self.program.get_course_locators(), [course.id for course in self.courses])
+
+    def test_only_field_values_cached(self):
+        self.program.get_courses()
+
+        cached_structure = cache.get(Program.program_structure_cache_key(self.program.id))
+        self.assertEqual(cached_structure['locators'], [unicode(course.id) for course in self.courses])
+        for course, field_values in zip(self.courses, cached_structure['course_overviews']):
+            self.assertFalse(any(isinstance(value, CourseOverview) for value in field_values))
+            self.assertIn(unicode(course.id), field_values)
+
+    def test_cache_key_version(self):
+        self._assert_courses(self.courses, 2)
+        with patch('ci_program.models.PROGRAM_STRUCTURE_VERSION', 0):
+            self._assert_courses(self.courses, 2)
+        with patch.object(CourseOverview, 'VERSION', 0):
+            self._assert_courses(self.courses, 2)
+
+    def test_invalidated_by_program_course_code(self):
+        self._assert_courses(self.courses, 2)
+        self.program_course_codes[0].delete()
+        self._assert_courses(self.courses[1:], 2)
+
+    def test_invalidated_by_course_code(self):
+        self._assert_courses(self.courses, 2)
+        course_code = self.program_course_codes[1].course_code
+        course_code.key = 'CI+HF101+2017_T1'
+        course_code.save()
+        self._assert_courses([self.courses[0], self.courses[0]], 2)
+
+    def test_invalidated_by_course_overview(self):
+        self._assert_courses(self.courses, 2)
+        self.course_overviews[0].display_name = 'Changed Display Name'
+        self.course_overviews[0].save()
+
+        course_overviews = self._assert_courses(self.courses, 2)
+        self.assertEqual(course_overviews[0].display_name, 'Changed Display Name')
@@ -27,6 +27,7 @@ from xmodule.modulestore.inheritance import InheritanceMixin
 NOTSET = object()
 ENABLED_OVERRIDE_PROVIDERS_KEY = u'courseware.field_overrides.enabled_providers.{course_id}'
 ENABLED_MODULESTORE_OVERRIDE_PROVIDERS_KEY = u'courseware.modulestore_field_overrides.enabled_providers.{course_id}'
+RESOLVED_OVERRIDES_CACHE = u'courseware.field_overrides.resolved'
 
 
 def resolve_dotted(name):
@@ -89,6 +90,15 @@ def overrides_disabled():
     return bool(_OVERRIDES_DISABLED.disabled)
 
 
+def clear_resolved_overrides():
+    """
+    Forgets the overrides resolved by `OverrideFieldData` during the current
+    request.  Must be called by the APIs which set or clear overrides, so that
+    the new values are seen by the rest of the request.
+    """
+    RequestCache.get_request_cache(RESOLVED_OVERRIDES_CACHE).clear()
+
+
 class FieldOverrideProvider(object):
     """
     Abstract class which defines the interface that a `FieldOverrideProvider`
@@ -197,18 +207,79 @@ class OverrideFieldData(FieldData):
     def __init__(self, user, fallback, providers):
         self.fallback = fallback
         self.providers = tuple(provider(user) for provider in providers)
+        # The overrides resolved for a block only depend on the user and on the
+        # providers, so they're shared by all the instances for them in the request.
+        self._resolved_overrides_key = (
+            type(self).__name__, getattr(user, 'id', None), tuple(providers)
+        )
+
+    def _resolved_overrides(self):
+        """
+        Returns the dictionary of the overrides resolved during the current request
+        for the user and providers of this instance, keyed by (location, field name)
+        for the direct overrides and by (location, field name, True) for the
+        overrides inherited from the ancestors.
+        """
+        return RequestCache.get_request_cache(RESOLVED_OVERRIDES_CACHE).setdefault(
+            self._resolved_overrides_key, {}
+        )
 
     def get_override(self, block, name):
         """
         Checks for an override for the field identified by `name` in `block`.
         Returns the overridden value or `NOTSET` if no override is found.
         """
-        if not overrides_disabled():
-            for provider in self.providers:
-                value = provider.get(block, name, NOTSET)
+        if overrides_disabled():
+            return NOTSET
+
+        location = getattr(block, 'location', None)
+        if location is None:
+            return self._get_provider_override(block, name)
+
+        resolved = self._resolved_overrides()
+        value = resolved.get((location, name), NOTSET)
+        if value is NOTSET and (location, name) not in resolved:
+            value = resolved[(location, name)] = self._get_provider_override(block, name)
+        return value
+
+    def _get_provider_override(self, block, name):
+        """
+        Asks the providers, in order, for an override for the field identified by
+        `name` in `block`.  Returns the first one found or `NOTSET`.
+        """
+        for provider in self.providers:
+            value = provider.get(block, name, NOTSET)
+            if value is not NOTSET:
+                return value
+        return NOTSET
+
+    def get_inherited_override(self, block, name):
+        """
+        Checks for an override for the field identified by `name` in the
+        ancestors of `block`, starting with its immediate parent.  Returns the
+        overridden value of the closest ancestor or `NOTSET` if no override is found.
+        """
+        if overrides_disabled():
+            return NOTSET
+
+        location = getattr(block, 'location', None)
+        if location is None:
+            for ancestor in _lineage(block):
+                value = self.get_override(ancestor, name)
                 if value is not NOTSET:
                     return value
-        return NOTSET
+            return NOTSET
+
+        resolved = self._resolved_overrides()
+        value = resolved.get((location, name, True), NOTSET)
+        if value is NOTSET and (location, name, True) not in resolved:
+            parent = block.get_parent()
+            if parent:
+                value = self.get_override(parent, name)
+                if value is NOTSET:
+                    value = self.get_inherited_override(parent, name)
+            resolved[(location, name, True)] = value
+        return value
 
     def get(self, block, name):
         value = self.get_override(block, name)
@@ -232,10 +303,8 @@ class OverrideFieldData(FieldData):
             # then we want to return False here, so the field_data uses the
             # override and not the original value for this block.
             inheritable = InheritanceMixin.fields.keys()
-            if name in inheritable:
-                for ancestor in _lineage(block):
-                    if self.get_override(ancestor, name) is not NOTSET:
-                        return False
+            if name in inheritable and self.get_inherited_override(block, name) is not NOTSET:
+                return False
 
         return has is not NOTSET or self.fallback.has(block, name)
 
@@ -248,10 +317,9 @@ class OverrideFieldData(FieldData):
         if self.providers and not overrides_disabled():
             inheritable = InheritanceMixin.fields.keys()
             if name in inheritable:
-                for ancestor in _lineage(block):
-                    value = self.get_override(ancestor, name)
-                    if value is not NOTSET:
-                        return value
+                value = self.get_inherited_override(block, name)
+                if value is not NOTSET:
+                    return value
         return self.fallback.default(block, name)
 
 
@@ -0,0 +1,126 @@
+"""
+Copy the user state of XBlocks from StudentModule into the shards of ShardedXBlockUserStateClient.
+"""
+import itertools
+import logging
+from collections import defaultdict
+from operator import attrgetter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.models import ShardedStudentModule, StudentModule
+from courseware.user_state_client import get_student_module_shard
+
+log = logging.getLogger(__name__)
+
+
+def copy_to_shards(student_modules, overwrite=False):
+    """
+    Copy the state of the given StudentModules into ShardedStudentModules, in their shards.
+
+    The states which have already been copied are only overwritten (if they differ) when
+    ``overwrite`` is True. Returns the number of states copied and of states overwritten.
+    """
+    by_shard = defaultdict(list)
+    for student_module in student_modules:
+        by_shard[get_student_module_shard(student_module.student_id, student_module.course_id)].append(student_module)
+
+    num_copied = num_overwritten = 0
+    for shard, shard_student_modules in by_shard.items():
+        existing = {}
+        course_key_func = attrgetter('course_id')
+        for course_key, course_student_modules in itertools.groupby(
+                sorted(shard_student_modules, key=course_key_func), course_key_func
+        ):
+            course_student_modules = list(course_student_modules)
+            copies = ShardedStudentModule.objects.using(shard).filter(
+                course_id=course_key,
+                student_id__in=set(student_module.student_id for student_module in course_student_modules),
+                module_state_key__in=set(student_module.module_state_key for student_module in course_student_modules),
+            )
+            for copy in copies:
+                existing[(copy.student_id, course_key, copy.module_state_key)] = copy
+
+        new_copies = []
+        with transaction.atomic(using=shard):
+            for student_module in shard_student_modules:
+                copy = existing.get(
+                    (student_module.student_id, student_module.course_id, student_module.module_state_key)
+                )
+                if copy is None:
+                    new_copies.append(ShardedStudentModule(
+                        student_id=student_module.student_id,
+                        course_id=student_module.course_id,
+                        module_state_key=student_module.module_state_key,
+                        module_type=student_module.module_type,
+                        state=student_module.state,
+                    ))
+                elif overwrite and copy.state != student_module.state:
+                    copy.state = student_module.state
+                    copy.save(using=shard)
+                    num_overwritten += 1
+            ShardedStudentModule.objects.db_manager(shard).bulk_create(new_copies)
+        num_copied += len(new_copies)
+
+    return num_copied, num_overwritten
+
+
+# To run from command line: ./manage.py lms backfill_sharded_student_modules course-v1:org+course+run
+
+
+class Command(BaseCommand):
+    """Copy the user state of XBlocks into the shards of ShardedXBlockUserStateClient"""
+    help = '''
+    Copy the Scope.user_state of XBlocks from courseware_studentmodule into the ShardedStudentModule
+    tables of the databases of settings.STUDENT_MODULE_SHARDS, before setting
+    XBLOCK_USER_STATE_CLIENT to courseware.user_state_client.ShardedXBlockUserStateClient.
+    Takes the course ids of the courses to copy the state of (all the courses by default).
+    States which have already been copied are kept unless --overwrite is given, so the command
+    can be run again after an interruption (with --start-id to skip the rows already copied).
+    The copies are timestamped with the time they're made.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_keys', nargs='*', help="IDs of the courses to copy the state of")
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help="Number of StudentModules to copy per batch"
+        )
+        parser.add_argument(
+            '--start-id', type=int, default=0, help="Only copy the StudentModules with greater ids than this"
+        )
+        parser.add_argument(
+            '--overwrite', action='store_true', help="Overwrite the copies which differ from their StudentModule"
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        try:
+            course_keys = [CourseKey.from_string(course_key) for course_key in options['course_keys']]
+        except InvalidKeyError:
+            raise CommandError("Invalid course key.")
+        if options['batch_size'] <= 0:
+            raise CommandError("The batch size must be positive.")
+
+        query = StudentModule.objects.filter(state__isnull=False).order_by('id')
+        if course_keys:
+            query = query.filter(course_id__in=course_keys)
+
+        last_id = options['start_id']
+        num_copied = num_overwritten = 0
+        while True:
+            student_modules = list(query.filter(id__gt=last_id)[:options['batch_size']])
+            if not student_modules:
+                break
+            last_id = student_modules[-1].id
+
+            batch_copied, batch_overwritten = copy_to_shards(student_modules, options['overwrite'])
+            num_copied += batch_copied
+            num_overwritten += batch_overwritten
+            log.info("Copied the StudentModules up to id %d.", last_id)
+
+        self.stdout.write("Copied {} and overwrote {} states, up to StudentModule {}.".format(
+            num_copied, num_overwritten, last_id
+        ))
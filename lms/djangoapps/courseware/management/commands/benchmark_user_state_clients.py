@@ -0,0 +1,200 @@
+"""
+Compare the single table and the sharded XBlockUserStateClient backends on a synthetic fixture.
+"""
+import itertools
+import json
+import logging
+import random
+from time import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+
+from courseware.management.commands.backfill_sharded_student_modules import copy_to_shards
+from courseware.models import ShardedStudentModule, StudentModule
+from courseware.user_state_client import DjangoXBlockUserStateClient, ShardedXBlockUserStateClient
+
+log = logging.getLogger(__name__)
+
+# Prefix of the usernames and course orgs of the fixture, so that it can be found again and removed.
+FIXTURE_PREFIX = 'user_state_benchmark'
+
+# Number of rows inserted per query while creating the fixture.
+FIXTURE_BATCH_SIZE = 1000
+
+
+# To run from command line, against databases dedicated to it:
+#     ./manage.py lms benchmark_user_state_clients --users 20000 --courses 10 --blocks 10
+
+
+class Command(BaseCommand):
+    """Benchmark the XBlockUserStateClient backends"""
+    help = '''
+    Create a synthetic fixture of users * courses * blocks StudentModules (reused if it already
+    exists), copy it into the shards of settings.STUDENT_MODULE_SHARDS, and time get_many, set_many
+    and full course scans with DjangoXBlockUserStateClient and ShardedXBlockUserStateClient.
+    This writes to the databases, so only run it against databases dedicated to benchmarking.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20000, help="Number of users of the fixture")
+        parser.add_argument('--courses', type=int, default=10, help="Number of courses of the fixture")
+        parser.add_argument('--blocks', type=int, default=10, help="Number of blocks per course of the fixture")
+        parser.add_argument(
+            '--samples', type=int, default=200, help="Number of (user, course) pairs to time get_many and set_many on"
+        )
+        parser.add_argument('--cleanup', action='store_true', help="Delete the fixture at the end")
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        if min(options['users'], options['courses'], options['blocks'], options['samples']) <= 0:
+            raise CommandError("The sizes of the fixture and the number of samples must be positive.")
+
+        course_keys = [
+            CourseLocator(FIXTURE_PREFIX, 'course{}'.format(index), 'run') for index in xrange(options['courses'])
+        ]
+        block_keys = {
+            course_key: [
+                BlockUsageLocator(course_key, 'problem', 'problem{}'.format(index))
+                for index in xrange(options['blocks'])
+            ]
+            for course_key in course_keys
+        }
+
+        with self.timer('fixture') as timing:
+            users = self.create_fixture(options['users'], block_keys)
+        self.report('create fixture (StudentModule)', timing)
+
+        with self.timer('backfill') as timing:
+            self.backfill(course_keys)
+        self.report('backfill (ShardedStudentModule)', timing)
+
+        samples = [(random.choice(users), random.choice(course_keys)) for __ in xrange(options['samples'])]
+        for client_class in (DjangoXBlockUserStateClient, ShardedXBlockUserStateClient):
+            client = client_class()
+            name = client_class.__name__
+
+            with self.timer('get_many') as timing:
+                for user, course_key in samples:
+                    list(client.get_many(user.username, block_keys[course_key]))
+            self.report('{} get_many'.format(name), timing, len(samples))
+
+            with self.timer('set_many') as timing:
+                for user, course_key in samples:
+                    client.set_many(
+                        user.username,
+                        {block_key: {'attempts': random.randint(1, 10)} for block_key in block_keys[course_key]}
+                    )
+            self.report('{} set_many'.format(name), timing, len(samples))
+
+        # DjangoXBlockUserStateClient doesn't implement iter_all_for_course, so scan its table directly.
+        with self.timer('scan') as timing:
+            for student_module in StudentModule.objects.filter(course_id=course_keys[0]).iterator():
+                json.loads(student_module.state)
+        self.report('StudentModule course scan', timing)
+        with self.timer('scan') as timing:
+            for __ in ShardedXBlockUserStateClient().iter_all_for_course(course_keys[0]):
+                pass
+        self.report('ShardedXBlockUserStateClient iter_all_for_course', timing)
+
+        if options['cleanup']:
+            self.delete_fixture(course_keys)
+
+    def timer(self, name):
+        """
+        Return a context manager recording the duration of its block.
+        """
+        return _Timer(name)
+
+    def report(self, description, timing, count=None):
+        """
+        Output the duration of a timed phase, and the average duration per operation.
+        """
+        line = "{}: {:.3f}s".format(description, timing.duration)
+        if count:
+            line += " ({:.2f}ms per call)".format(timing.duration * 1000 / count)
+        self.stdout.write(line)
+
+    def create_fixture(self, num_users, block_keys):
+        """
+        Create the users and StudentModules of the fixture which don't exist yet, and return the users.
+        """
+        existing_usernames = set(
+            User.objects.filter(username__startswith=FIXTURE_PREFIX).values_list('username', flat=True)
+        )
+        usernames = ['{}_{}'.format(FIXTURE_PREFIX, index) for index in xrange(num_users)]
+        new_users = [
+            User(username=username, email='{}@example.com'.format(username))
+            for username in usernames if username not in existing_usernames
+        ]
+        for index in xrange(0, len(new_users), FIXTURE_BATCH_SIZE):
+            User.objects.bulk_create(new_users[index:index + FIXTURE_BATCH_SIZE])
+        users = list(User.objects.filter(username__in=usernames))
+
+        for course_key, course_block_keys in block_keys.items():
+            with_state = set(
+                StudentModule.objects.filter(course_id=course_key).values_list('student_id', flat=True).distinct()
+            )
+            new_student_modules = (
+                StudentModule(
+                    student_id=user.id,
+                    course_id=course_key,
+                    module_state_key=block_key,
+                    module_type=block_key.block_type,
+                    state=json.dumps({'attempts': random.randint(1, 10), 'seed': random.random()}),
+                )
+                for user in users if user.id not in with_state
+                for block_key in course_block_keys
+            )
+            while True:
+                batch = list(itertools.islice(new_student_modules, FIXTURE_BATCH_SIZE))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    StudentModule.objects.bulk_create(batch)
+            log.info("Created the fixture of course %s.", course_key)
+        return users
+
+    def backfill(self, course_keys):
+        """
+        Copy the StudentModules of the fixture into the shards.
+        """
+        query = StudentModule.objects.filter(course_id__in=course_keys).order_by('id')
+        last_id = 0
+        while True:
+            student_modules = list(query.filter(id__gt=last_id)[:FIXTURE_BATCH_SIZE])
+            if not student_modules:
+                break
+            last_id = student_modules[-1].id
+            copy_to_shards(student_modules)
+
+    def delete_fixture(self, course_keys):
+        """
+        Delete the users and state of the fixture.
+        """
+        for course_key in course_keys:
+            StudentModule.objects.filter(course_id=course_key).delete()
+            # pylint: disable=protected-access
+            for shard in ShardedXBlockUserStateClient()._get_course_shards(course_key):
+                ShardedStudentModule.objects.using(shard).filter(course_id=course_key).delete()
+        User.objects.filter(username__startswith=FIXTURE_PREFIX).delete()
+
+
+class _Timer(object):
+    """
+    Context manager recording the duration of its block, in seconds.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.duration = None
+        self._start = None
+
+    def __enter__(self):
+        self._start = time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time() - self._start
+        log.info("%s took %.3fs", self.name, self.duration)
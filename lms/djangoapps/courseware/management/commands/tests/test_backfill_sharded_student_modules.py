@@ -0,0 +1,91 @@
+"""
+Tests for the backfill_sharded_student_modules management command
+"""
+import json
+
+from django.conf import settings
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+
+from courseware.models import ShardedStudentModule
+from courseware.tests.factories import StudentModuleFactory, UserFactory
+from courseware.user_state_client import ShardedXBlockUserStateClient
+
+
+class TestBackfillShardedStudentModules(TestCase):
+    """
+    Tests for the backfill_sharded_student_modules management command
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestBackfillShardedStudentModules, self).setUp()
+        self.user = UserFactory.create()
+        self.block_keys = [
+            BlockUsageLocator(CourseLocator('org', 'course_{}'.format(index), 'run'), 'problem', 'problem')
+            for index in range(4)
+        ]
+        self.student_modules = [
+            StudentModuleFactory.create(
+                student=self.user,
+                course_id=block_key.course_key,
+                module_state_key=block_key,
+                state=json.dumps({'index': index}),
+            )
+            for index, block_key in enumerate(self.block_keys)
+        ]
+        # A StudentModule with only a score isn't copied
+        StudentModuleFactory.create(
+            student=self.user,
+            course_id=self.block_keys[0].course_key,
+            module_state_key=self.block_keys[0].replace(block_id='other'),
+        )
+
+    def get_states(self):
+        """
+        Return the states stored by the sharded backend for the blocks of the StudentModules.
+        """
+        client = ShardedXBlockUserStateClient()
+        return {state.block_key: state.state for state in client.get_many(self.user.username, self.block_keys)}
+
+    def count_copies(self):
+        """
+        Return the number of ShardedStudentModules in all the shards.
+        """
+        return sum(
+            ShardedStudentModule.objects.using(shard).count() for shard in settings.STUDENT_MODULE_SHARDS
+        )
+
+    def test_invalid_course_key(self):
+        with self.assertRaisesRegexp(CommandError, "Invalid course key."):
+            call_command('backfill_sharded_student_modules', 'not a course key')
+
+    def test_backfill(self):
+        call_command('backfill_sharded_student_modules', batch_size=3)
+        self.assertEqual(self.count_copies(), len(self.block_keys))
+        self.assertEqual(
+            self.get_states(), {block_key: {'index': index} for index, block_key in enumerate(self.block_keys)}
+        )
+
+    def test_backfill_courses(self):
+        call_command('backfill_sharded_student_modules', unicode(self.block_keys[1].course_key))
+        self.assertEqual(self.get_states(), {self.block_keys[1]: {'index': 1}})
+
+    def test_backfill_again(self):
+        call_command('backfill_sharded_student_modules')
+        ShardedXBlockUserStateClient().set_many(self.user.username, {self.block_keys[0]: {'index': 10}})
+        self.student_modules[1].state = json.dumps({'index': 11})
+        self.student_modules[1].save()
+
+        # The copies are kept
+        call_command('backfill_sharded_student_modules')
+        self.assertEqual(self.count_copies(), len(self.block_keys))
+        self.assertEqual(self.get_states()[self.block_keys[0]], {'index': 10})
+        self.assertEqual(self.get_states()[self.block_keys[1]], {'index': 1})
+
+        # unless they're overwritten
+        call_command('backfill_sharded_student_modules', overwrite=True)
+        self.assertEqual(self.get_states()[self.block_keys[0]], {'index': 0})
+        self.assertEqual(self.get_states()[self.block_keys[1]], {'index': 11})
@@ -4,6 +4,7 @@ Middleware for the courseware app
 
 from django.shortcuts import redirect
 
+from courseware.models import bump_pending_user_state_generations
 from lms.djangoapps.courseware.exceptions import Redirect
 
 
@@ -17,3 +18,16 @@ class RedirectMiddleware(object):
         """
         if isinstance(exception, Redirect):
             return redirect(exception.url)
+
+
+class UserStateGenerationMiddleware(object):
+    """
+    Start new generations of the user states written by a request, once its transaction
+    (see ATOMIC_REQUESTS) is over.
+    """
+    def process_response(self, _request, response):
+        """
+        Bump the generations of the user states written by the request.
+        """
+        bump_pending_user_state_generations()
+        return response
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.conf import settings
+from openedx.core.djangoapps.xmodule_django.models import CourseKeyField, LocationKeyField
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courseware', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardedStudentModule',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('module_type', models.CharField(max_length=32, db_index=True)),
+                ('module_state_key', LocationKeyField(max_length=255, db_column=b'module_id')),
+                ('course_id', CourseKeyField(max_length=255, db_index=True)),
+                ('state', models.TextField(null=True, blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True, db_index=True)),
+                ('student', models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=django.db.models.deletion.DO_NOTHING, db_constraint=False)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='shardedstudentmodule',
+            unique_together=set([('student', 'course_id', 'module_state_key')]),
+        ),
+    ]
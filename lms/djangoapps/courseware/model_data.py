@@ -27,6 +27,8 @@ from abc import ABCMeta, abstractmethod
 from collections import defaultdict, namedtuple
 
 from contracts import contract, new_contract
+from django.conf import settings
+from django.core.cache import cache
 from django.db import DatabaseError
 from opaque_keys.edx.asides import AsideUsageKeyV1, AsideUsageKeyV2
 from opaque_keys.edx.block_types import BlockTypeKeyV1
@@ -36,10 +38,17 @@ from xblock.exceptions import InvalidScopeError, KeyValueMultiSaveError
 from xblock.fields import Scope, UserScope
 from xblock.runtime import KeyValueStore
 
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import get_user_state_client
 from xmodule.modulestore.django import modulestore
 
-from .models import StudentModule, XModuleStudentInfoField, XModuleStudentPrefsField, XModuleUserStateSummaryField
+from .models import (
+    StudentModule,
+    XModuleStudentInfoField,
+    XModuleStudentPrefsField,
+    XModuleUserStateSummaryField,
+    bump_user_state_generation,
+    get_user_state_generation,
+)
 
 log = logging.getLogger(__name__)
 
@@ -344,12 +353,24 @@ class DjangoOrmFieldCache(object):
 class UserStateCache(object):
     """
     Cache for Scope.user_state xblock field data.
+
+    If the ENABLE_USER_STATE_CACHE feature is enabled, the state loaded from the
+    XBlockUserStateClient is also kept in the django cache between requests, for
+    USER_STATE_CACHE_TIMEOUT seconds, under the current generation of the state of the
+    user in the course (see get_user_state_generation). Every write of that state starts
+    a new generation, so repeated page views are served from the cache until the state changes.
     """
     def __init__(self, user, course_id):
         self._cache = defaultdict(dict)
         self.course_id = course_id
         self.user = user
-        self._client = DjangoXBlockUserStateClient(self.user)
+        self._client = get_user_state_client(self.user)
+
+    def _shared_cache_key(self, generation, usage_key):
+        """
+        Return the key of the state of ``usage_key`` of the ``generation`` in the django cache.
+        """
+        return u'courseware.user_state.{}.{}.{}'.format(self.user.id, generation, usage_key)
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
@@ -361,13 +382,42 @@ class UserStateCache(object):
             xblocks (list of :class:`XBlock`): XBlocks to cache fields for.
             aside_types (list of str): Aside types to cache fields for.
         """
+        usage_keys = _all_usage_keys(xblocks, aside_types)
+
+        shared_cache_keys = None
+        if settings.FEATURES.get('ENABLE_USER_STATE_CACHE'):
+            generation = get_user_state_generation(self.user.id, self.course_id)
+            shared_cache_keys = {
+                usage_key: self._shared_cache_key(generation, usage_key) for usage_key in usage_keys
+            }
+            shared_states = cache.get_many(shared_cache_keys.values())
+            missing_usage_keys = set()
+            for usage_key, shared_cache_key in shared_cache_keys.items():
+                if shared_cache_key not in shared_states:
+                    missing_usage_keys.add(usage_key)
+                # An empty state is cached for the blocks without state.
+                elif shared_states[shared_cache_key]:
+                    self._cache[usage_key] = shared_states[shared_cache_key]
+            usage_keys = missing_usage_keys
+            if not usage_keys:
+                return
+
         block_field_state = self._client.get_many(
             self.user.username,
-            _all_usage_keys(xblocks, aside_types),
+            usage_keys,
         )
         for user_state in block_field_state:
             self._cache[user_state.block_key] = user_state.state
 
+        if shared_cache_keys is not None:
+            cache.set_many(
+                {
+                    shared_cache_keys[usage_key]: self._cache.get(usage_key, {})
+                    for usage_key in usage_keys
+                },
+                settings.USER_STATE_CACHE_TIMEOUT,
+            )
+
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def set(self, kvs_key, value):
         """
@@ -423,6 +473,7 @@ class UserStateCache(object):
             raise KeyValueMultiSaveError([])
         finally:
             self._cache.update(pending_updates)
+            bump_user_state_generation(self.user.id, self.course_id)
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def get(self, kvs_key):
@@ -461,6 +512,7 @@ class UserStateCache(object):
             raise KeyError(kvs_key.field_name)
 
         self._client.delete(self.user.username, cache_key, fields=[kvs_key.field_name])
+        bump_user_state_generation(self.user.id, self.course_id)
         del field_state[kvs_key.field_name]
 
     @contract(kvs_key=DjangoKeyValueStore.Key, returns=bool)
@@ -988,6 +1040,30 @@ class ScoresClient(object):
         client.fetch_scores(scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_id, user_ids, scorable_locations):
+        """
+        Create a ScoresClient for each of the given users, with pre-fetched
+        data for the given locations, using a single query.
+
+        Returns a dict of user_id to ScoresClient.
+        """
+        clients = {user_id: cls(course_id, user_id) for user_id in user_ids}
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_id,
+            module_state_key__in=set(scorable_locations),
+        )
+        for user_id, location, correct, total, created in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade', 'created'
+        ):
+            clients[user_id]._locations_to_scores[  # pylint: disable=protected-access
+                UsageKey.from_string(location).map_into_course(course_id)
+            ] = cls.Score(correct, total, created)
+        for client in clients.itervalues():
+            client._has_fetched = True  # pylint: disable=protected-access
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
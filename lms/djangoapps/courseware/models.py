@@ -14,11 +14,15 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 """
 import itertools
 import logging
+import threading
+from uuid import uuid4
 
+from celery.signals import task_postrun
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import connections, models
+from django.db.models.signals import post_delete, post_save
 from model_utils.models import TimeStampedModel
 
 import coursewarehistoryextended
@@ -236,6 +240,132 @@ class StudentModuleHistory(BaseStudentModuleHistory):
         post_save.connect(save_history, sender=StudentModule)
 
 
+class ShardedStudentModule(models.Model):
+    """
+    Keeps student state for a particular module in a particular course, in one of the
+    databases of settings.STUDENT_MODULE_SHARDS. Used by ShardedXBlockUserStateClient;
+    scores are still kept in StudentModule.
+    """
+    objects = ChunkingManager()
+
+    class Meta(object):
+        app_label = "courseware"
+        unique_together = (('student', 'course_id', 'module_state_key'),)
+
+    module_type = models.CharField(max_length=32, db_index=True)
+    module_state_key = LocationKeyField(max_length=255, db_column='module_id')
+    # The users are in the default database, so this can't be a database constraint.
+    student = models.ForeignKey(User, db_constraint=False, on_delete=models.DO_NOTHING)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # Internal state of the object
+    state = models.TextField(null=True, blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __repr__(self):
+        return 'ShardedStudentModule<%r>' % ({
+            'course_id': self.course_id,
+            'module_type': self.module_type,
+            'student_id': self.student_id,
+            'module_state_key': self.module_state_key,
+            'state': str(self.state)[:20],
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+
+def _user_state_generation_key(user_id, course_id):
+    """
+    Return the cache key of the generation of the user state of ``user_id`` in ``course_id``.
+    """
+    return u'courseware.user_state_generation.{}.{}'.format(user_id, course_id)
+
+
+def get_user_state_generation(user_id, course_id):
+    """
+    Return the current generation of the user state of the user with id ``user_id`` in
+    the course ``course_id``, which changes whenever that state is written.
+
+    Generations are random rather than incremented, so that a generation lost from the
+    cache is never reused.
+    """
+    key = _user_state_generation_key(user_id, course_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+class _PendingUserStateGenerations(threading.local):
+    """
+    The users and courses whose user state was written by the transactions in progress
+    in the current thread.
+    """
+    def __init__(self):
+        super(_PendingUserStateGenerations, self).__init__()
+        self.keys = set()
+
+
+_PENDING_USER_STATE_GENERATIONS = _PendingUserStateGenerations()
+
+
+def bump_user_state_generation(user_id, course_id):
+    """
+    Start a new generation of the user state of the user with id ``user_id`` in the
+    course ``course_id``, invalidating the state cached for the previous one.
+
+    Inside a transaction, other requests don't see the write until it's committed, and
+    may meanwhile cache the state they read under the new generation. So another
+    generation is started once the transaction is over, by
+    :func:`bump_pending_user_state_generations`.
+    """
+    if not settings.FEATURES.get('ENABLE_USER_STATE_CACHE'):
+        return
+    cache.set(_user_state_generation_key(user_id, course_id), uuid4().hex, None)
+    if any(connection.in_atomic_block for connection in connections.all()):
+        _PENDING_USER_STATE_GENERATIONS.keys.add((user_id, course_id))
+
+
+def bump_pending_user_state_generations():
+    """
+    Start new generations of the user states written by the transactions of the current
+    thread, which must all be over (committed or rolled back).
+    """
+    pending_keys = _PENDING_USER_STATE_GENERATIONS.keys
+    if not pending_keys:
+        return
+    _PENDING_USER_STATE_GENERATIONS.keys = set()
+    cache.set_many(
+        {_user_state_generation_key(user_id, course_id): uuid4().hex for user_id, course_id in pending_keys},
+        None,
+    )
+
+
+@task_postrun.connect
+def bump_user_state_generations_after_task(**kwargs):  # pylint: disable=unused-argument
+    """
+    Once a celery task completes, start new generations of the user states it wrote.
+    """
+    bump_pending_user_state_generations()
+
+
+def bump_user_state_generation_for_student_module(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the cached user state when a StudentModule is written, whoever writes it.
+    """
+    bump_user_state_generation(instance.student_id, instance.course_id)
+
+
+post_save.connect(bump_user_state_generation_for_student_module, sender=StudentModule)
+post_delete.connect(bump_user_state_generation_for_student_module, sender=StudentModule)
+post_save.connect(bump_user_state_generation_for_student_module, sender=ShardedStudentModule)
+post_delete.connect(bump_user_state_generation_for_student_module, sender=ShardedStudentModule)
+
+
 class XBlockFieldBase(models.Model):
     """
     Base class for all XBlock field storage.
@@ -4,9 +4,13 @@ by the individual due dates feature.
 """
 import json
 
-from .field_overrides import FieldOverrideProvider
+from request_cache.middleware import RequestCache
+
+from .field_overrides import FieldOverrideProvider, clear_resolved_overrides
 from .models import StudentFieldOverride
 
+STUDENT_OVERRIDES_CACHE = u'courseware.student_field_overrides'
+
 
 class IndividualStudentOverrideProvider(FieldOverrideProvider):
     """
@@ -43,19 +47,45 @@ def _get_overrides_for_user(user, block):
     Gets all of the individual student overrides for given user and block.
     Returns a dictionary of field override values keyed by field name.
     """
-    query = StudentFieldOverride.objects.filter(
-        course_id=block.runtime.course_id,
-        location=block.location,
-        student_id=user.id,
-    )
+    course_overrides = _get_course_overrides_for_user(user, block.runtime.course_id)
+    # Match the locations as they're serialized in the database, without version nor branch.
+    location = unicode(block.location.version_agnostic().for_branch(None))
     overrides = {}
-    for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
+    for name, serialized_value in course_overrides.get(location, {}).iteritems():
+        field = block.fields[name]
+        overrides[name] = field.from_json(json.loads(serialized_value))
     return overrides
 
 
+def _get_course_overrides_for_user(user, course_id):
+    """
+    Gets all of the individual student overrides for given user in the course,
+    with a single query per request.  Returns a dictionary mapping the serialized
+    locations of the blocks to dictionaries of serialized override values keyed by field name.
+    """
+    overrides_cache = RequestCache.get_request_cache(STUDENT_OVERRIDES_CACHE)
+    cache_key = (course_id, user.id)
+    if cache_key not in overrides_cache:
+        course_overrides = {}
+        query = StudentFieldOverride.objects.filter(
+            course_id=course_id,
+            student_id=user.id,
+        )
+        for override in query:
+            course_overrides.setdefault(unicode(override.location), {})[override.field] = override.value
+        overrides_cache[cache_key] = course_overrides
+    return overrides_cache[cache_key]
+
+
+def _clear_course_overrides_for_user(user, block):
+    """
+    Forgets the overrides loaded for the user in the course of the block, after
+    they're changed.
+    """
+    RequestCache.get_request_cache(STUDENT_OVERRIDES_CACHE).pop((block.runtime.course_id, user.id), None)
+    clear_resolved_overrides()
+
+
 def override_field_for_user(user, block, name, value):
     """
     Overrides a field for the `user`.  `block` and `name` specify the block
@@ -70,6 +100,7 @@ def override_field_for_user(user, block, name, value):
     field = block.fields[name]
     override.value = json.dumps(field.to_json(value))
     override.save()
+    _clear_course_overrides_for_user(user, block)
 
 
 def clear_override_for_user(user, block, name):
@@ -87,3 +118,5 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+    else:
+        _clear_course_overrides_for_user(user, block)
@@ -2,22 +2,28 @@
 Tests for `field_overrides` module.
 """
 # pylint: disable=missing-docstring
+import datetime
 import unittest
 
 from django.test.utils import override_settings
 from nose.plugins.attrib import attr
+from pytz import UTC
 from xblock.field_data import DictFieldData
 
-from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
-from xmodule.modulestore.tests.factories import CourseFactory
+from request_cache.middleware import RequestCache
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from ..field_overrides import (
     FieldOverrideProvider,
     OverrideFieldData,
     OverrideModulestoreFieldData,
+    clear_resolved_overrides,
     disable_overrides,
     resolve_dotted
 )
+from ..student_field_overrides import get_override_for_user, override_field_for_user
 from ..testutils import FieldOverrideTestMixin
 
 TESTUSER = "testuser"
@@ -45,6 +51,35 @@ class TestOverrideProvider(FieldOverrideProvider):
         return True
 
 
+class CountingOverrideProvider(FieldOverrideProvider):
+    """
+    A `FieldOverrideProvider` overriding the fields listed in `overrides`, and
+    recording the lookups made, for testing.
+    """
+    overrides = {}
+    lookups = []
+
+    def get(self, block, name, default):
+        self.lookups.append((block.location, name))
+        return self.overrides.get((block.location, name), default)
+
+    @classmethod
+    def enabled_for(cls, course):
+        return True
+
+
+class FakeBlock(object):
+    """
+    The parts of an XBlock used by `OverrideFieldData`.
+    """
+    def __init__(self, location, parent=None):
+        self.location = location
+        self.parent = parent
+
+    def get_parent(self):
+        return self.parent
+
+
 @attr(shard=1)
 @override_settings(FIELD_OVERRIDE_PROVIDERS=(
     'courseware.tests.test_field_overrides.TestOverrideProvider',))
@@ -142,6 +177,128 @@ class OverrideModulestoreFieldDataTests(FieldOverrideTestMixin, OverrideFieldDat
         self.assertIsInstance(data, DictFieldData)
 
 
+@attr(shard=1)
+@override_settings(FIELD_OVERRIDE_PROVIDERS=(
+    'courseware.tests.test_field_overrides.CountingOverrideProvider',))
+class ResolvedOverridesTests(SharedModuleStoreTestCase):
+    """
+    Tests for the resolution of the overrides once per request by `OverrideFieldData`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(ResolvedOverridesTests, cls).setUpClass()
+        cls.course = CourseFactory.create()
+
+    def setUp(self):
+        super(ResolvedOverridesTests, self).setUp()
+        OverrideFieldData.provider_classes = None
+        RequestCache.clear_request_cache()
+        self.addCleanup(RequestCache.clear_request_cache)
+        CountingOverrideProvider.overrides = {}
+        CountingOverrideProvider.lookups = []
+        self.student = UserFactory.create()
+
+        self.chapter = FakeBlock(self.course.id.make_usage_key('chapter', 'chapter'))
+        self.sequential = FakeBlock(self.course.id.make_usage_key('sequential', 'sequential'), self.chapter)
+        self.problems = [
+            FakeBlock(self.course.id.make_usage_key('problem', 'problem{}'.format(index)), self.sequential)
+            for index in range(3)
+        ]
+        self.due = datetime.datetime(2030, 1, 1, tzinfo=UTC)
+        CountingOverrideProvider.overrides[(self.chapter.location, 'due')] = self.due
+        CountingOverrideProvider.overrides[(self.problems[0].location, 'display_name')] = 'Overridden'
+
+    def tearDown(self):
+        super(ResolvedOverridesTests, self).tearDown()
+        OverrideFieldData.provider_classes = None
+
+    def make_one(self):
+        """
+        Factory method.
+        """
+        return OverrideFieldData.wrap(self.student, self.course, DictFieldData({'display_name': 'Original'}))
+
+    def test_get_resolved_once(self):
+        data = self.make_one()
+        for __ in range(2):
+            self.assertEqual(data.get(self.problems[0], 'display_name'), 'Overridden')
+            self.assertEqual(data.get(self.problems[1], 'display_name'), 'Original')
+        # Other instances for the same user share the resolved overrides.
+        self.assertEqual(self.make_one().get(self.problems[0], 'display_name'), 'Overridden')
+        self.assertEqual(
+            CountingOverrideProvider.lookups,
+            [(self.problems[0].location, 'display_name'), (self.problems[1].location, 'display_name')]
+        )
+
+    def test_inherited_resolved_once(self):
+        data = self.make_one()
+        for problem in self.problems:
+            self.assertFalse(data.has(problem, 'due'))
+            self.assertEqual(data.default(problem, 'due'), self.due)
+        # Each block is asked for its own override once, however many descendants it has.
+        self.assertEqual(
+            sorted(CountingOverrideProvider.lookups),
+            sorted(
+                [(problem.location, 'due') for problem in self.problems] +
+                [(self.sequential.location, 'due'), (self.chapter.location, 'due')]
+            )
+        )
+
+    def test_disabled_overrides_not_resolved(self):
+        data = self.make_one()
+        with disable_overrides():
+            self.assertEqual(data.get(self.problems[0], 'display_name'), 'Original')
+        self.assertEqual(CountingOverrideProvider.lookups, [])
+        self.assertEqual(data.get(self.problems[0], 'display_name'), 'Overridden')
+
+    def test_clear_resolved_overrides(self):
+        data = self.make_one()
+        self.assertEqual(data.get(self.problems[1], 'display_name'), 'Original')
+        CountingOverrideProvider.overrides[(self.problems[1].location, 'display_name')] = 'Changed'
+        self.assertEqual(data.get(self.problems[1], 'display_name'), 'Original')
+        clear_resolved_overrides()
+        self.assertEqual(data.get(self.problems[1], 'display_name'), 'Changed')
+
+
+@attr(shard=1)
+class IndividualStudentOverrideProviderTests(ModuleStoreTestCase):
+    """
+    Tests for the loading of the individual student overrides.
+    """
+
+    def setUp(self):
+        super(IndividualStudentOverrideProviderTests, self).setUp()
+        RequestCache.clear_request_cache()
+        self.addCleanup(RequestCache.clear_request_cache)
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.sequentials = [ItemFactory.create(parent=chapter, category='sequential') for __ in range(3)]
+        self.student = UserFactory.create()
+        self.due = datetime.datetime(2030, 1, 1, tzinfo=UTC)
+
+    def get_sequentials(self):
+        """
+        Load the sequentials again, so that no override is cached on them.
+        """
+        return [self.store.get_item(sequential.location) for sequential in self.sequentials]
+
+    def test_overrides_loaded_once_per_course(self):
+        override_field_for_user(self.student, self.sequentials[0], 'due', self.due)
+        RequestCache.clear_request_cache()
+        sequentials = self.get_sequentials()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_override_for_user(self.student, sequentials[0], 'due'), self.due)
+            for sequential in sequentials[1:]:
+                self.assertIsNone(get_override_for_user(self.student, sequential, 'due'))
+
+    def test_override_seen_in_same_request(self):
+        sequentials = self.get_sequentials()
+        self.assertIsNone(get_override_for_user(self.student, sequentials[1], 'due'))
+        override_field_for_user(self.student, self.sequentials[1], 'due', self.due)
+        self.assertEqual(get_override_for_user(self.student, self.get_sequentials()[1], 'due'), self.due)
+
+
 @attr(shard=1)
 class ResolveDottedTests(unittest.TestCase):
     """
@@ -2,12 +2,13 @@
 Tests for courseware middleware
 """
 
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.test.client import RequestFactory
+from mock import patch
 from nose.plugins.attrib import attr
 
 from lms.djangoapps.courseware.exceptions import Redirect
-from lms.djangoapps.courseware.middleware import RedirectMiddleware
+from lms.djangoapps.courseware.middleware import RedirectMiddleware, UserStateGenerationMiddleware
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
@@ -42,3 +43,13 @@ class CoursewareMiddlewareTestCase(SharedModuleStoreTestCase):
         self.assertEqual(response.status_code, 302)
         target_url = response._headers['location'][1]
         self.assertTrue(target_url.endswith(test_url))
+
+    @patch('lms.djangoapps.courseware.middleware.bump_pending_user_state_generations')
+    def test_user_state_generations_bumped(self, mock_bump):
+        """
+        The user state generations are bumped after the request.
+        """
+        request = RequestFactory().get("dummy_url")
+        response = HttpResponse()
+        self.assertIs(UserStateGenerationMiddleware().process_response(request, response), response)
+        mock_bump.assert_called_once_with()
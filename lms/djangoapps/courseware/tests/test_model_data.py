@@ -15,6 +15,7 @@ from xblock.fields import BlockScope, Scope, ScopeIds
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
 from courseware.models import (
     StudentModule,
+    bump_pending_user_state_generations,
     XModuleStudentInfoField,
     XModuleStudentPrefsField,
     XModuleUserStateSummaryField
@@ -27,6 +28,7 @@ from courseware.tests.factories import (
     course_id,
     location
 )
+from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 from student.tests.factories import UserFactory
 
 
@@ -434,3 +436,71 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@attr(shard=1)
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_USER_STATE_CACHE': True})
+class TestUserStateCacheBetweenRequests(CacheIsolationTestCase):
+    """Tests for the user_state kept in the django cache between FieldDataCaches"""
+    ENABLED_CACHES = ['default']
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestUserStateCacheBetweenRequests, self).setUp()
+        self.user = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'})).student
+        self.key = DjangoKeyValueStore.Key(Scope.user_state, self.user.id, location('usage_id'), 'a_field')
+
+    def make_kvs(self, user=None):
+        """
+        Return a DjangoKeyValueStore over a new FieldDataCache, as built on each request.
+        """
+        field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])], course_id, user or self.user
+        )
+        return DjangoKeyValueStore(field_data_cache)
+
+    def test_cached_between_requests(self):
+        with self.assertNumQueries(1):
+            self.assertEquals('a_value', self.make_kvs().get(self.key))
+        with self.assertNumQueries(0):
+            self.assertEquals('a_value', self.make_kvs().get(self.key))
+
+    def test_missing_state_cached(self):
+        user = UserFactory.create()
+        key = DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field')
+        with self.assertNumQueries(1):
+            self.assertFalse(self.make_kvs(user).has(key))
+        with self.assertNumQueries(0):
+            self.assertFalse(self.make_kvs(user).has(key))
+
+    def test_set_invalidates(self):
+        self.make_kvs().set(self.key, 'new_value')
+        with self.assertNumQueries(1):
+            self.assertEquals('new_value', self.make_kvs().get(self.key))
+
+    def test_delete_invalidates(self):
+        self.make_kvs().delete(self.key)
+        with self.assertNumQueries(1):
+            self.assertFalse(self.make_kvs().has(self.key))
+
+    def test_other_writes_invalidate(self):
+        self.make_kvs()
+        student_module = StudentModule.objects.get(student=self.user)
+        student_module.state = json.dumps({'a_field': 'reset_value'})
+        student_module.save()
+        self.assertEquals('reset_value', self.make_kvs().get(self.key))
+
+    def test_write_invalidates_again_once_committed(self):
+        self.make_kvs().set(self.key, 'new_value')
+        # Until the write is committed, other requests read and cache the previous state
+        # under the generation it started.
+        StudentModule.objects.filter(student=self.user).update(state=json.dumps({'a_field': 'a_value'}))
+        self.assertEquals('a_value', self.make_kvs().get(self.key))
+        StudentModule.objects.filter(student=self.user).update(state=json.dumps({'a_field': 'new_value'}))
+        self.assertEquals('a_value', self.make_kvs().get(self.key))
+
+        # As done by UserStateGenerationMiddleware once the transaction of the request is over.
+        bump_pending_user_state_generations()
+        with self.assertNumQueries(1):
+            self.assertEquals('new_value', self.make_kvs().get(self.key))
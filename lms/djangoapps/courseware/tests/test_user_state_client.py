@@ -4,13 +4,25 @@ defined in edx_user_state_client.
 """
 
 from collections import defaultdict
+from datetime import datetime
 from unittest import skip
 
+import ddt
+from django.conf import settings
+from django.db import connections
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from edx_user_state_client.tests import UserStateClientTestBase
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+from pytz import UTC
 
+from courseware.models import ShardedStudentModule, StudentModule
 from courseware.tests.factories import UserFactory
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import (
+    DjangoXBlockUserStateClient,
+    ShardedXBlockUserStateClient,
+    get_student_module_shard,
+)
 
 
 class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
@@ -67,3 +79,166 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
     @skip("Not supported by DjangoXBlockUserStateClient")
     def test_iter_course_many_users(self):
         pass
+
+
+class TestBatchedDjangoUserStateClient(TestDjangoUserStateClient):
+    """
+    Tests of the DjangoUserStateClient backend, writing the states in batches.
+    """
+    def setUp(self):
+        super(TestBatchedDjangoUserStateClient, self).setUp()
+        self.client = DjangoXBlockUserStateClient(batch_writes=True)
+
+    def _set_many_counting_queries(self, username, block_keys, state):
+        """
+        Set the state of the blocks, and return the number of queries made to each database.
+        """
+        captures = [CaptureQueriesContext(connection) for connection in connections.all()]
+        for capture in captures:
+            capture.__enter__()
+        try:
+            self.client.set_many(username, {block_key: state for block_key in block_keys})
+        finally:
+            for capture in reversed(captures):
+                capture.__exit__(None, None, None)
+        return {capture.connection.alias: len(capture) for capture in captures}
+
+    def _count_set_many_queries(self, username, num_blocks):
+        """
+        Return the number of queries made to each database by creating, and then
+        updating the state of num_blocks blocks.
+        """
+        course_key = CourseLocator('org', 'course_{}'.format(num_blocks), 'run')
+        block_keys = [BlockUsageLocator(course_key, 'problem', 'block_{}'.format(idx)) for idx in range(num_blocks)]
+        num_queries = [
+            self._set_many_counting_queries(username, block_keys, {'field': value}) for value in ('created', 'updated')
+        ]
+        for block_key in block_keys:
+            self.assertEqual(self.client.get(username, block_key).state, {'field': 'updated'})
+        return num_queries
+
+    def test_set_many_queries_independent_of_block_count(self):
+        username = self._user(0)
+        self.assertEqual(self._count_set_many_queries(username, 2), self._count_set_many_queries(username, 20))
+
+    def test_set_many_saves_history(self):
+        username = self._user(0)
+        course_key = CourseLocator('org', 'course', 'run')
+        block_keys = [BlockUsageLocator(course_key, 'problem', 'block_{}'.format(idx)) for idx in range(3)]
+        for value in ('created', 'updated', 'updated'):
+            self.client.set_many(username, {block_key: {'field': value} for block_key in block_keys})
+
+        for block_key in block_keys:
+            self.assertEqual(
+                [history.state for history in self.client.get_history(username, block_key)],
+                [{'field': 'updated'}, {'field': 'updated'}, {'field': 'created'}],
+            )
+
+    def test_set_many_unchanged_state_updates_modified(self):
+        username = self._user(0)
+        block_key = BlockUsageLocator(CourseLocator('org', 'course', 'run'), 'problem', 'block')
+        self.client.set_many(username, {block_key: {'field': 'value'}})
+        StudentModule.objects.filter(module_state_key=block_key).update(modified=datetime(2000, 1, 1, tzinfo=UTC))
+
+        self.client.set_many(username, {block_key: {'field': 'value'}})
+        self.assertGreater(
+            StudentModule.objects.get(module_state_key=block_key).modified,
+            datetime(2000, 1, 1, tzinfo=UTC),
+        )
+
+
+@ddt.ddt
+class TestShardedUserStateClient(TestCase):
+    """
+    Tests of the ShardedXBlockUserStateClient backend.
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestShardedUserStateClient, self).setUp()
+        self.users = [UserFactory.create() for __ in range(2)]
+        # Find courses stored in each of the shards.
+        self.course_keys = {}
+        index = 0
+        while len(self.course_keys) < len(settings.STUDENT_MODULE_SHARDS):
+            course_key = CourseLocator('org', 'course_{}'.format(index), 'run')
+            self.course_keys.setdefault(get_student_module_shard(None, course_key), course_key)
+            index += 1
+
+    def _block_keys(self, course_key, num_blocks=2):
+        """
+        Return the keys of num_blocks problems of the course.
+        """
+        return [BlockUsageLocator(course_key, 'problem', 'block_{}'.format(idx)) for idx in range(num_blocks)]
+
+    @ddt.data(False, True)
+    def test_set_and_get_in_each_shard(self, batch_writes):
+        client = ShardedXBlockUserStateClient(batch_writes=batch_writes)
+        username = self.users[0].username
+        block_keys = [
+            block_key for course_key in self.course_keys.values() for block_key in self._block_keys(course_key)
+        ]
+
+        client.set_many(username, {block_key: {'field': 'value'} for block_key in block_keys})
+        client.set_many(username, {block_key: {'other': 'value'} for block_key in block_keys})
+
+        states = {state.block_key: state.state for state in client.get_many(username, block_keys)}
+        self.assertEqual(states, {block_key: {'field': 'value', 'other': 'value'} for block_key in block_keys})
+        for shard, course_key in self.course_keys.items():
+            self.assertEqual(ShardedStudentModule.objects.using(shard).filter(course_id=course_key).count(), 2)
+        self.assertFalse(StudentModule.objects.filter(student=self.users[0]).exists())
+
+    def test_delete_many(self):
+        client = ShardedXBlockUserStateClient()
+        username = self.users[0].username
+        block_keys = self._block_keys(self.course_keys.values()[0])
+        client.set_many(username, {block_key: {'field': 'value', 'other': 'value'} for block_key in block_keys})
+
+        client.delete_many(username, block_keys[:1])
+        client.delete_many(username, block_keys[1:], fields=['other'])
+
+        states = {state.block_key: state.state for state in client.get_many(username, block_keys)}
+        self.assertEqual(states, {block_keys[1]: {'field': 'value'}})
+        # Deleting all the fields of a block deletes its row, as no history is kept.
+        shard = get_student_module_shard(self.users[0].id, block_keys[0].course_key)
+        self.assertFalse(
+            ShardedStudentModule.objects.using(shard).filter(module_state_key=block_keys[0]).exists()
+        )
+
+    @ddt.data('course', 'user')
+    def test_iter_all(self, shard_key):
+        with override_settings(STUDENT_MODULE_SHARD_KEY=shard_key):
+            client = ShardedXBlockUserStateClient()
+            course_key = self.course_keys.values()[0]
+            block_keys = self._block_keys(course_key, num_blocks=3)
+            for user in self.users:
+                client.set_many(user.username, {block_key: {'user': user.username} for block_key in block_keys})
+            client.delete_many(self.users[0].username, block_keys[:1])
+
+            self.assertItemsEqual(
+                [(state.username, state.block_key, state.state) for state in client.iter_all_for_block(block_keys[0])],
+                [(self.users[1].username, block_keys[0], {'user': self.users[1].username})],
+            )
+            self.assertItemsEqual(
+                [(state.username, state.block_key) for state in client.iter_all_for_course(course_key, batch_size=2)],
+                [(user.username, block_key) for user in self.users for block_key in block_keys][1:],
+            )
+            self.assertEqual(list(client.iter_all_for_course(course_key, block_type='html')), [])
+
+    def test_get_history(self):
+        client = ShardedXBlockUserStateClient()
+        username = self.users[0].username
+        block_key = self._block_keys(self.course_keys.values()[0])[0]
+        with self.assertRaises(client.DoesNotExist):
+            list(client.get_history(username, block_key))
+
+        client.set_many(username, {block_key: {'field': 'value'}})
+        client.set_many(username, {block_key: {'field': 'other value'}})
+
+        # The history isn't kept, so the current state is its only entry.
+        history = list(client.get_history(username, block_key))
+        self.assertEqual(
+            [(entry.username, entry.block_key, entry.state) for entry in history],
+            [(username, block_key, {'field': 'other value'})],
+        )
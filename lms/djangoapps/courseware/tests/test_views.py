@@ -26,7 +26,7 @@ from courseware.module_render import get_module
 from courseware.tests.factories import GlobalStaffFactory, StudentModuleFactory
 from courseware.testutils import RenderXBlockTestMixin
 from courseware.url_helpers import get_redirect_url
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import DjangoXBlockUserStateClient, ShardedXBlockUserStateClient
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.urlresolvers import reverse
@@ -984,6 +984,61 @@ class ViewsTestCase(ModuleStoreTestCase):
             self.assertContains(response, test)
 
 
+@attr(shard=2)
+@override_settings(XBLOCK_USER_STATE_CLIENT='courseware.user_state_client.ShardedXBlockUserStateClient')
+class ShardedSubmissionHistoryTest(ModuleStoreTestCase):
+    """
+    Tests for the submission history of state stored by the ShardedXBlockUserStateClient.
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(ShardedSubmissionHistoryTest, self).setUp()
+        course_key = CourseFactory.create().id
+        self.admin = AdminFactory.create()
+        self.assertTrue(self.client.login(username=self.admin.username, password='test'))
+        self.usage_key = course_key.make_usage_key('problem', 'test-history')
+        self.url = reverse('submission_history', kwargs={
+            'course_id': unicode(course_key),
+            'student_username': self.admin.username,
+            'location': unicode(self.usage_key),
+        })
+
+    def test_submission_history_contents(self):
+        state_client = ShardedXBlockUserStateClient(self.admin)
+        state_client.set(
+            username=self.admin.username,
+            block_key=self.usage_key,
+            state={'field_a': 'x', 'field_b': 'y'}
+        )
+        set_score(self.admin.id, self.usage_key, 0, 3)
+        state_client.set(
+            username=self.admin.username,
+            block_key=self.usage_key,
+            state={'field_a': 'a', 'field_b': 'b'}
+        )
+        set_score(self.admin.id, self.usage_key, 3, 3)
+
+        response = self.client.get(self.url)
+        response_content = HTMLParser().unescape(response.content.decode('utf-8'))
+
+        # The history isn't kept, so only the current state is shown, with the current score.
+        self.assertIn('#1', response_content)
+        self.assertNotIn('#2', response_content)
+        self.assertIn(json.dumps({'field_a': 'a', 'field_b': 'b'}, sort_keys=True, indent=2), response_content)
+        self.assertNotIn(json.dumps({'field_a': 'x', 'field_b': 'y'}, sort_keys=True, indent=2), response_content)
+        self.assertIn("Score: 3.0 / 3.0", response_content)
+
+    def test_submission_history_without_state(self):
+        # Scores are still kept in StudentModule, which has no state.
+        set_score(self.admin.id, self.usage_key, 3, 3)
+
+        response = self.client.get(self.url)
+
+        self.assertIn('has never accessed problem', response.content)
+
+
 @attr(shard=2)
 # Patching 'lms.djangoapps.courseware.views.views.get_programs' would be ideal,
 # but for some unknown reason that patch doesn't seem to be applied.
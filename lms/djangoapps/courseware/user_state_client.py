@@ -5,17 +5,30 @@ data in a Django ORM model.
 
 import itertools
 import logging
+from collections import defaultdict
 from operator import attrgetter
 from time import time
+import zlib
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.db import router, transaction
+from django.db.models import Case, TextField, Value, When
 from django.db.utils import IntegrityError
+from django.utils import timezone
+from django.utils.module_loading import import_string
 from edx_user_state_client.interface import XBlockUserState, XBlockUserStateClient
 from xblock.fields import Scope
 
 import dogstats_wrapper as dog_stats_api
-from courseware.models import BaseStudentModuleHistory, StudentModule
+from courseware.models import (
+    BaseStudentModuleHistory,
+    ShardedStudentModule,
+    StudentModule,
+    StudentModuleHistory,
+    bump_user_state_generation,
+    chunks
+)
 from openedx.core.djangoapps import monitoring_utils
 
 try:
@@ -68,14 +81,26 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         pass
 
-    def __init__(self, user=None):
+    # The number of StudentModules updated per query in batched writes.
+    BATCH_WRITE_CHUNK_SIZE = 500
+
+    # The model the state is stored in.
+    model = StudentModule
+
+    def __init__(self, user=None, batch_writes=None):
         """
         Arguments:
             user (:class:`~User`): An already-loaded django user. If this user matches the username
                 supplied to `set_many`, then that will reduce the number of queries made to store
                 the user state.
+            batch_writes (bool): Whether `set_many` writes all the blocks with a fixed number of
+                queries rather than with queries per block. Defaults to the
+                ENABLE_BATCHED_USER_STATE_WRITES feature flag.
         """
         self.user = user
+        if batch_writes is None:
+            batch_writes = settings.FEATURES.get('ENABLE_BATCHED_USER_STATE_WRITES', False)
+        self.batch_writes = batch_writes
 
     def _get_student_modules(self, username, block_keys):
         """
@@ -103,6 +128,13 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                 usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
                 yield (student_module, usage_key)
 
+    def _get_student_module_db(self, user_id, course_key):  # pylint: disable=unused-argument
+        """
+        Return the alias of the database the state of the user with id ``user_id`` in the
+        course ``course_key`` is written to.
+        """
+        return router.db_for_write(self.model)
+
     def _ddog_increment(self, evt_time, evt_name):
         """
         DataDog increment method.
@@ -270,42 +302,15 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         evt_time = time()
 
-        for usage_key, state in block_keys_to_state.items():
-            student_module, created = StudentModule.objects.get_or_create(
-                student=user,
-                course_id=usage_key.course_key,
-                module_state_key=usage_key,
-                defaults={
-                    'state': json.dumps(state),
-                    'module_type': usage_key.block_type,
-                },
+        if self.batch_writes:
+            results = self._set_many_batched(user, block_keys_to_state)
+        else:
+            results = (
+                (usage_key, state) + self._set_one(user, usage_key, state, block_keys_to_state)
+                for usage_key, state in block_keys_to_state.items()
             )
 
-            num_fields_before = num_fields_after = num_new_fields_set = len(state)
-            num_fields_updated = 0
-            if not created:
-                if student_module.state is None:
-                    current_state = {}
-                else:
-                    current_state = json.loads(student_module.state)
-                num_fields_before = len(current_state)
-                current_state.update(state)
-                num_fields_after = len(current_state)
-                student_module.state = json.dumps(current_state)
-                try:
-                    with transaction.atomic():
-                        # Updating the object - force_update guarantees no INSERT will occur.
-                        student_module.save(force_update=True)
-                except IntegrityError:
-                    # The UPDATE above failed. Log information - but ignore the error.
-                    # See https://openedx.atlassian.net/browse/TNL-5365
-                    log.warning("set_many: IntegrityError for student {} - course_id {} - usage key {}".format(
-                        user, repr(unicode(usage_key.course_key)), usage_key
-                    ))
-                    log.warning("set_many: All {} block keys: {}".format(
-                        len(block_keys_to_state), block_keys_to_state.keys()
-                    ))
-
+        for usage_key, state, student_module, created, num_fields_before, num_fields_after in results:
             # DataDog and New Relic reporting
 
             # record the size of state modifications
@@ -337,6 +342,218 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         self._ddog_histogram(evt_time, 'set_many.response_time', duration)
         self._nr_stat_accumulate('set_many', 'duration', duration)
 
+    def _log_integrity_error(self, user, usage_key, block_keys_to_state):
+        """
+        Log the information about an UPDATE of a StudentModule which failed with an IntegrityError.
+        """
+        # See https://openedx.atlassian.net/browse/TNL-5365
+        log.warning("set_many: IntegrityError for student {} - course_id {} - usage key {}".format(
+            user, repr(unicode(usage_key.course_key)), usage_key
+        ))
+        log.warning("set_many: All {} block keys: {}".format(
+            len(block_keys_to_state), block_keys_to_state.keys()
+        ))
+
+    def _set_one(self, user, usage_key, state, block_keys_to_state):
+        """
+        Overlay ``state`` over the stored state of a single block, with a query
+        finding or creating its StudentModule and another one updating it.
+
+        Returns a tuple of the StudentModule, whether it was created, and the number
+        of fields of the state before and after the overlay.
+        """
+        db = self._get_student_module_db(user.id, usage_key.course_key)
+        student_module, created = self.model.objects.db_manager(db).get_or_create(
+            student=user,
+            course_id=usage_key.course_key,
+            module_state_key=usage_key,
+            defaults={
+                'state': json.dumps(state),
+                'module_type': usage_key.block_type,
+            },
+        )
+
+        num_fields_before = num_fields_after = len(state)
+        if not created:
+            if student_module.state is None:
+                current_state = {}
+            else:
+                current_state = json.loads(student_module.state)
+            num_fields_before = len(current_state)
+            current_state.update(state)
+            num_fields_after = len(current_state)
+            student_module.state = json.dumps(current_state)
+            try:
+                with transaction.atomic(using=db):
+                    # Updating the object - force_update guarantees no INSERT will occur.
+                    student_module.save(force_update=True)
+            except IntegrityError:
+                # The UPDATE above failed. Log information - but ignore the error.
+                self._log_integrity_error(user, usage_key, block_keys_to_state)
+
+        return student_module, created, num_fields_before, num_fields_after
+
+    def _set_many_batched(self, user, block_keys_to_state):
+        """
+        Overlay the states over the stored states of all the blocks, with one query
+        fetching the existing StudentModules, one inserting the missing ones and one
+        updating the existing ones (per chunk of blocks), however many blocks there are.
+
+        As the bulk queries don't send the post_save signals of StudentModule, the history
+        of the states is saved in bulk too (see _record_bulk_writes).
+
+        Returns a list of tuples of the usage key, the state, the StudentModule, whether it
+        was created, and the number of fields of the state before and after the overlay.
+        """
+        by_db = defaultdict(dict)
+        for usage_key, state in block_keys_to_state.items():
+            by_db[self._get_student_module_db(user.id, usage_key.course_key)][usage_key] = state
+
+        results = []
+        for db, db_block_keys_to_state in by_db.items():
+            existing = {
+                usage_key: student_module
+                for student_module, usage_key in self._get_student_modules(user.username, db_block_keys_to_state.keys())
+            }
+
+            to_create = []
+            to_update = []
+            for usage_key, state in db_block_keys_to_state.items():
+                student_module = existing.get(usage_key)
+                if student_module is None:
+                    to_create.append((usage_key, state))
+                    continue
+
+                if student_module.state is None:
+                    current_state = {}
+                else:
+                    current_state = json.loads(student_module.state)
+                num_fields_before = len(current_state)
+                current_state.update(state)
+                student_module.state = json.dumps(current_state)
+                # Like _set_one, every row is written, even if its state doesn't change,
+                # so that its modified time and history record the write.
+                to_update.append((usage_key, student_module))
+                results.append((usage_key, state, student_module, False, num_fields_before, len(current_state)))
+
+            if to_create:
+                results.extend(self._create_student_modules(user, db, to_create, block_keys_to_state))
+            if to_update:
+                self._update_student_modules(user, db, to_update, block_keys_to_state)
+
+        return results
+
+    def _create_student_modules(self, user, db, keys_and_states, block_keys_to_state):
+        """
+        Insert the StudentModules of the given (usage key, state) pairs in bulk into the database ``db``.
+
+        If some of them have been created concurrently in the meantime, fall back
+        to setting the state of each block separately.
+        """
+        new_student_modules = [
+            self.model(
+                student=user,
+                course_id=usage_key.course_key,
+                module_state_key=usage_key,
+                module_type=usage_key.block_type,
+                state=json.dumps(state),
+            )
+            for usage_key, state in keys_and_states
+        ]
+        try:
+            with transaction.atomic(using=db):
+                self.model.objects.db_manager(db).bulk_create(new_student_modules)
+        except IntegrityError:
+            return [
+                (usage_key, state) + self._set_one(user, usage_key, state, block_keys_to_state)
+                for usage_key, state in keys_and_states
+            ]
+
+        # bulk_create doesn't set the ids of the new rows on every database, so read them back.
+        created = {
+            usage_key: student_module
+            for student_module, usage_key in self._get_student_modules(
+                user.username, [usage_key for usage_key, __ in keys_and_states]
+            )
+        }
+        self._record_bulk_writes(user, created.values())
+        return [
+            (usage_key, state, created[usage_key], True, len(state), len(state))
+            for usage_key, state in keys_and_states
+        ]
+
+    def _update_student_modules(self, user, db, keys_and_student_modules, block_keys_to_state):
+        """
+        Write the states of the given (usage key, StudentModule) pairs to the database ``db``,
+        with one UPDATE per chunk.
+        """
+        modified = timezone.now()
+        updated_student_modules = []
+        for chunk in chunks(keys_and_student_modules, self.BATCH_WRITE_CHUNK_SIZE):
+            try:
+                with transaction.atomic(using=db):
+                    self.model.objects.using(db).filter(
+                        id__in=[student_module.id for __, student_module in chunk]
+                    ).update(
+                        state=Case(
+                            *[
+                                When(id=student_module.id, then=Value(student_module.state))
+                                for __, student_module in chunk
+                            ],
+                            output_field=TextField()
+                        ),
+                        modified=modified,
+                    )
+            except IntegrityError:
+                # The UPDATE above failed. Log information - but ignore the error.
+                for usage_key, __ in chunk:
+                    self._log_integrity_error(user, usage_key, block_keys_to_state)
+                continue
+
+            for __, student_module in chunk:
+                student_module.modified = modified
+                updated_student_modules.append(student_module)
+
+        if updated_student_modules:
+            self._record_bulk_writes(user, updated_student_modules)
+
+    def _record_bulk_writes(self, user, student_modules):
+        """
+        Do what the post_save receivers of the model do for each saved StudentModule, for
+        ``student_modules`` written in bulk (which doesn't send post_save): save the history
+        of their states, with one INSERT per chunk, and bump the user state generation of
+        each of their courses once.
+        """
+        self._save_history(student_modules)
+        for course_key in set(student_module.course_id for student_module in student_modules):
+            bump_user_state_generation(user.id, course_key)
+
+    def _save_history(self, student_modules):
+        """
+        Save the history entries of ``student_modules`` in bulk, in the history table
+        that the post_save receivers of StudentModule write to.
+        """
+        if settings.FEATURES.get('ENABLE_CSMH_EXTENDED'):
+            from coursewarehistoryextended.models import StudentModuleHistoryExtended
+            history_model = StudentModuleHistoryExtended
+        else:
+            history_model = StudentModuleHistory
+
+        history_entries = [
+            history_model(
+                student_module=student_module,
+                version=None,
+                created=student_module.modified,
+                state=student_module.state,
+                grade=student_module.grade,
+                max_grade=student_module.max_grade,
+            )
+            for student_module in student_modules
+            if student_module.module_type in history_model.HISTORY_SAVING_TYPES
+        ]
+        if history_entries:
+            history_model.objects.bulk_create(history_entries, batch_size=self.BATCH_WRITE_CHUNK_SIZE)
+
     def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
         Delete the stored XBlock state for a many xblock usages.
@@ -448,3 +665,221 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
         raise NotImplementedError()
+
+
+def get_student_module_shard(user_id, course_key):
+    """
+    Return the alias of the database of settings.STUDENT_MODULE_SHARDS which stores the
+    ShardedStudentModules of the user with id ``user_id`` in the course ``course_key``.
+    """
+    shards = settings.STUDENT_MODULE_SHARDS
+    if settings.STUDENT_MODULE_SHARD_KEY == 'user':
+        shard_index = user_id
+    else:
+        # crc32 rather than hash() so that the shard of a course is the same in every process.
+        shard_index = zlib.crc32(unicode(course_key).encode('utf-8')) & 0xffffffff
+    return shards[shard_index % len(shards)]
+
+
+class ShardedXBlockUserStateClient(DjangoXBlockUserStateClient):
+    """
+    An interface that uses ShardedStudentModule as a backend, partitioning the state across
+    the databases of settings.STUDENT_MODULE_SHARDS by course (or by user, if
+    settings.STUDENT_MODULE_SHARD_KEY is 'user').
+
+    The state is stored in the same format as by :class:`DjangoXBlockUserStateClient`,
+    but its history isn't kept: get_history only returns the current state.
+    """
+
+    # The number of ShardedStudentModules read per query by iter_all_for_block and iter_all_for_course.
+    ITER_BATCH_SIZE = 1000
+
+    model = ShardedStudentModule
+
+    def __init__(self, user=None, batch_writes=None):
+        super(ShardedXBlockUserStateClient, self).__init__(user, batch_writes)
+        self._user_ids = {}
+
+    def _get_user_id(self, username):
+        """
+        Return the id of the user named ``username``, or None if there's no such user.
+        """
+        if self.user is not None and self.user.username == username:
+            return self.user.id
+        if username not in self._user_ids:
+            self._user_ids[username] = User.objects.filter(username=username).values_list('id', flat=True).first()
+        return self._user_ids[username]
+
+    def _get_student_module_db(self, user_id, course_key):
+        return get_student_module_shard(user_id, course_key)
+
+    def _save_history(self, student_modules):
+        """
+        The history of the state isn't kept in the shards.
+        """
+        pass
+
+    def _get_student_modules(self, username, block_keys):
+        """
+        Retrieve the :class:`~ShardedStudentModule`s for the supplied ``username`` and ``block_keys``.
+
+        Arguments:
+            username (str): The name of the user to load `ShardedStudentModule`s for.
+            block_keys (list of :class:`~UsageKey`): The set of XBlocks to load data for.
+        """
+        user_id = self._get_user_id(username)
+        if user_id is None:
+            return
+
+        course_key_func = attrgetter('course_key')
+        by_course = itertools.groupby(
+            sorted(block_keys, key=course_key_func),
+            course_key_func,
+        )
+
+        for course_key, usage_keys in by_course:
+            query = self.model.objects.db_manager(get_student_module_shard(user_id, course_key)).chunked_filter(
+                'module_state_key__in',
+                usage_keys,
+                student_id=user_id,
+                course_id=course_key,
+            )
+
+            for student_module in query:
+                usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+                yield (student_module, usage_key)
+
+    def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
+        """
+        Delete the stored XBlock state for a many xblock usages.
+
+        As no history is kept, deleting all the fields of a block deletes its
+        ShardedStudentModule, rather than storing an empty state.
+        """
+        if fields is not None:
+            super(ShardedXBlockUserStateClient, self).delete_many(username, block_keys, scope, fields)
+            return
+
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        evt_time = time()
+        self._ddog_increment(evt_time, 'delete_many.empty_state')
+        self._ddog_histogram(evt_time, 'delete_many.block_count', len(block_keys))
+
+        for student_module, _ in self._get_student_modules(username, block_keys):
+            student_module.delete()
+
+        finish_time = time()
+        self._ddog_histogram(evt_time, 'delete_many.response_time', (finish_time - evt_time) * 1000)
+
+    def get_history(self, username, block_key, scope=Scope.user_state):
+        """
+        Retrieve history of state changes for a given block for a given
+        student.  As the history of the state isn't kept in the shards, the
+        current state is its only entry.
+
+        If the specified block doesn't exist, raise :class:`~DoesNotExist`.
+
+        Arguments:
+            username: The name of the user whose history should be retrieved.
+            block_key: The key identifying which xblock history to retrieve.
+            scope (Scope): The scope to load data from.
+
+        Yields:
+            A single XBlockUserState entry for the current state of the specified XBlock.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+        student_modules = list(self._get_student_modules(username, [block_key]))
+        if len(student_modules) == 0:
+            raise self.DoesNotExist()
+
+        student_module, usage_key = student_modules[0]
+        state = student_module.state
+        if state is not None:
+            state = json.loads(state)
+        # If the state is empty, then for the purposes of `get_history`, it has been
+        # deleted, and so we list that entry as `None`.
+        if state == {}:
+            state = None
+
+        yield XBlockUserState(username, usage_key, state, student_module.modified, scope)
+
+    def _get_course_shards(self, course_key):
+        """
+        Return the aliases of the databases which may store state of the course ``course_key``.
+        """
+        if settings.STUDENT_MODULE_SHARD_KEY == 'user':
+            return settings.STUDENT_MODULE_SHARDS
+        return [get_student_module_shard(None, course_key)]
+
+    def _iter_states(self, course_key, batch_size, **filters):
+        """
+        Yield XBlockUserState tuples for the ShardedStudentModules of the course ``course_key``
+        which match ``filters``, reading batch_size of them per query.
+        """
+        batch_size = batch_size or self.ITER_BATCH_SIZE
+        for shard in self._get_course_shards(course_key):
+            query = self.model.objects.using(shard).filter(course_id=course_key, **filters).order_by('id')
+            last_id = 0
+            while True:
+                student_modules = list(query.filter(id__gt=last_id)[:batch_size])
+                if not student_modules:
+                    break
+                last_id = student_modules[-1].id
+
+                usernames = dict(User.objects.filter(
+                    id__in=set(student_module.student_id for student_module in student_modules)
+                ).values_list('id', 'username'))
+                for student_module in student_modules:
+                    if student_module.state is None:
+                        continue
+                    state = json.loads(student_module.state)
+                    # If the state is the empty dict, then it has been deleted.
+                    if state == {}:
+                        continue
+                    usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+                    yield XBlockUserState(
+                        usernames.get(student_module.student_id),
+                        usage_key,
+                        state,
+                        student_module.modified,
+                        Scope.user_state,
+                    )
+
+    def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
+        """
+        You get no ordering guarantees. Fetching will happen in batch_size
+        increments. If you're using this method, you should be running in an
+        async task.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+        return self._iter_states(block_key.course_key, batch_size, module_state_key=block_key)
+
+    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
+        """
+        You get no ordering guarantees. Fetching will happen in batch_size
+        increments. If you're using this method, you should be running in an
+        async task.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+        filters = {}
+        if block_type is not None:
+            filters['module_type'] = block_type
+        return self._iter_states(course_key, batch_size, **filters)
+
+
+def get_user_state_client(user=None):
+    """
+    Return an instance of the XBlockUserStateClient backend configured by settings.XBLOCK_USER_STATE_CLIENT.
+
+    Arguments:
+        user (:class:`~User`): An already-loaded django user, passed to the backend.
+    """
+    client_class = import_string(
+        getattr(settings, 'XBLOCK_USER_STATE_CLIENT', 'courseware.user_state_client.DjangoXBlockUserStateClient')
+    )
+    return client_class(user)
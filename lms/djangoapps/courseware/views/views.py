@@ -64,7 +64,7 @@ from courseware.masquerade import setup_masquerade
 from courseware.model_data import FieldDataCache
 from courseware.models import BaseStudentModuleHistory, StudentModule
 from courseware.url_helpers import get_redirect_url
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import get_user_state_client
 from edxmako.shortcuts import marketing_link, render_to_response, render_to_string
 from enrollment.api import add_enrollment
 from eventtracking import tracker
@@ -1168,10 +1168,10 @@ def submission_history(request, course_id, student_username, location):
     if (student_username != request.user.username) and (not staff_access):
         raise PermissionDenied
 
-    user_state_client = DjangoXBlockUserStateClient()
+    user_state_client = get_user_state_client()
     try:
         history_entries = list(user_state_client.get_history(student_username, usage_key))
-    except DjangoXBlockUserStateClient.DoesNotExist:
+    except user_state_client.DoesNotExist:
         return HttpResponse(escape(_(u'User {username} has never accessed problem {location}').format(
             username=student_username,
             location=location
@@ -1202,8 +1202,11 @@ def submission_history(request, course_id, student_username, location):
             score.created: score
             for score in scores
         }
+        # Backends which don't keep the history of the state only return its
+        # current state, which is shown with the current score, if any.
+        current_score = csm.first()
         scores = [
-            scores_by_date[history.updated]
+            scores_by_date.get(history.updated, current_score)
             for history in history_entries
         ]
 
@@ -1,5 +1,6 @@
 from collections import namedtuple
 from contextlib import contextmanager
+from itertools import islice
 from logging import getLogger
 
 import dogstats_wrapper as dog_stats_api
@@ -11,6 +12,7 @@ from ..config.waffle import WRITE_ONLY_IF_ENGAGED, waffle
 from ..models import PersistentCourseGrade, VisibleBlocks
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
+from .subsection_grade_factory import SubsectionGradeFactory
 
 log = getLogger(__name__)
 
@@ -21,6 +23,9 @@ class CourseGradeFactory(object):
     """
     GradeResult = namedtuple('GradeResult', ['student', 'course_grade', 'error'])
 
+    # Number of users whose scores and grades are prefetched together by iter.
+    PREFETCH_BATCH_SIZE = 100
+
     def create(self, user, course=None, collected_block_structure=None, course_structure=None, course_key=None):
         """
         Returns the CourseGrade for the given user in the course.
@@ -93,6 +98,22 @@ class CourseGradeFactory(object):
         yield
         VisibleBlocks.clear_cache(course_key)
 
+    @contextmanager
+    def _prefetched_batch(self, course_data, users):
+        """
+        Provides a context in which the persisted grades and the scores
+        of the given users are prefetched, so that grading each user
+        does not query each of these tables again.
+        """
+        if should_persist_grades(course_data.course_key):
+            PersistentCourseGrade.prefetch(course_data.course_key, users)
+        SubsectionGradeFactory.prefetch(course_data.course_key, course_data.collected_structure, users)
+        try:
+            yield
+        finally:
+            PersistentCourseGrade.clear_prefetched_data(course_data.course_key)
+            SubsectionGradeFactory.clear_prefetched_data(course_data.course_key, users)
+
     def iter(
             self,
             users,
@@ -109,6 +130,9 @@ class CourseGradeFactory(object):
 
         If an error occurred, course_grade will be None and err_msg will be an
         exception message. If there was no error, err_msg is an empty string.
+
+        The students are graded in batches of PREFETCH_BATCH_SIZE, for each
+        of which their scores and persisted grades are prefetched in bulk.
         """
         # Pre-fetch the collected course_structure so:
         # 1. Correctness: the same version of the course is used to
@@ -119,10 +143,16 @@ class CourseGradeFactory(object):
             user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
         )
         stats_tags = [u'action:{}'.format(course_data.course_key)]
+        users = iter(users)
         with self._course_transaction(course_data.course_key):
-            for user in users:
-                with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
-                    yield self._iter_grade_result(user, course_data, force_update)
+            while True:
+                users_batch = list(islice(users, self.PREFETCH_BATCH_SIZE))
+                if not users_batch:
+                    break
+                with self._prefetched_batch(course_data, users_batch):
+                    for user in users_batch:
+                        with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
+                            yield self._iter_grade_result(user, course_data, force_update)
 
     def _iter_grade_result(self, user, course_data, force_update):
         try:
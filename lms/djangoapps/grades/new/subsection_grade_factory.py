@@ -1,4 +1,4 @@
-from collections import OrderedDict
+from collections import namedtuple, OrderedDict
 from logging import getLogger
 
 from lazy import lazy
@@ -8,19 +8,29 @@ from lms.djangoapps.grades.config import assume_zero_if_absent, should_persist_g
 from lms.djangoapps.grades.models import PersistentSubsectionGrade
 from lms.djangoapps.grades.scores import possibly_scored
 from openedx.core.lib.grade_utils import is_score_higher_or_equal
+from request_cache import get_cache
 from student.models import anonymous_id_for_user
 from submissions import api as submissions_api
+from submissions.models import ScoreSummary
+from submissions.serializers import UnannotatedScoreSerializer
 
 from .course_data import CourseData
 from .subsection_grade import SubsectionGrade, ZeroSubsectionGrade
 
 log = getLogger(__name__)
 
+# The scores of a user in a course prefetched by SubsectionGradeFactory.prefetch.
+#   csm_scores (ScoresClient)
+#   submissions_scores ({item_id: score})
+PrefetchedScores = namedtuple('PrefetchedScores', ['csm_scores', 'submissions_scores'])
+
 
 class SubsectionGradeFactory(object):
     """
     Factory for Subsection Grades.
     """
+    CACHE_NAMESPACE = u"grades.new.subsection_grade_factory.SubsectionGradeFactory"
+
     def __init__(self, student, course=None, course_structure=None, course_data=None):
         self.student = student
         self.course_data = course_data or CourseData(student, course=course, structure=course_structure)
@@ -98,12 +108,76 @@ class SubsectionGradeFactory(object):
 
         return calculated_grade
 
+    @classmethod
+    def prefetch(cls, course_key, collected_block_structure, users):
+        """
+        Prefetches the CSM scores, the Submissions API scores and the
+        persisted subsection grades of the given users in the course,
+        with one query each, for use by the factories of those users
+        until clear_prefetched_data is called.
+        """
+        scorable_locations = [block_key for block_key in collected_block_structure if possibly_scored(block_key)]
+        user_ids = [user.id for user in users]
+        anonymous_user_ids = {
+            anonymous_id_for_user(user, course_key, save=False): user.id
+            for user in users
+        }
+
+        submissions_scores = {user_id: {} for user_id in user_ids}
+        score_summaries = ScoreSummary.objects.filter(
+            student_item__course_id=str(course_key),
+            student_item__student_id__in=anonymous_user_ids.keys(),
+        ).select_related('latest', 'latest__submission', 'student_item')
+        for summary in score_summaries:
+            if not summary.latest.is_hidden():
+                user_id = anonymous_user_ids[summary.student_item.student_id]
+                submissions_scores[user_id][summary.student_item.item_id] = \
+                    UnannotatedScoreSerializer(summary.latest).data
+
+        csm_scores = ScoresClient.create_for_users(course_key, user_ids, scorable_locations)
+        cache = get_cache(cls.CACHE_NAMESPACE)
+        for user_id in user_ids:
+            cache[cls._cache_key(course_key, user_id)] = PrefetchedScores(
+                csm_scores=csm_scores[user_id],
+                submissions_scores=submissions_scores[user_id],
+            )
+        if should_persist_grades(course_key):
+            PersistentSubsectionGrade.prefetch(course_key, users)
+
+    @classmethod
+    def clear_prefetched_data(cls, course_key, users):
+        """
+        Clears the data prefetched for the given users in the given course.
+        """
+        cache = get_cache(cls.CACHE_NAMESPACE)
+        for user in users:
+            cache.pop(cls._cache_key(course_key, user.id), None)
+        PersistentSubsectionGrade.clear_prefetched_data(course_key, users)
+
+    @classmethod
+    def _cache_key(cls, course_key, user_id):
+        return u"prefetched_scores.{}.{}".format(course_key, user_id)
+
+    def _get_prefetched_scores(self, scores_name):
+        """
+        Returns the given PrefetchedScores field for the student, or None
+        if the scores of the student were not prefetched.
+        """
+        prefetched_scores = get_cache(self.CACHE_NAMESPACE).get(
+            self._cache_key(self.course_data.course_key, self.student.id)
+        )
+        if prefetched_scores is not None:
+            return getattr(prefetched_scores, scores_name)
+
     @lazy
     def _csm_scores(self):
         """
         Lazily queries and returns all the scores stored in the user
         state (in CSM) for the course, while caching the result.
         """
+        prefetched_scores = self._get_prefetched_scores('csm_scores')
+        if prefetched_scores is not None:
+            return prefetched_scores
         scorable_locations = [block_key for block_key in self.course_data.structure if possibly_scored(block_key)]
         return ScoresClient.create_for_locations(self.course_data.course_key, self.student.id, scorable_locations)
 
@@ -113,6 +187,9 @@ class SubsectionGradeFactory(object):
         Lazily queries and returns the scores stored by the
         Submissions API for the course, while caching the result.
         """
+        prefetched_scores = self._get_prefetched_scores('submissions_scores')
+        if prefetched_scores is not None:
+            return prefetched_scores
         anonymous_user_id = anonymous_id_for_user(self.student, self.course_data.course_key)
         return submissions_api.get_scores(str(self.course_data.course_key), anonymous_user_id)
 
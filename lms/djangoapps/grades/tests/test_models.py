@@ -13,7 +13,7 @@ from django.db.utils import IntegrityError
 from django.test import TestCase
 from django.utils.timezone import now
 from freezegun import freeze_time
-from mock import patch
+from mock import Mock, patch
 from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
 
 from lms.djangoapps.grades.config import waffle
@@ -229,6 +229,34 @@ class PersistentSubsectionGradeTest(GradesModelTestCase):
         with self.assertRaises(IntegrityError):
             PersistentSubsectionGrade.create_grade(**self.params)
 
+    def test_prefetch(self):
+        created_grade = PersistentSubsectionGrade.create_grade(**self.params)
+        other_user_id = self.params["user_id"] + 1
+        with self.assertNumQueries(1):
+            PersistentSubsectionGrade.prefetch(
+                self.course_key,
+                [Mock(id=self.params["user_id"]), Mock(id=other_user_id)],
+            )
+        with self.assertNumQueries(0):
+            read_grades = PersistentSubsectionGrade.bulk_read_grades(self.params["user_id"], self.course_key)
+            self.assertEqual(read_grades, [created_grade])
+            self.assertEqual(read_grades[0].visible_blocks.blocks, self.block_records)
+            self.assertEqual(PersistentSubsectionGrade.bulk_read_grades(other_user_id, self.course_key), [])
+
+        # the grades of users who were not prefetched are still read
+        with self.assertNumQueries(1):
+            self.assertEqual(list(PersistentSubsectionGrade.bulk_read_grades(other_user_id + 1, self.course_key)), [])
+
+        PersistentSubsectionGrade.clear_prefetched_data(
+            self.course_key,
+            [Mock(id=self.params["user_id"]), Mock(id=other_user_id)],
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(PersistentSubsectionGrade.bulk_read_grades(self.params["user_id"], self.course_key)),
+                [created_grade],
+            )
+
     @ddt.data('course_version', 'subtree_edited_timestamp')
     def test_optional_fields(self, field):
         del self.params[field]
@@ -17,7 +17,7 @@ from courseware.tests.test_submitting_problems import ProblemSubmissionTestMixin
 from lms.djangoapps.course_blocks.api import get_course_blocks
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from openedx.core.djangolib.testing.utils import get_mock_request
-from student.models import CourseEnrollment
+from student.models import CourseEnrollment, anonymous_id_for_user
 from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
@@ -260,6 +260,46 @@ class TestCourseGradeFactory(GradeTestBase):
         self.assertTrue(desired_call.called)
         self.assertFalse(undesired_call.called)
 
+    def test_iter_prefetches_scores(self):
+        users = [self.request.user, UserFactory.create()]
+        with mock_get_score(1, 2):
+            with patch(
+                'lms.djangoapps.grades.new.subsection_grade_factory.submissions_api.get_scores'
+            ) as mock_get_scores:
+                with patch(
+                    'lms.djangoapps.grades.new.subsection_grade_factory.ScoresClient.create_for_locations'
+                ) as mock_create_scores_client:
+                    grade_results = list(CourseGradeFactory().iter(users=users, course=self.course))
+
+        self.assertFalse(mock_get_scores.called)
+        self.assertFalse(mock_create_scores_client.called)
+        self.assertEqual([result.student for result in grade_results], users)
+        for result in grade_results:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.course_grade.percent, 0.5)
+
+    def test_prefetch_is_per_user(self):
+        other_user = UserFactory.create()
+        SubsectionGradeFactory.prefetch(
+            self.course.id, self.course_structure, [self.request.user],
+        )
+        self.addCleanup(SubsectionGradeFactory.clear_prefetched_data, self.course.id, [self.request.user])
+
+        with patch(
+            'lms.djangoapps.grades.new.subsection_grade_factory.submissions_api.get_scores', return_value={}
+        ) as mock_get_scores:
+            # the scores of the prefetched user are read from the prefetched data...
+            prefetched_factory = SubsectionGradeFactory(self.request.user, self.course, self.course_structure)
+            self.assertEqual(prefetched_factory._submissions_scores, {})  # pylint: disable=protected-access
+            self.assertFalse(mock_get_scores.called)
+
+            # ... and those of any other user are queried
+            other_factory = SubsectionGradeFactory(other_user, self.course, self.course_structure)
+            self.assertEqual(other_factory._submissions_scores, {})  # pylint: disable=protected-access
+            mock_get_scores.assert_called_once_with(
+                str(self.course.id), anonymous_id_for_user(other_user, self.course.id),
+            )
+
 
 @ddt.ddt
 class TestSubsectionGradeFactory(ProblemSubmissionTestMixin, GradeTestBase):
@@ -4,7 +4,6 @@ Enrollment operations for use by instructor APIs.
 Does not include any access control, be sure to check access before calling.
 """
 
-import json
 import logging
 from datetime import datetime
 
@@ -17,6 +16,7 @@ from django.utils.translation import override as override_language
 
 from course_modes.models import CourseMode
 from courseware.models import StudentModule
+from courseware.user_state_client import get_user_state_client
 from edxmako.shortcuts import render_to_string
 from eventtracking import tracker
 from lms.djangoapps.grades.constants import ScoreDatabaseTableEnum
@@ -275,6 +275,11 @@ def reset_student_attempts(course_id, student, module_state_key, requesting_user
 
     if delete_module:
         module_to_reset.delete()
+        # Depending on the XBlockUserStateClient backend, the state may be stored apart from the StudentModule.
+        get_user_state_client(student).delete(
+            student.username,
+            module_to_reset.module_state_key.map_into_course(course_id),
+        )
         create_new_event_transaction_id()
         grade_update_root_type = 'edx.grades.problem.state_deleted'
         set_event_transaction_type(grade_update_root_type)
@@ -304,16 +309,24 @@ def _reset_module_attempts(studentmodule):
     """
     Reset the number of attempts on a studentmodule.
 
+    The state is read and written through the configured XBlockUserStateClient.
+
     Throws ValueError if `problem_state` is invalid JSON.
     """
-    # load the state json
-    problem_state = json.loads(studentmodule.state)
+    student = studentmodule.student
+    client = get_user_state_client(student)
+    usage_key = studentmodule.module_state_key.map_into_course(studentmodule.course_id)
+
+    # load the state
+    try:
+        problem_state = client.get(student.username, usage_key).state
+    except client.DoesNotExist:
+        problem_state = {}
     # old_number_of_attempts = problem_state["attempts"]
     problem_state["attempts"] = 0
 
     # save
-    studentmodule.state = json.dumps(problem_state)
-    studentmodule.save()
+    client.set(student.username, usage_key, problem_state)
 
 
 def _fire_score_changed_for_block(
@@ -9,6 +9,7 @@ from abc import ABCMeta
 import mock
 from ccx_keys.locator import CCXLocator
 from django.conf import settings
+from django.test.utils import override_settings
 from django.utils.translation import override as override_language
 from django.utils.translation import get_language
 from mock import patch
@@ -16,7 +17,8 @@ from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
-from courseware.models import StudentModule
+from courseware.models import ShardedStudentModule, StudentModule
+from courseware.user_state_client import ShardedXBlockUserStateClient
 from grades.new.subsection_grade_factory import SubsectionGradeFactory
 from grades.tests.utils import answer_problem
 from lms.djangoapps.ccx.tests.factories import CcxFactory
@@ -501,6 +503,54 @@ class TestInstructorEnrollmentStudentModule(SharedModuleStoreTestCase):
         self.assertEqual(unrelated_state['brains'], 'zombie')
 
 
+@attr(shard=1)
+@override_settings(XBLOCK_USER_STATE_CLIENT='courseware.user_state_client.ShardedXBlockUserStateClient')
+class TestInstructorEnrollmentShardedStudentModule(SharedModuleStoreTestCase):
+    """ Test student module manipulations, with the state stored by the ShardedXBlockUserStateClient. """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestInstructorEnrollmentShardedStudentModule, cls).setUpClass()
+        cls.course = CourseFactory(
+            name='fake',
+            org='course',
+            run='id',
+        )
+        # pylint: disable=no-member
+        cls.course_key = cls.course.location.course_key
+        cls.msk = cls.course_key.make_usage_key('dummy', 'module')
+
+    def setUp(self):
+        super(TestInstructorEnrollmentShardedStudentModule, self).setUp()
+        self.user = UserFactory()
+        self.client = ShardedXBlockUserStateClient()
+        # The StudentModule only holds the score, the state is in the shards.
+        StudentModule.objects.create(
+            student=self.user,
+            course_id=self.course_key,
+            module_state_key=self.msk,
+        )
+        self.client.set(self.user.username, self.msk, {'attempts': 32, 'otherstuff': 'alsorobots'})
+
+    def test_reset_student_attempts(self):
+        reset_student_attempts(self.course_key, self.user, self.msk, requesting_user=self.user)
+        self.assertEqual(
+            self.client.get(self.user.username, self.msk).state,
+            {'attempts': 0, 'otherstuff': 'alsorobots'},
+        )
+
+    @mock.patch('lms.djangoapps.grades.signals.handlers.PROBLEM_WEIGHTED_SCORE_CHANGED.send')
+    def test_delete_student_attempts(self, _mock_signal):
+        reset_student_attempts(self.course_key, self.user, self.msk, requesting_user=self.user, delete_module=True)
+        self.assertFalse(StudentModule.objects.filter(student=self.user).exists())
+        with self.assertRaises(self.client.DoesNotExist):
+            self.client.get(self.user.username, self.msk)
+        for shard in settings.STUDENT_MODULE_SHARDS:
+            self.assertFalse(ShardedStudentModule.objects.using(shard).filter(student_id=self.user.id).exists())
+
+
 class TestStudentModuleGrading(SharedModuleStoreTestCase):
     """
     Tests the effects of student module manipulations
@@ -169,10 +169,25 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(CourseGradeReport.generate, xmodule_instance_args)
+    task_fn = partial(CourseGradeReport.generate, xmodule_instance_args, batch_task=calculate_grades_csv_batch)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_batch(entry_id, xmodule_instance_args, batch_index, user_list, subtask_status_dict):
+    """
+    Grade a batch of the learners of a course for a grade report that
+    calculate_grades_csv has split across subtasks.  The subtask that
+    grades the last batch pushes the results to an S3 bucket for download.
+
+    `user_list` is a list of dicts holding the 'pk' of each learner, and
+    `subtask_status_dict` is the SubtaskStatus of this subtask, as a dict.
+    """
+    return CourseGradeReport.generate_batch(
+        entry_id, xmodule_instance_args, batch_index, user_list, subtask_status_dict
+    )
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
@@ -1,13 +1,18 @@
 """
 Functionality for generating grade reports.
 """
+import json
 import logging
 import re
 from collections import OrderedDict
 from datetime import datetime
-from itertools import chain, izip, izip_longest
+from itertools import chain, count, izip, izip_longest
 from time import time
 
+from celery.states import FAILURE, SUCCESS
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
 from lazy import lazy
 from pytz import UTC
 
@@ -16,7 +21,6 @@ from courseware.courses import get_course_by_id
 from instructor_analytics.basic import list_problem_responses
 from instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.grades.context import grading_context, grading_context_for_course
-from lms.djangoapps.grades.models import PersistentCourseGrade
 from lms.djangoapps.grades.new.course_grade_factory import CourseGradeFactory
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
@@ -29,6 +33,14 @@ from xmodule.modulestore.django import modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
 
+from ..config.models import GradeReportSetting
+from ..models import InstructorTask, ReportStore
+from ..subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status
+)
 from .runner import TaskProgress
 from .utils import upload_csv_to_report_store
 
@@ -180,7 +192,6 @@ class _CourseGradeBulkContext(object):
         self.enrollments = _EnrollmentBulkContext(context, users)
         bulk_cache_cohorts(context.course_id, users)
         BulkRoleCache.prefetch(users)
-        PersistentCourseGrade.prefetch(context.course_id, users)
         BulkCourseTags.prefetch(context.course_id, users)
 
 
@@ -192,14 +203,58 @@ class CourseGradeReport(object):
     USER_BATCH_SIZE = 100
 
     @classmethod
-    def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+    def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name, batch_task=None):
         """
         Public method to generate a grade report.
+
+        When a `batch_task` is given and GradeReportSetting is enabled, the
+        learners are graded in batches by subtasks created from `batch_task`
+        rather than in the current task.
         """
         with modulestore().bulk_operations(course_id):
             context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
+            if batch_task is not None:
+                setting = GradeReportSetting.current()
+                if setting.enabled:
+                    return CourseGradeReport()._delegate_batches(
+                        context, _xmodule_instance_args, _entry_id, batch_task, setting.batch_size
+                    )
             return CourseGradeReport()._generate(context)
 
+    @classmethod
+    def generate_batch(cls, entry_id, xmodule_instance_args, batch_index, user_list, subtask_status_dict):
+        """
+        Public method to grade one batch of learners of a grade report that
+        was delegated to subtasks, and to upload the report once the last
+        batch of the report has been graded.
+        """
+        entry = InstructorTask.objects.get(pk=entry_id)
+        subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+        current_task_id = subtask_status.task_id
+        check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+        action_name = json.loads(entry.task_output)['action_name']
+        context = _CourseGradeReportContext(
+            xmodule_instance_args, entry_id, entry.course_id, entry.task_input, action_name
+        )
+        try:
+            users_by_id = cls._enrolled_users(context.course_id).in_bulk([item['pk'] for item in user_list])
+            users = [users_by_id[item['pk']] for item in user_list if item['pk'] in users_by_id]
+            success_rows, error_rows = CourseGradeReport()._rows_for_users(context, users)
+            cls._store_batch(context, entry, batch_index, success_rows, error_rows)
+        except Exception:
+            TASK_LOG.exception(
+                u'%s, Task type: %s, Failed to grade batch %s', context.task_info_string, action_name, batch_index
+            )
+            subtask_status.increment(failed=len(user_list), state=FAILURE)
+            update_subtask_status(entry_id, current_task_id, subtask_status)
+            raise
+
+        subtask_status.increment(succeeded=len(success_rows), failed=len(error_rows), state=SUCCESS)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        CourseGradeReport()._upload_batches_if_complete(context, entry_id)
+        return subtask_status.to_dict()
+
     def _generate(self, context):
         """
         Internal method for generating a grade report for the given context.
@@ -217,6 +272,141 @@ class CourseGradeReport(object):
 
         return context.update_status(u'Completed grades')
 
+    def _delegate_batches(self, context, xmodule_instance_args, entry_id, batch_task, batch_size):
+        """
+        Queues a subtask created from `batch_task` for each batch of
+        `batch_size` learners, in the order in which they are graded
+        serially, and returns the task progress.  Reports with a single
+        batch of learners are generated in the current task.
+        """
+        entry = InstructorTask.objects.get(pk=entry_id)
+
+        # As with bulk email, the same task may be run again when the
+        # connection to the broker is lost.  The subtasks queued by the
+        # first run are left to complete the report.
+        if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+            TASK_LOG.warning(u'%s, Subtasks have already been queued', context.task_info_string)
+            return json.loads(entry.task_output)
+
+        enrolled_users = self._enrolled_users(context.course_id)
+        total_num_users = enrolled_users.count()
+        if total_num_users <= batch_size:
+            return self._generate(context)
+
+        batch_indexes = count()
+
+        def _create_batch_subtask(user_list, initial_subtask_status):
+            """
+            Creates a subtask to grade the given batch of learners.
+            """
+            return batch_task.subtask(
+                (
+                    entry_id,
+                    xmodule_instance_args,
+                    next(batch_indexes),
+                    user_list,
+                    initial_subtask_status.to_dict(),
+                ),
+                task_id=initial_subtask_status.task_id,
+                routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+            )
+
+        context.update_status(u'Queuing grades')
+        return queue_subtasks_for_query(
+            entry,
+            context.action_name,
+            _create_batch_subtask,
+            [enrolled_users],
+            [],
+            batch_size,
+            total_num_users,
+        )
+
+    @staticmethod
+    def _batch_filename(entry, batch_index):
+        """
+        Returns the name of the report store file holding the rows of the
+        given batch of a report delegated to subtasks.  The files are kept
+        in a directory of their own, so that they are not listed among the
+        reports of the course.
+        """
+        return u'grade_report_batches/{task_id}/{batch_index:06d}.json'.format(
+            task_id=entry.task_id,
+            batch_index=batch_index,
+        )
+
+    @classmethod
+    def _store_batch(cls, context, entry, batch_index, success_rows, error_rows):
+        """
+        Stores the (success_rows, error_rows) of the given batch in the
+        report store, until the report is compiled.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        report_store.store(
+            context.course_id,
+            cls._batch_filename(entry, batch_index),
+            ContentFile(json.dumps([success_rows, error_rows])),
+        )
+
+    def _upload_batches_if_complete(self, context, entry_id):
+        """
+        Compiles and uploads the report from the rows stored by its
+        subtasks, when all of them have completed.  Only the first subtask
+        to find all of them completed does so.
+        """
+        entry = self._claim_upload_if_complete(entry_id)
+        if entry is None:
+            return
+
+        subtask_dict = json.loads(entry.subtasks)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        batch_paths = [
+            report_store.path_to(context.course_id, self._batch_filename(entry, batch_index))
+            for batch_index in xrange(subtask_dict['total'])
+        ]
+        batched_rows = []
+        for batch_path in batch_paths:
+            with report_store.storage.open(batch_path) as batch_file:
+                batched_rows.append(json.load(batch_file))
+
+        TASK_LOG.info(u'%s, Task type: %s, Uploading grades', context.task_info_string, context.action_name)
+        success_rows, error_rows = self._compile(context, batched_rows)
+        self._upload(context, self._success_headers(context), success_rows, self._error_headers(), error_rows)
+
+        for batch_path in batch_paths:
+            report_store.storage.delete(batch_path)
+
+    @staticmethod
+    @transaction.atomic
+    def _claim_upload_if_complete(entry_id):
+        """
+        Records in the subtasks of the InstructorTask that its report is
+        being uploaded, and returns the InstructorTask, when all of its
+        subtasks have completed.  Returns None when some of them haven't completed,
+        or when the upload was already claimed by another subtask, as more
+        than one subtask (or a retried one) may find all of them completed.
+
+        Uses select_for_update to lock the InstructorTask while it is
+        updated, as the statuses of the subtasks are.
+        """
+        entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+        subtask_dict = json.loads(entry.subtasks)
+        if subtask_dict['succeeded'] + subtask_dict['failed'] < subtask_dict['total']:
+            return None
+        if subtask_dict['failed'] > 0:
+            raise ValueError(
+                u'Grade report for InstructorTask {} is incomplete: {} of {} subtasks failed'.format(
+                    entry_id, subtask_dict['failed'], subtask_dict['total'],
+                )
+            )
+        if subtask_dict.get('report_uploaded'):
+            return None
+
+        subtask_dict['report_uploaded'] = True
+        entry.subtasks = json.dumps(subtask_dict)
+        entry.save()
+        return entry
+
     def _success_headers(self, context):
         """
         Returns a list of all applicable column headers for this grade report.
@@ -293,9 +483,16 @@ class CourseGradeReport(object):
             args = [iter(iterable)] * chunk_size
             return izip_longest(*args, fillvalue=fillvalue)
 
-        users = CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True)
-        users = users.select_related('profile__allow_certificate')
-        return grouper(users)
+        return grouper(self._enrolled_users(context.course_id))
+
+    @staticmethod
+    def _enrolled_users(course_id):
+        """
+        Returns the users enrolled in the given course, in the order in
+        which they are graded.
+        """
+        users = CourseEnrollment.objects.users_enrolled_in(course_id, include_inactive=True)
+        return users.select_related('profile__allow_certificate')
 
     def _user_grade_results(self, course_grade, context):
         """
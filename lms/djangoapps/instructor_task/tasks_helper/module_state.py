@@ -1,7 +1,6 @@
 """
 Instructor Tasks related to module state.
 """
-import json
 import logging
 from time import time
 
@@ -15,6 +14,7 @@ from courseware.courses import get_course_by_id, get_problems_in_section
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
 from courseware.models import StudentModule
 from courseware.module_render import get_module_for_descriptor_internal
+from courseware.user_state_client import get_user_state_client
 from eventtracking import tracker
 from lms.djangoapps.grades.scores import weighted_score
 from track.contexts import course_context_from_course_id
@@ -229,17 +229,21 @@ def reset_attempts_module_state(xmodule_instance_args, _module_descriptor, stude
     that are being reset, and UPDATE_STATUS_SKIPPED otherwise.
     """
     update_status = UPDATE_STATUS_SKIPPED
-    problem_state = json.loads(student_module.state) if student_module.state else {}
+    student = student_module.student
+    client = get_user_state_client(student)
+    usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+    try:
+        problem_state = client.get(student.username, usage_key).state
+    except client.DoesNotExist:
+        problem_state = {}
     if 'attempts' in problem_state:
         old_number_of_attempts = problem_state["attempts"]
         if old_number_of_attempts > 0:
             problem_state["attempts"] = 0
-            # convert back to json and save
-            student_module.state = json.dumps(problem_state)
-            student_module.save()
+            client.set(student.username, usage_key, problem_state)
             # get request-related tracking information from args passthrough,
             # and supplement with task-specific information:
-            track_function = _get_track_function_for_task(student_module.student, xmodule_instance_args)
+            track_function = _get_track_function_for_task(student, xmodule_instance_args)
             event_info = {"old_attempts": old_number_of_attempts, "new_attempts": 0}
             track_function('problem_reset_attempts', event_info)
             update_status = UPDATE_STATUS_SUCCEEDED
@@ -250,11 +254,15 @@ def reset_attempts_module_state(xmodule_instance_args, _module_descriptor, stude
 @outer_atomic
 def delete_problem_module_state(xmodule_instance_args, _module_descriptor, student_module, _task_input):
     """
-    Delete the StudentModule entry.
+    Delete the StudentModule entry, and the state stored for it by the XBlockUserStateClient.
 
     Always returns UPDATE_STATUS_SUCCEEDED, indicating success, if it doesn't raise an exception due to database error.
     """
     student_module.delete()
+    get_user_state_client(student_module.student).delete(
+        student_module.student.username,
+        student_module.module_state_key.map_into_course(student_module.course_id),
+    )
     # get request-related tracking information from args passthrough,
     # and supplement with task-specific information:
     track_function = _get_track_function_for_task(student_module.student, xmodule_instance_args)
@@ -11,13 +11,16 @@ from uuid import uuid4
 
 import ddt
 from celery.states import FAILURE, SUCCESS
+from django.conf import settings
+from django.test.utils import override_settings
 from django.utils.translation import ugettext_noop
 from mock import MagicMock, Mock, patch
 from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import i4xEncoder
 
-from courseware.models import StudentModule
+from courseware.models import ShardedStudentModule, StudentModule
 from courseware.tests.factories import StudentModuleFactory
+from courseware.user_state_client import ShardedXBlockUserStateClient
 from lms.djangoapps.instructor_task.exceptions import UpdateProblemModuleStateError
 from lms.djangoapps.instructor_task.models import InstructorTask
 from lms.djangoapps.instructor_task.tasks import (
@@ -34,6 +37,7 @@ from student.tests.factories import CourseEnrollmentFactory, UserFactory
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
 PROBLEM_URL_NAME = "test_urlname"
+SHARDED_USER_STATE_CLIENT = 'courseware.user_state_client.ShardedXBlockUserStateClient'
 
 
 class TestTaskFailure(Exception):
@@ -158,6 +162,16 @@ class TestInstructorTasks(InstructorTaskModuleTestCase):
                                         state=state)
         return students
 
+    def _create_students_with_sharded_state(self, num_students, state):
+        """
+        Create students, a problem, and StudentModule objects holding only their scores, with
+        the state of the problem stored by the ShardedXBlockUserStateClient.
+        """
+        students = self._create_students_with_state(num_students)
+        for student in students:
+            ShardedXBlockUserStateClient(student).set(student.username, self.location, state)
+        return students
+
     def _assert_num_attempts(self, students, num_attempts):
         """Check the number attempts for all students is the same"""
         for student in students:
@@ -336,6 +350,8 @@ class TestRescoreInstructorTask(TestInstructorTasks):
 @attr(shard=3)
 class TestResetAttemptsInstructorTask(TestInstructorTasks):
     """Tests instructor task that resets problem attempts."""
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
 
     def test_reset_missing_current_task(self):
         self._test_missing_current_task(reset_problem_attempts)
@@ -425,6 +441,19 @@ class TestResetAttemptsInstructorTask(TestInstructorTasks):
             else:
                 self.assertEquals(state['attempts'], initial_attempts)
 
+    @override_settings(XBLOCK_USER_STATE_CLIENT=SHARDED_USER_STATE_CLIENT)
+    def test_reset_with_sharded_state(self):
+        num_students = 3
+        students = self._create_students_with_sharded_state(num_students, {'attempts': 3, 'other': 'value'})
+        self._test_run_with_task(reset_problem_attempts, 'reset', num_students)
+        client = ShardedXBlockUserStateClient()
+        for student in students:
+            self.assertEquals(client.get(student.username, self.location).state, {'attempts': 0, 'other': 'value'})
+            module = StudentModule.objects.get(course_id=self.course.id,
+                                               student=student,
+                                               module_state_key=self.location)
+            self.assertIsNone(module.state)
+
     def test_reset_with_student_username(self):
         self._test_reset_with_student(False)
 
@@ -435,6 +464,8 @@ class TestResetAttemptsInstructorTask(TestInstructorTasks):
 @attr(shard=3)
 class TestDeleteStateInstructorTask(TestInstructorTasks):
     """Tests instructor task that deletes problem state."""
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
 
     def test_delete_missing_current_task(self):
         self._test_missing_current_task(delete_problem_state)
@@ -475,6 +506,18 @@ class TestDeleteStateInstructorTask(TestInstructorTasks):
                                           student=student,
                                           module_state_key=self.location)
 
+    @override_settings(XBLOCK_USER_STATE_CLIENT=SHARDED_USER_STATE_CLIENT)
+    def test_delete_with_sharded_state(self):
+        num_students = 3
+        students = self._create_students_with_sharded_state(num_students, {'attempts': 3})
+        self._test_run_with_task(delete_problem_state, 'deleted', num_students)
+        client = ShardedXBlockUserStateClient()
+        for student in students:
+            with self.assertRaises(client.DoesNotExist):
+                client.get(student.username, self.location)
+        for shard in settings.STUDENT_MODULE_SHARDS:
+            self.assertFalse(ShardedStudentModule.objects.using(shard).filter(course_id=self.course.id).exists())
+
 
 class TestCertificateGenerationnstructorTask(TestInstructorTasks):
     """Tests instructor task that generates student certificates."""
@@ -8,14 +8,17 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 
 """
 
+import json
 import os
 import shutil
 import tempfile
 import urllib
 from datetime import datetime
+from uuid import uuid4
 
 import ddt
 import unicodecsv
+from celery.states import FAILURE, SUCCESS
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
@@ -45,13 +48,15 @@ from lms.djangoapps.instructor_task.tasks_helper.grades import (
     NOT_ENROLLED_IN_COURSE,
     CourseGradeReport,
     ProblemGradeReport,
-    ProblemResponses
+    ProblemResponses,
+    _CourseGradeReportContext
 )
 from lms.djangoapps.instructor_task.tasks_helper.misc import (
     cohort_students_and_upload,
     upload_course_survey_report,
     upload_ora2_data
 )
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from lms.djangoapps.instructor_task.tests.test_base import (
     InstructorTaskCourseTestCase,
     InstructorTaskModuleTestCase,
@@ -82,7 +87,9 @@ from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, check_mongo_calls
 from xmodule.partitions.partitions import Group, UserPartition
 
-from ..models import ReportStore
+from ..config.models import GradeReportSetting
+from ..models import InstructorTask, ReportStore
+from ..tasks import calculate_grades_csv
 from ..tasks_helper.utils import UPDATE_STATUS_FAILED, UPDATE_STATUS_SUCCEEDED
 
 
@@ -394,7 +401,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
 
         RequestCache.clear_request_cache()
 
-        expected_query_count = 41
+        expected_query_count = 43
         with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
             with check_mongo_calls(mongo_count):
                 with self.assertNumQueries(expected_query_count):
@@ -422,6 +429,96 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
             {'attempted': expected_students, 'succeeded': expected_students, 'failed': 0}, result
         )
 
+    def test_report_split_across_subtasks_matches_serial_report(self):
+        for index in range(5):
+            self.create_student(u'student{}'.format(index), u'student{}@example.com'.format(index))
+        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+            CourseGradeReport.generate(None, None, self.course.id, None, 'graded')
+        serial_rows = self._read_report_rows()
+
+        GradeReportSetting.objects.create(enabled=True, batch_size=2)
+        entry = self._run_grades_csv_task()
+
+        self.assertEqual(len(serial_rows), 5)
+        self.assertEqual(self._read_report_rows(), serial_rows)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 3, 'failed': 0}, json.loads(entry.subtasks))
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0, 'total': 5}, json.loads(entry.task_output)
+        )
+        # The rows stored by the subtasks are removed once the report is uploaded.
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 2)
+        batch_dirs, _ = report_store.storage.listdir(report_store.path_to(self.course.id, 'grade_report_batches'))
+        for batch_dir in batch_dirs:
+            batch_path = report_store.path_to(self.course.id, os.path.join('grade_report_batches', batch_dir))
+            self.assertEqual(report_store.storage.listdir(batch_path), ([], []))
+
+    def test_report_not_uploaded_when_a_subtask_fails(self):
+        for index in range(5):
+            self.create_student(u'student{}'.format(index), u'student{}@example.com'.format(index))
+        GradeReportSetting.objects.create(enabled=True, batch_size=2)
+
+        with patch.object(CourseGradeReport, '_store_batch', side_effect=[None, Exception('boom'), None]):
+            entry = self._run_grades_csv_task()
+
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 2, 'failed': 1}, json.loads(entry.subtasks))
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+
+    def test_report_uploaded_once(self):
+        for index in range(5):
+            self.create_student(u'student{}'.format(index), u'student{}@example.com'.format(index))
+        GradeReportSetting.objects.create(enabled=True, batch_size=2)
+
+        with patch.object(
+            CourseGradeReport, '_upload', autospec=True, side_effect=CourseGradeReport._upload
+        ) as mock_upload:
+            entry = self._run_grades_csv_task()
+            # Late or retried subtasks may also find all of the subtasks completed.
+            context = _CourseGradeReportContext({}, entry.id, entry.course_id, entry.task_input, 'graded')
+            for _ in range(2):
+                CourseGradeReport()._upload_batches_if_complete(context, entry.id)  # pylint: disable=protected-access
+
+        self.assertEqual(mock_upload.call_count, 1)
+        self.assertEqual(len(self._read_report_rows()), 5)
+
+    def test_single_batch_report_is_not_split(self):
+        self.create_student(u'student', u'student@example.com')
+        GradeReportSetting.objects.create(enabled=True, batch_size=2)
+
+        entry = self._run_grades_csv_task()
+
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(entry.subtasks, '')
+        self.assertEqual(len(self._read_report_rows()), 1)
+
+    def _run_grades_csv_task(self):
+        """
+        Runs the celery task generating the grade report of the course, and
+        returns its reloaded InstructorTask.
+        """
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_key='',
+            task_id=str(uuid4()),
+        )
+        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+            calculate_grades_csv.apply([entry.id, {}], task_id=entry.task_id)
+        return InstructorTask.objects.get(pk=entry.id)
+
+    def _read_report_rows(self):
+        """
+        Returns the rows of the most recent grade report of the course.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        report_csv_filename = report_store.links_for(self.course.id)[0][0]
+        report_path = report_store.path_to(self.course.id, report_csv_filename)
+        with report_store.storage.open(report_path) as csv_file:
+            return list(unicodecsv.DictReader(csv_file))
+
 
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
@@ -1,19 +1,26 @@
+from challenges.models import ChallengeSubmission
 from ci_program.api import get_program_by_program_code
+from courseware.models import StudentModule
 from django.conf import settings
+from django.db import connection
+from django.db.models import Q
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from opaque_keys.edx.locator import CourseLocator
-from xmodule.modulestore.django import modulestore
+from openedx.core.djangoapps.content.block_structure.api import get_course_breadcrumbs
 from lms.djangoapps.learning_success.management.commands.challenges_helper import extract_all_student_challenges
 
 from collections import Counter, defaultdict, OrderedDict
 from datetime import datetime, timedelta
+from itertools import groupby, islice
 import json
+from operator import itemgetter, or_
 import math
 import pandas as pd
 import pytz
 import requests
-from sqlalchemy import create_engine, types
+from sqlalchemy import (Column, MetaData, Table, and_, column, create_engine,
+                        select, table, types)
 
 KEYS = ['module','section','lesson']
 utc=pytz.UTC
@@ -33,21 +40,24 @@ CONNECTION_STRING = 'mysql+mysqldb://%s:%s@%s:%s/%s%s' % (
 LMS_ACTIVITY_TABLE = settings.LMS_ACTIVITY_TABLE
 ROWS_PER_PACKET = 1000
 
-
-def harvest_course_tree(tree, output_dict, prefix=()):
-    """Recursively harvest the breadcrumbs for each component in a tree
-
-    Populates output_dict
-    """
-    block_name = tree.display_name
-    block_breadcrumbs = prefix + (tree.display_name,)
-    block_id = tree.location.block_id
-
-    output_dict[block_id] = block_breadcrumbs
-
-    children = tree.get_children()
-    for subtree in children:
-        harvest_course_tree(subtree, output_dict, prefix=block_breadcrumbs)
+# The columns of the activity table that identify the rows of a student
+ACTIVITY_TABLE = table(
+    LMS_ACTIVITY_TABLE,
+    column('email'),
+    column('source_platform'),
+    column('program_code'),
+)
+
+# The time each program was last exported, for incremental exports
+WATERMARK_METADATA = MetaData()
+WATERMARK_TABLE = Table(
+    getattr(settings, 'LMS_ACTIVITY_WATERMARK_TABLE',
+            'lms_activity_watermark'),
+    WATERMARK_METADATA,
+    Column('source_platform', types.String(50), primary_key=True),
+    Column('program_code', types.String(50), primary_key=True),
+    Column('watermark', types.DateTime, nullable=False),
+)
 
 
 def harvest_program(program):
@@ -57,8 +67,9 @@ def harvest_program(program):
     """
     all_blocks = {}
     for course_locator in program.get_course_locators():
-        course = modulestore().get_course(course_locator)
-        harvest_course_tree(course, all_blocks)
+        all_blocks.update(
+            (block_id, block.breadcrumbs) for block_id, block
+            in get_course_breadcrumbs(course_locator).items())
     return all_blocks
 
 
@@ -205,98 +216,292 @@ def get_fractions(lesson_fractions, completed_fractions, block_id, breadcrumbs,
         'cumulative_fraction' : cumulative_fraction}
 
 
-def all_student_data(program):
+def stream_rows(queryset, chunk_size=ROWS_PER_PACKET):
+    """Iterate over the rows of a `values_list` queryset without buffering
+    the whole result set in memory
+
+    On MySQL the query is run through an unbuffered, server-side cursor so
+    that rows are fetched from the database as they are consumed. Other
+    backends fall back to Django's own chunked iterator.
+
+    Yields raw row tuples in the order of the queryset
+    """
+    if connection.vendor != 'mysql':
+        for row in queryset.iterator():
+            yield row
+        return
+
+    from MySQLdb.cursors import SSCursor
+
+    sql, params = queryset.query.sql_with_params()
+    connection.ensure_connection()
+    cursor = connection.connection.cursor(SSCursor)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+
+def as_utc(value):
+    """Raw cursors hand back naive datetimes, which are stored in UTC"""
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value, utc)
+    return value
+
+
+def program_activities(program, course_locators, student_ids=None):
+    """Stream the activity records of every student enrolled in the program
+
+    All the `StudentModule` rows for the program are read in a single query
+    ordered by `(student_id, modified)`, so the number of queries doesn't
+    depend on the number of students.
+
+    Yields a `(student_id, activities)` pair for each student that has any
+    activity, where `activities` is a list of `(block_id, created, modified)`
+    tuples in the order they were modified
+
+    `student_ids` optionally limits the stream to the given students
+    """
+    location_field = StudentModule._meta.get_field('module_state_key')
+    queryset = StudentModule.objects.filter(
+        course_id__in=course_locators,
+        student_id__in=program.enrolled_students.values('id'),
+    )
+    if student_ids is not None:
+        queryset = queryset.filter(student_id__in=student_ids)
+    queryset = queryset.order_by('student_id', 'modified').values_list(
+        'student_id', 'module_state_key', 'created', 'modified')
+
+    rows = stream_rows(queryset)
+    for student_id, student_rows in groupby(rows, key=itemgetter(0)):
+        yield student_id, [
+            (location_field.to_python(module_state_key).block_id,
+             as_utc(created), as_utc(modified))
+            for _, module_state_key, created, modified in student_rows]
+
+
+def single_student_data(student, activities, all_components, lesson_fractions,
+                        student_challenges):
+    """Aggregate the activities of one student in a single pass
+
+    `activities` is a list of `(block_id, created, modified)` tuples ordered
+    by their modified time
+
+    Returns the progress metadata dictionary of the student
+    """
+    # remember details of the first activity
+    first_active = min(created for _, created, _ in activities) if activities \
+        else student.date_joined
+
+    # We care about the lesson level (depth 3) and unit level (depth 4).
+    # Dictionaries of breadcrumbs to timestamps of completion
+    completed_lessons = {}
+    completed_fractions = {}
+    completed_units = {}
+    all_fractions = create_fractions_dict(lesson_fractions)
+
+    # Provide default values in cases where student hasn't started
+    latest_unit_started = None
+    latest_unit_breadcrumbs = (u'',) * 4
+    for block_id, created, modified in activities:
+        breadcrumbs = all_components.get(block_id)
+        if breadcrumbs and len(breadcrumbs) == 3:  # lesson
+            # for each lesson learned, store latest timestamp
+            completed_lessons[breadcrumbs] = modified
+
+            # get timestamp and fractions for each breadcrumb
+            get_fractions(lesson_fractions, completed_fractions, block_id,
+                          breadcrumbs, modified)
+
+        if breadcrumbs and len(breadcrumbs) >= 4:  # unit or inner block
+            unit_breadcrumbs = breadcrumbs[:4]
+            # for each unit learned, store latest timestamp
+            completed_units[unit_breadcrumbs] = modified
+
+            # remember details of the latest unit overall
+            # we use 'created' (not 'modified') to ignore backward leaps
+            # to old units; sadly, there's no way to ignore forward leaps
+            latest_unit_started = created
+            latest_unit_breadcrumbs = unit_breadcrumbs
+
+    completed_fractions_last14d = n_days_fractions(
+            completed_fractions.values(), 14)
+    student_dict = {
+        'email': student.email,
+        'date_joined': format_date(first_active),
+        'last_login': format_date(student.last_login),
+        'latest_unit_completion': format_date(latest_unit_started),
+        'latest_module': latest_unit_breadcrumbs[0].encode('utf-8'),
+        'latest_section': latest_unit_breadcrumbs[1].encode('utf-8'),
+        'latest_lesson': latest_unit_breadcrumbs[2].encode('utf-8'),
+        'latest_unit': latest_unit_breadcrumbs[3].encode('utf-8'),
+        'units_in_30d': thirty_day_units(completed_units.values()),
+        'days_into_data': days_into_data(
+            first_active, completed_units.values()),
+        'completed_fractions_14d' : completed_fractions_last14d,
+        'completed_fractions_28d' : n_days_fractions(
+            completed_fractions.values(), 28) - completed_fractions_last14d,
+        'cumulative_completed_fractions' : n_days_fractions(
+            completed_fractions.values()),
+        'fractions_per_day': fractions_per_day(
+            first_active, completed_fractions.values())
+    }
+
+    completed_fractions_per_module = fractions_per_module(all_fractions,
+        completed_fractions)
+
+    student_dict.update(completed_fractions_per_module)
+    student_dict.update(completed_lessons_per_module(completed_lessons))
+    student_dict.update(completed_units_per_module(completed_units))
+    student_dict.update(
+        lessons_days_into_per_module(first_active, completed_lessons))
+    student_dict.update(student_challenges)
+
+    return student_dict
+
+
+def all_student_data(program, student_ids=None):
     """Yield a progress metadata dictionary for each of the students
 
-    Input is a pregenerated dictionary mapping block IDs in LMS to breadcrumbs
+    Students are visited in order of their id, merged against a single
+    stream of the program's activity records which is ordered the same
+    way, so only one student's activities are held in memory at a time.
+
+    `student_ids` optionally limits the export to the given students
     """
     breadcrumb_index_url = ('%s?format=amos_fractions' %
                             settings.BREADCRUMB_INDEX_URL)
     all_components = harvest_program(program)
     lesson_fractions = requests.get(breadcrumb_index_url).json()['LESSONS']
-    module_fractions = {item['module'] : item['fractions']['module_fraction']
-                        for item in lesson_fractions.values()}
-    challenges = extract_all_student_challenges(program)
-
-    for student in program.enrolled_students.all():
-        # A short name for the activities queryset
-        student_activities = student.studentmodule_set.filter(
-            course_id__in=program.get_course_locators())
-
-        student_challenges = challenges.get(student.email, {})
-
-        # remember details of the first activity
-        first_activity = student_activities.order_by('created').first()
-        first_active = (
-            first_activity.created if first_activity else student.date_joined)
-
-        # We care about the lesson level (depth 3) and unit level (depth 4).
-        # Dictionaries of breadcrumbs to timestamps of completion
-        completed_lessons = {}
-        completed_fractions = {}
-        completed_units = {}
-        all_fractions = create_fractions_dict(lesson_fractions)
-
-        # Provide default values in cases where student hasn't started
-        latest_unit_started = None
-        latest_unit_breadcrumbs = (u'',) * 4
-        for activity in student_activities.order_by('modified'):
-            block_id = activity.module_state_key.block_id
-            breadcrumbs = all_components.get(block_id)
-            if breadcrumbs and len(breadcrumbs) == 3:  # lesson
-                # for each lesson learned, store latest timestamp
-                completed_lessons[breadcrumbs] = activity.modified
-
-                # get timestamp and fractions for each breadcrumb
-                get_fractions(lesson_fractions, completed_fractions, block_id,
-                              breadcrumbs, activity.modified)
-
-            if breadcrumbs and len(breadcrumbs) >= 4:  # unit or inner block
-                unit_breadcrumbs = breadcrumbs[:4]
-                # for each unit learned, store latest timestamp
-                completed_units[unit_breadcrumbs] = activity.modified
-
-                # remember details of the latest unit overall
-                # we use 'created' (not 'modified') to ignore backward leaps
-                # to old units; sadly, there's no way to ignore forward leaps
-                latest_unit_started = activity.created
-                latest_unit_breadcrumbs = unit_breadcrumbs
-
-
-        completed_fractions_last14d = n_days_fractions(
-                completed_fractions.values(), 14)
-        student_dict = {
-            'email': student.email,
-            'date_joined': format_date(first_active),
-            'last_login': format_date(student.last_login),
-            'latest_unit_completion': format_date(latest_unit_started),
-            'latest_module': latest_unit_breadcrumbs[0].encode('utf-8'),
-            'latest_section': latest_unit_breadcrumbs[1].encode('utf-8'),
-            'latest_lesson': latest_unit_breadcrumbs[2].encode('utf-8'),
-            'latest_unit': latest_unit_breadcrumbs[3].encode('utf-8'),
-            'units_in_30d': thirty_day_units(completed_units.values()),
-            'days_into_data': days_into_data(
-                first_active, completed_units.values()),
-            'completed_fractions_14d' : completed_fractions_last14d,
-            'completed_fractions_28d' : n_days_fractions(
-                completed_fractions.values(), 28) - completed_fractions_last14d,
-            'cumulative_completed_fractions' : n_days_fractions(
-                completed_fractions.values()),
-            'fractions_per_day': fractions_per_day(
-                first_active, completed_fractions.values())
-        }
-
-        completed_fractions_per_module = fractions_per_module(all_fractions,
-            completed_fractions)
-
-        student_dict.update(completed_fractions_per_module)
-        student_dict.update(completed_lessons_per_module(completed_lessons))
-        student_dict.update(completed_units_per_module(completed_units))
-        student_dict.update(
-            lessons_days_into_per_module(first_active, completed_lessons))
-        student_dict.update(student_challenges)
-
-        yield student_dict
+    challenges = extract_all_student_challenges(program, student_ids)
+
+    # The students have to be read before the activity stream is opened,
+    # as no other query can run on the connection while it is streaming
+    students = program.enrolled_students.order_by('id').only(
+        'id', 'email', 'date_joined', 'last_login')
+    if student_ids is not None:
+        students = students.filter(id__in=student_ids)
+    students = list(students)
+    if not students:
+        return
+
+    activities = program_activities(
+        program, program.get_course_locators(), student_ids)
+    next_activities = next(activities, None)
+
+    for student in students:
+        # Skip the activities of anyone who isn't in the ordered students
+        while next_activities and next_activities[0] < student.id:
+            next_activities = next(activities, None)
+
+        student_activities = []
+        if next_activities and next_activities[0] == student.id:
+            student_activities = next_activities[1]
+            next_activities = next(activities, None)
+
+        yield single_student_data(
+            student, student_activities, all_components, lesson_fractions,
+            challenges.get(student.email, {}))
+
+
+def chunked(iterable, chunk_size=ROWS_PER_PACKET):
+    """Split an iterable into lists of at most chunk_size items"""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def get_watermark(conn, source_platform, program_code):
+    """Read the time of the last export of the program
+
+    Returns the watermark as an aware datetime, or None if the program
+    hasn't been exported yet
+    """
+    watermark = conn.execute(
+        select([WATERMARK_TABLE.c.watermark]).where(and_(
+            WATERMARK_TABLE.c.source_platform == source_platform,
+            WATERMARK_TABLE.c.program_code == program_code))
+    ).scalar()
+    return as_utc(watermark)
+
+
+def set_watermark(conn, source_platform, program_code, watermark):
+    """Record the time that the export of the program started"""
+    conn.execute(WATERMARK_TABLE.delete().where(and_(
+        WATERMARK_TABLE.c.source_platform == source_platform,
+        WATERMARK_TABLE.c.program_code == program_code)))
+    conn.execute(WATERMARK_TABLE.insert().values(
+        source_platform=source_platform,
+        program_code=program_code,
+        watermark=watermark.astimezone(utc).replace(tzinfo=None)))
+
+
+def program_rows(source_platform, program_code):
+    """Get the clause that matches the activity rows of the program"""
+    return and_(ACTIVITY_TABLE.c.source_platform == source_platform,
+                ACTIVITY_TABLE.c.program_code == program_code)
+
+
+def exported_emails(conn, source_platform, program_code):
+    """Get the emails of all students already in the activity table"""
+    rows = conn.execute(select([ACTIVITY_TABLE.c.email]).where(
+        program_rows(source_platform, program_code)))
+    return {email for email, in rows}
+
+
+def program_challenge_submissions(course_locators):
+    """Get the challenge submissions for the challenges of the program
+
+    Challenges are matched to the program's courses through the course key
+    at the start of their `block_locator`
+    """
+    return ChallengeSubmission.objects.filter(reduce(or_, [
+        Q(challenge__block_locator__startswith='block-v1:{}+{}+{}+'.format(
+            course_locator.org, course_locator.course, course_locator.run))
+        for course_locator in course_locators], Q(pk__in=[])))
+
+
+def changed_student_ids(program, since, exported):
+    """Find the students whose activity records are out of date
+
+    A student needs to be exported again if they have worked on any
+    component or submitted a challenge since the last export, or if they
+    were enrolled after it and aren't in the activity table yet.
+
+    Returns a set of user ids
+    """
+    enrolled = program.enrolled_students.values('id')
+    course_locators = program.get_course_locators()
+    active = StudentModule.objects.filter(
+        course_id__in=course_locators,
+        student_id__in=enrolled,
+        modified__gt=since,
+    ).values_list('student_id', flat=True).distinct()
+    submitted = program_challenge_submissions(course_locators).filter(
+        student_id__in=enrolled,
+        time_challenge_submitted__gt=since,
+    ).values_list('student_id', flat=True).distinct()
+    not_exported = (
+        student_id for student_id, email
+        in program.enrolled_students.values_list('id', 'email')
+        if email not in exported)
+    return set(active) | set(submitted) | set(not_exported)
+
+
+def delete_students(conn, source_platform, program_code, emails):
+    """Remove the activity records of the given students"""
+    for emails_chunk in chunked(emails):
+        conn.execute(ACTIVITY_TABLE.delete().where(and_(
+            program_rows(source_platform, program_code),
+            ACTIVITY_TABLE.c.email.in_(emails_chunk))))
 
 
 class Command(BaseCommand):
@@ -305,31 +510,71 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('source_platform', type=str)
         parser.add_argument('program_code', type=str)
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            default=False,
+            help=('Only export students with activity since the last run. '
+                  'Time based columns of the other students, such as '
+                  'units_in_30d, are only refreshed by a full run.'))
 
     def handle(self, source_platform, program_code, **kwargs):
         """POST the collected data to the api endpoint from the settings
             Arguments:
                 source_platform: Platform import as, i.e. 'juniper' or 'ginkgo'
                 program_code: Program code of program to use 'disd'
+                incremental: Only recompute the students with new activity
         """
 
         program = get_program_by_program_code(program_code)
-        student_data = list(all_student_data(program))
+        created = datetime.now()
+        # Anything modified while the export runs is picked up next time
+        export_started = timezone.now()
 
         engine = create_engine(CONNECTION_STRING, echo=False)
+        # MySQL commits the open transaction before any DDL, so the
+        # watermark table is created before the transaction begins
+        WATERMARK_METADATA.create_all(engine)
+
+        # The rows of the program are removed, added and watermarked in a
+        # single transaction, so a failed export leaves them untouched
         with engine.begin() as conn:
-            # remove existing
-            conn.execute("delete from lms_activity where source_platform = %s", (source_platform,))
-
-            # add new
-            df = pd.DataFrame(student_data)
-            df['created'] = datetime.now()
-            # TODO: Add arg for source_platform
-            df['source_platform'] = source_platform
-            df['program_code'] = program_code
-            write_type = 'append'
-
-            df.to_sql(name=LMS_ACTIVITY_TABLE,
-                    con=conn,
-                    if_exists=write_type,
-                    chunksize=1000)
+            watermark = get_watermark(conn, source_platform, program_code)
+            student_ids = None
+
+            if kwargs.get('incremental') and watermark is not None:
+                exported = exported_emails(conn, source_platform, program_code)
+                student_ids = changed_student_ids(program, watermark, exported)
+                enrolled = set(program.enrolled_students.values_list(
+                    'email', flat=True))
+                stale_emails = list(exported - enrolled) + list(
+                    program.enrolled_students.filter(
+                        id__in=student_ids).values_list('email', flat=True))
+                self.stdout.write('Exporting {} students with activity since {}'
+                                  .format(len(student_ids), watermark))
+
+                # remove the changed and unenrolled students
+                delete_students(conn, source_platform, program_code,
+                                stale_emails)
+            else:
+                # remove the existing rows of the program
+                conn.execute(ACTIVITY_TABLE.delete().where(
+                    program_rows(source_platform, program_code)))
+
+            # add new, one packet of students at a time so that memory
+            # use stays flat however many students are enrolled
+            rows = all_student_data(program, student_ids)
+            for student_data in chunked(rows):
+                df = pd.DataFrame(student_data)
+                df['created'] = created
+                # TODO: Add arg for source_platform
+                df['source_platform'] = source_platform
+                df['program_code'] = program_code
+                write_type = 'append'
+
+                df.to_sql(name=LMS_ACTIVITY_TABLE,
+                        con=conn,
+                        if_exists=write_type,
+                        chunksize=ROWS_PER_PACKET)
+
+            set_watermark(conn, source_platform, program_code, export_started)
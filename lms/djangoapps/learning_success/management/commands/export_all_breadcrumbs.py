@@ -3,7 +3,7 @@ from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from opaque_keys.edx.locator import CourseLocator
-from xmodule.modulestore.django import modulestore
+from openedx.core.djangoapps.content.block_structure.api import get_course_breadcrumbs
 import pandas as pd
 from sqlalchemy import create_engine, types
 
@@ -48,30 +48,25 @@ def get_safely(breadcrumbs, index):
         return None
 
 
-def harvest_course_tree(tree, output_list, prefix=()):
-    """Recursively harvest the breadcrumbs for each component in a tree
+def harvest_block(block_id, block):
+    """Harvest the breadcrumbs of a single component
 
-    Populates output_dict
+    Returns a dictionary containing the xblock meta data
     """
-    block_breadcrumbs = prefix + (tree.display_name,)
-
-    block = {}
-    block['block_id'] = tree.location.block_id
-    block['block_name'] = tree.display_name
-    block['block_type'] = BLOCK_TYPES.get(tree.category) or 'component'
-    block['module'] = get_safely(block_breadcrumbs, 0)
-    block['section'] = get_safely(block_breadcrumbs, 1)
-    block['lesson'] = get_safely(block_breadcrumbs, 2)
-    block['unit'] = get_safely(block_breadcrumbs, 3)
-    block['breadcrumbs'] = ' - '.join(block_breadcrumbs)
-    block['lms_category'] = tree.category
-
-    output_list.append(block)
-
-    children = tree.get_children()
-    for subtree in children:
-        harvest_course_tree(subtree, output_list, prefix=block_breadcrumbs)
-    
+    block_breadcrumbs = block.breadcrumbs
+
+    return {
+        'block_id': block_id,
+        'block_name': block_breadcrumbs[-1],
+        'block_type': BLOCK_TYPES.get(block.block_type) or 'component',
+        'module': get_safely(block_breadcrumbs, 0),
+        'section': get_safely(block_breadcrumbs, 1),
+        'lesson': get_safely(block_breadcrumbs, 2),
+        'unit': get_safely(block_breadcrumbs, 3),
+        'breadcrumbs': ' - '.join(block_breadcrumbs),
+        'lms_category': block.block_type,
+    }
+
 
 def harvest_program(program):
     """Harvest the breadcrumbs from all components in the program
@@ -80,8 +75,9 @@ def harvest_program(program):
     """
     all_blocks = []
     for course_locator in program.get_course_locators():
-        course = modulestore().get_course(course_locator)
-        harvest_course_tree(course, all_blocks)
+        all_blocks.extend(
+            harvest_block(block_id, block) for block_id, block
+            in get_course_breadcrumbs(course_locator).items())
     return all_blocks
 
 
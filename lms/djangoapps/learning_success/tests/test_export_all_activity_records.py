@@ -0,0 +1,236 @@
+"""
+Tests for the export_all_activity_records management command.
+"""
+from datetime import timedelta
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from mock import patch
+from opaque_keys.edx.locator import CourseLocator
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from challenges.models import Challenge, ChallengeSubmission
+from ci_program.models import Program
+from courseware.models import StudentModule
+from courseware.tests.factories import StudentModuleFactory
+from lms.djangoapps.learning_success.management.commands.export_all_activity_records import (
+    all_student_data,
+    changed_student_ids,
+    get_watermark,
+    program_activities,
+)
+from student.tests.factories import UserFactory
+
+COMMAND_MODULE = 'lms.djangoapps.learning_success.management.commands.export_all_activity_records'
+COURSE_KEY = CourseLocator('CI', 'HF101', '2017_T1')
+
+
+@patch.object(Program, 'get_course_locators', return_value=[COURSE_KEY])
+class ExportAllActivityRecordsTest(TestCase):
+    """
+    Tests for exporting the activity records of a program to the activity
+    table, which is kept in an in-memory database.
+    """
+
+    def setUp(self):
+        super(ExportAllActivityRecordsTest, self).setUp()
+        self.program = Program.objects.create(name='Test Program', program_code='TP')
+        self.students = [UserFactory.create(), UserFactory.create()]
+        self.program.enrolled_students.add(*self.students)
+
+        self.engine = create_engine(
+            'sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+        self._add_rows([
+            ('juniper', 'TP', 'stale@example.com'),
+            ('juniper', 'OTHER', 'other@example.com'),
+            ('ginkgo', 'TP', 'ginkgo@example.com'),
+        ])
+
+        patcher = patch(COMMAND_MODULE + '.create_engine', return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _add_rows(self, rows):
+        """
+        Add activity rows for the given platforms, programs and emails.
+        """
+        pd.DataFrame([
+            {'source_platform': source_platform, 'program_code': program_code, 'email': email,
+             'created': timezone.now().replace(tzinfo=None)}
+            for source_platform, program_code, email in rows
+        ]).to_sql(name='lms_activity', con=self.engine, if_exists='append')
+
+    def _rows(self):
+        """
+        Get the platform, program and email of every activity row.
+        """
+        return sorted(self.engine.execute(
+            'select source_platform, program_code, email from lms_activity').fetchall())
+
+    def _student_data(self, program, student_ids=None):
+        """
+        Stand in for all_student_data, which reads the course structures.
+        """
+        for student in self.students:
+            if student_ids is None or student.id in student_ids:
+                yield {'email': student.email}
+
+    def test_full_export_replaces_rows_of_program(self, __):
+        with patch(COMMAND_MODULE + '.all_student_data', side_effect=self._student_data):
+            call_command('export_all_activity_records', 'juniper', 'TP')
+
+        self.assertEqual(self._rows(), sorted([
+            ('ginkgo', 'TP', 'ginkgo@example.com'),
+            ('juniper', 'OTHER', 'other@example.com'),
+            ('juniper', 'TP', self.students[0].email),
+            ('juniper', 'TP', self.students[1].email),
+        ]))
+        with self.engine.connect() as conn:
+            self.assertIsNotNone(get_watermark(conn, 'juniper', 'TP'))
+
+    def test_failed_export_keeps_rows(self, __):
+        def failing_student_data(program, student_ids=None):
+            """ Fail once the rows of the program have been deleted """
+            yield {'email': self.students[0].email}
+            raise ValueError('Breadcrumbs unavailable')
+
+        rows = self._rows()
+        with patch(COMMAND_MODULE + '.all_student_data', side_effect=failing_student_data):
+            with self.assertRaises(ValueError):
+                call_command('export_all_activity_records', 'juniper', 'TP')
+
+        self.assertEqual(self._rows(), rows)
+        with self.engine.connect() as conn:
+            self.assertIsNone(get_watermark(conn, 'juniper', 'TP'))
+
+    def test_incremental_export(self, __):
+        with patch(COMMAND_MODULE + '.all_student_data', side_effect=self._student_data):
+            call_command('export_all_activity_records', 'juniper', 'TP')
+            self.program.enrolled_students.remove(self.students[1])
+            new_student = UserFactory.create()
+            self.program.enrolled_students.add(new_student)
+            self.students.append(new_student)
+
+            call_command('export_all_activity_records', 'juniper', 'TP', incremental=True)
+
+        # the unenrolled student is removed and the new one is added
+        self.assertEqual(
+            [email for source_platform, program_code, email in self._rows()
+             if (source_platform, program_code) == ('juniper', 'TP')],
+            sorted([self.students[0].email, new_student.email]),
+        )
+
+    def test_changed_students_submitted_challenges_of_program(self, __):
+        since = timezone.now() - timedelta(hours=1)
+        program_challenge = Challenge.objects.create(
+            name='program', block_locator='block-v1:CI+HF101+2017_T1+type@problem+block@1', level='Required')
+        other_challenge = Challenge.objects.create(
+            name='other', block_locator='block-v1:CI+HF1010+2017_T1+type@problem+block@2', level='Required')
+        for student, challenge in zip(self.students, [program_challenge, other_challenge]):
+            ChallengeSubmission.objects.create(
+                student=student,
+                challenge=challenge,
+                time_challenge_started=timezone.now(),
+                time_challenge_submitted=timezone.now(),
+                passed=True,
+            )
+
+        exported = {student.email for student in self.students}
+        self.assertEqual(changed_student_ids(self.program, since, exported), {self.students[0].id})
+
+
+@patch.object(Program, 'get_course_locators', return_value=[COURSE_KEY])
+@patch(COMMAND_MODULE + '.extract_all_student_challenges', return_value={})
+@patch(COMMAND_MODULE + '.requests.get')
+@patch(COMMAND_MODULE + '.harvest_program', return_value={
+    'lesson_1': (u'Module A', u'Section 1', u'Lesson 1'),
+    'unit_1': (u'Module A', u'Section 1', u'Lesson 1', u'Unit 1'),
+    'unit_2': (u'Module A', u'Section 1', u'Lesson 1', u'Unit 2'),
+})
+class AllStudentDataTest(TestCase):
+    """
+    Tests for streaming the activity records of the students of a program.
+    """
+
+    def setUp(self):
+        super(AllStudentDataTest, self).setUp()
+        self.program = Program.objects.create(name='Test Program', program_code='TP')
+        self.students = [UserFactory.create() for __ in range(3)]
+        self.program.enrolled_students.add(*self.students)
+        self.now = timezone.now()
+
+    def _add_activity(self, student, block_type, block_id, minutes_ago):
+        """
+        Add a StudentModule for the block, last modified the given number of minutes ago.
+        """
+        student_module = StudentModuleFactory.create(
+            student=student,
+            course_id=COURSE_KEY,
+            module_type=block_type,
+            module_state_key=COURSE_KEY.make_usage_key(block_type, block_id),
+        )
+        StudentModule.objects.filter(id=student_module.id).update(
+            modified=self.now - timedelta(minutes=minutes_ago))
+
+    def _add_activities(self):
+        """
+        Add the activities of the first two students and of a student
+        who isn't in the program.
+        """
+        self._add_activity(self.students[1], 'vertical', 'unit_2', 10)
+        self._add_activity(self.students[0], 'vertical', 'unit_2', 5)
+        self._add_activity(self.students[0], 'sequential', 'lesson_1', 30)
+        self._add_activity(self.students[0], 'vertical', 'unit_1', 20)
+        self._add_activity(UserFactory.create(), 'vertical', 'unit_1', 1)
+
+    def test_program_activities(self, *__):
+        self._add_activities()
+
+        with self.assertNumQueries(1):
+            activities = [
+                (student_id, [block_id for block_id, __, __ in student_activities])
+                for student_id, student_activities in program_activities(self.program, [COURSE_KEY])
+            ]
+
+        # the activities are grouped by student, in order of their modified time
+        self.assertEqual(activities, [
+            (self.students[0].id, ['lesson_1', 'unit_1', 'unit_2']),
+            (self.students[1].id, ['unit_2']),
+        ])
+
+    def test_program_activities_of_students(self, *__):
+        self._add_activities()
+
+        activities = list(program_activities(self.program, [COURSE_KEY], [self.students[1].id]))
+
+        self.assertEqual([student_id for student_id, __ in activities], [self.students[1].id])
+
+    def test_all_student_data(self, __, mock_requests_get, *___):
+        mock_requests_get.return_value.json.return_value = {'LESSONS': {}}
+        self._add_activities()
+
+        # the students and their activities are read in a single query each,
+        # however many students there are
+        with self.assertNumQueries(2):
+            rows = list(all_student_data(self.program))
+
+        self.assertEqual([row['email'] for row in rows], [student.email for student in self.students])
+        self.assertEqual(rows[0]['latest_unit'], 'Unit 2')
+        self.assertEqual(rows[0]['module_a_lessons'], 1)
+        self.assertEqual(rows[0]['module_a_units'], 2)
+        self.assertEqual(rows[1]['latest_unit'], 'Unit 2')
+        # students without any activity still have a row
+        self.assertEqual(rows[2]['latest_unit'], '')
+        self.assertIsNone(rows[2]['latest_unit_completion'])
+
+    def test_all_student_data_of_students(self, __, mock_requests_get, *___):
+        mock_requests_get.return_value.json.return_value = {'LESSONS': {}}
+        self._add_activities()
+
+        rows = list(all_student_data(self.program, [self.students[1].id, self.students[2].id]))
+
+        self.assertEqual([row['email'] for row in rows], [self.students[1].email, self.students[2].email])
+        self.assertEqual(rows[0]['latest_unit'], 'Unit 2')
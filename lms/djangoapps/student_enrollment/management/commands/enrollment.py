@@ -1,19 +1,18 @@
+from collections import defaultdict
 from logging import getLogger
 
 from django.core.management.base import BaseCommand
-from django.core.exceptions import ObjectDoesNotExist
-from django.contrib.auth.models import User
 from django.conf import settings
 from ci_program.models import Program
 from student_enrollment.utils import (
-    get_or_register_student, post_to_zapier
+    get_or_register_students, post_to_zapier
 )
 from student_enrollment.zoho import (
     get_students_to_be_enrolled,
     parse_course_of_interest_code
 )
-from lms.djangoapps.student_enrollment.models import EnrollmentStatusHistory
 from lms.djangoapps.student_enrollment.models import ProgramAccessStatus
+from lms.djangoapps.student_enrollment.tasks import send_enrollment_emails
 
 log = getLogger(__name__)
 
@@ -49,64 +48,97 @@ class Command(BaseCommand):
         will be registered. A student can be unenrolled from courses
         if they miss payments (or other circumstances) which means they
         may already be registered in the system.
-        """
-        zoho_students = get_students_to_be_enrolled()
-
-        for student in zoho_students:
-            if not student['Email']:
-                continue
-
-            # Get the user, the user's password, and their enrollment type
-            user, password, enrollment_type = get_or_register_student(
-                student['Email'], student['Email'])
 
-            # Get the code for the course the student is enrolling in
-            program_to_enroll_in = parse_course_of_interest_code(
+        The students are enrolled in bulk, one program at a time, and
+        their enrollment emails are sent asynchronously.
+        """
+        zoho_students = [
+            student for student in get_students_to_be_enrolled()
+            if student['Email']]
+
+        # Get the users and their enrollment types (the passwords of the
+        # new users are generated again when their emails are sent)
+        registered_students = get_or_register_students(
+            [student['Email'] for student in zoho_students])
+
+        # Get the code for the course each student is enrolling in
+        program_codes = {
+            student['Email']: parse_course_of_interest_code(
                 student['Course_of_Interest_Code'])
-
-            try:
-                # Get the Program that contains the Zoho program code
-                program = Program.objects.get(
-                    program_code=program_to_enroll_in)
+            for student in zoho_students
+        }
+        programs = {
+            program.program_code: program
+            for program in Program.objects.filter(
+                program_code__in=set(program_codes.values()))
+        }
+
+        students_by_program = defaultdict(list)
+        user_ids_by_program = defaultdict(set)
+        for student in zoho_students:
+            user = registered_students[student['Email']][0]
+            program = programs.get(program_codes[student['Email']])
 
             # Catch if there is an error with the Course_of_Interest_Code
             # and send an email to SC, but continue with the next student
-            except ObjectDoesNotExist as does_not_exist_exception:
-                log.exception(str(does_not_exist_exception))
+            if program is None:
+                log.error("Program matching query does not exist: %s",
+                          program_codes[student['Email']])
                 post_to_zapier(settings.ZAPIER_ENROLLMENT_EXCEPTION_URL,
                                 {'email': user.email,
                                  'crm_field': 'Course_of_Interest_Code'})
                 continue
 
-            # Enroll the student in the program
-            program_enrollment_status = program.enroll_student_in_program(
-                user.email,
-                exclude_courses=EXCLUDED_FROM_ONBOARDING)
-
-            # Send the email
-            email_sent_status = program.send_email(
-                user, enrollment_type, password)
+            # A student may appear more than once in the CRM
+            if user.id in user_ids_by_program[program]:
+                continue
+            user_ids_by_program[program].add(user.id)
+            students_by_program[program].append(
+                registered_students[student['Email']])
 
-            # Set the students access level (i.e. determine whether or
-            # not a student is allowed to access to the LMS.
-            # Deprecated...
-            access, created = ProgramAccessStatus.objects.get_or_create(
-                user=user, program_access=True)
+        for program, students in students_by_program.iteritems():
+            self.enroll_students_in_program(program, students)
 
-            if not created:
-                access.allowed_access = True
-                access.save()
+    def enroll_students_in_program(self, program, students):
+        """
+        Enroll a batch of students in a program.
 
-            # Used to update the status from 'Enroll' to 'Online'
-            # in the CRM
+        `program` is the Program to enroll the students in
+        `students` is a list of tuples of the user instance, the user's
+            password and the enrollment type of each student
+        """
+        users = [user for user, _, _ in students]
+
+        # Enroll the students in the program
+        program_enrollment_statuses = program.bulk_enroll_students_in_program(
+            [user.email for user in users],
+            exclude_courses=EXCLUDED_FROM_ONBOARDING)
+
+        # Set the students access level (i.e. determine whether or
+        # not a student is allowed to access to the LMS.
+        # Deprecated...
+        users_with_access = set(ProgramAccessStatus.objects.filter(
+            user__in=users, program_access=True).values_list(
+            'user_id', flat=True))
+        ProgramAccessStatus.objects.bulk_create([
+            ProgramAccessStatus(user=user, program_access=True)
+            for user in users if user.id not in users_with_access
+        ])
+
+        # Used to update the status from 'Enroll' to 'Online'
+        # in the CRM
+        for user in users:
             post_to_zapier(settings.ZAPIER_ENROLLMENT_URL,
                             {'email': user.email})
 
-            enrollment_status = EnrollmentStatusHistory(
-                student=user,
-                program=program,
-                registered=bool(user),
-                enrollment_type=enrollment_type,
-                enrolled=bool(program_enrollment_status),
-                email_sent=email_sent_status)
-            enrollment_status.save()
+        # Send the emails, which also records the status of each
+        # enrollment once its email has been sent. The passwords are
+        # not passed to the task, which generates them itself
+        send_enrollment_emails.delay(program.id, [
+            {
+                'user_id': user.id,
+                'enrollment_type': enrollment_type,
+                'enrolled': bool(program_enrollment_statuses.get(user.email)),
+            }
+            for user, _, enrollment_type in students
+        ])
@@ -0,0 +1,65 @@
+"""
+This file contains celery tasks for the enrollment of students in programs.
+"""
+from logging import getLogger
+
+from celery import task
+from django.contrib.auth.models import User
+
+from ci_program.models import Program
+from lms.djangoapps.student_enrollment.enrollment_types import ENROLLMENT_TYPES__ENROLLMENT
+from lms.djangoapps.student_enrollment.models import EnrollmentStatusHistory
+from student_enrollment.utils import create_email_connection
+
+log = getLogger(__name__)
+
+
+@task()
+def send_enrollment_emails(program_id, enrollments):
+    """
+    Send the enrollment emails of a batch of students enrolled in a
+    program over a single email connection, then record the status of
+    each enrollment in the `EnrollmentStatusHistory`.
+
+    `program_id` is the id of the program the students were enrolled in
+    `enrollments` is a list of dicts, one per student, containing the
+        `user_id` and `enrollment_type` of the student and whether or
+        not the student was `enrolled`
+
+    The passwords of the newly registered students are generated here,
+    right before their emails are sent, so that they never go through
+    the message broker.
+    """
+    program = Program.objects.get(id=program_id)
+    students = User.objects.in_bulk(
+        [enrollment['user_id'] for enrollment in enrollments])
+
+    email_connection = create_email_connection()
+    email_connection.open()
+    enrollment_statuses = []
+    try:
+        for enrollment in enrollments:
+            student = students[enrollment['user_id']]
+            try:
+                password = None
+                if enrollment['enrollment_type'] == ENROLLMENT_TYPES__ENROLLMENT:
+                    password = User.objects.make_random_password()
+                    student.set_password(password)
+                    student.save()
+                email_sent_status = program.send_email(
+                    student, enrollment['enrollment_type'],
+                    password, connection=email_connection)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Failed to send email to %s", student.email)
+                email_sent_status = False
+
+            enrollment_statuses.append(EnrollmentStatusHistory(
+                student=student,
+                program=program,
+                registered=True,
+                enrollment_type=enrollment['enrollment_type'],
+                enrolled=enrollment['enrolled'],
+                email_sent=email_sent_status))
+    finally:
+        email_connection.close()
+        EnrollmentStatusHistory.objects.bulk_create(enrollment_statuses)
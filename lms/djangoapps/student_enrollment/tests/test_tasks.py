@@ -0,0 +1,59 @@
+"""
+Tests for the student_enrollment celery tasks.
+"""
+from django.test import TestCase
+from mock import patch
+
+from ci_program.models import Program
+from lms.djangoapps.student_enrollment.enrollment_types import (
+    ENROLLMENT_TYPES__ENROLLMENT,
+    ENROLLMENT_TYPES__REENROLLMENT
+)
+from lms.djangoapps.student_enrollment.models import EnrollmentStatusHistory
+from lms.djangoapps.student_enrollment.tasks import send_enrollment_emails
+from student.tests.factories import UserFactory
+
+
+@patch('lms.djangoapps.student_enrollment.tasks.create_email_connection')
+@patch.object(Program, 'send_email', autospec=True, return_value=True)
+class SendEnrollmentEmailsTest(TestCase):
+    """
+    Tests for `send_enrollment_emails`.
+    """
+
+    def setUp(self):
+        super(SendEnrollmentEmailsTest, self).setUp()
+        self.program = Program.objects.create(name='Test Program', program_code='TP')
+        self.new_student = UserFactory.create()
+        self.returning_student = UserFactory.create()
+
+    def test_passwords_generated_by_the_task(self, send_email, __):
+        send_enrollment_emails(self.program.id, [
+            {'user_id': self.new_student.id, 'enrollment_type': ENROLLMENT_TYPES__ENROLLMENT, 'enrolled': True},
+            {'user_id': self.returning_student.id, 'enrollment_type': ENROLLMENT_TYPES__REENROLLMENT, 'enrolled': True},
+        ])
+
+        passwords = {call[0][1].id: call[0][3] for call in send_email.call_args_list}
+        self.assertIsNotNone(passwords[self.new_student.id])
+        self.new_student.refresh_from_db()
+        self.assertTrue(self.new_student.check_password(passwords[self.new_student.id]))
+        # Returning students keep their password
+        self.assertIsNone(passwords[self.returning_student.id])
+
+    def test_enrollment_statuses_recorded(self, send_email, __):
+        send_email.side_effect = [True, Exception('SMTP error')]
+
+        send_enrollment_emails(self.program.id, [
+            {'user_id': self.new_student.id, 'enrollment_type': ENROLLMENT_TYPES__ENROLLMENT, 'enrolled': True},
+            {
+                'user_id': self.returning_student.id,
+                'enrollment_type': ENROLLMENT_TYPES__REENROLLMENT,
+                'enrolled': False,
+            },
+        ])
+
+        history = EnrollmentStatusHistory.objects.filter(program=self.program)
+        self.assertTrue(history.get(student=self.new_student).email_sent)
+        returning_history = history.get(student=self.returning_student)
+        self.assertFalse(returning_history.email_sent)
+        self.assertFalse(returning_history.enrolled)
@@ -0,0 +1,33 @@
+"""
+Tests for the student_enrollment utilities.
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from student.tests.factories import UserFactory
+from student_enrollment.utils import get_or_register_students
+
+
+class GetOrRegisterStudentsTest(TestCase):
+    """
+    Tests for `get_or_register_students`.
+    """
+
+    def test_new_student_registered_once(self):
+        emails = ['new@example.com', 'New@Example.com', 'new@example.com']
+
+        students = get_or_register_students(emails)
+
+        self.assertEqual(User.objects.filter(email__iexact='new@example.com').count(), 1)
+        self.assertItemsEqual(students.keys(), set(emails))
+        self.assertEqual(len({user.id for user, _, _ in students.values()}), 1)
+        self.assertEqual(students['New@Example.com'][2], 0)
+
+    def test_existing_student_not_registered(self):
+        user = UserFactory.create(email='existing@example.com')
+
+        students = get_or_register_students(['existing@example.com', 'Existing@example.com'])
+
+        self.assertEqual(User.objects.filter(email__iexact='existing@example.com').count(), 1)
+        self.assertEqual(students['existing@example.com'], (user, None, 2))
+        self.assertEqual(students['Existing@example.com'], (user, None, 2))
@@ -5,6 +5,7 @@ creating/registering users, as well as sending emails.
 
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db.models import Count
 from django.core.mail import get_connection
 from django.template.loader import render_to_string
 import requests
@@ -77,6 +78,43 @@ def get_or_register_student(email, full_name, password=None):
         return user, password, 0
 
 
+def get_or_register_students(emails):
+    """
+    The batched equivalent of `get_or_register_student`, which looks up
+    all of the existing students in a single query and registers the
+    others. The email of each student is also used as their full name.
+
+    Emails are compared case insensitively, so an email appearing more
+    than once (in any case) only registers a single student.
+
+    `emails` is a collection of the emails of the students
+
+    Returns a dict mapping each email to a tuple of the user instance,
+        the user's password and the enrollment type.
+    """
+    students_by_lower_email = {}
+
+    existing_users = User.objects.filter(email__in=emails).annotate(
+        number_of_programs=Count('program'))
+    existing_users_by_email = {
+        user.email.lower(): user for user in existing_users}
+
+    for email in emails:
+        lower_email = email.lower()
+        if lower_email in students_by_lower_email:
+            continue
+        user = existing_users_by_email.get(lower_email)
+        if user is None:
+            user, password = register_student(email, email)
+            students_by_lower_email[lower_email] = (user, password, 0)
+        elif user.number_of_programs:
+            students_by_lower_email[lower_email] = (user, None, 3)
+        else:
+            students_by_lower_email[lower_email] = (user, None, 2)
+
+    return {email: students_by_lower_email[email.lower()] for email in emails}
+
+
 def create_email_connection():
     """
     Create a new SMTP connection using the SMTP settings
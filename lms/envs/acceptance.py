@@ -83,6 +83,8 @@ DATABASES = {
     }
 }
 
+STUDENT_MODULE_SHARDS = ['default']
+
 TRACKING_BACKENDS.update({
     'mongo': {
         'ENGINE': 'track.backends.mongodb.MongoBackend'
@@ -961,6 +961,12 @@ STUDENTMODULEHISTORYEXTENDED_OFFSET = ENV_TOKENS.get(
     'STUDENTMODULEHISTORYEXTENDED_OFFSET', STUDENTMODULEHISTORYEXTENDED_OFFSET
 )
 
+# Storage of the user state of XBlocks
+XBLOCK_USER_STATE_CLIENT = ENV_TOKENS.get('XBLOCK_USER_STATE_CLIENT', XBLOCK_USER_STATE_CLIENT)
+STUDENT_MODULE_SHARDS = ENV_TOKENS.get('STUDENT_MODULE_SHARDS', STUDENT_MODULE_SHARDS)
+STUDENT_MODULE_SHARD_KEY = ENV_TOKENS.get('STUDENT_MODULE_SHARD_KEY', STUDENT_MODULE_SHARD_KEY)
+USER_STATE_CACHE_TIMEOUT = ENV_TOKENS.get('USER_STATE_CACHE_TIMEOUT', USER_STATE_CACHE_TIMEOUT)
+
 # Cutoff date for granting audit certificates
 if ENV_TOKENS.get('AUDIT_CERT_CUTOFF_DATE', None):
     AUDIT_CERT_CUTOFF_DATE = dateutil.parser.parse(ENV_TOKENS.get('AUDIT_CERT_CUTOFF_DATE'))
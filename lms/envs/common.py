@@ -364,6 +364,14 @@ FEATURES = {
     # making multiple queries.
     'ENABLE_READING_FROM_MULTIPLE_HISTORY_TABLES': True,
 
+    # Write the user state of all the XBlocks saved together with a fixed
+    # number of queries, rather than with queries per XBlock.
+    'ENABLE_BATCHED_USER_STATE_WRITES': False,
+
+    # Keep the user state of XBlocks loaded for courseware pages in the django cache
+    # until it's written (see USER_STATE_CACHE_TIMEOUT).
+    'ENABLE_USER_STATE_CACHE': False,
+
     # Display the 'Analytics' tab in the instructor dashboard for CCX courses.
     # Note: This has no effect unless ANALYTICS_DASHBOARD_URL is already set,
     #       because without that setting, the tab does not show up for any courses.
@@ -461,6 +469,7 @@ STATUS_MESSAGE_PATH = ENV_ROOT / "status_message.json"
 
 DATABASE_ROUTERS = [
     'openedx.core.lib.django_courseware_routers.StudentModuleHistoryExtendedRouter',
+    'openedx.core.lib.django_courseware_routers.StudentModuleShardRouter',
 ]
 
 ############################ OpenID Provider  ##################################
@@ -1239,6 +1248,9 @@ MIDDLEWARE_CLASSES = (
     # to redirected unenrolled students to the course info page
     'courseware.middleware.RedirectMiddleware',
 
+    # to invalidate the cached user state written by requests once they're committed
+    'courseware.middleware.UserStateGenerationMiddleware',
+
     'course_wiki.middleware.WikiAccessMiddleware',
 
     'openedx.core.djangoapps.theming.middleware.CurrentSiteThemeMiddleware',
@@ -3139,6 +3151,21 @@ APP_UPGRADE_CACHE_TIMEOUT = 3600
 # if you want to avoid an overlap in ids while searching for history across the two tables.
 STUDENTMODULEHISTORYEXTENDED_OFFSET = 10000
 
+# The XBlockUserStateClient backend storing the Scope.user_state data of XBlocks.
+XBLOCK_USER_STATE_CLIENT = 'courseware.user_state_client.DjangoXBlockUserStateClient'
+
+# The databases courseware.user_state_client.ShardedXBlockUserStateClient partitions the
+# user state across, and whether it partitions it by 'course' or by 'user'. Changing
+# either changes which shard the state of users is looked up in, so they shouldn't
+# change once the sharded backend is in use.
+STUDENT_MODULE_SHARDS = ['default']
+STUDENT_MODULE_SHARD_KEY = 'course'
+
+# How long (in seconds) the user state of XBlocks is kept in the django cache when the
+# ENABLE_USER_STATE_CACHE feature is enabled. Writes invalidate it, both when they're
+# made and once their transaction is over.
+USER_STATE_CACHE_TIMEOUT = 300
+
 # Cutoff date for granting audit certificates
 
 AUDIT_CERT_CUTOFF_DATE = None
@@ -195,8 +195,14 @@ DATABASES = {
     'student_module_history': {
         'ENGINE': 'django.db.backends.sqlite3',
     },
+    'student_module_shard_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    },
 }
 
+# Test ShardedXBlockUserStateClient with state split across two databases
+STUDENT_MODULE_SHARDS = ['default', 'student_module_shard_1']
+
 if os.environ.get('DISABLE_MIGRATIONS'):
     # Create tables directly from apps' models. This can be removed once we upgrade
     # to Django 1.9, which allows setting MIGRATION_MODULES to None in order to skip migrations.
@@ -233,6 +239,11 @@ CACHES = {
     },
 }
 
+# Don't keep course structures in memory between tests, so that the mongo calls
+# counted by tests don't depend on the tests run before them. The split and mixed
+# modulestore tests turn the memory cache on for the length of each test.
+COURSE_STRUCTURE_MEMORY_CACHE_SIZE = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
@@ -613,3 +624,12 @@ STATIC_COLLECTOR_ROOT = REPO_ROOT / "static_collection_test"
 #for lms.djangoapps.instructor_task.tests.test_models
 S3_HOST = ''
 S3_USE_SIGV4 = ''
+
+# for lms.djangoapps.learning_success.tests, which export to an in-memory database
+BREADCRUMB_INDEX_URL = 'https://breadcrumbs.example.com/index'
+RDS_DB_USER = 'test'
+RDS_DB_PASS = 'test'
+RDS_DB_ENDPOINT = 'localhost'
+RDS_DB_PORT = 3306
+RDS_LMS_DB = 'test'
+LMS_ACTIVITY_TABLE = 'lms_activity'
@@ -4,6 +4,7 @@ Higher order functions built on the BlockStructureManager to interact with a dja
 from django.core.cache import cache
 from xmodule.modulestore.django import modulestore
 
+from .breadcrumbs import BreadcrumbIndex
 from .manager import BlockStructureManager
 
 
@@ -26,7 +27,9 @@ def update_course_in_cache(course_key):
     block_structure.updated_collected function that updates the block
     structure in the cache for the given course_key.
     """
-    return get_block_structure_manager(course_key).update_collected_if_needed()
+    block_structure = get_block_structure_manager(course_key).update_collected_if_needed()
+    clear_course_breadcrumbs_from_cache(course_key)
+    return block_structure
 
 
 def clear_course_from_cache(course_key):
@@ -41,6 +44,29 @@ def clear_course_from_cache(course_key):
     arbitrary access to an intermediate block will be supported.
     """
     get_block_structure_manager(course_key).clear()
+    clear_course_breadcrumbs_from_cache(course_key)
+
+
+def get_course_breadcrumbs(course_key):
+    """
+    A higher order function implemented on top of the
+    get_course_in_cache function that returns the breadcrumbs of every
+    block in the given course, building them from the collected block
+    structure only when they are not already cached.
+
+    Returns:
+        OrderedDict {block_id: BlockBreadcrumbs} - The block type and the
+            display names from the course down to each block.
+    """
+    return BreadcrumbIndex(course_key, get_cache()).get(lambda: get_course_in_cache(course_key))
+
+
+def clear_course_breadcrumbs_from_cache(course_key):
+    """
+    Clears the cached breadcrumbs of the given course, so that they are
+    rebuilt from the collected block structure on their next use.
+    """
+    BreadcrumbIndex(course_key, get_cache()).clear()
 
 
 def get_block_structure_manager(course_key):
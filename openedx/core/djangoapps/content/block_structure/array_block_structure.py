@@ -0,0 +1,537 @@
+"""
+Module with an array-backed alternative to BlockStructureBlockData.
+
+    ArrayBlockStructureBlockData - Has the same public interface as
+        BlockStructureBlockData, but interns usage keys into integer
+        indices, keeps relations in CSR-style integer arrays and keeps
+        block and transformer fields column-wise.
+
+The following internal data structures are implemented:
+    _BlockDataView - Read-only view of a single block's data.
+    _TransformerBlockDataView - Read-only view of a single block's
+        data for a single transformer.
+
+A structure is created once per collected block structure and is then
+only ever mutated by transformers.  Therefore the key table, the relation
+arrays and the field columns are shared between copies.  Relations
+changed by a copy are kept in a small map of overrides and columns are
+copied the first time a copy writes to them, so copy() is cheap.
+"""
+from array import array
+from copy import deepcopy
+
+from .block_structure import BlockStructureBlockData, TransformerDataMap
+
+
+# Type code of the arrays used to store integer indices.
+INDEX_TYPECODE = 'i'
+
+# Value of a field that is not set for a block.
+_MISSING = object()
+
+
+def dense_column(num_blocks, indices, values):
+    """
+    Returns a column of num_blocks values, with the given values at the
+    given indices and _MISSING everywhere else.
+    """
+    column = [_MISSING] * num_blocks
+    for index, value in zip(indices, values):
+        column[index] = value
+    return column
+
+
+def _transformer_name(transformer):
+    """
+    Returns the name of the given transformer, which can be either the
+    transformer's class or its name.
+    """
+    try:
+        return transformer.name()
+    except AttributeError:
+        return transformer
+
+
+class _TransformerBlockDataView(object):
+    """
+    Read-only view of the data of a single block for a single
+    transformer.
+    """
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns, index):
+        self._columns = columns
+        self._index = index
+
+    def __getattr__(self, field_name):
+        try:
+            value = self._columns[field_name][self._index]
+        except KeyError:
+            value = _MISSING
+        if value is _MISSING:
+            raise AttributeError("Field {0} does not exist".format(field_name))
+        return value
+
+    @property
+    def fields(self):
+        """
+        Returns a dict of the fields of the block for the transformer.
+        """
+        return {
+            field_name: column[self._index]
+            for field_name, column in self._columns.iteritems()
+            if column[self._index] is not _MISSING
+        }
+
+
+class _BlockDataView(object):
+    """
+    Read-only view of the data of a single block, with the same
+    attributes as BlockData.
+    """
+    __slots__ = ('_block_structure', '_index')
+
+    def __init__(self, block_structure, index):
+        self._block_structure = block_structure
+        self._index = index
+
+    def __getattr__(self, field_name):
+        column = self._block_structure._xblock_columns.get(field_name)  # pylint: disable=protected-access
+        value = column[self._index] if column is not None else _MISSING
+        if value is _MISSING:
+            raise AttributeError("Field {0} does not exist".format(field_name))
+        return value
+
+    @property
+    def location(self):
+        """
+        Returns the usage key of the block.
+        """
+        return self._block_structure._usage_keys[self._index]  # pylint: disable=protected-access
+
+    @property
+    def fields(self):
+        """
+        Returns a dict of the xBlock fields of the block.
+        """
+        return {
+            field_name: column[self._index]
+            for field_name, column in self._block_structure._xblock_columns.iteritems()  # pylint: disable=protected-access
+            if column[self._index] is not _MISSING
+        }
+
+    @property
+    def transformer_data(self):
+        """
+        Returns a map of transformer name to the data of the block for
+        that transformer.
+        """
+        transformer_data = TransformerDataMap()
+        for transformer_name, columns in self._block_structure._transformer_columns.iteritems():  # pylint: disable=protected-access
+            if any(column[self._index] is not _MISSING for column in columns.itervalues()):
+                transformer_data[transformer_name] = _TransformerBlockDataView(columns, self._index)
+        return transformer_data
+
+
+class ArrayBlockStructureBlockData(BlockStructureBlockData):
+    """
+    Array-backed block structure with the same public interface as
+    BlockStructureBlockData.
+
+    Every usage key is interned into an index into self._usage_keys.
+    The parents and children of the blocks are stored as CSR-style
+    integer arrays, with any relations changed since creation kept in
+    self._relation_overrides.  Fields are stored as one list per field,
+    indexed by block, with _MISSING for blocks that don't have the field.
+    """
+    def __init__(  # pylint: disable=super-init-not-called
+            self,
+            root_block_usage_key,
+            usage_keys,
+            relations,
+            xblock_columns,
+            transformer_columns,
+            transformer_data,
+    ):
+        """
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage key of the root
+                block of the structure.
+
+            usage_keys ([UsageKey]) - The usage keys of all the blocks,
+                in the order of their indices.
+
+            relations ((array, array, array, array)) - The parent
+                offsets, parents, child offsets and children arrays.
+                The parents of the block at index i are
+                parents[parent_offsets[i]:parent_offsets[i + 1]].
+
+            xblock_columns ({string: list}) - Map of xBlock field name
+                to the values of the field, in the order of the blocks.
+
+            transformer_columns ({string: {string: list}}) - Map of
+                transformer name to its map of field name to the values
+                of the field, in the order of the blocks.
+
+            transformer_data (TransformerDataMap) - The non-block-specific
+                data of the transformers.
+        """
+        self.root_block_usage_key = root_block_usage_key
+        self.transformer_data = transformer_data
+
+        self._usage_keys = usage_keys
+        self._index_of = {usage_key: index for index, usage_key in enumerate(usage_keys)}
+        self._parent_offsets, self._parents, self._child_offsets, self._children = relations
+
+        # Map of block index to a (parents, children) pair of tuples of
+        # block indices, for blocks whose relations have changed.
+        self._relation_overrides = {}
+
+        # Whether each block is still in the structure.
+        self._present = bytearray([1]) * len(usage_keys)
+        self._num_present = len(usage_keys)
+
+        self._xblock_columns = xblock_columns
+        self._transformer_columns = transformer_columns
+
+        # Ids of the columns that are not shared with any copy, and can
+        # therefore be written to in place.
+        self._owned_columns = set()
+
+    @classmethod
+    def create_from(cls, block_structure):
+        """
+        Returns a new ArrayBlockStructureBlockData with the contents of
+        the given BlockStructureBlockData.
+        """
+        # pylint: disable=protected-access
+        return cls.create_from_maps(
+            block_structure.root_block_usage_key,
+            block_structure._block_relations,
+            deepcopy(block_structure.transformer_data),
+            block_structure._block_data_map,
+        )
+
+    @classmethod
+    def create_from_maps(cls, root_block_usage_key, block_relations, transformer_data, block_data_map):
+        """
+        Returns a new ArrayBlockStructureBlockData with the given block
+        relations and block data maps of a BlockStructureBlockData.
+
+        The given transformer_data is used as is, rather than copied.
+        """
+        usage_keys = list(block_relations)
+        usage_keys.extend(usage_key for usage_key in block_data_map if usage_key not in block_relations)
+        index_of = {usage_key: index for index, usage_key in enumerate(usage_keys)}
+
+        relations = []
+        for relation_name in ('parents', 'children'):
+            offsets = array(INDEX_TYPECODE, [0])
+            indices = array(INDEX_TYPECODE)
+            for usage_key in usage_keys:
+                relation = block_relations.get(usage_key)
+                if relation is not None:
+                    indices.extend(index_of[related_key] for related_key in getattr(relation, relation_name))
+                offsets.append(len(indices))
+            relations.extend((offsets, indices))
+
+        xblock_columns = {}
+        transformer_columns = {}
+        for usage_key, block_data in block_data_map.iteritems():
+            index = index_of[usage_key]
+            cls._set_in_columns(xblock_columns, len(usage_keys), index, block_data.fields)
+            for transformer_name, transformer_block_data in block_data.transformer_data.iteritems():
+                cls._set_in_columns(
+                    transformer_columns.setdefault(transformer_name, {}),
+                    len(usage_keys),
+                    index,
+                    transformer_block_data.fields,
+                )
+
+        array_block_structure = cls(
+            root_block_usage_key,
+            usage_keys,
+            tuple(relations),
+            xblock_columns,
+            transformer_columns,
+            transformer_data,
+        )
+        for index, usage_key in enumerate(usage_keys):
+            if usage_key not in block_relations:
+                array_block_structure._remove_index(index)  # pylint: disable=protected-access
+        return array_block_structure
+
+    @classmethod
+    def create_from_columns(
+            cls,
+            root_block_usage_key,
+            usage_keys,
+            relations,
+            xblock_columns,
+            transformer_columns,
+            transformer_data,
+    ):
+        """
+        Returns a new ArrayBlockStructureBlockData for the given sparse
+        columns, where each column is an (indices, values) pair.
+
+        The relation arrays may cover only a prefix of usage_keys; the
+        remaining keys are not part of the structure.
+        """
+        num_blocks = len(usage_keys)
+        parent_offsets, parents, child_offsets, children = relations
+        num_related = len(child_offsets) - 1
+        for offsets in (parent_offsets, child_offsets):
+            offsets.extend([offsets[-1]] * (num_blocks - num_related))
+
+        block_structure = cls(
+            root_block_usage_key,
+            usage_keys,
+            (parent_offsets, parents, child_offsets, children),
+            {
+                field_name: dense_column(num_blocks, indices, values)
+                for field_name, (indices, values) in xblock_columns.iteritems()
+            },
+            {
+                transformer_name: {
+                    field_name: dense_column(num_blocks, indices, values)
+                    for field_name, (indices, values) in columns.iteritems()
+                }
+                for transformer_name, columns in transformer_columns.iteritems()
+            },
+            transformer_data,
+        )
+        for index in range(num_related, num_blocks):
+            block_structure._remove_index(index)  # pylint: disable=protected-access
+        return block_structure
+
+    @staticmethod
+    def _set_in_columns(columns, num_blocks, index, fields):
+        """
+        Sets the given fields of the block at the given index in the
+        given columns, adding any missing columns.
+        """
+        for field_name, value in fields.iteritems():
+            column = columns.get(field_name)
+            if column is None:
+                column = columns[field_name] = [_MISSING] * num_blocks
+            column[index] = value
+
+    def __len__(self):
+        return self._num_present
+
+    def __contains__(self, usage_key):
+        index = self._index_of.get(usage_key)
+        return index is not None and self._present[index] == 1
+
+    #--- Block structure relation methods ---#
+
+    def get_parents(self, usage_key):
+        index = self._index_of.get(usage_key)
+        if index is None or not self._present[index]:
+            return []
+        return [self._usage_keys[parent] for parent in self._get_relations(index)[0]]
+
+    def get_children(self, usage_key):
+        index = self._index_of.get(usage_key)
+        if index is None or not self._present[index]:
+            return []
+        return [self._usage_keys[child] for child in self._get_relations(index)[1]]
+
+    def set_root_block(self, usage_key):
+        index = self._index_of[usage_key]
+        self.root_block_usage_key = usage_key
+        self._relation_overrides[index] = ((), self._get_relations(index)[1])
+
+    def get_block_keys(self):
+        return (
+            usage_key
+            for usage_key, present in zip(self._usage_keys, self._present)
+            if present
+        )
+
+    #--- Block and transformer data methods ---#
+
+    def copy(self):
+        """
+        Returns a new instance of ArrayBlockStructureBlockData with the
+        same contents, sharing the unchanged data with this instance.
+        """
+        block_structure_copy = ArrayBlockStructureBlockData.__new__(ArrayBlockStructureBlockData)
+        block_structure_copy.__dict__.update(self.__dict__)
+        block_structure_copy.transformer_data = deepcopy(self.transformer_data)
+        block_structure_copy._relation_overrides = dict(self._relation_overrides)
+        block_structure_copy._present = bytearray(self._present)
+        block_structure_copy._xblock_columns = dict(self._xblock_columns)
+        block_structure_copy._transformer_columns = {
+            transformer_name: dict(columns)
+            for transformer_name, columns in self._transformer_columns.iteritems()
+        }
+
+        # The columns are now shared, so neither structure may write to
+        # them in place anymore.
+        block_structure_copy._owned_columns = set()
+        self._owned_columns = set()
+        return block_structure_copy
+
+    def iteritems(self):
+        return (
+            (self._usage_keys[index], _BlockDataView(self, index))
+            for index in self._present_indices()
+        )
+
+    def itervalues(self):
+        return (_BlockDataView(self, index) for index in self._present_indices())
+
+    def __getitem__(self, usage_key):
+        return _BlockDataView(self, self._get_index(usage_key))
+
+    def get_xblock_field(self, usage_key, field_name, default=None):
+        index = self._index_of.get(usage_key)
+        column = self._xblock_columns.get(field_name)
+        if index is None or column is None or not self._present[index]:
+            return default
+        value = column[index]
+        return default if value is _MISSING else value
+
+    def get_transformer_block_data(self, usage_key, transformer):
+        index = self._get_index(usage_key)
+        columns = self._transformer_columns[_transformer_name(transformer)]
+        if all(column[index] is _MISSING for column in columns.itervalues()):
+            raise KeyError(transformer)
+        return _TransformerBlockDataView(columns, index)
+
+    def get_transformer_block_field(self, usage_key, transformer, key, default=None):
+        index = self._index_of.get(usage_key)
+        if index is None or not self._present[index]:
+            return default
+        column = self._transformer_columns.get(_transformer_name(transformer), {}).get(key)
+        value = column[index] if column is not None else _MISSING
+        return default if value is _MISSING else value
+
+    def set_transformer_block_field(self, usage_key, transformer, key, value):
+        index = self._get_index(usage_key)
+        columns = self._transformer_columns.setdefault(_transformer_name(transformer), {})
+        self._get_writable_column(columns, key)[index] = value
+
+    def remove_transformer_block_field(self, usage_key, transformer, key):
+        index = self._index_of.get(usage_key)
+        columns = self._transformer_columns.get(_transformer_name(transformer), {})
+        if index is not None and key in columns:
+            self._get_writable_column(columns, key)[index] = _MISSING
+
+    def remove_block(self, usage_key, keep_descendants):
+        index = self._get_index(usage_key)
+        parents, children = self._get_relations(index)
+
+        # Remove block from its children.
+        for child in children:
+            child_parents, child_children = self._get_relations(child)
+            self._relation_overrides[child] = (self._without(child_parents, index), child_children)
+
+        # Remove block from its parents.
+        for parent in parents:
+            parent_parents, parent_children = self._get_relations(parent)
+            self._relation_overrides[parent] = (parent_parents, self._without(parent_children, index))
+
+        # Remove block.
+        self._remove_index(index)
+
+        # Recreate the graph connections if descendants are to be kept.
+        if keep_descendants:
+            for child in children:
+                for parent in parents:
+                    self._add_relation(self._usage_keys[parent], self._usage_keys[child])
+
+    #--- Internal methods ---#
+    # To be used within the block_structure framework or by tests.
+
+    def _prune_unreachable(self):
+        reachable = set(self._index_of[usage_key] for usage_key in self.post_order_traversal())
+        for index in self._present_indices():
+            if index not in reachable:
+                self._remove_index(index)
+                continue
+            parents, children = self._get_relations(index)
+            if any(parent not in reachable for parent in parents):
+                self._relation_overrides[index] = (
+                    tuple(parent for parent in parents if parent in reachable),
+                    children,
+                )
+
+    def _add_relation(self, parent_key, child_key):
+        parent = self._get_index(parent_key)
+        child = self._get_index(child_key)
+
+        child_parents, child_children = self._get_relations(child)
+        self._relation_overrides[child] = (child_parents + (parent,), child_children)
+
+        parent_parents, parent_children = self._get_relations(parent)
+        self._relation_overrides[parent] = (parent_parents, parent_children + (child,))
+
+    def _get_or_create_block(self, usage_key):
+        return self[usage_key]
+
+    def _get_index(self, usage_key):
+        """
+        Returns the index of the given usage key.
+
+        Raises KeyError if the block is not in the structure.
+        """
+        index = self._index_of[usage_key]
+        if not self._present[index]:
+            raise KeyError(usage_key)
+        return index
+
+    def _get_relations(self, index):
+        """
+        Returns the (parents, children) pair of tuples of indices of the
+        block at the given index.
+        """
+        try:
+            return self._relation_overrides[index]
+        except KeyError:
+            return (
+                tuple(self._parents[self._parent_offsets[index]:self._parent_offsets[index + 1]]),
+                tuple(self._children[self._child_offsets[index]:self._child_offsets[index + 1]]),
+            )
+
+    def _present_indices(self):
+        """
+        Returns the indices of the blocks in the structure.
+        """
+        return (index for index, present in enumerate(self._present) if present)
+
+    def _remove_index(self, index):
+        """
+        Marks the block at the given index as removed.
+        """
+        if self._present[index]:
+            self._present[index] = 0
+            self._num_present -= 1
+            self._relation_overrides.pop(index, None)
+
+    def _get_writable_column(self, columns, field_name):
+        """
+        Returns the column for the given field in the given columns,
+        copying it first if it may be shared with another structure.
+        """
+        column = columns.get(field_name)
+        if column is None:
+            column = [_MISSING] * len(self._usage_keys)
+        elif id(column) not in self._owned_columns:
+            column = list(column)
+        else:
+            return column
+        columns[field_name] = column
+        self._owned_columns.add(id(column))
+        return column
+
+    @staticmethod
+    def _without(indices, index):
+        """
+        Returns the given tuple of indices with the first occurrence of
+        the given index removed, as list.remove would.
+        """
+        position = indices.index(index)
+        return indices[:position] + indices[position + 1:]
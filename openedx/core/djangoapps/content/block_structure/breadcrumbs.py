@@ -0,0 +1,99 @@
+"""
+Module for an index of the breadcrumbs of every block in a course.
+
+The breadcrumbs of a block are the display names of the block and all of
+its ancestors, starting at the course, i.e. (module, section, lesson, unit,
+...). The index is built from the collected BlockStructure of the course,
+rather than from the modulestore, and is cached until the course is
+published again.
+"""
+from collections import namedtuple, OrderedDict
+from logging import getLogger
+
+from . import config
+
+
+logger = getLogger(__name__)  # pylint: disable=invalid-name
+
+
+# Increment whenever the format of the cached index changes.
+VERSION = 1
+
+# The breadcrumbs of a single block.
+#   block_type (str) - The type of the block, e.g. 'vertical'.
+#   breadcrumbs (tuple) - The display names from the root block down to,
+#       and including, the block.
+BlockBreadcrumbs = namedtuple('BlockBreadcrumbs', ['block_type', 'breadcrumbs'])
+
+
+class BreadcrumbIndex(object):
+    """
+    Cached index of the breadcrumbs of every block in a course, keyed by
+    the block_id of the block.
+    """
+    def __init__(self, course_key, cache):
+        """
+        Arguments:
+            course_key (CourseKey) - The course that is to be indexed.
+
+            cache (django.core.cache.backends.base.BaseCache) - The
+                cache in which the index is stored.
+        """
+        self.course_key = course_key
+        self._cache = cache
+
+    def get(self, get_block_structure):
+        """
+        Returns the index of the course, building and caching it if it
+        isn't already in the cache.
+
+        Arguments:
+            get_block_structure (function) - Returns the collected
+                BlockStructure of the course. Only called on a cache miss.
+
+        Returns:
+            OrderedDict {block_id: BlockBreadcrumbs} - Blocks in
+                pre-order, starting at the root of the course.
+        """
+        index = self._cache.get(self._cache_key)
+        if index is None:
+            logger.info("BlockStructure: Breadcrumbs not found in cache; %s.", self.course_key)
+            index = self.build(get_block_structure())
+            self._cache.set(self._cache_key, index, timeout=config.cache_timeout_in_seconds())
+        return index
+
+    def clear(self):
+        """
+        Removes the index of the course from the cache.
+        """
+        self._cache.delete(self._cache_key)
+
+    @staticmethod
+    def build(block_structure):
+        """
+        Returns the index of the given collected block structure.
+
+        Blocks with more than one parent are indexed by the last path
+        through which they are reached, as when walking the course tree.
+        """
+        index = OrderedDict()
+        stack = [(block_structure.root_block_usage_key, ())]
+        while stack:
+            usage_key, prefix = stack.pop()
+            breadcrumbs = prefix + (block_structure.get_xblock_field(usage_key, 'display_name'),)
+            index[usage_key.block_id] = BlockBreadcrumbs(usage_key.block_type, breadcrumbs)
+            stack.extend(
+                (child_key, breadcrumbs)
+                for child_key in reversed(block_structure.get_children(usage_key))
+            )
+        return index
+
+    @property
+    def _cache_key(self):
+        """
+        Returns the cache key of the index of the course.
+        """
+        return u"v{version}.breadcrumbs.{course_key}".format(
+            version=VERSION,
+            course_key=unicode(self.course_key),
+        )
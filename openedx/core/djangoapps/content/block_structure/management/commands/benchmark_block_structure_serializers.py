@@ -0,0 +1,133 @@
+"""
+Command to compare the block structure serializers.
+"""
+from datetime import datetime
+import logging
+import timeit
+
+from django.core.management.base import BaseCommand
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+from pytz import UTC
+
+import openedx.core.djangoapps.content.block_structure.api as api
+from openedx.core.djangoapps.content.block_structure.block_structure import BlockStructureBlockData
+from openedx.core.djangoapps.content.block_structure.serializers import SERIALIZERS
+from openedx.core.lib.command_utils import parse_course_keys
+
+
+log = logging.getLogger(__name__)
+
+# Number of children of each block in the synthetic course, by depth.
+SYNTHETIC_BRANCHING = [20, 10, 5]
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_block_structure_serializers --num_blocks 5000 --settings=devstack
+        $ ./manage.py lms benchmark_block_structure_serializers --courses 'edX/DemoX/Demo_Course' --settings=devstack
+    """
+    help = u'Compares the size and load time of the block structure serializers.'
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            '--courses',
+            dest='courses',
+            nargs='+',
+            help=u'Benchmark the collected block structures of the list of courses provided.',
+        )
+        parser.add_argument(
+            '--num_blocks',
+            help=u'Number of leaf blocks in the synthetic course used when no courses are provided.',
+            default=5000,
+            type=int,
+        )
+        parser.add_argument(
+            '--iterations',
+            help=u'Number of times each serializer is timed.',
+            default=10,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        if options.get('courses'):
+            block_structures = [
+                (unicode(course_key), api.get_course_in_cache(course_key))
+                for course_key in parse_course_keys(options['courses'])
+            ]
+        else:
+            block_structures = [(u'synthetic', _create_synthetic_block_structure(options['num_blocks']))]
+
+        for name, block_structure in block_structures:
+            self.stdout.write(u'{}: {} blocks'.format(name, len(block_structure)))
+            for serializer_name, serializer_class in sorted(SERIALIZERS.iteritems()):
+                self.stdout.write(u'  {}: {}'.format(
+                    serializer_name,
+                    _benchmark(serializer_class(), block_structure, options['iterations']),
+                ))
+
+
+def _benchmark(serializer, block_structure, iterations):
+    """
+    Returns a summary of the size and the best serialize and deserialize
+    times of the given serializer for the given block structure.
+    """
+    serialized_data = serializer.serialize(block_structure)
+    root_block_usage_key = block_structure.root_block_usage_key
+
+    serialize_time = min(timeit.repeat(
+        lambda: serializer.serialize(block_structure), number=1, repeat=iterations,
+    ))
+    deserialize_time = min(timeit.repeat(
+        lambda: serializer.deserialize(serialized_data, root_block_usage_key), number=1, repeat=iterations,
+    ))
+    return u'size: {} bytes, serialize: {:.1f} ms, deserialize: {:.1f} ms'.format(
+        len(serialized_data),
+        serialize_time * 1000,
+        deserialize_time * 1000,
+    )
+
+
+def _create_synthetic_block_structure(num_blocks):
+    """
+    Returns a collected block structure of a course with at least
+    num_blocks leaves, with xBlock and transformer fields similar to
+    those collected for a real course.
+    """
+    course_key = CourseLocator('benchmark', 'serializers', 'run')
+    root_key = BlockUsageLocator(course_key, 'course', 'course')
+    block_structure = BlockStructureBlockData(root_key)
+    block_types = ['chapter', 'sequential', 'vertical']
+    now = datetime.now(UTC)
+
+    def add_block(usage_key, depth):
+        """
+        Adds the block and its descendants to the block structure.
+        """
+        block_data = block_structure._get_or_create_block(usage_key)  # pylint: disable=protected-access
+        block_data.display_name = u'{} {}'.format(usage_key.block_type, usage_key.block_id)
+        block_data.category = usage_key.block_type
+        block_data.start = now
+        block_data.due = None
+        block_data.graded = depth == 2
+        block_data.format = u'Homework' if depth == 2 else None
+        block_data.transformer_data.get_or_create('visibility').fields['merged_visible_to_staff_only'] = False
+        block_data.transformer_data.get_or_create('grades').fields['max_score'] = 1.0 if depth == 3 else None
+
+        if depth == len(SYNTHETIC_BRANCHING):
+            return
+        branching = SYNTHETIC_BRANCHING[depth]
+        if depth == len(SYNTHETIC_BRANCHING) - 1:
+            branching = max(branching, num_blocks // reduce(lambda x, y: x * y, SYNTHETIC_BRANCHING[:-1]))
+        for index in range(branching):
+            child_key = BlockUsageLocator(
+                course_key, block_types[depth], u'{}_{}'.format(usage_key.block_id, index),
+            )
+            block_structure._add_relation(usage_key, child_key)  # pylint: disable=protected-access
+            add_block(child_key, depth + 1)
+
+    add_block(root_key, 0)
+    return block_structure
@@ -0,0 +1,104 @@
+"""
+Command to compare the dict-based and array-backed block structures.
+"""
+import gc
+import timeit
+
+from django.core.management.base import BaseCommand
+
+import openedx.core.djangoapps.content.block_structure.api as api
+from openedx.core.djangoapps.content.block_structure.array_block_structure import ArrayBlockStructureBlockData
+from openedx.core.lib.command_utils import parse_course_keys
+
+from .benchmark_block_structure_serializers import _create_synthetic_block_structure
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_block_structures --num_blocks 5000 --settings=devstack
+        $ ./manage.py lms benchmark_block_structures --courses 'edX/DemoX/Demo_Course' --settings=devstack
+    """
+    help = u'Compares the memory use and latency of the dict-based and array-backed block structures.'
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            '--courses',
+            dest='courses',
+            nargs='+',
+            help=u'Benchmark the collected block structures of the list of courses provided.',
+        )
+        parser.add_argument(
+            '--num_blocks',
+            help=u'Number of leaf blocks in the synthetic course used when no courses are provided.',
+            default=5000,
+            type=int,
+        )
+        parser.add_argument(
+            '--iterations',
+            help=u'Number of times each operation is timed.',
+            default=10,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        if options.get('courses'):
+            block_structures = [
+                (unicode(course_key), api.get_course_in_cache(course_key))
+                for course_key in parse_course_keys(options['courses'])
+            ]
+        else:
+            block_structures = [(u'synthetic', _create_synthetic_block_structure(options['num_blocks']))]
+
+        for name, block_structure in block_structures:
+            self.stdout.write(u'{}: {} blocks'.format(name, len(block_structure)))
+            array_block_structure = ArrayBlockStructureBlockData.create_from(block_structure)
+            for structure_name, structure in ((u'dict', block_structure), (u'array', array_block_structure)):
+                self.stdout.write(u'  {}: {}'.format(
+                    structure_name,
+                    _benchmark(structure, options['iterations']),
+                ))
+
+
+def _benchmark(block_structure, iterations):
+    """
+    Returns a summary of the number of objects allocated by a copy of the
+    given block structure and the best times of the operations run by
+    the transformers on it.
+    """
+    def remove_block_traversal():
+        """
+        Removes every other leaf block from a copy of the structure.
+        """
+        block_structure.copy().remove_block_traversal(
+            lambda usage_key: not block_structure.get_children(usage_key) and hash(usage_key) % 2
+        )
+
+    def read_fields():
+        """
+        Reads a field of every block in a topological traversal.
+        """
+        for usage_key in block_structure.topological_traversal():
+            block_structure.get_xblock_field(usage_key, 'display_name')
+
+    gc.collect()
+    num_objects = len(gc.get_objects())
+    block_structure_copy = block_structure.copy()
+    num_objects = len(gc.get_objects()) - num_objects
+    del block_structure_copy
+
+    def best_time(func):
+        """
+        Returns the best time of the given function, in milliseconds.
+        """
+        return min(timeit.repeat(func, number=1, repeat=iterations)) * 1000
+
+    return u'copy objects: {}, copy: {:.1f} ms, read fields: {:.1f} ms, remove blocks: {:.1f} ms'.format(
+        num_objects,
+        best_time(block_structure.copy),
+        best_time(read_fields),
+        best_time(remove_block_traversal),
+    )
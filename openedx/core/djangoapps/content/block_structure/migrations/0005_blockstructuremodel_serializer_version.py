@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('block_structure', '0004_blockstructuremodel_usagekeywithrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blockstructuremodel',
+            name='serializer_version',
+            field=models.CharField(max_length=255, null=True, verbose_name='Version of the serializer used to write the data.', blank=True),
+        ),
+    ]
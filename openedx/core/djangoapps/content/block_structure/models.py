@@ -130,6 +130,7 @@ class BlockStructureModel(TimeStampedModel):
         u'data_edit_timestamp',
         u'transformers_schema_version',
         u'block_structure_schema_version',
+        u'serializer_version',
     ]
     UNIQUENESS_FIELDS = [u'data_usage_key'] + VERSION_FIELDS
 
@@ -163,6 +164,12 @@ class BlockStructureModel(TimeStampedModel):
         blank=False,
         max_length=255,
     )
+    serializer_version = models.CharField(
+        u'Version of the serializer used to write the data.',
+        blank=True,
+        null=True,
+        max_length=255,
+    )
     data = CustomizableFileField()
 
     def get_serialized_data(self):
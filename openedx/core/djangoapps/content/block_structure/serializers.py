@@ -0,0 +1,337 @@
+"""
+Module for the serialization formats of BlockStructure objects.
+
+    PickleSerializer - zlib compressed pickle of the block structure's
+        internal data structures.
+    CompactSerializer - zlib compressed, schema-aware format that interns
+        usage keys into an integer table, stores relations as integer
+        adjacency arrays and stores field data column-wise.
+
+The serializer used to write a block structure is recorded with it, so
+structures written in either format can always be read back.
+"""
+# pylint: disable=protected-access
+from array import array
+import cPickle as pickle
+import zlib
+
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from . import config
+from .array_block_structure import ArrayBlockStructureBlockData, INDEX_TYPECODE
+from .block_structure import _BlockRelations, BlockData, TransformerData, TransformerDataMap
+from .factory import BlockStructureFactory
+
+
+class PickleSerializer(object):
+    """
+    Serializes the internal data structures of a block structure using
+    zlib compressed pickles.
+    """
+    NAME = u'zpickle'
+
+    def serialize(self, block_structure):
+        """
+        Returns the serialized data for the given block_structure.
+        """
+        return zpickle((
+            block_structure._block_relations,
+            block_structure.transformer_data,
+            block_structure._block_data_map,
+        ))
+
+    def deserialize(self, serialized_data, root_block_usage_key):
+        """
+        Returns the block structure for the given serialized_data.
+        """
+        block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
+        if _use_array_block_structures():
+            return ArrayBlockStructureBlockData.create_from_maps(
+                root_block_usage_key,
+                block_relations,
+                transformer_data,
+                block_data_map,
+            )
+        return BlockStructureFactory.create_new(
+            root_block_usage_key,
+            block_relations,
+            transformer_data,
+            block_data_map,
+        )
+
+
+class CompactSerializer(object):
+    """
+    Serializes block structures in a compact, schema-aware format.
+
+    Every usage key is interned into a table and referenced by its index
+    everywhere else. Keys in the same course as the root block are stored
+    as (block_type, block_id) pairs rather than as pickled key objects.
+    The parents and children of the blocks are stored as CSR-style
+    integer arrays: an array of offsets into a flat array of indices.
+    The xBlock and transformer fields of the blocks are stored as one
+    column per field: an array of the indices of the blocks that have the
+    field, and the list of their values.
+    """
+    NAME = u'compact_v1'
+
+    def serialize(self, block_structure):
+        """
+        Returns the serialized data for the given block_structure.
+        """
+        course_key = block_structure.root_block_usage_key.course_key
+        block_relations = block_structure._block_relations
+        block_data_map = block_structure._block_data_map
+
+        usage_keys = list(block_relations)
+        usage_keys.extend(usage_key for usage_key in block_data_map if usage_key not in block_relations)
+        index_of = {usage_key: index for index, usage_key in enumerate(usage_keys)}
+
+        key_table = [self._encode_key(usage_key, course_key) for usage_key in usage_keys]
+        relations = self._encode_relations(usage_keys[:len(block_relations)], block_relations, index_of)
+
+        xblock_columns = self._encode_columns(
+            (index_of[usage_key], block_data.fields)
+            for usage_key, block_data in block_data_map.iteritems()
+        )
+        transformer_columns = {}
+        for usage_key, block_data in block_data_map.iteritems():
+            for transformer_name, transformer_block_data in block_data.transformer_data.iteritems():
+                transformer_columns.setdefault(transformer_name, []).append(
+                    (index_of[usage_key], transformer_block_data.fields)
+                )
+        transformer_columns = {
+            transformer_name: (
+                array(INDEX_TYPECODE, (index for index, _ in columns)).tostring(),
+                self._encode_columns(columns),
+            )
+            for transformer_name, columns in transformer_columns.iteritems()
+        }
+        structure_transformer_data = {
+            transformer_name: transformer_data.fields
+            for transformer_name, transformer_data in block_structure.transformer_data.iteritems()
+        }
+
+        return zlib.compress(pickle.dumps(
+            (
+                unicode(course_key),
+                key_table,
+                relations,
+                array(INDEX_TYPECODE, (index_of[usage_key] for usage_key in block_data_map)).tostring(),
+                xblock_columns,
+                transformer_columns,
+                structure_transformer_data,
+            ),
+            pickle.HIGHEST_PROTOCOL,
+        ))
+
+    def deserialize(self, serialized_data, root_block_usage_key):
+        """
+        Returns the block structure for the given serialized_data.
+        """
+        (
+            course_key,
+            key_table,
+            relations,
+            block_data_indices,
+            xblock_columns,
+            transformer_columns,
+            structure_transformer_data,
+        ) = pickle.loads(zlib.decompress(serialized_data))
+
+        course_key = CourseKey.from_string(course_key)
+        usage_keys = [self._decode_key(encoded_key, course_key) for encoded_key in key_table]
+
+        if _use_array_block_structures():
+            return ArrayBlockStructureBlockData.create_from_columns(
+                root_block_usage_key,
+                usage_keys,
+                [array(INDEX_TYPECODE, encoded_array) for encoded_array in relations],
+                {
+                    field_name: (array(INDEX_TYPECODE, indices), values)
+                    for field_name, (indices, values) in xblock_columns.iteritems()
+                },
+                {
+                    transformer_name: {
+                        field_name: (array(INDEX_TYPECODE, indices), values)
+                        for field_name, (indices, values) in columns.iteritems()
+                    }
+                    for transformer_name, (_, columns) in transformer_columns.iteritems()
+                },
+                self._decode_transformer_data(structure_transformer_data),
+            )
+
+        block_relations = self._decode_relations(usage_keys, relations)
+
+        block_data_list = [None] * len(usage_keys)
+        for index in array(INDEX_TYPECODE, block_data_indices):
+            block_data_list[index] = self._new_field_data(
+                BlockData,
+                fields={},
+                location=usage_keys[index],
+                transformer_data=TransformerDataMap(),
+            )
+
+        self._decode_columns(
+            xblock_columns,
+            lambda index: block_data_list[index].fields,
+        )
+        for transformer_name, (indices, columns) in transformer_columns.iteritems():
+            for index in array(INDEX_TYPECODE, indices):
+                dict.__setitem__(
+                    block_data_list[index].transformer_data,
+                    transformer_name,
+                    self._new_field_data(TransformerData, fields={}),
+                )
+            self._decode_columns(
+                columns,
+                lambda index, name=transformer_name: block_data_list[index].transformer_data[name].fields,
+            )
+
+        return BlockStructureFactory.create_new(
+            root_block_usage_key,
+            block_relations,
+            self._decode_transformer_data(structure_transformer_data),
+            {
+                usage_keys[index]: block_data
+                for index, block_data in enumerate(block_data_list)
+                if block_data is not None
+            },
+        )
+
+    @classmethod
+    def _decode_transformer_data(cls, structure_transformer_data):
+        """
+        Returns the TransformerDataMap for the given map of transformer
+        name to the transformer's fields.
+        """
+        transformer_data = TransformerDataMap()
+        for transformer_name, fields in structure_transformer_data.iteritems():
+            transformer_data[transformer_name] = cls._new_field_data(TransformerData, fields=fields)
+        return transformer_data
+
+    @staticmethod
+    def _new_field_data(field_data_class, **attributes):
+        """
+        Returns a new instance of the given FieldData class, setting its
+        attributes directly as unpickling would, rather than through the
+        slower FieldData.__setattr__.
+        """
+        field_data = field_data_class.__new__(field_data_class)
+        field_data.__dict__.update(attributes)
+        return field_data
+
+    @staticmethod
+    def _encode_key(usage_key, course_key):
+        """
+        Returns the (block_type, block_id) pair of the given usage_key if
+        it can be recreated from them, else its serialized string.
+        """
+        if usage_key.course_key == course_key and \
+                usage_key == course_key.make_usage_key(usage_key.block_type, usage_key.block_id):
+            return usage_key.block_type, usage_key.block_id
+        return unicode(usage_key)
+
+    @staticmethod
+    def _decode_key(encoded_key, course_key):
+        """
+        Returns the usage key for the given output of _encode_key.
+        """
+        if isinstance(encoded_key, tuple):
+            return course_key.make_usage_key(*encoded_key)
+        return UsageKey.from_string(encoded_key)
+
+    @staticmethod
+    def _encode_relations(relation_keys, block_relations, index_of):
+        """
+        Returns the (parent_offsets, parents, child_offsets, children)
+        arrays of the given block_relations, as strings, for the blocks
+        in the order of relation_keys.
+        """
+        encoded = []
+        for relation_name in ('parents', 'children'):
+            offsets = array(INDEX_TYPECODE, [0])
+            indices = array(INDEX_TYPECODE)
+            for usage_key in relation_keys:
+                related_keys = getattr(block_relations[usage_key], relation_name)
+                indices.extend(index_of[related_key] for related_key in related_keys)
+                offsets.append(len(indices))
+            encoded.extend((offsets.tostring(), indices.tostring()))
+        return tuple(encoded)
+
+    @staticmethod
+    def _decode_relations(usage_keys, relations):
+        """
+        Returns the block relations map for the given output of
+        _encode_relations, given all the interned usage_keys.
+        """
+        parent_offsets, parents, child_offsets, children = [
+            array(INDEX_TYPECODE, encoded_array) for encoded_array in relations
+        ]
+        num_relations = len(child_offsets) - 1
+        block_relations = {}
+        for index, usage_key in enumerate(usage_keys[:num_relations]):
+            block_relation = _BlockRelations()
+            block_relation.parents = [
+                usage_keys[parent] for parent in parents[parent_offsets[index]:parent_offsets[index + 1]]
+            ]
+            block_relation.children = [
+                usage_keys[child] for child in children[child_offsets[index]:child_offsets[index + 1]]
+            ]
+            block_relations[usage_key] = block_relation
+        return block_relations
+
+    @staticmethod
+    def _encode_columns(indexed_fields):
+        """
+        Returns a map of field name to the (indices, values) column of the
+        field, given an iterable of (index, fields) pairs.
+        """
+        columns = {}
+        for index, fields in indexed_fields:
+            for field_name, value in fields.iteritems():
+                if field_name not in columns:
+                    columns[field_name] = (array(INDEX_TYPECODE), [])
+                indices, values = columns[field_name]
+                indices.append(index)
+                values.append(value)
+        return {
+            field_name: (indices.tostring(), values)
+            for field_name, (indices, values) in columns.iteritems()
+        }
+
+    @staticmethod
+    def _decode_columns(columns, get_fields):
+        """
+        Sets the values in the given columns on the fields returned by
+        get_fields for the index of each block.
+        """
+        for field_name, (indices, values) in columns.iteritems():
+            for index, value in zip(array(INDEX_TYPECODE, indices), values):
+                get_fields(index)[field_name] = value
+
+
+def _use_array_block_structures():
+    """
+    Returns whether deserialized block structures should be array-backed.
+    """
+    return config.waffle().is_enabled(config.ARRAY_BLOCK_STRUCTURES)
+
+
+SERIALIZERS = {
+    serializer.NAME: serializer
+    for serializer in (PickleSerializer, CompactSerializer)
+}
+
+
+def get_serializer(name=None):
+    """
+    Returns the serializer with the given name, or the serializer that is
+    currently configured for writing if no name is given.
+    """
+    if name is None:
+        name = CompactSerializer.NAME if config.waffle().is_enabled(config.COMPACT_SERIALIZATION) \
+            else PickleSerializer.NAME
+    return SERIALIZERS[name]()
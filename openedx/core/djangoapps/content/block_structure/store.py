@@ -4,13 +4,11 @@ Module for the Storage of BlockStructure objects.
 # pylint: disable=protected-access
 from logging import getLogger
 
-from openedx.core.lib.cache_utils import zpickle, zunpickle
-
 from . import config
 from .block_structure import BlockStructureBlockData
 from .exceptions import BlockStructureNotFound
-from .factory import BlockStructureFactory
 from .models import BlockStructureModel
+from .serializers import PickleSerializer, get_serializer
 from .transformer_registry import TransformerRegistry
 
 
@@ -25,6 +23,7 @@ class StubModel(object):
     """
     def __init__(self, root_block_usage_key):
         self.data_usage_key = root_block_usage_key
+        self.serializer_version = get_serializer().NAME
 
     def __unicode__(self):
         return unicode(self.data_usage_key)
@@ -51,8 +50,8 @@ class BlockStructureStore(object):
 
     def add(self, block_structure):
         """
-        Stores and caches a compressed and pickled serialization of
-        the given block structure.
+        Stores and caches a compressed serialization of the given
+        block structure, in the currently configured format.
 
         The data stored includes the structure's
         block relations, transformer data, and block data.
@@ -94,7 +93,9 @@ class BlockStructureStore(object):
         except BlockStructureNotFound:
             serialized_data = self._get_from_store(bs_model)
 
-        return self._deserialize(serialized_data, root_block_usage_key)
+        # Entries written before the serializer was recorded were pickled.
+        serializer_version = bs_model.serializer_version or PickleSerializer.NAME
+        return self._deserialize(serialized_data, root_block_usage_key, serializer_version)
 
     def delete(self, root_block_usage_key):
         """
@@ -192,24 +193,14 @@ class BlockStructureStore(object):
         """
         Serializes the data for the given block_structure.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure.transformer_data,
-            block_structure._block_data_map,
-        )
-        return zpickle(data_to_cache)
+        return get_serializer().serialize(block_structure)
 
-    def _deserialize(self, serialized_data, root_block_usage_key):
+    def _deserialize(self, serialized_data, root_block_usage_key, serializer_version=None):
         """
-        Deserializes the given data and returns the parsed block_structure.
+        Deserializes the given data, written with the given version of
+        serializer, and returns the parsed block_structure.
         """
-        block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
-        return BlockStructureFactory.create_new(
-            root_block_usage_key,
-            block_relations,
-            transformer_data,
-            block_data_map,
-        )
+        return get_serializer(serializer_version).deserialize(serialized_data, root_block_usage_key)
 
     @staticmethod
     def _encode_root_cache_key(bs_model):
@@ -221,8 +212,9 @@ class BlockStructureStore(object):
             return unicode(bs_model)
 
         else:
-            return "v{version}.root.key.{root_usage_key}".format(
+            return "v{version}.{serializer_version}.root.key.{root_usage_key}".format(
                 version=unicode(BlockStructureBlockData.VERSION),
+                serializer_version=bs_model.serializer_version,
                 root_usage_key=unicode(bs_model.data_usage_key),
             )
 
@@ -237,6 +229,7 @@ class BlockStructureStore(object):
             data_edit_timestamp=getattr(root_block, 'subtree_edited_on', None),
             transformers_schema_version=TransformerRegistry.get_write_version_hash(),
             block_structure_schema_version=unicode(BlockStructureBlockData.VERSION),
+            serializer_version=get_serializer().NAME,
         )
 
     @staticmethod
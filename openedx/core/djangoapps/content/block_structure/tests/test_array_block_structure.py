@@ -0,0 +1,152 @@
+"""
+Tests for array_block_structure.py
+"""
+# pylint: disable=protected-access
+from copy import deepcopy
+import ddt
+import itertools
+from nose.plugins.attrib import attr
+from unittest import TestCase
+
+from openedx.core.lib.graph_traversals import traverse_post_order
+
+from ..array_block_structure import ArrayBlockStructureBlockData
+from .helpers import MockTransformer, ChildrenMapTestMixin
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestArrayBlockStructureBlockData(TestCase, ChildrenMapTestMixin):
+    """
+    Tests for ArrayBlockStructureBlockData
+    """
+    def create_array_block_structure(self, children_map):
+        """
+        Returns an ArrayBlockStructureBlockData for the given
+        children_map, where every block has a display_name and a
+        transformer field.
+        """
+        block_structure = self.create_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)
+        for block in range(len(children_map)):
+            block_structure._get_or_create_block(block).display_name = u'Block {}'.format(block)
+            block_structure.set_transformer_block_field(block, MockTransformer, 'test_key', block)
+        return ArrayBlockStructureBlockData.create_from(block_structure)
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_create_from(self, children_map):
+        block_structure = self.create_array_block_structure(children_map)
+        self.assert_block_structure(block_structure, children_map)
+        self.assertEqual(len(block_structure), len(children_map))
+        self.assertEqual(block_structure._get_transformer_data_version(MockTransformer), 1)
+
+        for block in range(len(children_map)):
+            self.assertEqual(block_structure.get_xblock_field(block, 'display_name'), u'Block {}'.format(block))
+            self.assertEqual(block_structure[block].display_name, u'Block {}'.format(block))
+            self.assertEqual(block_structure[block].location, block)
+            self.assertEqual(block_structure.get_transformer_block_field(block, MockTransformer, 'test_key'), block)
+            self.assertEqual(
+                block_structure.get_transformer_block_data(block, MockTransformer).fields,
+                {'test_key': block},
+            )
+        self.assertIsNone(block_structure.get_xblock_field(0, 'missing_field'))
+        self.assertEqual(block_structure.get_transformer_block_field(0, MockTransformer, 'missing_key', 'd'), 'd')
+
+    def test_transformer_fields(self):
+        block_structure = self.create_array_block_structure(self.SIMPLE_CHILDREN_MAP)
+
+        block_structure.set_transformer_block_field(1, MockTransformer, 'new_key', 'new_value')
+        self.assertEqual(block_structure.get_transformer_block_field(1, MockTransformer, 'new_key'), 'new_value')
+        self.assertIsNone(block_structure.get_transformer_block_field(2, MockTransformer, 'new_key'))
+
+        block_structure.remove_transformer_block_field(1, MockTransformer, 'new_key')
+        self.assertIsNone(block_structure.get_transformer_block_field(1, MockTransformer, 'new_key'))
+
+        block_structure.set_transformer_block_field(1, 'other_transformer', 'key', 'value')
+        self.assertEqual(block_structure[1].transformer_data['other_transformer'].key, 'value')
+        with self.assertRaises(KeyError):
+            block_structure.get_transformer_block_data(2, 'other_transformer')
+
+    @ddt.data(
+        *itertools.product(
+            [True, False],
+            range(7),
+            [
+                ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+                ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+                ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+            ],
+        )
+    )
+    @ddt.unpack
+    def test_remove_block(self, keep_descendants, block_to_remove, children_map):
+        ### skip test if invalid
+        if (block_to_remove >= len(children_map)) or (keep_descendants and block_to_remove == 0):
+            return
+
+        block_structure = self.create_array_block_structure(children_map)
+        parents_map = self.get_parents_map(children_map)
+
+        ### remove block
+        block_structure.remove_block(block_to_remove, keep_descendants)
+        missing_blocks = [block_to_remove]
+
+        removed_children_map = deepcopy(children_map)
+        removed_children_map[block_to_remove] = []
+        for parent in parents_map[block_to_remove]:
+            removed_children_map[parent].remove(block_to_remove)
+        if keep_descendants:
+            for child in children_map[block_to_remove]:
+                for parent in parents_map[block_to_remove]:
+                    removed_children_map[parent].append(child)
+
+        self.assert_block_structure(block_structure, removed_children_map, missing_blocks)
+        self.assertIsNone(block_structure.get_xblock_field(block_to_remove, 'display_name'))
+
+        ### prune the structure
+        block_structure._prune_unreachable()
+
+        pruned_children_map = deepcopy(removed_children_map)
+        if not keep_descendants:
+            pruned_parents_map = self.get_parents_map(pruned_children_map)
+            for child in children_map[block_to_remove]:
+                if pruned_parents_map[child]:
+                    continue
+                for block in traverse_post_order(child, get_children=lambda block: pruned_children_map[block]):
+                    missing_blocks.append(block)
+                    pruned_children_map[block] = []
+
+        self.assert_block_structure(block_structure, pruned_children_map, missing_blocks)
+        self.assertEqual(len(block_structure), len(children_map) - len(set(missing_blocks)))
+        self.assertSetEqual(
+            set(block_structure.get_block_keys()),
+            set(range(len(children_map))) - set(missing_blocks),
+        )
+
+    def test_copy(self):
+        block_structure = self.create_array_block_structure(self.LINEAR_CHILDREN_MAP)
+        new_copy = block_structure.copy()
+        self.assert_block_structure(new_copy, self.LINEAR_CHILDREN_MAP)
+
+        # verify edits to the original block structure do not affect the copy
+        block_structure.remove_block(2, keep_descendants=True)
+        block_structure.set_transformer_block_field(1, MockTransformer, 'test_key', 'edit1')
+        block_structure.set_transformer_data(MockTransformer, 'data_key', 'edit1')
+        self.assert_block_structure(block_structure, [[1], [3], [], []], missing_blocks=[2])
+        self.assert_block_structure(new_copy, self.LINEAR_CHILDREN_MAP)
+        self.assertEqual(new_copy.get_transformer_block_field(1, MockTransformer, 'test_key'), 1)
+        self.assertIsNone(new_copy.get_transformer_data(MockTransformer, 'data_key'))
+
+        # verify edits to the copy do not affect the original
+        new_copy.set_transformer_block_field(1, MockTransformer, 'test_key', 'edit2')
+        self.assertEqual(block_structure.get_transformer_block_field(1, MockTransformer, 'test_key'), 'edit1')
+        self.assertEqual(new_copy.get_transformer_block_field(1, MockTransformer, 'test_key'), 'edit2')
+
+    def test_remove_block_traversal(self):
+        block_structure = self.create_array_block_structure(self.LINEAR_CHILDREN_MAP)
+        block_structure.remove_block_traversal(lambda block: block == 2)
+        self.assert_block_structure(block_structure, [[1], [], [], []], missing_blocks=[2])
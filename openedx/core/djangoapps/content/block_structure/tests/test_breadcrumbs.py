@@ -0,0 +1,59 @@
+"""
+Tests for block_structure/breadcrumbs.py
+"""
+from mock import Mock
+from nose.plugins.attrib import attr
+
+from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
+
+from ..breadcrumbs import BlockBreadcrumbs, BreadcrumbIndex
+from .helpers import ChildrenMapTestMixin, UsageKeyFactoryMixin, MockCache
+
+
+@attr(shard=2)
+class TestBreadcrumbIndex(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheIsolationTestCase):
+    """
+    Tests for BreadcrumbIndex
+    """
+    def setUp(self):
+        super(TestBreadcrumbIndex, self).setUp()
+
+        self.block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        for block_id in range(len(self.SIMPLE_CHILDREN_MAP)):
+            block_data = self.block_structure._get_or_create_block(  # pylint: disable=protected-access
+                self.block_key_factory(block_id)
+            )
+            block_data.display_name = u'Block {}'.format(block_id)
+
+        self.mock_cache = MockCache()
+        self.index = BreadcrumbIndex(self.course_key, self.mock_cache)
+
+    def test_build(self):
+        self.assertEqual(
+            BreadcrumbIndex.build(self.block_structure).items(),
+            [
+                (u'0', BlockBreadcrumbs('course', (u'Block 0',))),
+                (u'1', BlockBreadcrumbs('course', (u'Block 0', u'Block 1'))),
+                (u'3', BlockBreadcrumbs('course', (u'Block 0', u'Block 1', u'Block 3'))),
+                (u'4', BlockBreadcrumbs('course', (u'Block 0', u'Block 1', u'Block 4'))),
+                (u'2', BlockBreadcrumbs('course', (u'Block 0', u'Block 2'))),
+            ]
+        )
+
+    def test_get_is_cached(self):
+        get_block_structure = Mock(return_value=self.block_structure)
+
+        first_index = self.index.get(get_block_structure)
+        self.assertEqual(first_index[u'4'].breadcrumbs, (u'Block 0', u'Block 1', u'Block 4'))
+        self.assertEqual(self.mock_cache.set_call_count, 1)
+
+        self.assertEqual(self.index.get(get_block_structure), first_index)
+        self.assertEqual(get_block_structure.call_count, 1)
+
+    def test_clear(self):
+        get_block_structure = Mock(return_value=self.block_structure)
+        self.index.get(get_block_structure)
+        self.index.clear()
+
+        self.index.get(get_block_structure)
+        self.assertEqual(get_block_structure.call_count, 2)
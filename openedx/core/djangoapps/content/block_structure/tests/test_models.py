@@ -62,6 +62,7 @@ class BlockStructureModelTestCase(TestCase):
             data_edit_timestamp=now(),
             transformers_schema_version='TV',
             block_structure_schema_version=unicode(1),
+            serializer_version='SV',
         )
 
     def _verify_update_or_create_call(self, serialized_data, mock_log=None, expect_created=None):
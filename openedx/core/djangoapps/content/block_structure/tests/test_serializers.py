@@ -0,0 +1,94 @@
+"""
+Tests for block_structure/serializers.py
+"""
+import ddt
+from mock import patch
+from nose.plugins.attrib import attr
+from unittest import TestCase
+
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+
+from ..array_block_structure import ArrayBlockStructureBlockData
+from ..config import ARRAY_BLOCK_STRUCTURES, COMPACT_SERIALIZATION, waffle
+from ..serializers import CompactSerializer, PickleSerializer, get_serializer
+from .helpers import ChildrenMapTestMixin, UsageKeyFactoryMixin, MockTransformer
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestSerializers(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the block structure serializers
+    """
+    def setUp(self):
+        super(TestSerializers, self).setUp()
+        self.children_map = self.DAG_CHILDREN_MAP
+        self.block_structure = self.create_block_structure(self.children_map)
+
+        self.block_structure._add_transformer(MockTransformer)  # pylint: disable=protected-access
+        for block_key in self.block_structure:
+            block_data = self.block_structure._get_or_create_block(block_key)  # pylint: disable=protected-access
+            block_data.display_name = u'Block {}'.format(block_key.block_id)
+            if block_key.block_id != u'3':
+                self.block_structure.set_transformer_block_field(block_key, MockTransformer, 'test', [block_key])
+
+    def assert_same_block_structure(self, block_structure):
+        """
+        Verifies that the given block structure has the same relations
+        and data as the one created in setUp.
+        """
+        self.assert_block_structure(block_structure, self.children_map)
+        self.assertEqual(block_structure._get_transformer_data_version(MockTransformer), 1)  # pylint: disable=protected-access
+        for block_key in self.block_structure:
+            self.assertEqual(
+                block_structure.get_xblock_field(block_key, 'display_name'),
+                u'Block {}'.format(block_key.block_id),
+            )
+            self.assertEqual(
+                block_structure.get_transformer_block_field(block_key, MockTransformer, 'test'),
+                None if block_key.block_id == u'3' else [block_key],
+            )
+
+    @ddt.data(PickleSerializer, CompactSerializer)
+    def test_round_trip(self, serializer_class):
+        serializer = serializer_class()
+        serialized_data = serializer.serialize(self.block_structure)
+        block_structure = serializer.deserialize(serialized_data, self.block_structure.root_block_usage_key)
+        self.assert_same_block_structure(block_structure)
+
+    @ddt.data(PickleSerializer, CompactSerializer)
+    def test_round_trip_array_block_structures(self, serializer_class):
+        serializer = serializer_class()
+        serialized_data = serializer.serialize(self.block_structure)
+        with waffle().override(ARRAY_BLOCK_STRUCTURES, active=True):
+            block_structure = serializer.deserialize(serialized_data, self.block_structure.root_block_usage_key)
+        self.assertIsInstance(block_structure, ArrayBlockStructureBlockData)
+        self.assert_same_block_structure(block_structure)
+
+    def test_pickle_array_block_structures_built_once(self):
+        serializer = PickleSerializer()
+        serialized_data = serializer.serialize(self.block_structure)
+        with waffle().override(ARRAY_BLOCK_STRUCTURES, active=True):
+            with patch('openedx.core.djangoapps.content.block_structure.serializers.BlockStructureFactory') as factory:
+                block_structure = serializer.deserialize(serialized_data, self.block_structure.root_block_usage_key)
+        self.assertFalse(factory.create_new.called)
+        self.assertIsInstance(block_structure, ArrayBlockStructureBlockData)
+        self.assert_same_block_structure(block_structure)
+
+    def test_compact_foreign_keys(self):
+        other_course_key = CourseLocator('other_org', 'other_course', 'other_run')
+        foreign_key = BlockUsageLocator(course_key=other_course_key, block_type='html', block_id='foreign')
+        self.block_structure._add_relation(self.block_key_factory(4), foreign_key)  # pylint: disable=protected-access
+
+        serializer = CompactSerializer()
+        serialized_data = serializer.serialize(self.block_structure)
+        block_structure = serializer.deserialize(serialized_data, self.block_structure.root_block_usage_key)
+        self.assertEqual(block_structure.get_children(self.block_key_factory(4)), [foreign_key])
+        self.assertEqual(block_structure.get_parents(foreign_key), [self.block_key_factory(4)])
+
+    @ddt.data((True, CompactSerializer), (False, PickleSerializer))
+    @ddt.unpack
+    def test_get_serializer(self, compact_serialization, expected_serializer):
+        with waffle().override(COMPACT_SERIALIZATION, active=compact_serialization):
+            self.assertIsInstance(get_serializer(), expected_serializer)
+        self.assertIsInstance(get_serializer(expected_serializer.NAME), expected_serializer)
@@ -1,12 +1,15 @@
 """
 Tests for block_structure/cache.py
 """
+import itertools
+
 import ddt
 from nose.plugins.attrib import attr
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 
-from ..config import STORAGE_BACKING_FOR_CACHE, waffle
+from ..array_block_structure import ArrayBlockStructureBlockData
+from ..config import ARRAY_BLOCK_STRUCTURES, COMPACT_SERIALIZATION, STORAGE_BACKING_FOR_CACHE, waffle
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
 from ..store import BlockStructureStore
@@ -59,6 +62,42 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             self.assertIsNotNone(stored_value)
             self.assert_block_structure(stored_value, self.children_map)
 
+    @ddt.data(*itertools.product((True, False), repeat=2))
+    @ddt.unpack
+    def test_add_and_get_compact(self, with_storage_backing, read_compact):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(COMPACT_SERIALIZATION, active=True):
+                self.store.add(self.block_structure)
+            with waffle().override(COMPACT_SERIALIZATION, active=read_compact):
+                if with_storage_backing or read_compact:
+                    stored_value = self.store.get(self.block_structure.root_block_usage_key)
+                    self.assert_block_structure(stored_value, self.children_map)
+                else:
+                    # The cache key of the block structure depends on the serializer
+                    with self.assertRaises(BlockStructureNotFound):
+                        self.store.get(self.block_structure.root_block_usage_key)
+
+    @ddt.data(*itertools.product((True, False), repeat=2))
+    @ddt.unpack
+    def test_add_and_get_array_block_structures(self, with_storage_backing, compact_serialization):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(COMPACT_SERIALIZATION, active=compact_serialization):
+                self.store.add(self.block_structure)
+                with waffle().override(ARRAY_BLOCK_STRUCTURES, active=True):
+                    stored_value = self.store.get(self.block_structure.root_block_usage_key)
+
+        self.assertIsInstance(stored_value, ArrayBlockStructureBlockData)
+        self.assert_block_structure(stored_value, self.children_map)
+        self.assertEqual(
+            stored_value._get_transformer_data_version(MockTransformer),  # pylint: disable=protected-access
+            self.block_structure._get_transformer_data_version(MockTransformer),  # pylint: disable=protected-access
+        )
+        for block_key in self.block_structure:
+            self.assertEqual(
+                stored_value.get_transformer_block_field(block_key, MockTransformer, 'test'),
+                self.block_structure.get_transformer_block_field(block_key, MockTransformer, 'test'),
+            )
+
     @ddt.data(True, False)
     def test_delete(self, with_storage_backing):
         with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
@@ -1,6 +1,8 @@
 """
-Database Routers for use with the coursewarehistoryextended django app.
+Database Routers for use with the courseware and coursewarehistoryextended django apps.
 """
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
 
 
 class StudentModuleHistoryExtendedRouter(object):
@@ -57,3 +59,35 @@ class StudentModuleHistoryExtendedRouter(object):
             return False
 
         return None
+
+
+class StudentModuleShardRouter(object):
+    """
+    A Database Router that keeps ShardedStudentModule in the databases of settings.STUDENT_MODULE_SHARDS,
+    and nothing but ShardedStudentModule in the shards other than the default database.
+
+    Reads and writes of ShardedStudentModule name the shard they go to explicitly.
+    """
+
+    def _is_sharded_student_module(self, model):
+        """
+        Return True if ``model`` is courseware.ShardedStudentModule.
+        """
+        return (
+            model._meta.app_label == 'courseware' and  # pylint: disable=protected-access
+            model.__name__ == 'ShardedStudentModule'
+        )
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):  # pylint: disable=unused-argument
+        """
+        Only sync ShardedStudentModule to the databases of settings.STUDENT_MODULE_SHARDS
+        """
+        shards = getattr(settings, 'STUDENT_MODULE_SHARDS', [DEFAULT_DB_ALIAS])
+        if model_name is not None:
+            model = hints.get('model')
+            if model is not None and self._is_sharded_student_module(model):
+                return db in shards
+        if db in shards and db != DEFAULT_DB_ALIAS:
+            return False
+
+        return None